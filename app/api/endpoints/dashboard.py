@@ -1,113 +1,89 @@
-from pathlib import Path
 from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, Response
 
 from app import schemas
 from app.chain.dashboard import DashboardChain
-from app.chain.storage import StorageChain
 from app.core.security import verify_token, verify_apitoken
-from app.db import get_db
-from app.db.models.transferhistory import TransferHistory
-from app.helper.directory import DirectoryHelper
 from app.scheduler import Scheduler
-from app.utils.system import SystemUtils
+from app.utils.http import RequestUtils
 
 router = APIRouter()
 
 
+def _snapshot_response(widget: str, response: Response, if_none_match: Optional[str], *args) -> Any:
+    """
+    返回组件的最新快照，ETag一致时返回304
+    """
+    data, etag = DashboardChain().snapshot(widget, *args)
+    headers = RequestUtils.generate_cache_headers(etag, cache_control="no-cache", max_age=None)
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return data
+
+
 @router.get("/statistic", summary="媒体数量统计", response_model=schemas.Statistic)
-def statistic(name: str = None, _: schemas.TokenPayload = Depends(verify_token)) -> Any:
+def statistic(response: Response, name: str = None, if_none_match: Optional[str] = Header(None),
+              _: schemas.TokenPayload = Depends(verify_token)) -> Any:
     """
     查询媒体数量统计信息
     """
-    media_statistics: Optional[List[schemas.Statistic]] = DashboardChain().media_statistic(name)
-    if media_statistics:
-        # 汇总各媒体库统计信息
-        ret_statistic = schemas.Statistic()
-        for media_statistic in media_statistics:
-            ret_statistic.movie_count += media_statistic.movie_count
-            ret_statistic.tv_count += media_statistic.tv_count
-            ret_statistic.episode_count += media_statistic.episode_count
-            ret_statistic.user_count += media_statistic.user_count
-        return ret_statistic
-    else:
-        return schemas.Statistic()
+    return _snapshot_response("statistic", response, if_none_match, name)
 
 
 @router.get("/statistic2", summary="媒体数量统计（API_TOKEN）", response_model=schemas.Statistic)
-def statistic2(_: str = Depends(verify_apitoken)) -> Any:
+def statistic2(response: Response, if_none_match: Optional[str] = Header(None),
+               _: str = Depends(verify_apitoken)) -> Any:
     """
     查询媒体数量统计信息 API_TOKEN认证（?token=xxx）
     """
-    return statistic()
+    return _snapshot_response("statistic", response, if_none_match, None)
 
 
 @router.get("/storage", summary="本地存储空间", response_model=schemas.Storage)
-def storage(_: schemas.TokenPayload = Depends(verify_token)) -> Any:
+def storage(response: Response, if_none_match: Optional[str] = Header(None),
+            _: schemas.TokenPayload = Depends(verify_token)) -> Any:
     """
     查询本地存储空间信息
     """
-    total, available = 0, 0
-    dirs = DirectoryHelper().get_dirs()
-    if not dirs:
-        return schemas.Storage(total_storage=total, used_storage=total - available)
-    storages = set([d.library_storage for d in dirs if d.library_storage])
-    for _storage in storages:
-        _usage = StorageChain().storage_usage(_storage)
-        if _usage:
-            total += _usage.total
-            available += _usage.available
-    return schemas.Storage(
-        total_storage=total,
-        used_storage=total - available
-    )
+    return _snapshot_response("storage", response, if_none_match)
 
 
 @router.get("/storage2", summary="本地存储空间（API_TOKEN）", response_model=schemas.Storage)
-def storage2(_: str = Depends(verify_apitoken)) -> Any:
+def storage2(response: Response, if_none_match: Optional[str] = Header(None),
+             _: str = Depends(verify_apitoken)) -> Any:
     """
     查询本地存储空间信息 API_TOKEN认证（?token=xxx）
     """
-    return storage()
+    return _snapshot_response("storage", response, if_none_match)
 
 
 @router.get("/processes", summary="进程信息", response_model=List[schemas.ProcessInfo])
-def processes(_: schemas.TokenPayload = Depends(verify_token)) -> Any:
+def processes(response: Response, if_none_match: Optional[str] = Header(None),
+              _: schemas.TokenPayload = Depends(verify_token)) -> Any:
     """
     查询进程信息
     """
-    return SystemUtils.processes()
+    return _snapshot_response("processes", response, if_none_match)
 
 
 @router.get("/downloader", summary="下载器信息", response_model=schemas.DownloaderInfo)
-def downloader(name: str = None, _: schemas.TokenPayload = Depends(verify_token)) -> Any:
+def downloader(response: Response, name: str = None, if_none_match: Optional[str] = Header(None),
+               _: schemas.TokenPayload = Depends(verify_token)) -> Any:
     """
     查询下载器信息
     """
-    # 下载目录空间
-    download_dirs = DirectoryHelper().get_local_download_dirs()
-    _, free_space = SystemUtils.space_usage([Path(d.download_path) for d in download_dirs])
-    # 下载器信息
-    downloader_info = schemas.DownloaderInfo()
-    transfer_infos = DashboardChain().downloader_info(name)
-    if transfer_infos:
-        for transfer_info in transfer_infos:
-            downloader_info.download_speed += transfer_info.download_speed
-            downloader_info.upload_speed += transfer_info.upload_speed
-            downloader_info.download_size += transfer_info.download_size
-            downloader_info.upload_size += transfer_info.upload_size
-        downloader_info.free_space = free_space
-    return downloader_info
+    return _snapshot_response("downloader", response, if_none_match, name)
 
 
 @router.get("/downloader2", summary="下载器信息（API_TOKEN）", response_model=schemas.DownloaderInfo)
-def downloader2(_: str = Depends(verify_apitoken)) -> Any:
+def downloader2(response: Response, if_none_match: Optional[str] = Header(None),
+                _: str = Depends(verify_apitoken)) -> Any:
     """
     查询下载器信息 API_TOKEN认证（?token=xxx）
     """
-    return downloader()
+    return _snapshot_response("downloader", response, if_none_match, None)
 
 
 @router.get("/schedule", summary="后台服务", response_model=List[schemas.ScheduleInfo])
@@ -127,42 +103,45 @@ def schedule2(_: str = Depends(verify_apitoken)) -> Any:
 
 
 @router.get("/transfer", summary="文件整理统计", response_model=List[int])
-def transfer(days: int = 7, db: Session = Depends(get_db),
+def transfer(response: Response, days: int = 7, if_none_match: Optional[str] = Header(None),
              _: schemas.TokenPayload = Depends(verify_token)) -> Any:
     """
     查询文件整理统计信息
     """
-    transfer_stat = TransferHistory.statistic(db, days)
-    return [stat[1] for stat in transfer_stat]
+    return _snapshot_response("transfer", response, if_none_match, days)
 
 
 @router.get("/cpu", summary="获取当前CPU使用率", response_model=int)
-def cpu(_: schemas.TokenPayload = Depends(verify_token)) -> Any:
+def cpu(response: Response, if_none_match: Optional[str] = Header(None),
+        _: schemas.TokenPayload = Depends(verify_token)) -> Any:
     """
     获取当前CPU使用率
     """
-    return SystemUtils.cpu_usage()
+    return _snapshot_response("cpu", response, if_none_match)
 
 
 @router.get("/cpu2", summary="获取当前CPU使用率（API_TOKEN）", response_model=int)
-def cpu2(_: str = Depends(verify_apitoken)) -> Any:
+def cpu2(response: Response, if_none_match: Optional[str] = Header(None),
+         _: str = Depends(verify_apitoken)) -> Any:
     """
     获取当前CPU使用率 API_TOKEN认证（?token=xxx）
     """
-    return cpu()
+    return _snapshot_response("cpu", response, if_none_match)
 
 
 @router.get("/memory", summary="获取当前内存使用量和使用率", response_model=List[int])
-def memory(_: schemas.TokenPayload = Depends(verify_token)) -> Any:
+def memory(response: Response, if_none_match: Optional[str] = Header(None),
+           _: schemas.TokenPayload = Depends(verify_token)) -> Any:
     """
     获取当前内存使用率
     """
-    return SystemUtils.memory_usage()
+    return _snapshot_response("memory", response, if_none_match)
 
 
 @router.get("/memory2", summary="获取当前内存使用量和使用率（API_TOKEN）", response_model=List[int])
-def memory2(_: str = Depends(verify_apitoken)) -> Any:
+def memory2(response: Response, if_none_match: Optional[str] = Header(None),
+            _: str = Depends(verify_apitoken)) -> Any:
     """
     获取当前内存使用率 API_TOKEN认证（?token=xxx）
     """
-    return memory()
+    return _snapshot_response("memory", response, if_none_match)
@@ -20,12 +20,13 @@ router = APIRouter()
 @router.get("/download", summary="查询下载历史记录", response_model=List[schemas.DownloadHistory])
 def download_history(page: int = 1,
                      count: int = 30,
+                     cursor: int = None,
                      db: Session = Depends(get_db),
                      _: schemas.TokenPayload = Depends(verify_token)) -> Any:
     """
-    查询下载历史记录
+    查询下载历史记录，传入cursor（上一页最后一条记录的ID）时按游标分页，忽略page
     """
-    return DownloadHistory.list_by_page(db, page, count)
+    return DownloadHistory.list_by_page(db, page, count, cursor=cursor)
 
 
 @router.delete("/download", summary="删除下载历史记录", response_model=schemas.Response)
@@ -44,10 +45,11 @@ def transfer_history(title: str = None,
                      page: int = 1,
                      count: int = 30,
                      status: bool = None,
+                     cursor: str = None,
                      db: Session = Depends(get_db),
                      _: schemas.TokenPayload = Depends(verify_token)) -> Any:
     """
-    查询转移历史记录
+    查询转移历史记录，传入cursor（上一页返回的next_cursor）时按游标分页，忽略page
     """
     if title == "失败":
         title = None
@@ -59,15 +61,16 @@ def transfer_history(title: str = None,
     if title:
         total = TransferHistory.count_by_title(db, title=title, status=status)
         result = TransferHistory.list_by_title(db, title=title, page=page,
-                                               count=count, status=status)
+                                               count=count, status=status, cursor=cursor)
     else:
-        result = TransferHistory.list_by_page(db, page=page, count=count, status=status)
+        result = TransferHistory.list_by_page(db, page=page, count=count, status=status, cursor=cursor)
         total = TransferHistory.count(db, status=status)
 
     return schemas.Response(success=True,
                             data={
                                 "list": result,
                                 "total": total,
+                                "next_cursor": TransferHistory.get_cursor(result[-1]) if len(result) >= count else None,
                             })
 
 
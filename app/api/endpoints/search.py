@@ -1,12 +1,15 @@
-from typing import List, Any
+import json
+from typing import List, Any, Optional, Tuple, Iterator
 
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 
 from app import schemas
 from app.chain.media import MediaChain
 from app.chain.search import SearchChain
-from app.core.config import settings
-from app.core.security import verify_token
+from app.core.config import settings, global_vars
+from app.core.context import Context
+from app.core.security import verify_token, verify_resource_token
 from app.schemas.types import MediaType
 
 router = APIRouter()
@@ -21,31 +24,21 @@ def search_latest(_: schemas.TokenPayload = Depends(verify_token)) -> Any:
     return [torrent.to_dict() for torrent in torrents]
 
 
-@router.get("/media/{mediaid}", summary="精确搜索资源", response_model=schemas.Response)
-def search_by_id(mediaid: str,
-                 mtype: str = None,
-                 area: str = "title",
-                 season: str = None,
-                 _: schemas.TokenPayload = Depends(verify_token)) -> Any:
+def _resolve_mediaid(mediaid: str, mtype: Optional[MediaType],
+                     season: Optional[int]) -> Tuple[Optional[dict], Optional[str]]:
     """
-    根据TMDBID/豆瓣ID精确搜索站点资源 tmdb:/douban:/bangumi:
+    将TMDBID/豆瓣ID/BangumiID转换为当前识别源可用的搜索参数
+    :return: 搜索参数, 错误信息
     """
-    if mtype:
-        mtype = MediaType(mtype)
-    if season:
-        season = int(season)
     if mediaid.startswith("tmdb:"):
         tmdbid = int(mediaid.replace("tmdb:", ""))
         if settings.RECOGNIZE_SOURCE == "douban":
             # 通过TMDBID识别豆瓣ID
             doubaninfo = MediaChain().get_doubaninfo_by_tmdbid(tmdbid=tmdbid, mtype=mtype)
             if doubaninfo:
-                torrents = SearchChain().search_by_id(doubanid=doubaninfo.get("id"),
-                                                      mtype=mtype, area=area, season=season)
-            else:
-                return schemas.Response(success=False, message="未识别到豆瓣媒体信息")
-        else:
-            torrents = SearchChain().search_by_id(tmdbid=tmdbid, mtype=mtype, area=area, season=season)
+                return {"doubanid": doubaninfo.get("id"), "mtype": mtype, "season": season}, None
+            return None, "未识别到豆瓣媒体信息"
+        return {"tmdbid": tmdbid, "mtype": mtype, "season": season}, None
     elif mediaid.startswith("douban:"):
         doubanid = mediaid.replace("douban:", "")
         if settings.RECOGNIZE_SOURCE == "themoviedb":
@@ -54,39 +47,98 @@ def search_by_id(mediaid: str,
             if tmdbinfo:
                 if tmdbinfo.get('season') and not season:
                     season = tmdbinfo.get('season')
-                torrents = SearchChain().search_by_id(tmdbid=tmdbinfo.get("id"),
-                                                      mtype=mtype, area=area, season=season)
-            else:
-                return schemas.Response(success=False, message="未识别到TMDB媒体信息")
-        else:
-            torrents = SearchChain().search_by_id(doubanid=doubanid, mtype=mtype, area=area, season=season)
+                return {"tmdbid": tmdbinfo.get("id"), "mtype": mtype, "season": season}, None
+            return None, "未识别到TMDB媒体信息"
+        return {"doubanid": doubanid, "mtype": mtype, "season": season}, None
     elif mediaid.startswith("bangumi:"):
         bangumiid = int(mediaid.replace("bangumi:", ""))
         if settings.RECOGNIZE_SOURCE == "themoviedb":
             # 通过BangumiID识别TMDBID
             tmdbinfo = MediaChain().get_tmdbinfo_by_bangumiid(bangumiid=bangumiid)
             if tmdbinfo:
-                torrents = SearchChain().search_by_id(tmdbid=tmdbinfo.get("id"),
-                                                      mtype=mtype, area=area, season=season)
-            else:
-                return schemas.Response(success=False, message="未识别到TMDB媒体信息")
-        else:
-            # 通过BangumiID识别豆瓣ID
-            doubaninfo = MediaChain().get_doubaninfo_by_bangumiid(bangumiid=bangumiid)
-            if doubaninfo:
-                torrents = SearchChain().search_by_id(doubanid=doubaninfo.get("id"),
-                                                      mtype=mtype, area=area, season=season)
-            else:
-                return schemas.Response(success=False, message="未识别到豆瓣媒体信息")
-    else:
-        return schemas.Response(success=False, message="未知的媒体ID")
+                return {"tmdbid": tmdbinfo.get("id"), "mtype": mtype, "season": season}, None
+            return None, "未识别到TMDB媒体信息"
+        # 通过BangumiID识别豆瓣ID
+        doubaninfo = MediaChain().get_doubaninfo_by_bangumiid(bangumiid=bangumiid)
+        if doubaninfo:
+            return {"doubanid": doubaninfo.get("id"), "mtype": mtype, "season": season}, None
+        return None, "未识别到豆瓣媒体信息"
+    return None, "未知的媒体ID"
+
+
+def _stream_response(results: Iterator[Tuple[List[Context], List[int]]] = None,
+                     message: str = None) -> StreamingResponse:
+    """
+    以SSE格式逐站点推送搜索结果，每条消息包含新增资源及其在全部结果中的位置，最后推送完成消息
+    :param results: 搜索结果生成器
+    :param message: 无法搜索时的错误信息，推送错误消息后结束
+    """
+
+    def event_generator():
+        if message:
+            yield f"data: {json.dumps({'type': 'error', 'message': message}, ensure_ascii=False)}\n\n"
+            yield f"data: {json.dumps({'type': 'done', 'total': 0})}\n\n"
+            return
+        total = 0
+        for contexts, positions in results:
+            if global_vars.is_system_stopped:
+                break
+            total += len(contexts)
+            data = {
+                "type": "result",
+                "site": contexts[0].torrent_info.site_name if contexts else None,
+                "positions": positions,
+                "data": [context.to_dict() for context in contexts]
+            }
+            yield f"data: {json.dumps(data, default=str)}\n\n"
+        yield f"data: {json.dumps({'type': 'done', 'total': total})}\n\n"
 
+    return StreamingResponse(event_generator(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/media/{mediaid}", summary="精确搜索资源", response_model=schemas.Response)
+def search_by_id(mediaid: str,
+                 mtype: str = None,
+                 area: str = "title",
+                 season: str = None,
+                 _: schemas.TokenPayload = Depends(verify_token)) -> Any:
+    """
+    根据TMDBID/豆瓣ID精确搜索站点资源 tmdb:/douban:/bangumi:
+    """
+    if mtype:
+        mtype = MediaType(mtype)
+    if season:
+        season = int(season)
+    params, message = _resolve_mediaid(mediaid, mtype=mtype, season=season)
+    if not params:
+        return schemas.Response(success=False, message=message)
+    torrents = SearchChain().search_by_id(area=area, **params)
     if not torrents:
         return schemas.Response(success=False, message="未搜索到任何资源")
     else:
         return schemas.Response(success=True, data=[torrent.to_dict() for torrent in torrents])
 
 
+@router.get("/media/{mediaid}/stream", summary="精确搜索资源（实时推送）")
+def search_by_id_stream(mediaid: str,
+                        mtype: str = None,
+                        area: str = "title",
+                        season: str = None,
+                        _: schemas.TokenPayload = Depends(verify_resource_token)) -> Any:
+    """
+    根据TMDBID/豆瓣ID精确搜索站点资源，每个站点完成后立即推送该站点匹配的资源，返回格式为SSE
+    """
+    if mtype:
+        mtype = MediaType(mtype)
+    if season:
+        season = int(season)
+    params, message = _resolve_mediaid(mediaid, mtype=mtype, season=season)
+    if not params:
+        return _stream_response(message=message)
+    return _stream_response(SearchChain().search_by_id_stream(area=area, **params))
+
+
 @router.get("/title", summary="模糊搜索资源", response_model=schemas.Response)
 def search_by_title(keyword: str = None,
                     page: int = 0,
@@ -99,3 +151,14 @@ def search_by_title(keyword: str = None,
     if not torrents:
         return schemas.Response(success=False, message="未搜索到任何资源")
     return schemas.Response(success=True, data=[torrent.to_dict() for torrent in torrents])
+
+
+@router.get("/title/stream", summary="模糊搜索资源（实时推送）")
+def search_by_title_stream(keyword: str = None,
+                           page: int = 0,
+                           site: int = None,
+                           _: schemas.TokenPayload = Depends(verify_resource_token)) -> Any:
+    """
+    根据名称模糊搜索站点资源，每个站点完成后立即推送该站点的资源，返回格式为SSE
+    """
+    return _stream_response(SearchChain().search_by_title_stream(title=keyword, page=page, site=site))
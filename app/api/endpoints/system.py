@@ -16,7 +16,9 @@ from app import schemas
 from app.chain.search import SearchChain
 from app.chain.system import SystemChain
 from app.core.config import global_vars, settings
+from app.core.metrics import metrics
 from app.core.module import ModuleManager
+from app.core.profiler import startup_profiler
 from app.core.security import verify_apitoken, verify_resource_token, verify_token
 from app.db.models import User
 from app.db.systemconfig_oper import SystemConfigOper
@@ -492,3 +494,22 @@ def run_scheduler2(jobid: str,
 
     Scheduler().start(jobid)
     return schemas.Response(success=True)
+
+
+@router.get("/startup", summary="启动耗时", response_model=schemas.Response)
+def startup_report(_: schemas.TokenPayload = Depends(verify_token)):
+    """
+    查询启动耗时报告，按阶段和模块统计
+    """
+    return schemas.Response(success=True, data=startup_profiler.report())
+
+
+@router.get("/metrics", summary="运行指标")
+def get_metrics(_: str = Depends(verify_apitoken)):
+    """
+    获取 OpenMetrics 格式的运行指标（API_TOKEN认证）
+    """
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="运行指标未开启")
+    return Response(content=metrics.render(),
+                    media_type="application/openmetrics-text; version=1.0.0; charset=utf-8")
@@ -1,22 +1,21 @@
 import gc
 import pickle
+import time
 import traceback
 from abc import ABCMeta
 from pathlib import Path
-from typing import Optional, Any, Tuple, List, Set, Union, Dict
-
-from qbittorrentapi import TorrentFilesList
-from ruamel.yaml import CommentedMap
-from transmission_rpc import File
+from typing import Optional, Any, Tuple, List, Set, Union, Dict, TYPE_CHECKING
 
 from app.core.config import settings
 from app.core.context import Context, MediaInfo, TorrentInfo
 from app.core.event import EventManager
 from app.core.meta import MetaBase
+from app.core.metrics import metrics
 from app.core.module import ModuleManager
 from app.db.message_oper import MessageOper
 from app.db.user_oper import UserOper
 from app.helper.message import MessageHelper
+from app.helper.messagequeue import MessageQueueManager
 from app.helper.service import ServiceConfigHelper
 from app.log import logger
 from app.schemas import TransferInfo, TransferTorrent, ExistMediaInfo, DownloadingTorrent, CommingMessage, Notification, \
@@ -24,6 +23,12 @@ from app.schemas import TransferInfo, TransferTorrent, ExistMediaInfo, Downloadi
 from app.schemas.types import TorrentStatus, MediaType, MediaImageType, EventType
 from app.utils.object import ObjectUtils
 
+if TYPE_CHECKING:
+    # 仅用于类型注解，避免启动时导入下载器等第三方库
+    from qbittorrentapi import TorrentFilesList
+    from ruamel.yaml import CommentedMap
+    from transmission_rpc import File
+
 
 class ChainBase(metaclass=ABCMeta):
     """
@@ -38,6 +43,7 @@ class ChainBase(metaclass=ABCMeta):
         self.eventmanager = EventManager()
         self.messageoper = MessageOper()
         self.messagehelper = MessageHelper()
+        self.messagequeue = MessageQueueManager()
         self.useroper = UserOper()
 
     @staticmethod
@@ -105,6 +111,7 @@ class ChainBase(metaclass=ABCMeta):
             except Exception as err:
                 logger.debug(f"获取模块名称出错：{str(err)}")
                 module_name = module_id
+            start_time = time.perf_counter() if metrics.enabled else None
             try:
                 func = getattr(module, method)
                 if is_result_empty(result):
@@ -140,6 +147,10 @@ class ChainBase(metaclass=ABCMeta):
                         "traceback": traceback.format_exc()
                     }
                 )
+            finally:
+                if start_time is not None:
+                    metrics.observe("mp_module_duration_seconds", "模块方法执行耗时",
+                                    time.perf_counter() - start_time, module=module_id, method=method)
         return result
 
     def recognize_media(self, meta: MetaBase = None,
@@ -300,7 +311,7 @@ class ChainBase(metaclass=ABCMeta):
         """
         return self.run_module("search_persons", name=name)
 
-    def search_torrents(self, site: CommentedMap,
+    def search_torrents(self, site: "CommentedMap",
                         keywords: List[str],
                         mtype: MediaType = None,
                         page: int = 0) -> List[TorrentInfo]:
@@ -315,7 +326,7 @@ class ChainBase(metaclass=ABCMeta):
         return self.run_module("search_torrents", site=site, keywords=keywords,
                                mtype=mtype, page=page)
 
-    def refresh_torrents(self, site: CommentedMap) -> List[TorrentInfo]:
+    def refresh_torrents(self, site: "CommentedMap") -> List[TorrentInfo]:
         """
         获取站点最新一页的种子，多个站点需要多线程处理
         :param site:  站点
@@ -381,6 +392,14 @@ class ChainBase(metaclass=ABCMeta):
         """
         return self.run_module("list_torrents", status=status, hashs=hashs, downloader=downloader)
 
+    def completed_torrents(self, downloader: str = None) -> Optional[List[TransferTorrent]]:
+        """
+        获取自上次检查以来新完成下载且未整理的种子
+        :param downloader:  下载器
+        :return: 新完成的种子列表
+        """
+        return self.run_module("completed_torrents", downloader=downloader)
+
     def transfer(self, fileitem: FileItem, meta: MetaBase, mediainfo: MediaInfo,
                  transfer_type: str, target_storage: str = None, target_path: Path = None,
                  episodes_info: List[TmdbEpisode] = None,
@@ -443,7 +462,7 @@ class ChainBase(metaclass=ABCMeta):
         return self.run_module("stop_torrents", hashs=hashs, downloader=downloader)
 
     def torrent_files(self, tid: str,
-                      downloader: str = None) -> Optional[Union[TorrentFilesList, List[File]]]:
+                      downloader: str = None) -> Optional[Union["TorrentFilesList", List["File"]]]:
         """
         获取种子文件
         :param tid:  种子Hash
@@ -508,7 +527,7 @@ class ChainBase(metaclass=ABCMeta):
         self.messagehelper.put(message, role="user", title=message.title)
         self.messageoper.add(**message.dict())
         # 发送
-        self.run_module("post_message", message=message)
+        self.messagequeue.send("post_message", message=message)
 
     def post_medias_message(self, message: Notification, medias: List[MediaInfo]) -> None:
         """
@@ -520,7 +539,7 @@ class ChainBase(metaclass=ABCMeta):
         note_list = [media.to_dict() for media in medias]
         self.messagehelper.put(message, role="user", note=note_list, title=message.title)
         self.messageoper.add(**message.dict(), note=note_list)
-        return self.run_module("post_medias_message", message=message, medias=medias)
+        self.messagequeue.send("post_medias_message", message=message, medias=medias)
 
     def post_torrents_message(self, message: Notification, torrents: List[Context]) -> None:
         """
@@ -532,7 +551,7 @@ class ChainBase(metaclass=ABCMeta):
         note_list = [torrent.torrent_info.to_dict() for torrent in torrents]
         self.messagehelper.put(message, role="user", note=note_list, title=message.title)
         self.messageoper.add(**message.dict(), note=note_list)
-        return self.run_module("post_torrents_message", message=message, torrents=torrents)
+        self.messagequeue.send("post_torrents_message", message=message, torrents=torrents)
 
     def metadata_img(self, mediainfo: MediaInfo, season: int = None, episode: int = None) -> Optional[dict]:
         """
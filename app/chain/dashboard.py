@@ -1,14 +1,72 @@
-from typing import Optional, List
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Optional, List, Any, Callable, Dict, Tuple
+
+from pydantic import BaseModel
 
 from app import schemas
 from app.chain import ChainBase
+from app.chain.storage import StorageChain
+from app.core.metrics import metrics
+from app.db.transferhistory_oper import TransferHistoryOper
+from app.helper.directory import DirectoryHelper
+from app.log import logger
+from app.utils.crypto import HashUtils
 from app.utils.singleton import Singleton
+from app.utils.system import SystemUtils
+
+
+class _Snapshot:
+    """
+    仪表板组件快照
+    """
+
+    def __init__(self):
+        self.data: Any = None
+        self.etag: Optional[str] = None
+        # 数据生成时间
+        self.updated: float = 0
+        # 最近一次访问时间
+        self.accessed: float = 0
+        # 刷新锁，同一组件同时只刷新一次
+        self.lock = threading.Lock()
 
 
 class DashboardChain(ChainBase, metaclass=Singleton):
     """
     各类仪表板统计处理链
     """
+
+    # 各组件数据的过期时间（秒），超过后访问时才重新计算
+    _budgets = {
+        "statistic": 300,
+        "storage": 600,
+        "downloader": 5,
+        "transfer": 300,
+        "cpu": 2,
+        "memory": 2,
+        "processes": 5,
+    }
+    # 超过该时长未被访问的组件快照释放（秒）
+    _idle_timeout = 600
+
+    def __init__(self):
+        super().__init__()
+        # (组件, 参数) -> 快照
+        self._snapshots: Dict[Tuple[str, tuple], _Snapshot] = {}
+        self._lock = threading.Lock()
+        self._builders: Dict[str, Callable[..., Any]] = {
+            "statistic": self.__build_statistic,
+            "storage": self.__build_storage,
+            "downloader": self.__build_downloader,
+            "transfer": self.__build_transfer,
+            "cpu": SystemUtils.cpu_usage,
+            "memory": SystemUtils.memory_usage,
+            "processes": SystemUtils.processes,
+        }
+
     def media_statistic(self, server: str = None) -> Optional[List[schemas.Statistic]]:
         """
         媒体数量统计
@@ -20,3 +78,146 @@ class DashboardChain(ChainBase, metaclass=Singleton):
         下载器信息
         """
         return self.run_module("downloader_info", downloader=downloader)
+
+    def snapshot(self, widget: str, *args) -> Tuple[Any, str]:
+        """
+        获取组件的最新快照，超过过期时间时才重新计算
+        :param widget: 组件名称
+        :param args: 组件参数
+        :return: 数据, ETag
+        """
+        with self._lock:
+            snapshot = self._snapshots.get((widget, args))
+            if not snapshot:
+                self.__release_idle()
+                snapshot = _Snapshot()
+                self._snapshots[(widget, args)] = snapshot
+        snapshot.accessed = time.time()
+        if self.__is_fresh(widget, snapshot):
+            metrics.cache_hit("dashboard", True)
+            # 已过一半过期时间时在后台提前刷新，下次访问拿到的是新数据
+            if snapshot.accessed - snapshot.updated >= self._budgets.get(widget, 0) / 2 \
+                    and snapshot.lock.acquire(blocking=False):
+                threading.Thread(target=self.__refresh_background, args=(widget, args, snapshot),
+                                 daemon=True).start()
+            return snapshot.data, snapshot.etag
+        metrics.cache_hit("dashboard", False)
+        with snapshot.lock:
+            # 等待锁期间可能已被其它请求或后台任务刷新
+            if not self.__is_fresh(widget, snapshot):
+                self.__refresh(widget, args, snapshot)
+        return snapshot.data, snapshot.etag
+
+    def __refresh_background(self, widget: str, args: tuple, snapshot: _Snapshot):
+        """
+        后台刷新组件快照，调用前已获取快照的刷新锁
+        """
+        try:
+            self.__refresh(widget, args, snapshot)
+        except Exception as err:
+            logger.debug(f"仪表板 {widget} 后台刷新失败：{str(err)}")
+        finally:
+            snapshot.lock.release()
+
+    def __release_idle(self):
+        """
+        释放长时间无人查看的组件快照，调用前已获取self._lock
+        """
+        now = time.time()
+        for key in [key for key, snapshot in self._snapshots.items()
+                    if snapshot.accessed and now - snapshot.accessed > self._idle_timeout]:
+            self._snapshots.pop(key, None)
+
+    def __is_fresh(self, widget: str, snapshot: _Snapshot) -> bool:
+        """
+        快照是否在过期时间内
+        """
+        return snapshot.etag is not None \
+            and time.time() - snapshot.updated < self._budgets.get(widget, 0)
+
+    def __refresh(self, widget: str, args: tuple, snapshot: _Snapshot):
+        """
+        重新计算组件数据
+        """
+        try:
+            data = self._builders[widget](*args)
+        except Exception as err:
+            logger.error(f"仪表板 {widget} 数据计算失败：{str(err)}")
+            if snapshot.etag is not None:
+                return
+            raise
+        snapshot.data = data
+        snapshot.etag = HashUtils.md5(json.dumps(self.__to_jsonable(data), sort_keys=True, default=str))
+        snapshot.updated = time.time()
+
+    @staticmethod
+    def __to_jsonable(data: Any) -> Any:
+        """
+        转换为可序列化的数据，用于计算ETag
+        """
+        if isinstance(data, BaseModel):
+            return data.dict()
+        if isinstance(data, list):
+            return [item.dict() if isinstance(item, BaseModel) else item for item in data]
+        return data
+
+    def __build_statistic(self, name: str = None) -> schemas.Statistic:
+        """
+        汇总各媒体库统计信息
+        """
+        ret_statistic = schemas.Statistic()
+        media_statistics = self.media_statistic(name)
+        if media_statistics:
+            for media_statistic in media_statistics:
+                ret_statistic.movie_count += media_statistic.movie_count
+                ret_statistic.tv_count += media_statistic.tv_count
+                ret_statistic.episode_count += media_statistic.episode_count
+                ret_statistic.user_count += media_statistic.user_count
+        return ret_statistic
+
+    @staticmethod
+    def __build_storage() -> schemas.Storage:
+        """
+        汇总媒体库存储空间
+        """
+        total, available = 0, 0
+        dirs = DirectoryHelper().get_dirs()
+        if not dirs:
+            return schemas.Storage(total_storage=total, used_storage=total - available)
+        storages = set([d.library_storage for d in dirs if d.library_storage])
+        for _storage in storages:
+            _usage = StorageChain().storage_usage(_storage)
+            if _usage:
+                total += _usage.total
+                available += _usage.available
+        return schemas.Storage(
+            total_storage=total,
+            used_storage=total - available
+        )
+
+    def __build_downloader(self, name: str = None) -> schemas.DownloaderInfo:
+        """
+        汇总下载器信息
+        """
+        # 下载目录空间
+        download_dirs = DirectoryHelper().get_local_download_dirs()
+        _, free_space = SystemUtils.space_usage([Path(d.download_path) for d in download_dirs])
+        # 下载器信息
+        downloader_info = schemas.DownloaderInfo()
+        transfer_infos = self.downloader_info(name)
+        if transfer_infos:
+            for transfer_info in transfer_infos:
+                downloader_info.download_speed += transfer_info.download_speed
+                downloader_info.upload_speed += transfer_info.upload_speed
+                downloader_info.download_size += transfer_info.download_size
+                downloader_info.upload_size += transfer_info.upload_size
+            downloader_info.free_space = free_space
+        return downloader_info
+
+    @staticmethod
+    def __build_transfer(days: int = 7) -> List[int]:
+        """
+        最近days天的整理数量
+        """
+        transfer_stat = TransferHistoryOper().statistic(days)
+        return [stat[1] for stat in transfer_stat]
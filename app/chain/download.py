@@ -3,6 +3,7 @@ import copy
 import json
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Optional, Tuple, Set, Dict, Union
 
@@ -30,6 +31,9 @@ class DownloadChain(ChainBase):
     下载处理链
     """
 
+    # 每次并发预下载的种子数量
+    _prefetch_count = 3
+
     def __init__(self):
         super().__init__()
         self.torrent = TorrentHelper()
@@ -95,93 +99,126 @@ class DownloadChain(ChainBase):
             link=settings.MP_DOMAIN('/#/downloading'),
             username=username))
 
-    def download_torrent(self, torrent: TorrentInfo,
-                         channel: MessageChannel = None,
-                         source: str = None,
-                         userid: Union[str, int] = None
-                         ) -> Tuple[Optional[Union[Path, str]], str, list]:
+    @staticmethod
+    def __get_redict_url(url: str, ua: str = None, cookie: str = None) -> Optional[str]:
         """
-        下载种子文件，如果是磁力链，会返回磁力链接本身
-        :return: 种子路径，种子目录名，种子文件清单
+        获取下载链接， url格式：[base64]url
         """
+        # 获取[]中的内容
+        m = re.search(r"\[(.*)](.*)", url)
+        if m:
+            # 参数
+            base64_str = m.group(1)
+            # URL
+            url = m.group(2)
+            if not base64_str:
+                return url
+            # 解码参数
+            req_str = base64.b64decode(base64_str.encode('utf-8')).decode('utf-8')
+            req_params: Dict[str, dict] = json.loads(req_str)
+            # 是否使用cookie
+            if not req_params.get('cookie'):
+                cookie = None
+            # 请求头
+            if req_params.get('header'):
+                headers = req_params.get('header')
+            else:
+                headers = None
+            if req_params.get('method') == 'get':
+                # GET请求
+                res = RequestUtils(
+                    ua=ua,
+                    cookies=cookie,
+                    headers=headers
+                ).get_res(url, params=req_params.get('params'))
+            else:
+                # POST请求
+                res = RequestUtils(
+                    ua=ua,
+                    cookies=cookie,
+                    headers=headers
+                ).post_res(url, params=req_params.get('params'))
+            if not res:
+                return None
+            if not req_params.get('result'):
+                return res.text
+            else:
+                data = res.json()
+                for key in str(req_params.get('result')).split("."):
+                    data = data.get(key)
+                    if not data:
+                        return None
+                logger.info(f"获取到下载地址：{data}")
+                return data
+        return None
 
-        def __get_redict_url(url: str, ua: str = None, cookie: str = None) -> Optional[str]:
-            """
-            获取下载链接， url格式：[base64]url
-            """
-            # 获取[]中的内容
-            m = re.search(r"\[(.*)](.*)", url)
-            if m:
-                # 参数
-                base64_str = m.group(1)
-                # URL
-                url = m.group(2)
-                if not base64_str:
-                    return url
-                # 解码参数
-                req_str = base64.b64decode(base64_str.encode('utf-8')).decode('utf-8')
-                req_params: Dict[str, dict] = json.loads(req_str)
-                # 是否使用cookie
-                if not req_params.get('cookie'):
-                    cookie = None
-                # 请求头
-                if req_params.get('header'):
-                    headers = req_params.get('header')
-                else:
-                    headers = None
-                if req_params.get('method') == 'get':
-                    # GET请求
-                    res = RequestUtils(
-                        ua=ua,
-                        cookies=cookie,
-                        headers=headers
-                    ).get_res(url, params=req_params.get('params'))
-                else:
-                    # POST请求
-                    res = RequestUtils(
-                        ua=ua,
-                        cookies=cookie,
-                        headers=headers
-                    ).post_res(url, params=req_params.get('params'))
-                if not res:
-                    return None
-                if not req_params.get('result'):
-                    return res.text
-                else:
-                    data = res.json()
-                    for key in str(req_params.get('result')).split("."):
-                        data = data.get(key)
-                        if not data:
-                            return None
-                    logger.info(f"获取到下载地址：{data}")
-                    return data
-            return None
-
+    def __fetch_torrent(self, torrent: TorrentInfo) \
+            -> Tuple[Optional[Path], Optional[Union[str, bytes]], str, list, str, Optional[str]]:
+        """
+        解析下载地址并下载种子文件，已下载过的种子直接使用缓存，不再解析地址和重复下载
+        :return: 种子路径，种子内容，种子目录名，种子文件清单，错误信息，下载地址
+        """
         # 获取下载链接
         if not torrent.enclosure:
-            return None, "", []
+            return None, None, "", [], "", None
         if torrent.enclosure.startswith("magnet:"):
-            return torrent.enclosure, "", []
+            return None, torrent.enclosure, "", [], "", torrent.enclosure
+        # 按原始下载链接缓存
+        cache = self.torrent.get_cache(torrent.enclosure)
+        if cache:
+            torrent_file, content, download_folder, files, error_msg = cache
+            return torrent_file, content, download_folder, files, error_msg, torrent.enclosure
         # Cookie
         site_cookie = torrent.site_cookie
         if torrent.enclosure.startswith("["):
             # 需要解码获取下载地址
-            torrent_url = __get_redict_url(url=torrent.enclosure,
-                                           ua=torrent.site_ua,
-                                           cookie=site_cookie)
+            torrent_url = self.__get_redict_url(url=torrent.enclosure,
+                                                ua=torrent.site_ua,
+                                                cookie=site_cookie)
             # 涉及解析地址的不使用Cookie下载种子，否则MT会出错
             site_cookie = None
         else:
             torrent_url = torrent.enclosure
         if not torrent_url:
             logger.error(f"{torrent.title} 无法获取下载地址：{torrent.enclosure}！")
-            return None, "", []
+            return None, None, "", [], "", None
         # 下载种子文件
         torrent_file, content, download_folder, files, error_msg = self.torrent.download_torrent(
             url=torrent_url,
             cookie=site_cookie,
             ua=torrent.site_ua,
-            proxy=torrent.site_proxy)
+            proxy=torrent.site_proxy,
+            cache_key=torrent.enclosure)
+        return torrent_file, content, download_folder, files, error_msg, torrent_url
+
+    def prefetch_torrents(self, torrents: List[TorrentInfo]):
+        """
+        并发预下载排在最前的几个种子文件到缓存，后续下载时直接使用缓存，失败时不发送通知
+        排在后面的种子多数不会被选中，由下载时按需获取
+        :param torrents: 种子信息列表，按优先顺序排列
+        """
+        torrents = [torrent for torrent in torrents
+                    if torrent.enclosure and not torrent.enclosure.startswith("magnet:")][:self._prefetch_count]
+        torrents = [torrent for torrent in torrents if not self.torrent.get_torrent_meta(torrent.enclosure)]
+        if len(torrents) < 2:
+            return
+        logger.info(f"开始预下载 {len(torrents)} 个种子文件 ...")
+        with ThreadPoolExecutor(max_workers=len(torrents)) as executor:
+            for _ in executor.map(self.__fetch_torrent, torrents):
+                pass
+
+    def download_torrent(self, torrent: TorrentInfo,
+                         channel: MessageChannel = None,
+                         source: str = None,
+                         userid: Union[str, int] = None
+                         ) -> Tuple[Optional[Union[Path, str]], str, list]:
+        """
+        下载种子文件，如果是磁力链，会返回磁力链接本身
+        :return: 种子路径，种子目录名，种子文件清单
+        """
+        torrent_file, content, download_folder, files, error_msg, torrent_url = self.__fetch_torrent(torrent)
+        if not torrent_url:
+            return None, "", []
 
         if isinstance(content, str):
             # 磁力链
@@ -491,6 +528,16 @@ class DownloadChain(ChainBase):
             logger.info(f"缺失整季：{need_seasons}")
             # 查找整季包含的种子，只处理整季没集的种子或者是集数超过季的种子
             for need_mid, need_season in need_seasons.items():
+                # 只有一季的整季种子需要打开种子鉴别，先并发预下载
+                self.prefetch_torrents([
+                    context.torrent_info for context in contexts
+                    if context.media_info.type == MediaType.TV
+                    and need_mid in [context.media_info.tmdb_id, context.media_info.douban_id]
+                    and not context.meta_info.episode_list
+                    and len(context.meta_info.season_list or [1]) == 1
+                    and set(context.meta_info.season_list or [1]).issubset(set(need_season))
+                    and context not in downloaded_list
+                ])
                 # 循环种子
                 for context in contexts:
                     if global_vars.is_system_stopped:
@@ -668,6 +715,16 @@ class DownloadChain(ChainBase):
                     # 没有集的不处理
                     if not need_episodes:
                         continue
+                    # 需要打开种子检查集数的种子，先并发预下载
+                    self.prefetch_torrents([
+                        context.torrent_info for context in contexts
+                        if context.media_info.type == MediaType.TV
+                        and need_mid in [context.media_info.tmdb_id, context.media_info.douban_id]
+                        and (not context.meta_info.episode_list
+                             or set(context.meta_info.episode_list).intersection(set(need_episodes)))
+                        and context.meta_info.season_list == [need_season]
+                        and context not in downloaded_list
+                    ])
                     # 循环种子
                     for context in contexts:
                         if global_vars.is_system_stopped:
@@ -916,8 +973,9 @@ class DownloadChain(ChainBase):
         if not torrents:
             return []
         ret_torrents = []
+        histories = self.downloadhis.get_by_hashes([torrent.hash for torrent in torrents])
         for torrent in torrents:
-            history = self.downloadhis.get_by_hash(torrent.hash)
+            history = histories.get(torrent.hash)
             if history:
                 # 媒体信息
                 torrent.media = {
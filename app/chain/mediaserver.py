@@ -1,9 +1,11 @@
 import threading
-from typing import List, Union, Optional, Generator
+import time
+from typing import List, Union, Optional, Generator, Dict
 
 from app import schemas
 from app.chain import ChainBase
 from app.core.config import global_vars
+from app.core.metrics import metrics
 from app.db.mediaserver_oper import MediaServerOper
 from app.helper.service import ServiceConfigHelper
 from app.log import logger
@@ -68,6 +70,18 @@ class MediaServerChain(ChainBase):
         yield from self.run_module("mediaserver_items", server=server, library_id=library_id,
                                    start_index=start_index, limit=limit)
 
+    def sync_items(self, server: str, library_id: Union[str, int]) -> Optional[Generator]:
+        """
+        同步用，并发分页获取媒体库的所有项目，仅包含同步所需字段
+        """
+        return self.run_module("mediaserver_sync_items", server=server, library_id=library_id)
+
+    def library_episodes(self, server: str, library_id: Union[str, int]) -> Optional[Dict[str, Dict[int, List[int]]]]:
+        """
+        批量获取媒体库下所有剧集的季集信息，{剧集ID: {季: [集]}}
+        """
+        return self.run_module("mediaserver_library_episodes", server=server, library_id=library_id)
+
     def iteminfo(self, server: str, item_id: Union[str, int]) -> schemas.MediaServerItem:
         """
         获取媒体服务器项目信息
@@ -133,9 +147,18 @@ class MediaServerChain(ChainBase):
                         logger.info(f"{library.name} 未在 {server_name} 同步媒体库列表中，跳过")
                         continue
                     logger.info(f"正在同步 {server_name} 媒体库 {library.name} ...")
+                    start_time = time.perf_counter()
                     library_count = 0
-                    for item in self.items(server=server_name, library_id=library.id):
+                    # 待入库数据，批量写入
+                    item_dicts = []
+                    # 一次性获取媒体库所有剧集的季集信息，获取失败时逐个剧集查询
+                    library_episodes = self.library_episodes(server_name, library.id)
+                    items = self.sync_items(server=server_name, library_id=library.id)
+                    if items is None:
+                        items = self.items(server=server_name, library_id=library.id)
+                    for item in items:
                         if global_vars.is_system_stopped:
+                            self.dboper.add_many(item_dicts)
                             return
                         if not item or not item.item_id:
                             continue
@@ -146,16 +169,28 @@ class MediaServerChain(ChainBase):
                         # 类型
                         item_type = "电视剧" if item.item_type in ["Series", "show"] else "电影"
                         if item_type == "电视剧":
-                            # 查询剧集信息
-                            espisodes_info = self.episodes(server_name, item.item_id) or []
-                            for episode in espisodes_info:
-                                seasoninfo[episode.season] = episode.episodes
+                            if library_episodes is not None:
+                                seasoninfo = library_episodes.get(str(item.item_id)) or {}
+                            else:
+                                # 查询剧集信息
+                                espisodes_info = self.episodes(server_name, item.item_id) or []
+                                for episode in espisodes_info:
+                                    seasoninfo[episode.season] = episode.episodes
                         # 插入数据
                         item_dict = item.dict()
                         item_dict["seasoninfo"] = seasoninfo
                         item_dict["item_type"] = item_type
-                        self.dboper.add(**item_dict)
-                    logger.info(f"{server_name} 媒体库 {library.name} 同步完成，共同步数量：{library_count}")
+                        item_dicts.append(item_dict)
+                        if len(item_dicts) >= 100:
+                            self.dboper.add_many(item_dicts)
+                            item_dicts = []
+                    self.dboper.add_many(item_dicts)
+                    elapsed = time.perf_counter() - start_time
+                    metrics.inc("mp_mediaserver_sync_items", "媒体服务器同步项目数", library_count, server=server_name)
+                    metrics.observe("mp_mediaserver_sync_duration_seconds", "媒体库同步耗时", elapsed,
+                                    server=server_name)
+                    logger.info(f"{server_name} 媒体库 {library.name} 同步完成，共同步数量：{library_count}，"
+                                f"耗时 {elapsed:.1f} 秒，{library_count / elapsed if elapsed else 0:.0f} 条/秒")
                     # 总数累加
                     total_count += library_count
                 logger.info(f"媒体服务器 {server_name} 数据同步完成，总同步数量：{total_count}")
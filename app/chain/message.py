@@ -13,26 +13,17 @@ from app.core.event import EventManager
 from app.core.meta import MetaBase
 from app.db.message_oper import MessageOper
 from app.helper.message import MessageHelper
+from app.helper.session import SessionHelper, UserSession
 from app.helper.torrent import TorrentHelper
 from app.log import logger
 from app.schemas import Notification, NotExistMediaInfo, CommingMessage
 from app.schemas.types import EventType, MessageChannel, MediaType
 from app.utils.string import StringUtils
 
-# 当前页面
-_current_page: int = 0
-# 当前元数据
-_current_meta: Optional[MetaBase] = None
-# 当前媒体信息
-_current_media: Optional[MediaInfo] = None
-
-
 class MessageChain(ChainBase):
     """
     外来消息处理链
     """
-    # 缓存的用户数据 {userid: {type: str, items: list}}
-    _cache_file = "__user_messages__"
     # 每页数据量
     _page_size: int = 8
 
@@ -46,6 +37,7 @@ class MessageChain(ChainBase):
         self.torrenthelper = TorrentHelper()
         self.messagehelper = MessageHelper()
         self.messageoper = MessageOper()
+        self.sessionhelper = SessionHelper()
 
     def __get_noexits_info(
             self,
@@ -133,10 +125,6 @@ class MessageChain(ChainBase):
         """
         识别消息内容，执行操作
         """
-        # 申明全局变量
-        global _current_page, _current_meta, _current_media
-        # 加载缓存
-        user_cache: Dict[str, dict] = self.load_cache(self._cache_file) or {}
         # 处理消息
         logger.info(f'收到用户消息内容，用户：{userid}，内容：{text}')
         # 保存消息
@@ -170,41 +158,43 @@ class MessageChain(ChainBase):
 
         elif text.isdigit():
             # 用户选择了具体的条目
-            # 缓存
-            cache_data: dict = user_cache.get(userid)
+            # 会话
+            session = self.sessionhelper.get(userid)
             # 选择项目
-            if not cache_data \
-                    or not cache_data.get('items') \
-                    or len(cache_data.get('items')) < int(text):
+            if not session \
+                    or not session.items \
+                    or len(session.items) < int(text):
                 # 发送消息
                 self.post_message(Notification(channel=channel, source=source, title="输入有误！", userid=userid))
                 return
             # 选择的序号
-            _choice = int(text) + _current_page * self._page_size - 1
+            _choice = int(text) + session.page * self._page_size - 1
             # 缓存类型
-            cache_type: str = cache_data.get('type')
-            # 缓存列表
-            cache_list: list = copy.deepcopy(cache_data.get('items'))
+            cache_type: str = session.type
+            # 缓存列表，选择的条目产生副本，避免修改原值
+            cache_list: list = session.items
+            meta = session.meta
             # 选择
             if cache_type in ["Search", "ReSearch"]:
                 # 当前媒体信息
-                mediainfo: MediaInfo = cache_list[_choice]
-                _current_media = mediainfo
+                mediainfo: MediaInfo = copy.deepcopy(cache_list[_choice])
+                session.media = mediainfo
+                self.sessionhelper.touch(userid)
                 # 查询缺失的媒体信息
-                exist_flag, no_exists = self.downloadchain.get_no_exists_info(meta=_current_meta,
-                                                                              mediainfo=_current_media)
+                exist_flag, no_exists = self.downloadchain.get_no_exists_info(meta=meta,
+                                                                              mediainfo=mediainfo)
                 if exist_flag and cache_type == "Search":
                     # 媒体库中已存在
                     self.post_message(
                         Notification(channel=channel,
                                      source=source,
-                                     title=f"【{_current_media.title_year}"
-                                           f"{_current_meta.sea} 媒体库中已存在，如需重新下载请发送：搜索 名称 或 下载 名称】",
+                                     title=f"【{mediainfo.title_year}"
+                                           f"{meta.sea} 媒体库中已存在，如需重新下载请发送：搜索 名称 或 下载 名称】",
                                      userid=userid))
                     return
                 elif exist_flag:
                     # 没有缺失，但要全量重新搜索和下载
-                    no_exists = self.__get_noexits_info(_current_meta, _current_media)
+                    no_exists = self.__get_noexits_info(meta, mediainfo)
                 # 发送缺失的媒体信息
                 messages = []
                 if no_exists and cache_type == "Search":
@@ -240,7 +230,7 @@ class MessageChain(ChainBase):
                         channel=channel,
                         source=source,
                         title=f"{mediainfo.title}"
-                              f"{_current_meta.sea} 未搜索到需要的资源！",
+                              f"{meta.sea} 未搜索到需要的资源！",
                         userid=userid))
                     return
                 # 搜索结果排序
@@ -258,13 +248,16 @@ class MessageChain(ChainBase):
                                          cache_list=contexts,
                                          userid=userid,
                                          username=username,
+                                         session=session,
                                          no_exists=no_exists)
                 else:
-                    # 更新缓存
-                    user_cache[userid] = {
-                        "type": "Torrent",
-                        "items": contexts
-                    }
+                    # 更新会话
+                    self.sessionhelper.set(userid, UserSession(
+                        type="Torrent",
+                        items=contexts,
+                        meta=meta,
+                        media=mediainfo
+                    ))
                     # 发送种子数据
                     logger.info(f"搜索到 {len(contexts)} 条数据，开始发送选择消息 ...")
                     self.__post_torrents_message(channel=channel,
@@ -276,19 +269,19 @@ class MessageChain(ChainBase):
 
             elif cache_type in ["Subscribe", "ReSubscribe"]:
                 # 订阅或洗版媒体
-                mediainfo: MediaInfo = cache_list[_choice]
+                mediainfo: MediaInfo = copy.deepcopy(cache_list[_choice])
                 # 洗版标识
                 best_version = False
                 # 查询缺失的媒体信息
                 if cache_type == "Subscribe":
-                    exist_flag, _ = self.downloadchain.get_no_exists_info(meta=_current_meta,
+                    exist_flag, _ = self.downloadchain.get_no_exists_info(meta=meta,
                                                                           mediainfo=mediainfo)
                     if exist_flag:
                         self.post_message(Notification(
                             channel=channel,
                             source=source,
                             title=f"【{mediainfo.title_year}"
-                                  f"{_current_meta.sea} 媒体库中已存在，如需洗版请发送：洗版 XXX】",
+                                  f"{meta.sea} 媒体库中已存在，如需洗版请发送：洗版 XXX】",
                             userid=userid))
                         return
                 else:
@@ -298,7 +291,7 @@ class MessageChain(ChainBase):
                                         year=mediainfo.year,
                                         mtype=mediainfo.type,
                                         tmdbid=mediainfo.tmdb_id,
-                                        season=_current_meta.begin_season,
+                                        season=meta.begin_season,
                                         channel=channel,
                                         source=source,
                                         userid=userid,
@@ -309,46 +302,47 @@ class MessageChain(ChainBase):
                     # 自动选择下载，强制下载模式
                     self.__auto_download(channel=channel,
                                          source=source,
-                                         cache_list=cache_list,
+                                         cache_list=copy.deepcopy(cache_list),
                                          userid=userid,
-                                         username=username)
+                                         username=username,
+                                         session=session)
                 else:
                     # 下载种子
-                    context: Context = cache_list[_choice]
+                    context: Context = copy.deepcopy(cache_list[_choice])
                     # 下载
                     self.downloadchain.download_single(context, channel=channel, source=source,
                                                        userid=userid, username=username)
 
         elif text.lower() == "p":
             # 上一页
-            cache_data: dict = user_cache.get(userid)
-            if not cache_data:
+            session = self.sessionhelper.get(userid)
+            if not session:
                 # 没有缓存
                 self.post_message(Notification(
                     channel=channel, source=source, title="输入有误！", userid=userid))
                 return
 
-            if _current_page == 0:
+            if session.page == 0:
                 # 第一页
                 self.post_message(Notification(
                     channel=channel, source=source, title="已经是第一页了！", userid=userid))
                 return
             # 减一页
-            _current_page -= 1
-            cache_type: str = cache_data.get('type')
-            # 产生副本，避免修改原值
-            cache_list: list = copy.deepcopy(cache_data.get('items'))
-            if _current_page == 0:
+            session.page -= 1
+            self.sessionhelper.touch(userid)
+            cache_type: str = session.type
+            cache_list: list = session.items
+            if session.page == 0:
                 start = 0
                 end = self._page_size
             else:
-                start = _current_page * self._page_size
+                start = session.page * self._page_size
                 end = start + self._page_size
             if cache_type == "Torrent":
                 # 发送种子数据
                 self.__post_torrents_message(channel=channel,
                                              source=source,
-                                             title=_current_media.title,
+                                             title=session.media.title,
                                              items=cache_list[start:end],
                                              userid=userid,
                                              total=len(cache_list))
@@ -356,26 +350,24 @@ class MessageChain(ChainBase):
                 # 发送媒体数据
                 self.__post_medias_message(channel=channel,
                                            source=source,
-                                           title=_current_meta.name,
+                                           title=session.meta.name,
                                            items=cache_list[start:end],
                                            userid=userid,
                                            total=len(cache_list))
 
         elif text.lower() == "n":
             # 下一页
-            cache_data: dict = user_cache.get(userid)
-            if not cache_data:
+            session = self.sessionhelper.get(userid)
+            if not session:
                 # 没有缓存
                 self.post_message(Notification(
                     channel=channel, source=source, title="输入有误！", userid=userid))
                 return
-            cache_type: str = cache_data.get('type')
-            # 产生副本，避免修改原值
-            cache_list: list = copy.deepcopy(cache_data.get('items'))
-            total = len(cache_list)
+            cache_type: str = session.type
+            total = len(session.items)
             # 加一页
-            cache_list = cache_list[
-                         (_current_page + 1) * self._page_size:(_current_page + 2) * self._page_size]
+            cache_list = session.items[
+                         (session.page + 1) * self._page_size:(session.page + 2) * self._page_size]
             if not cache_list:
                 # 没有数据
                 self.post_message(Notification(
@@ -383,18 +375,19 @@ class MessageChain(ChainBase):
                 return
             else:
                 # 加一页
-                _current_page += 1
+                session.page += 1
+                self.sessionhelper.touch(userid)
                 if cache_type == "Torrent":
                     # 发送种子数据
                     self.__post_torrents_message(channel=channel,
                                                  source=source,
-                                                 title=_current_media.title,
+                                                 title=session.media.title,
                                                  items=cache_list, userid=userid, total=total)
                 else:
                     # 发送媒体数据
                     self.__post_medias_message(channel=channel,
                                                source=source,
-                                               title=_current_meta.name,
+                                               title=session.meta.name,
                                                items=cache_list, userid=userid, total=total)
 
         else:
@@ -439,13 +432,11 @@ class MessageChain(ChainBase):
                     return
                 logger.info(f"搜索到 {len(medias)} 条相关媒体信息")
                 # 记录当前状态
-                _current_meta = meta
-                user_cache[userid] = {
-                    'type': action,
-                    'items': medias
-                }
-                _current_page = 0
-                _current_media = None
+                self.sessionhelper.set(userid, UserSession(
+                    type=action,
+                    items=medias,
+                    meta=meta
+                ))
                 # 发送媒体列表
                 self.__post_medias_message(channel=channel,
                                            source=source,
@@ -464,24 +455,23 @@ class MessageChain(ChainBase):
                     }
                 )
 
-        # 保存缓存
-        self.save_cache(user_cache, self._cache_file)
-
     def __auto_download(self, channel: MessageChannel, source: str, cache_list: list[Context],
-                        userid: Union[str, int], username: str,
+                        userid: Union[str, int], username: str, session: UserSession,
                         no_exists: Optional[Dict[Union[int, str], Dict[int, NotExistMediaInfo]]] = None):
         """
         自动择优下载
         """
+        meta = session.meta
+        mediainfo = session.media
         if no_exists is None:
             # 查询缺失的媒体信息
             exist_flag, no_exists = self.downloadchain.get_no_exists_info(
-                meta=_current_meta,
-                mediainfo=_current_media
+                meta=meta,
+                mediainfo=mediainfo
             )
             if exist_flag:
                 # 媒体库中已存在，查询全量
-                no_exists = self.__get_noexits_info(_current_meta, _current_media)
+                no_exists = self.__get_noexits_info(meta, mediainfo)
 
         # 批量下载
         downloads, lefts = self.downloadchain.batch_download(contexts=cache_list,
@@ -492,11 +482,11 @@ class MessageChain(ChainBase):
                                                              username=username)
         if downloads and not lefts:
             # 全部下载完成
-            logger.info(f'{_current_media.title_year} 下载完成')
+            logger.info(f'{mediainfo.title_year} 下载完成')
         else:
             # 未完成下载
-            logger.info(f'{_current_media.title_year} 未下载未完整，添加订阅 ...')
-            if downloads and _current_media.type == MediaType.TV:
+            logger.info(f'{mediainfo.title_year} 未下载未完整，添加订阅 ...')
+            if downloads and mediainfo.type == MediaType.TV:
                 # 获取已下载剧集
                 downloaded = [download.meta_info.begin_episode for download in downloads
                               if download.meta_info.begin_episode]
@@ -504,11 +494,11 @@ class MessageChain(ChainBase):
             else:
                 note = None
             # 添加订阅，状态为R
-            self.subscribechain.add(title=_current_media.title,
-                                    year=_current_media.year,
-                                    mtype=_current_media.type,
-                                    tmdbid=_current_media.tmdb_id,
-                                    season=_current_meta.begin_season,
+            self.subscribechain.add(title=mediainfo.title,
+                                    year=mediainfo.year,
+                                    mtype=mediainfo.type,
+                                    tmdbid=mediainfo.tmdb_id,
+                                    season=meta.begin_season,
                                     channel=channel,
                                     source=source,
                                     userid=userid,
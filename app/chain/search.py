@@ -2,7 +2,7 @@ import pickle
 import traceback
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Generator, Tuple
 from typing import List, Optional
 
 from app.chain import ChainBase
@@ -10,6 +10,7 @@ from app.core.config import global_vars
 from app.core.context import Context
 from app.core.context import MediaInfo, TorrentInfo
 from app.core.event import eventmanager, Event
+from app.core.meta import MetaBase
 from app.core.metainfo import MetaInfo
 from app.db.systemconfig_oper import SystemConfigOper
 from app.helper.progress import ProgressHelper
@@ -99,6 +100,55 @@ class SearchChain(ChainBase):
             logger.error(f'加载搜索结果失败：{str(e)} - {traceback.format_exc()}')
             return []
 
+    def search_by_id_stream(self, tmdbid: int = None, doubanid: str = None,
+                            mtype: MediaType = None, area: str = "title",
+                            season: int = None) -> Generator[Tuple[List[Context], List[int]], None, None]:
+        """
+        根据TMDBID/豆瓣ID搜索资源，每个站点完成后即返回该站点匹配到的资源
+        :param tmdbid: TMDB ID
+        :param doubanid: 豆瓣 ID
+        :param mtype: 媒体，电影 or 电视剧
+        :param area: 搜索范围，title or imdbid
+        :param season: 季数
+        :return: 生成器，每次返回（新增资源列表，新增资源在全部结果中的排序位置）
+        """
+        mediainfo = self.recognize_media(tmdbid=tmdbid, doubanid=doubanid, mtype=mtype)
+        if not mediainfo:
+            logger.error(f'{tmdbid} 媒体信息识别失败！')
+            return
+        no_exists = None
+        if season:
+            no_exists = {
+                tmdbid or doubanid: {
+                    season: NotExistMediaInfo(episodes=[])
+                }
+            }
+        yield from self.process_stream(mediainfo=mediainfo, area=area, no_exists=no_exists)
+
+    def search_by_title_stream(self, title: str, page: int = 0,
+                               site: int = None) -> Generator[Tuple[List[Context], List[int]], None, None]:
+        """
+        根据标题搜索资源，不识别不过滤，每个站点完成后即返回该站点的内容
+        :param title: 标题，为空时返回所有站点首页内容
+        :param page: 页码
+        :param site: 站点ID
+        :return: 生成器，每次返回（新增资源列表，新增资源在全部结果中的位置）
+        """
+        if title:
+            logger.info(f'开始搜索资源，关键词：{title} ...')
+        else:
+            logger.info(f'开始浏览资源，站点：{site} ...')
+        contexts = []
+        try:
+            for _, torrents in self.__iter_sites(keywords=[title], sites=[site] if site else None, page=page):
+                batch = [Context(meta_info=MetaInfo(title=torrent.title, subtitle=torrent.description),
+                                 torrent_info=torrent) for torrent in torrents]
+                contexts.extend(batch)
+                yield batch, list(range(len(contexts) - len(batch), len(contexts)))
+        finally:
+            # 保存到本地文件
+            self.save_cache(pickle.dumps(contexts), self.__result_temp_file)
+
     def process(self, mediainfo: MediaInfo,
                 keyword: str = None,
                 no_exists: Dict[int, Dict[int, NotExistMediaInfo]] = None,
@@ -116,55 +166,10 @@ class SearchChain(ChainBase):
         :param area: 搜索范围，title or imdbid
         :param custom_words: 自定义识别词列表
         """
-
-        def __do_filter(torrent_list: List[TorrentInfo]) -> List[TorrentInfo]:
-            """
-            执行优先级过滤
-            """
-            return self.filter_torrents(rule_groups=rule_groups,
-                                        torrent_list=torrent_list,
-                                        season_episodes=season_episodes,
-                                        mediainfo=mediainfo) or []
-
-        # 豆瓣标题处理
-        if not mediainfo.tmdb_id:
-            meta = MetaInfo(title=mediainfo.title)
-            mediainfo.title = meta.name
-            mediainfo.season = meta.begin_season
-        logger.info(f'开始搜索资源，关键词：{keyword or mediainfo.title} ...')
-
-        # 补充媒体信息
-        if not mediainfo.names:
-            mediainfo: MediaInfo = self.recognize_media(mtype=mediainfo.type,
-                                                        tmdbid=mediainfo.tmdb_id,
-                                                        doubanid=mediainfo.douban_id)
-            if not mediainfo:
-                logger.error(f'媒体信息识别失败！')
-                return []
-
-        # 缺失的季集
-        mediakey = mediainfo.tmdb_id or mediainfo.douban_id
-        if no_exists and no_exists.get(mediakey):
-            # 过滤剧集
-            season_episodes = {sea: info.episodes
-                               for sea, info in no_exists[mediakey].items()}
-        elif mediainfo.season:
-            # 豆瓣只搜索当前季
-            season_episodes = {mediainfo.season: []}
-        else:
-            season_episodes = None
-
-        # 搜索关键词
-        if keyword:
-            keywords = [keyword]
-        else:
-            # 去重去空，但要保持顺序
-            keywords = list(dict.fromkeys([k for k in [mediainfo.title,
-                                                       mediainfo.original_title,
-                                                       mediainfo.en_title,
-                                                       mediainfo.hk_title,
-                                                       mediainfo.tw_title,
-                                                       mediainfo.sg_title] if k]))
+        prepared = self.__prepare(mediainfo=mediainfo, keyword=keyword, no_exists=no_exists)
+        if not prepared:
+            return []
+        mediainfo, keywords, season_episodes = prepared
 
         # 执行搜索
         torrents: List[TorrentInfo] = self.__search_all_sites(
@@ -190,7 +195,8 @@ class SearchChain(ChainBase):
             rule_groups: List[str] = self.systemconfig.get(SystemConfigKey.SearchFilterRuleGroups)
         if rule_groups:
             logger.info(f'开始过滤规则/剧集过滤，使用规则组：{rule_groups} ...')
-            torrents = __do_filter(torrents)
+            torrents = self.__filter(torrents, mediainfo=mediainfo, rule_groups=rule_groups,
+                                     season_episodes=season_episodes)
             if not torrents:
                 logger.warn(f'{keyword or mediainfo.title} 没有符合过滤规则的资源')
                 return []
@@ -200,51 +206,7 @@ class SearchChain(ChainBase):
         self.progress.update(value=50, text=f'过滤完成，剩余 {len(torrents)} 个资源', key=ProgressKey.Search)
 
         # 开始匹配
-        _match_torrents = []
-        # 总数
-        _total = len(torrents)
-        # 已处理数
-        _count = 0
-
-        if mediainfo:
-            # 英文标题应该在别名/原标题中，不需要再匹配
-            logger.info(f"开始匹配结果 标题：{mediainfo.title}，原标题：{mediainfo.original_title}，别名：{mediainfo.names}")
-            self.progress.update(value=51, text=f'开始匹配，总 {_total} 个资源 ...', key=ProgressKey.Search)
-            for torrent in torrents:
-                if global_vars.is_system_stopped:
-                    break
-                _count += 1
-                self.progress.update(value=(_count / _total) * 96,
-                                     text=f'正在匹配 {torrent.site_name}，已完成 {_count} / {_total} ...',
-                                     key=ProgressKey.Search)
-                if not torrent.title:
-                    continue
-                # 识别元数据
-                torrent_meta = MetaInfo(title=torrent.title, subtitle=torrent.description,
-                                        custom_words=custom_words)
-                if torrent.title != torrent_meta.org_string:
-                    logger.info(f"种子名称应用识别词后发生改变：{torrent.title} => {torrent_meta.org_string}")
-                # 比对IMDBID
-                if torrent.imdbid \
-                        and mediainfo.imdb_id \
-                        and torrent.imdbid == mediainfo.imdb_id:
-                    logger.info(f'{mediainfo.title} 通过IMDBID匹配到资源：{torrent.site_name} - {torrent.title}')
-                    _match_torrents.append((torrent, torrent_meta))
-                    continue
-                # 比对种子
-                if self.torrenthelper.match_torrent(mediainfo=mediainfo,
-                                                    torrent_meta=torrent_meta,
-                                                    torrent=torrent):
-                    # 匹配成功
-                    _match_torrents.append((torrent, torrent_meta))
-                    continue
-            # 匹配完成
-            logger.info(f"匹配完成，共匹配到 {len(_match_torrents)} 个资源")
-            self.progress.update(value=97,
-                                 text=f'匹配完成，共匹配到 {len(_match_torrents)} 个资源',
-                                 key=ProgressKey.Search)
-        else:
-            _match_torrents = [(t, MetaInfo(title=t.title, subtitle=t.description)) for t in torrents]
+        _match_torrents = self.__match(torrents, mediainfo=mediainfo, custom_words=custom_words)
 
         # 去掉mediainfo中多余的数据
         mediainfo.clear()
@@ -270,6 +232,184 @@ class SearchChain(ChainBase):
         # 返回
         return contexts
 
+    def process_stream(self, mediainfo: MediaInfo,
+                       keyword: str = None,
+                       no_exists: Dict[int, Dict[int, NotExistMediaInfo]] = None,
+                       sites: List[int] = None,
+                       rule_groups: List[str] = None,
+                       area: str = "title",
+                       custom_words: List[str] = None) -> Generator[Tuple[List[Context], List[int]], None, None]:
+        """
+        根据媒体信息搜索种子资源，与process相同的过滤和匹配，但每个站点完成后立即处理并返回该站点的结果，
+        新增资源与已返回的资源一起重新排序，按新增资源在全部结果中的位置依次插入即可得到完整排序
+        :return: 生成器，每次返回（新增资源按排序先后的列表，新增资源在全部结果中的位置）
+        """
+        prepared = self.__prepare(mediainfo=mediainfo, keyword=keyword, no_exists=no_exists)
+        if not prepared:
+            return
+        mediainfo, keywords, season_episodes = prepared
+        if rule_groups is None:
+            # 取搜索过滤规则
+            rule_groups: List[str] = self.systemconfig.get(SystemConfigKey.SearchFilterRuleGroups)
+        contexts: List[Context] = []
+        # 排序键在本次搜索中保持不变，已返回资源的排序键与contexts一一对应
+        sort_key = self.torrenthelper.get_sort_key()
+        sort_keys: List[tuple] = []
+        try:
+            for site_name, torrents in self.__iter_sites(mediainfo=mediainfo, keywords=keywords,
+                                                         sites=sites, area=area):
+                if rule_groups:
+                    torrents = self.__filter(torrents, mediainfo=mediainfo, rule_groups=rule_groups,
+                                             season_episodes=season_episodes)
+                if not torrents:
+                    continue
+                batch = [Context(torrent_info=t[0],
+                                 media_info=mediainfo,
+                                 meta_info=t[1]) for t in self.__match(torrents, mediainfo=mediainfo,
+                                                                       custom_words=custom_words,
+                                                                       progress=False)]
+                if not batch:
+                    continue
+                logger.info(f'{site_name} 匹配到 {len(batch)} 个资源')
+                # 新增资源排序后与已有结果归并，排序键相同时已有资源在前，与整体稳定排序的结果一致
+                batch_keys = sorted(((sort_key(context), context) for context in batch),
+                                    key=lambda x: x[0], reverse=True)
+                merged, merged_keys, positions = [], [], []
+                i = 0
+                for key, context in batch_keys:
+                    while i < len(contexts) and sort_keys[i] >= key:
+                        merged.append(contexts[i])
+                        merged_keys.append(sort_keys[i])
+                        i += 1
+                    positions.append(len(merged))
+                    merged.append(context)
+                    merged_keys.append(key)
+                merged.extend(contexts[i:])
+                merged_keys.extend(sort_keys[i:])
+                contexts, sort_keys = merged, merged_keys
+                yield [context for _, context in batch_keys], positions
+            logger.info(f'搜索完成，共 {len(contexts)} 个资源')
+        finally:
+            # 去掉mediainfo中多余的数据
+            mediainfo.clear()
+            # 保存到本地文件
+            self.save_cache(pickle.dumps(contexts), self.__result_temp_file)
+
+    def __prepare(self, mediainfo: MediaInfo,
+                  keyword: str = None,
+                  no_exists: Dict[int, Dict[int, NotExistMediaInfo]] = None
+                  ) -> Optional[Tuple[MediaInfo, List[str], Optional[Dict[int, list]]]]:
+        """
+        补充媒体信息，计算搜索关键词和缺失的季集
+        :return: 媒体信息, 搜索关键词列表, 缺失的季集
+        """
+        # 豆瓣标题处理
+        if not mediainfo.tmdb_id:
+            meta = MetaInfo(title=mediainfo.title)
+            mediainfo.title = meta.name
+            mediainfo.season = meta.begin_season
+        logger.info(f'开始搜索资源，关键词：{keyword or mediainfo.title} ...')
+
+        # 补充媒体信息
+        if not mediainfo.names:
+            mediainfo: MediaInfo = self.recognize_media(mtype=mediainfo.type,
+                                                        tmdbid=mediainfo.tmdb_id,
+                                                        doubanid=mediainfo.douban_id)
+            if not mediainfo:
+                logger.error(f'媒体信息识别失败！')
+                return None
+
+        # 缺失的季集
+        mediakey = mediainfo.tmdb_id or mediainfo.douban_id
+        if no_exists and no_exists.get(mediakey):
+            # 过滤剧集
+            season_episodes = {sea: info.episodes
+                               for sea, info in no_exists[mediakey].items()}
+        elif mediainfo.season:
+            # 豆瓣只搜索当前季
+            season_episodes = {mediainfo.season: []}
+        else:
+            season_episodes = None
+
+        # 搜索关键词
+        if keyword:
+            keywords = [keyword]
+        else:
+            # 去重去空，但要保持顺序
+            keywords = list(dict.fromkeys([k for k in [mediainfo.title,
+                                                       mediainfo.original_title,
+                                                       mediainfo.en_title,
+                                                       mediainfo.hk_title,
+                                                       mediainfo.tw_title,
+                                                       mediainfo.sg_title] if k]))
+        return mediainfo, keywords, season_episodes
+
+    def __filter(self, torrents: List[TorrentInfo], mediainfo: MediaInfo,
+                 rule_groups: List[str], season_episodes: Dict[int, list] = None) -> List[TorrentInfo]:
+        """
+        执行优先级过滤
+        """
+        return self.filter_torrents(rule_groups=rule_groups,
+                                    torrent_list=torrents,
+                                    season_episodes=season_episodes,
+                                    mediainfo=mediainfo) or []
+
+    def __match(self, torrents: List[TorrentInfo], mediainfo: MediaInfo,
+                custom_words: List[str] = None, progress: bool = True) -> List[Tuple[TorrentInfo, MetaBase]]:
+        """
+        识别种子元数据并与媒体信息匹配
+        :param torrents: 资源列表
+        :param mediainfo: 媒体信息
+        :param custom_words: 自定义识别词列表
+        :param progress: 是否更新匹配进度
+        :return: 匹配成功的（资源，元数据）列表
+        """
+        _match_torrents = []
+        # 总数
+        _total = len(torrents)
+        # 已处理数
+        _count = 0
+        # 英文标题应该在别名/原标题中，不需要再匹配
+        logger.info(f"开始匹配结果 标题：{mediainfo.title}，原标题：{mediainfo.original_title}，别名：{mediainfo.names}")
+        if progress:
+            self.progress.update(value=51, text=f'开始匹配，总 {_total} 个资源 ...', key=ProgressKey.Search)
+        for torrent in torrents:
+            if global_vars.is_system_stopped:
+                break
+            _count += 1
+            if progress:
+                self.progress.update(value=(_count / _total) * 96,
+                                     text=f'正在匹配 {torrent.site_name}，已完成 {_count} / {_total} ...',
+                                     key=ProgressKey.Search)
+            if not torrent.title:
+                continue
+            # 识别元数据
+            torrent_meta = MetaInfo(title=torrent.title, subtitle=torrent.description,
+                                    custom_words=custom_words)
+            if torrent.title != torrent_meta.org_string:
+                logger.info(f"种子名称应用识别词后发生改变：{torrent.title} => {torrent_meta.org_string}")
+            # 比对IMDBID
+            if torrent.imdbid \
+                    and mediainfo.imdb_id \
+                    and torrent.imdbid == mediainfo.imdb_id:
+                logger.info(f'{mediainfo.title} 通过IMDBID匹配到资源：{torrent.site_name} - {torrent.title}')
+                _match_torrents.append((torrent, torrent_meta))
+                continue
+            # 比对种子
+            if self.torrenthelper.match_torrent(mediainfo=mediainfo,
+                                                torrent_meta=torrent_meta,
+                                                torrent=torrent):
+                # 匹配成功
+                _match_torrents.append((torrent, torrent_meta))
+                continue
+        # 匹配完成
+        logger.info(f"匹配完成，共匹配到 {len(_match_torrents)} 个资源")
+        if progress:
+            self.progress.update(value=97,
+                                 text=f'匹配完成，共匹配到 {len(_match_torrents)} 个资源',
+                                 key=ProgressKey.Search)
+        return _match_torrents
+
     def __search_all_sites(self, keywords: List[str],
                            mediainfo: Optional[MediaInfo] = None,
                            sites: List[int] = None,
@@ -284,6 +424,26 @@ class SearchChain(ChainBase):
         :param area:  搜索区域 title or imdbid
         :reutrn: 资源列表
         """
+        results = []
+        for _, result in self.__iter_sites(keywords=keywords, mediainfo=mediainfo,
+                                           sites=sites, page=page, area=area):
+            results.extend(result)
+        return results
+
+    def __iter_sites(self, keywords: List[str],
+                     mediainfo: Optional[MediaInfo] = None,
+                     sites: List[int] = None,
+                     page: int = 0,
+                     area: str = "title") -> Generator[Tuple[str, List[TorrentInfo]], None, None]:
+        """
+        多线程搜索多个站点，按完成先后返回各站点的结果
+        :param mediainfo:  识别的媒体信息
+        :param keywords:  搜索关键词列表
+        :param sites:  指定站点ID列表，如有则只搜索指定站点，否则搜索所有站点
+        :param page:  搜索页码
+        :param area:  搜索区域 title or imdbid
+        :reutrn: 生成器，每次返回（站点名称，该站点的资源列表）
+        """
         # 未开启的站点不搜索
         indexer_sites = []
 
@@ -302,7 +462,7 @@ class SearchChain(ChainBase):
                 indexer_sites.append(indexer)
         if not indexer_sites:
             logger.warn('未开启任何有效站点，无法搜索资源')
-            return []
+            return
 
         # 开始进度
         self.progress.start(ProgressKey.Search)
@@ -312,13 +472,15 @@ class SearchChain(ChainBase):
         total_num = len(indexer_sites)
         # 完成数
         finish_count = 0
+        # 有效资源数
+        result_count = 0
         # 更新进度
         self.progress.update(value=0,
                              text=f"开始搜索，共 {total_num} 个站点 ...",
                              key=ProgressKey.Search)
         # 多线程
         executor = ThreadPoolExecutor(max_workers=len(indexer_sites))
-        all_task = []
+        all_task = {}
         for site in indexer_sites:
             if area == "imdbid":
                 # 搜索IMDBID
@@ -332,31 +494,33 @@ class SearchChain(ChainBase):
                                        keywords=keywords,
                                        mtype=mediainfo.type if mediainfo else None,
                                        page=page)
-            all_task.append(task)
-        # 结果集
-        results = []
-        for future in as_completed(all_task):
-            if global_vars.is_system_stopped:
-                break
-            finish_count += 1
-            result = future.result()
-            if result:
-                results.extend(result)
-            logger.info(f"站点搜索进度：{finish_count} / {total_num}")
-            self.progress.update(value=finish_count / total_num * 100,
-                                 text=f"正在搜索{keywords or ''}，已完成 {finish_count} / {total_num} 个站点 ...",
+            all_task[task] = site.get("name")
+        try:
+            for future in as_completed(all_task):
+                if global_vars.is_system_stopped:
+                    break
+                finish_count += 1
+                result = future.result()
+                logger.info(f"站点搜索进度：{finish_count} / {total_num}")
+                self.progress.update(value=finish_count / total_num * 100,
+                                     text=f"正在搜索{keywords or ''}，已完成 {finish_count} / {total_num} 个站点 ...",
+                                     key=ProgressKey.Search)
+                if result:
+                    result_count += len(result)
+                    yield all_task[future], result
+        finally:
+            # 调用方提前结束时不再等待未完成的站点
+            executor.shutdown(wait=False, cancel_futures=True)
+            # 计算耗时
+            end_time = datetime.now()
+            # 更新进度
+            self.progress.update(value=100,
+                                 text=f"站点搜索完成，有效资源数：{result_count}，"
+                                      f"总耗时 {(end_time - start_time).seconds} 秒",
                                  key=ProgressKey.Search)
-        # 计算耗时
-        end_time = datetime.now()
-        # 更新进度
-        self.progress.update(value=100,
-                             text=f"站点搜索完成，有效资源数：{len(results)}，总耗时 {(end_time - start_time).seconds} 秒",
-                             key=ProgressKey.Search)
-        logger.info(f"站点搜索完成，有效资源数：{len(results)}，总耗时 {(end_time - start_time).seconds} 秒")
-        # 结束进度
-        self.progress.end(ProgressKey.Search)
-        # 返回
-        return results
+            logger.info(f"站点搜索完成，有效资源数：{result_count}，总耗时 {(end_time - start_time).seconds} 秒")
+            # 结束进度
+            self.progress.end(ProgressKey.Search)
 
     @eventmanager.register(EventType.SiteDeleted)
     def remove_site(self, event: Event):
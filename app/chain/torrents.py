@@ -1,6 +1,6 @@
 import re
 import traceback
-from typing import Dict, List, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from cachetools import cached, TTLCache
 
@@ -28,6 +28,11 @@ class TorrentsChain(ChainBase, metaclass=Singleton):
 
     _spider_file = "__torrents_cache__"
     _rss_file = "__rss_cache__"
+    # 缓存文件格式版本
+    _cache_version = 3
+    # 种子信息中的站点字段，缓存文件中只保存名称和优先级到站点表，Cookie等认证信息读取时从站点配置获取
+    _site_fields = ("site_name", "site_cookie", "site_ua", "site_proxy", "site_order")
+    _site_cache_fields = ("site_name", "site_order")
 
     def __init__(self):
         super().__init__()
@@ -59,9 +64,112 @@ class TorrentsChain(ChainBase, metaclass=Singleton):
 
         # 读取缓存
         if stype == 'spider':
-            return self.load_cache(self._spider_file) or {}
+            return self.__unpack_torrents(self.load_cache(self._spider_file))
         else:
-            return self.load_cache(self._rss_file) or {}
+            return self.__unpack_torrents(self.load_cache(self._rss_file))
+
+    @staticmethod
+    def __media_key(mediainfo: MediaInfo) -> Optional[Tuple]:
+        """
+        媒体信息的共享键，未识别的媒体信息不共享
+        """
+        if not mediainfo or (not mediainfo.tmdb_id and not mediainfo.douban_id):
+            return None
+        return mediainfo.type, mediainfo.tmdb_id, mediainfo.douban_id
+
+    def __pack_torrents(self, torrents_cache: Dict[str, List[Context]]) -> Dict[str, Any]:
+        """
+        压缩种子缓存用于保存：站点字段提取到站点表，相同的媒体信息只保存一份
+        """
+        sites: Dict[Any, tuple] = {}
+        medias: List[MediaInfo] = []
+        media_index: Dict[Any, int] = {}
+        torrents: Dict[str, list] = {}
+        for domain, contexts in torrents_cache.items():
+            items = []
+            for context in contexts:
+                torrent_info = context.torrent_info
+                state = dict(torrent_info.__dict__)
+                site_values = {f: state.pop(f, None) for f in self._site_fields}
+                # 后面的种子较新，覆盖站点名称及优先级
+                sites[torrent_info.site] = tuple(site_values[f] for f in self._site_cache_fields)
+                mediainfo = context.media_info
+                key = self.__media_key(mediainfo) or id(mediainfo)
+                if key not in media_index:
+                    media_index[key] = len(medias)
+                    medias.append(mediainfo)
+                items.append((context.meta_info, media_index[key], state))
+            torrents[domain] = items
+        return {
+            "version": self._cache_version,
+            "sites": sites,
+            "medias": medias,
+            "torrents": torrents
+        }
+
+    def __unpack_torrents(self, data: Any) -> Dict[str, List[Context]]:
+        """
+        还原种子缓存，兼容旧格式
+        """
+        if not data:
+            return {}
+        # 站点ID -> 当前站点配置中的站点字段
+        site_configs: Dict[Any, Optional[dict]] = {}
+        version = data.get("version")
+        if version not in (2, self._cache_version):
+            # 旧格式，共享相同的媒体信息
+            medias: Dict[Tuple, MediaInfo] = {}
+            for contexts in data.values():
+                for context in contexts:
+                    key = self.__media_key(context.media_info)
+                    if key:
+                        context.media_info = medias.setdefault(key, context.media_info)
+                    self.__update_site_fields(context.torrent_info, site_configs)
+            return data
+        # 2版本的站点表保存了全部站点字段
+        cache_fields = self._site_fields if version == 2 else self._site_cache_fields
+        sites: Dict[Any, tuple] = data.get("sites") or {}
+        medias: List[MediaInfo] = data.get("medias") or []
+        torrents_cache: Dict[str, List[Context]] = {}
+        for domain, items in (data.get("torrents") or {}).items():
+            contexts = []
+            for meta, media_idx, state in items:
+                torrent_info = TorrentInfo()
+                torrent_info.__dict__.update(state)
+                torrent_info.__dict__.update(zip(cache_fields, sites.get(state.get("site")) or ()))
+                self.__update_site_fields(torrent_info, site_configs)
+                contexts.append(Context(meta_info=meta, media_info=medias[media_idx], torrent_info=torrent_info))
+            torrents_cache[domain] = contexts
+        return torrents_cache
+
+    def __update_site_fields(self, torrent_info: TorrentInfo, site_configs: Dict[Any, Optional[dict]]):
+        """
+        使用当前站点配置更新种子的站点字段，避免使用缓存中过期的Cookie、UA
+        :param site_configs: 本次还原中已查询的站点配置
+        """
+        site_id = torrent_info.site
+        if site_id not in site_configs:
+            site = self.siteoper.get(site_id) if site_id else None
+            site_configs[site_id] = {
+                "site_name": site.name,
+                "site_cookie": site.cookie,
+                "site_ua": site.ua or settings.USER_AGENT,
+                "site_proxy": site.proxy,
+                "site_order": site.pri
+            } if site else None
+        site_config = site_configs[site_id]
+        if site_config:
+            torrent_info.__dict__.update(site_config)
+        else:
+            # 站点已删除，不再使用缓存的认证信息
+            torrent_info.site_cookie = None
+
+    def __save_torrents(self, torrents_cache: Dict[str, List[Context]], stype: str):
+        """
+        保存种子缓存到本地
+        """
+        self.save_cache(self.__pack_torrents(torrents_cache),
+                        self._spider_file if stype == "spider" else self._rss_file)
 
     def clear_torrents(self):
         """
@@ -152,6 +260,14 @@ class TorrentsChain(ChainBase, metaclass=Singleton):
             torrents_cache[_domain] = [_torrent for _torrent in _torrents
                                        if not self.torrenthelper.is_invalid(_torrent.torrent_info.enclosure)]
 
+        # 已缓存的媒体信息，相同媒体的种子共享同一个媒体信息
+        medias: Dict[Tuple, MediaInfo] = {}
+        for _torrents in torrents_cache.values():
+            for _torrent in _torrents:
+                _key = self.__media_key(_torrent.media_info)
+                if _key:
+                    medias.setdefault(_key, _torrent.media_info)
+
         # 所有站点索引
         indexers = self.siteshelper.get_indexers()
         # 需要刷新的站点domain
@@ -204,8 +320,15 @@ class TorrentsChain(ChainBase, metaclass=Singleton):
                         logger.warn(f'{torrent.title} 未识别到媒体信息')
                         # 存储空的媒体信息
                         mediainfo = MediaInfo()
-                    # 清理多余数据
-                    mediainfo.clear()
+                    media_key = self.__media_key(mediainfo)
+                    if media_key in medias:
+                        # 共享已缓存的媒体信息
+                        mediainfo = medias[media_key]
+                    else:
+                        # 清理多余数据
+                        mediainfo.clear()
+                        if media_key:
+                            medias[media_key] = mediainfo
                     # 上下文
                     context = Context(meta_info=meta, media_info=mediainfo, torrent_info=torrent)
                     # 添加到缓存
@@ -222,10 +345,7 @@ class TorrentsChain(ChainBase, metaclass=Singleton):
                 logger.info(f'{indexer.get("name")} 没有获取到种子')
 
         # 保存缓存到本地
-        if stype == "spider":
-            self.save_cache(torrents_cache, self._spider_file)
-        else:
-            self.save_cache(torrents_cache, self._rss_file)
+        self.__save_torrents(torrents_cache, stype)
 
         # 去除不在站点范围内的缓存种子
         if sites and torrents_cache:
@@ -1,6 +1,7 @@
 import re
 import threading
 from pathlib import Path
+from queue import Queue, Empty
 from typing import List, Optional, Tuple, Union, Dict
 
 from app.chain import ChainBase
@@ -20,13 +21,15 @@ from app.helper.directory import DirectoryHelper
 from app.helper.format import FormatParser
 from app.helper.progress import ProgressHelper
 from app.log import logger
-from app.schemas import TransferInfo, TransferTorrent, Notification, EpisodeFormat, FileItem
+from app.schemas import TransferInfo, TransferTorrent, Notification, EpisodeFormat, FileItem, TransferDirectoryConf
 from app.schemas.types import TorrentStatus, EventType, MediaType, ProgressKey, NotificationType, MessageChannel, \
     SystemConfigKey
 from app.utils.string import StringUtils
 from app.utils.system import SystemUtils
 
 lock = threading.Lock()
+# 新完成下载的待整理任务队列
+transfer_queue: Queue = Queue()
 
 
 class TransferChain(ChainBase):
@@ -62,19 +65,15 @@ class TransferChain(ChainBase):
 
         # 全局锁，避免重复处理
         with lock:
-            # 获取下载器监控目录
-            download_dirs = self.directoryhelper.get_download_dirs()
+            # 下载器监控目录索引
+            dir_index = self.__get_downloader_dir_index()
             # 如果没有下载器监控的目录则不处理
-            downloader_monitor = False
-            for dir_info in download_dirs:
-                # 只有下载器监控的本地目录才处理
-                if dir_info.monitor_type == "downloader" and dir_info.storage == "local":
-                    downloader_monitor = True
-                    break
-            if not downloader_monitor:
+            if not dir_index:
                 return True
 
             logger.info("开始整理下载器中已经完成下载的文件 ...")
+            # 全量整理会覆盖队列中等待的任务
+            self.__drain_queue()
             # 从下载器获取种子列表
             torrents: Optional[List[TransferTorrent]] = self.list_torrents(status=TorrentStatus.TRANSFER)
             if not torrents:
@@ -83,71 +82,144 @@ class TransferChain(ChainBase):
 
             logger.info(f"获取到 {len(torrents)} 个已完成的下载任务")
 
-            for torrent in torrents:
-                if global_vars.is_system_stopped:
-                    break
-                # 文件路径
-                file_path = torrent.path
-                if not file_path.exists():
-                    logger.warn(f"文件不存在：{file_path}")
-                    continue
-                # 检查是否为下载器监控目录中的文件
-                transfer_dirinfo = None
-                for dir_info in download_dirs:
-                    if dir_info.monitor_type != "downloader":
-                        continue
-                    if not dir_info.download_path:
-                        continue
-                    if file_path.is_relative_to(Path(dir_info.download_path)):
-                        transfer_dirinfo = dir_info
-                        break
-                if not transfer_dirinfo:
-                    logger.debug(f"文件 {file_path} 不在下载器监控目录中，不通过下载器进行整理")
-                    continue
-                # 查询下载记录识别情况
-                downloadhis: DownloadHistory = self.downloadhis.get_by_hash(torrent.hash)
-                if downloadhis:
-                    # 类型
-                    try:
-                        mtype = MediaType(downloadhis.type)
-                    except ValueError:
-                        mtype = MediaType.TV
-                    # 按TMDBID识别
-                    mediainfo = self.recognize_media(mtype=mtype,
-                                                     tmdbid=downloadhis.tmdbid,
-                                                     doubanid=downloadhis.doubanid)
-                    if mediainfo:
-                        # 补充图片
-                        self.obtain_images(mediainfo)
-                        # 更新自定义媒体类别
-                        if downloadhis.media_category:
-                            mediainfo.category = downloadhis.media_category
-                else:
-                    # 非MoviePilot下载的任务，按文件识别
-                    mediainfo = None
-
-                # 执行整理
-                self.__do_transfer(
-                    fileitem=FileItem(
-                        storage="local",
-                        path=str(file_path),
-                        type="dir" if not file_path.is_file() else "file",
-                        name=file_path.name,
-                        size=file_path.stat().st_size,
-                        extension=file_path.suffix.lstrip('.'),
-                    ),
-                    target_storage=transfer_dirinfo.library_storage,
-                    mediainfo=mediainfo,
-                    download_hash=torrent.hash
-                )
-
-                # 设置下载任务状态
-                self.transfer_completed(hashs=torrent.hash, path=torrent.path,
-                                        transfer_type=transfer_dirinfo.transfer_type)
+            self.__process_torrents(torrents=torrents, dir_index=dir_index)
             # 结束
             logger.info("所有下载器中下载完成的文件已整理完成")
             return True
 
+    def process_completed(self) -> bool:
+        """
+        检查下载器状态镜像中新完成下载的任务，加入整理队列并立即整理，无需等待全量整理
+        """
+        # 新完成的任务加入队列
+        for torrent in self.completed_torrents() or []:
+            transfer_queue.put(torrent)
+        if transfer_queue.empty():
+            return True
+        # 正在整理时留在队列中，下次检查时再处理
+        if not lock.acquire(blocking=False):
+            return True
+        try:
+            torrents = list(self.__drain_queue().values())
+            # 下载器监控目录索引
+            dir_index = self.__get_downloader_dir_index()
+            if not torrents or not dir_index:
+                return True
+            logger.info(f"下载器中有 {len(torrents)} 个任务完成下载，开始整理 ...")
+            self.__process_torrents(torrents=torrents, dir_index=dir_index)
+            logger.info("新完成下载的文件已整理完成")
+            return True
+        finally:
+            lock.release()
+
+    @staticmethod
+    def __drain_queue() -> Dict[str, TransferTorrent]:
+        """
+        取出整理队列中的所有任务，按Hash去重
+        """
+        torrents: Dict[str, TransferTorrent] = {}
+        while True:
+            try:
+                torrent: TransferTorrent = transfer_queue.get_nowait()
+            except Empty:
+                break
+            torrents[torrent.hash] = torrent
+        return torrents
+
+    def __get_downloader_dir_index(self) -> Dict[Path, Tuple[int, TransferDirectoryConf]]:
+        """
+        获取下载器监控目录索引：下载目录 -> (优先顺序, 目录配置)，没有下载器监控的本地目录时返回空
+        """
+        download_dirs = self.directoryhelper.get_download_dirs()
+        # 只有下载器监控的本地目录才处理
+        if not any(dir_info.monitor_type == "downloader" and dir_info.storage == "local"
+                   for dir_info in download_dirs):
+            return {}
+        dir_index: Dict[Path, Tuple[int, TransferDirectoryConf]] = {}
+        for order, dir_info in enumerate(download_dirs):
+            if dir_info.monitor_type != "downloader":
+                continue
+            if not dir_info.download_path:
+                continue
+            dir_index.setdefault(Path(dir_info.download_path), (order, dir_info))
+        return dir_index
+
+    @staticmethod
+    def __match_download_dir(file_path: Path,
+                             dir_index: Dict[Path, Tuple[int, TransferDirectoryConf]]) \
+            -> Optional[TransferDirectoryConf]:
+        """
+        按路径前缀查找文件所在的下载器监控目录，多个目录匹配时按目录优先顺序取第一个
+        """
+        matched = [dir_index[path] for path in (file_path, *file_path.parents) if path in dir_index]
+        if not matched:
+            return None
+        return min(matched, key=lambda x: x[0])[1]
+
+    def __process_torrents(self, torrents: List[TransferTorrent],
+                           dir_index: Dict[Path, Tuple[int, TransferDirectoryConf]]):
+        """
+        整理下载器中已完成的种子
+        :param torrents: 种子列表
+        :param dir_index: 下载器监控目录索引
+        """
+        # 批量查询下载记录
+        download_histories = self.downloadhis.get_by_hashes([torrent.hash for torrent in torrents])
+
+        for torrent in torrents:
+            if global_vars.is_system_stopped:
+                break
+            # 文件路径
+            file_path = torrent.path
+            if not file_path.exists():
+                logger.warn(f"文件不存在：{file_path}")
+                continue
+            # 检查是否为下载器监控目录中的文件
+            transfer_dirinfo = self.__match_download_dir(file_path, dir_index)
+            if not transfer_dirinfo:
+                logger.debug(f"文件 {file_path} 不在下载器监控目录中，不通过下载器进行整理")
+                continue
+            # 查询下载记录识别情况
+            downloadhis: DownloadHistory = download_histories.get(torrent.hash)
+            if downloadhis:
+                # 类型
+                try:
+                    mtype = MediaType(downloadhis.type)
+                except ValueError:
+                    mtype = MediaType.TV
+                # 按TMDBID识别
+                mediainfo = self.recognize_media(mtype=mtype,
+                                                 tmdbid=downloadhis.tmdbid,
+                                                 doubanid=downloadhis.doubanid)
+                if mediainfo:
+                    # 补充图片
+                    self.obtain_images(mediainfo)
+                    # 更新自定义媒体类别
+                    if downloadhis.media_category:
+                        mediainfo.category = downloadhis.media_category
+            else:
+                # 非MoviePilot下载的任务，按文件识别
+                mediainfo = None
+
+            # 执行整理
+            self.__do_transfer(
+                fileitem=FileItem(
+                    storage="local",
+                    path=str(file_path),
+                    type="dir" if not file_path.is_file() else "file",
+                    name=file_path.name,
+                    size=file_path.stat().st_size,
+                    extension=file_path.suffix.lstrip('.'),
+                ),
+                target_storage=transfer_dirinfo.library_storage,
+                mediainfo=mediainfo,
+                download_hash=torrent.hash
+            )
+
+            # 设置下载任务状态
+            self.transfer_completed(hashs=torrent.hash, path=torrent.path,
+                                    transfer_type=transfer_dirinfo.transfer_type)
+
     def __do_transfer(self, fileitem: FileItem,
                       meta: MetaBase = None, mediainfo: MediaInfo = None,
                       download_hash: str = None, target_storage: str = None,
@@ -243,6 +315,13 @@ class TransferChain(ChainBase):
             
             logger.info(f"正在整理 {len(file_items)} 个文件...")
 
+            # 批量查询已整理成功的文件
+            transferd_srcs = set()
+            if not force:
+                for storage in {f.storage for f in file_items}:
+                    transferd_srcs |= self.transferhis.exists_src_many(
+                        [f.path for f in file_items if f.storage == storage], storage=storage, success=True)
+
             # 整理所有文件
             for file_item in file_items:
                 if global_vars.is_system_stopped:
@@ -278,8 +357,7 @@ class TransferChain(ChainBase):
 
                 # 整理成功的不再处理
                 if not force:
-                    transferd = self.transferhis.get_by_src(file_item.path, storage=file_item.storage)
-                    if transferd and transferd.status:
+                    if file_item.path in transferd_srcs:
                         logger.info(f"{file_item.path} 已成功整理过，如需重新处理，请删除历史记录。")
                         # 计数
                         processed_num += 1
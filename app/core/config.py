@@ -69,6 +69,18 @@ class ConfigModel(BaseModel):
     DB_MAX_OVERFLOW: int = 10
     # SQLite 的 busy_timeout 参数，默认为 60 秒
     DB_TIMEOUT: int = 60
+    # SQLite 是否启用 WAL 日志模式，默认开启
+    DB_WAL_ENABLE: bool = True
+    # SQLite 的 synchronous 参数，OFF, NORMAL, FULL, EXTRA，默认 NORMAL
+    DB_SYNCHRONOUS: str = "NORMAL"
+    # SQLite 的页缓存大小（KB），默认 20480 KB
+    DB_CACHE_SIZE: int = 20480
+    # SQLite 的内存映射大小（MB），默认 64 MB，0 为不启用
+    DB_MMAP_SIZE: int = 64
+    # 慢查询日志阈值（毫秒），超过该耗时的 SQL 语句将记录日志，默认 0 不记录
+    DB_SLOW_QUERY_MS: int = 0
+    # 是否开启运行指标统计，开启后可通过 /api/v1/system/metrics 获取
+    METRICS_ENABLE: bool = False
     # 配置文件目录
     CONFIG_DIR: Optional[str] = None
     # 超级管理员
@@ -115,6 +127,14 @@ class ConfigModel(BaseModel):
     DOH_DOMAINS: str = "api.themoviedb.org,api.tmdb.org,webservice.fanart.tv,api.github.com,github.com,raw.githubusercontent.com,api.telegram.org"
     # DOH 解析服务器列表
     DOH_RESOLVERS: str = "1.0.0.1,1.1.1.1,9.9.9.9,149.112.112.112"
+    # 是否缓存所有域名的DNS解析结果，未启用时只缓存 DOH 解析的域名
+    DNS_CACHE_ENABLE: bool = False
+    # DNS 缓存的最大域名数
+    DNS_CACHE_SIZE: int = 1024
+    # 系统解析结果的缓存时间（秒），系统解析无法获取记录的 TTL
+    DNS_CACHE_TTL: int = 300
+    # 解析失败结果的缓存时间（秒）
+    DNS_NEGATIVE_TTL: int = 30
     # 支持的后缀格式
     RMT_MEDIAEXT: list = ['.mp4', '.mkv', '.ts', '.iso',
                           '.rmvb', '.avi', '.mov', '.mpeg',
@@ -133,10 +153,19 @@ class ConfigModel(BaseModel):
                           '.tta', '.vqf', '.wav', '.wma',
                           '.aifc', '.aiff', '.alac', '.adif', '.adts',
                           '.flac', '.midi', '.opus', '.sfalc']
+    # 本地存储递归遍历目录时并行扫描的线程数，网络挂载的媒体库可适当调大
+    LOCAL_SCAN_WORKERS: int = 1
+    # 遍历本地目录时跳过的目录名称，如NAS的缩略图、回收站和快照目录
+    SCAN_EXCLUDE_DIRS: list = ['@eaDir', '#recycle', '@Recycle', '#snapshot', '@Recently-Snapshot',
+                               '.@__thumb', '$RECYCLE.BIN', 'System Volume Information', 'lost+found']
+    # 复制整理使用的复制方式：kernel 内核加速复制（reflink/copy_file_range，支持断点续传），shutil 标准库复制
+    TRANSFER_COPY_ENGINE: str = "shutil"
     # 下载器临时文件后缀
     DOWNLOAD_TMPEXT: list = ['.!qB', '.part']
     # 媒体服务器同步间隔（小时）
     MEDIASERVER_SYNC_INTERVAL: int = 6
+    # 媒体服务器同步时并发拉取的分页数
+    MEDIASERVER_SYNC_WORKERS: int = 4
     # 订阅模式
     SUBSCRIBE_MODE: str = "spider"
     # RSS订阅模式刷新时间间隔（分钟）
@@ -151,6 +180,8 @@ class ConfigModel(BaseModel):
     SITEDATA_REFRESH_INTERVAL: int = 6
     # 种子标签
     TORRENT_TAG: str = "MOVIEPILOT"
+    # 单个站点种子文件下载并发数
+    TORRENT_DOWNLOAD_THREADS: int = 2
     # 下载站点字幕
     DOWNLOAD_SUBTITLE: bool = True
     # 交互搜索自动下载用户ID，使用,分割
@@ -178,6 +209,12 @@ class ConfigModel(BaseModel):
                             "/Season {{season}}" \
                             "/{{title}} - {{season_episode}}{% if part %}-{{part}}{% endif %}{% if episode %} - 第 {{episode}} 集{% endif %}" \
                             "{{fileExt}}"
+    # 常驻浏览器的最大数量，用于站点登录、数据刷新及爬虫
+    BROWSER_POOL_SIZE: int = 2
+    # 浏览器全部空闲多久后关闭（秒）
+    BROWSER_IDLE_TIMEOUT: int = 300
+    # 站点浏览器上下文（Cookie及本地存储）未使用多久后关闭（秒）
+    BROWSER_CONTEXT_TIMEOUT: int = 1800
     # OCR服务器地址
     OCR_HOST: str = "https://movie-pilot.org"
     # 服务器地址，对应 https://github.com/jxxghp/MoviePilot-Server 项目
@@ -188,6 +225,10 @@ class ConfigModel(BaseModel):
     PLUGIN_STATISTIC_SHARE: bool = True
     # 是否开启插件热加载
     PLUGIN_AUTO_RELOAD: bool = False
+    # 插件数据合并写入数据库的间隔（毫秒），0为每次保存立即写入
+    PLUGIN_DATA_FLUSH_INTERVAL: int = 500
+    # 插件数据内存缓存的最大条数
+    PLUGIN_DATA_CACHE_SIZE: int = 10000
     # Github token，提高请求api限流阈值 ghp_****
     GITHUB_TOKEN: Optional[str] = None
     # Github代理服务器，格式：https://mirror.ghproxy.com/
@@ -10,6 +10,7 @@ from functools import lru_cache
 from queue import Empty, PriorityQueue
 from typing import Callable, Dict, List, Optional, Union
 
+from app.core.metrics import metrics
 from app.helper.message import MessageHelper
 from app.helper.thread import ThreadHelper
 from app.log import logger
@@ -84,6 +85,7 @@ class EventManager(metaclass=Singleton):
         self.__disabled_handlers = set()  # 禁用的事件处理器集合
         self.__disabled_classes = set()  # 禁用的事件处理器类集合
         self.__lock = threading.Lock()  # 线程锁
+        metrics.register_gauge("mp_event_queue_depth", "广播事件队列长度", self.__event_queue.qsize)
 
     def start(self):
         """
@@ -380,6 +382,7 @@ class EventManager(metaclass=Singleton):
 
         names = handler.__qualname__.split(".")
         class_name, method_name = names[0], names[1]
+        handler_name = f"{class_name}.{method_name}"
 
         try:
             from app.core.plugin import PluginManager
@@ -387,7 +390,10 @@ class EventManager(metaclass=Singleton):
             if class_name in PluginManager().get_plugin_ids():
                 # 定义一个插件调用函数
                 def plugin_callable():
+                    start_time = time.perf_counter()
                     PluginManager().run_plugin_method(class_name, method_name, event_to_process)
+                    metrics.observe("mp_event_handler_duration_seconds", "事件处理耗时",
+                                    time.perf_counter() - start_time, handler=handler_name)
 
                 if is_broadcast_event:
                     self.__executor.submit(plugin_callable)
@@ -398,6 +404,8 @@ class EventManager(metaclass=Singleton):
                 class_obj = self.__get_class_instance(class_name)
                 if class_obj and hasattr(class_obj, method_name):
                     method = getattr(class_obj, method_name)
+                    if metrics.enabled:
+                        method = self.__timed_handler(method, handler_name)
                     if is_broadcast_event:
                         self.__executor.submit(method, event_to_process)
                     else:
@@ -405,6 +413,22 @@ class EventManager(metaclass=Singleton):
         except Exception as e:
             self.__handle_event_error(event, handler, e)
 
+    @staticmethod
+    def __timed_handler(method: Callable, handler_name: str) -> Callable:
+        """
+        包装处理器，统计处理耗时
+        """
+
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                metrics.observe("mp_event_handler_duration_seconds", "事件处理耗时",
+                                time.perf_counter() - start_time, handler=handler_name)
+
+        return wrapper
+
     @staticmethod
     def __get_class_instance(class_name: str):
         """
@@ -1,15 +1,193 @@
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
 import regex as re
+from cachetools import LRUCache
 
 from app.db.systemconfig_oper import SystemConfigOper
+from app.log import logger
 from app.schemas.types import SystemConfigKey
 from app.utils.singleton import Singleton
 
 
+class _GroupsAutomaton:
+    """
+    制作组匹配器：可展开为字面量的组名构建Aho-Corasick自动机，一次扫描标题即可找出所有组名，
+    含其它正则语法的组名单独预编译；匹配结果与按顺序拼接的正则一致
+    """
+
+    # 制作组前后的分隔符
+    _prefix_chars = frozenset("-@[￡【&")
+    _suffix_chars = frozenset("@.[]】&")
+    # 单个组名最多展开的字面量数
+    _expand_limit = 256
+
+    def __init__(self, patterns: List[str]):
+        # 状态转移、失配跳转、各状态匹配到的（字面量长度, 优先级）
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[int, int]]] = [[]]
+        # 无法展开的组名合并为一个正则，以分组名记录优先级
+        self._regex: Optional[re.Pattern] = None
+        literals: Dict[str, int] = {}
+        residuals = []
+        priority = 0
+        for pattern in patterns:
+            if not pattern:
+                continue
+            expanded = self.__expand(pattern)
+            if expanded is None:
+                try:
+                    re.compile(pattern)
+                    residuals.append(f"(?P<mp_group_{priority}>{pattern})")
+                except re.error as err:
+                    logger.warn(f"制作组 {pattern} 不是有效的正则表达式：{str(err)}")
+                priority += 1
+                continue
+            for literal in expanded:
+                # 同一位置可匹配多个组名时，与正则一样取排在前面的
+                literal = self.__lower(literal)
+                if literal and literals.setdefault(literal, priority) == priority:
+                    self.__add(literal, priority)
+                priority += 1
+        if residuals:
+            self._regex = re.compile(r"(?<=[-@\[￡【&])(?:%s)(?=[@.\s\]\[】&])" % "|".join(residuals), re.I)
+        self.__build()
+
+    @classmethod
+    def __expand(cls, pattern: str) -> Optional[List[str]]:
+        """
+        将仅由字面量和非捕获分组 (?:a|b) 组成的正则展开为字面量列表，顺序与正则回溯的尝试顺序一致
+        :return: 字面量列表，含其它正则语法时返回None
+        """
+
+        def parse(pos: int) -> Tuple[Optional[List[str]], int]:
+            alternatives, current = [], [""]
+            while pos < len(pattern):
+                char = pattern[pos]
+                if char == "(":
+                    if not pattern.startswith("(?:", pos):
+                        return None, pos
+                    group, pos = parse(pos + 3)
+                    if group is None or pos >= len(pattern) or pattern[pos] != ")":
+                        return None, pos
+                    current = [prefix + suffix for prefix in current for suffix in group]
+                elif char == "|":
+                    alternatives.extend(current)
+                    current = [""]
+                elif char == ")":
+                    break
+                elif char == "\\":
+                    # 仅支持转义的标点符号
+                    pos += 1
+                    if pos >= len(pattern) or pattern[pos].isalnum() or pattern[pos] == "_":
+                        return None, pos
+                    current = [prefix + pattern[pos] for prefix in current]
+                elif char in ".^$*+?{}[]":
+                    return None, pos
+                else:
+                    current = [prefix + char for prefix in current]
+                if len(alternatives) + len(current) > cls._expand_limit:
+                    return None, pos
+                pos += 1
+            alternatives.extend(current)
+            return alternatives, pos
+
+        literals, end = parse(0)
+        if literals is None or end != len(pattern):
+            return None
+        return literals
+
+    @staticmethod
+    def __lower(text: str) -> str:
+        """
+        转小写并保持长度不变，少数字符转小写后长度变化时保留原字符，使位置与原文对应
+        """
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            return lowered
+        return "".join(char.lower() if len(char.lower()) == 1 else char for char in text)
+
+    def __add(self, literal: str, priority: int):
+        """
+        将字面量加入前缀树
+        """
+        state = 0
+        for char in literal:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        self._outputs[state].append((len(literal), priority))
+
+    def __build(self):
+        """
+        按层计算失配跳转，并合并后缀状态的匹配结果
+        """
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+                queue.append(next_state)
+
+    def findall(self, title: str) -> List[str]:
+        """
+        查找标题中的所有制作组，去重并保留顺序
+        :param title: 标题，末尾需带空格作为结束分隔符
+        """
+        lowered = self.__lower(title)
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        prefix_chars, suffix_chars = self._prefix_chars, self._suffix_chars
+        length = len(title)
+        # 起始位置 -> (优先级, 结束位置)
+        candidates: Dict[int, Tuple[int, int]] = {}
+        state = 0
+        for end, char in enumerate(lowered, start=1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not outputs[state] or end >= length:
+                continue
+            after = title[end]
+            if after not in suffix_chars and not after.isspace():
+                continue
+            for size, priority in outputs[state]:
+                start = end - size
+                if start > 0 and title[start - 1] in prefix_chars \
+                        and (start not in candidates or priority < candidates[start][0]):
+                    candidates[start] = (priority, end)
+        if self._regex:
+            for match in self._regex.finditer(title, overlapped=True):
+                start, priority = match.start(), int(match.lastgroup.rsplit("_", 1)[-1])
+                if match.end() > start and (start not in candidates or priority < candidates[start][0]):
+                    candidates[start] = (priority, match.end())
+        # 与正则查找一致，从左到右取不重叠的匹配
+        groups, pos = [], 0
+        for start in sorted(candidates):
+            if start < pos:
+                continue
+            pos = candidates[start][1]
+            group = title[start:pos]
+            if group not in groups:
+                groups.append(group)
+        return groups
+
+
 class ReleaseGroupsMatcher(metaclass=Singleton):
     """
     识别制作组、字幕组
     """
-    __release_groups: str = None
+    __release_groups: List[str] = None
     # 内置组
     RELEASE_GROUPS: dict = {
         "0ff": ['FF(?:(?:A|WE)B|CD|E(?:DU|B)|TV)'],
@@ -80,11 +258,38 @@ class ReleaseGroupsMatcher(metaclass=Singleton):
 
     def __init__(self):
         self.systemconfig = SystemConfigOper()
+        self._lock = threading.Lock()
         release_groups = []
         for site_groups in self.RELEASE_GROUPS.values():
             for release_group in site_groups:
                 release_groups.append(release_group)
-        self.__release_groups = '|'.join(release_groups)
+        self.__release_groups = release_groups
+        # 当前使用的自定义组及对应的匹配器，自定义组变化时重建
+        self.__custom_groups: Optional[tuple] = None
+        self.__matcher: Optional[_GroupsAutomaton] = None
+        # 指定制作组时的匹配器
+        self.__groups_matchers: LRUCache = LRUCache(maxsize=16)
+
+    def __get_matcher(self, groups: str = None) -> _GroupsAutomaton:
+        """
+        获取匹配器，未指定制作组时使用内置组及自定义组
+        """
+        if groups:
+            # LRUCache读取时也会调整顺序，需在锁内访问
+            with self._lock:
+                matcher = self.__groups_matchers.get(groups)
+            if not matcher:
+                matcher = _GroupsAutomaton([groups])
+                with self._lock:
+                    self.__groups_matchers[groups] = matcher
+            return matcher
+        custom_groups = tuple(self.systemconfig.get(SystemConfigKey.CustomReleaseGroups) or [])
+        if self.__matcher is None or custom_groups != self.__custom_groups:
+            with self._lock:
+                if self.__matcher is None or custom_groups != self.__custom_groups:
+                    self.__matcher = _GroupsAutomaton(self.__release_groups + list(custom_groups))
+                    self.__custom_groups = custom_groups
+        return self.__matcher
 
     def match(self, title: str = None, groups: str = None):
         """
@@ -94,19 +299,5 @@ class ReleaseGroupsMatcher(metaclass=Singleton):
         """
         if not title:
             return ""
-        if not groups:
-            # 自定义组
-            custom_release_groups = self.systemconfig.get(SystemConfigKey.CustomReleaseGroups)
-            if custom_release_groups:
-                custom_release_groups_str = '|'.join(custom_release_groups)
-                groups = f"{self.__release_groups}|{custom_release_groups_str}"
-            else:
-                groups = self.__release_groups
-        title = f"{title} "
-        groups_re = re.compile(r"(?<=[-@\[￡【&])(?:%s)(?=[@.\s\]\[】&])" % groups, re.I)
         # 处理一个制作组识别多次的情况，保留顺序
-        unique_groups = []
-        for item in re.findall(groups_re, title):
-            if item not in unique_groups:
-                unique_groups.append(item)
-        return "@".join(unique_groups)
+        return "@".join(self.__get_matcher(groups).findall(f"{title} "))
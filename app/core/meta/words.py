@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import List, Tuple
 
 import cn2an
@@ -24,6 +25,32 @@ class WordsMatcher(metaclass=Singleton):
         appley_words = []
         # 读取自定义识别词
         words: List[str] = custom_words or self.systemconfig.get(SystemConfigKey.CustomIdentifiers) or []
+        for word, replaced, replace, front, back, offset in self.__parse(tuple(words)):
+            try:
+                state = False
+                if replaced is not None:
+                    # 替换词
+                    title, message, state = self.__replace_regex(title, replaced, replace)
+                if offset is not None and (replaced is None or state):
+                    # 集偏移，有替换词时替换成功再进行集偏移
+                    title, message, state = self.__episode_offset(title, front, back, offset)
+
+                if state:
+                    appley_words.append(word)
+
+            except Exception as err:
+                logger.warn(f"自定义识别词 {word} 预处理标题失败：{str(err)} - 标题：{title}")
+
+        return title, appley_words
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def __parse(words: Tuple[str, ...]) -> List[tuple]:
+        """
+        解析识别词，同一组识别词只解析一次
+        :return: [(识别词, 被替换词, 替换词, 前定位词, 后定位词, 偏移量)]，不涉及的部分为None
+        """
+        rules = []
         for word in words:
             if not word or word.startswith("#"):
                 continue
@@ -39,34 +66,30 @@ class WordsMatcher(metaclass=Singleton):
                     pyh = str(re.findall(r'<>(.*?)\s*>>', word)[0]).strip()
                     # 集偏移
                     offsets = str(re.findall(r'>>\s*(.*?)$', word)[0]).strip()
-                    # 替换词
-                    title, message, state = self.__replace_regex(title, thc, bthc)
-                    if state:
-                        # 替换词成功再进行集偏移
-                        title, message, state = self.__episode_offset(title, pyq, pyh, offsets)
+                    rules.append((word, thc, bthc, pyq, pyh, offsets))
                 elif word.count(" => "):
                     # 替换词
                     strings = word.split(" => ")
-                    title, message, state = self.__replace_regex(title, strings[0], strings[1])
+                    rules.append((word, strings[0], strings[1], None, None, None))
                 elif word.count(" >> ") and word.count(" <> "):
                     # 集偏移
                     strings = word.split(" <> ")
                     offsets = strings[1].split(" >> ")
-                    strings[1] = offsets[0]
-                    title, message, state = self.__episode_offset(title, strings[0], strings[1], offsets[1])
-                else:
+                    rules.append((word, None, None, strings[0], offsets[0], offsets[1]))
+                elif word.strip():
                     # 屏蔽词
-                    if not word.strip():
-                        continue
-                    title, message, state = self.__replace_regex(title, word, "")
-
-                if state:
-                    appley_words.append(word)
-
+                    rules.append((word, word, "", None, None, None))
             except Exception as err:
-                logger.warn(f"自定义识别词 {word} 预处理标题失败：{str(err)} - 标题：{title}")
+                logger.warn(f"自定义识别词 {word} 格式错误：{str(err)}")
+        return rules
 
-        return title, appley_words
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def __compile(pattern: str) -> re.Pattern:
+        """
+        编译正则，识别词中的正则只编译一次
+        """
+        return re.compile(pattern)
 
     @staticmethod
     def __replace_regex(title: str, replaced: str, replace: str) -> Tuple[str, str, bool]:
@@ -74,10 +97,8 @@ class WordsMatcher(metaclass=Singleton):
         正则替换
         """
         try:
-            if not re.findall(r'%s' % replaced, title):
-                return title, "", False
-            else:
-                return re.sub(r'%s' % replaced, r'%s' % replace, title), "", True
+            title, count = WordsMatcher.__compile(replaced).subn(replace, title)
+            return title, "", count > 0
         except Exception as err:
             logger.warn(f"自定义识别词正则替换失败：{str(err)} - 标题：{title}，被替换词：{replaced}，替换词：{replace}")
             return title, str(err), False
@@ -88,12 +109,13 @@ class WordsMatcher(metaclass=Singleton):
         集数偏移
         """
         try:
-            if back and not re.findall(r'%s' % back, title):
+            if back and not WordsMatcher.__compile(back).search(title):
                 return title, "", False
-            if front and not re.findall(r'%s' % front, title):
+            if front and not WordsMatcher.__compile(front).search(title):
                 return title, "", False
-            offset_word_info_re = re.compile(r'(?<=%s.*?)[0-9一二三四五六七八九十]+(?=.*?%s)' % (front, back))
-            episode_nums_str = re.findall(offset_word_info_re, title)
+            offset_word_info_re = WordsMatcher.__compile(
+                r'(?<=%s.*?)[0-9一二三四五六七八九十]+(?=.*?%s)' % (front, back))
+            episode_nums_str = offset_word_info_re.findall(title)
             if not episode_nums_str:
                 return title, "", False
             episode_nums_offset_str = []
@@ -126,9 +148,9 @@ class WordsMatcher(metaclass=Singleton):
             else:
                 episode_nums_list = sorted(episode_nums_dict.items(), key=lambda x: x[1], reverse=True)
             for episode_num in episode_nums_list:
-                episode_offset_re = re.compile(
+                episode_offset_re = WordsMatcher.__compile(
                     r'(?<=%s.*?)%s(?=.*?%s)' % (front, episode_num[0], back))
-                title = re.sub(episode_offset_re, r'%s' % episode_num[1], title)
+                title = episode_offset_re.sub(r'%s' % episode_num[1], title)
             return title, "", True
         except Exception as err:
             logger.warn(f"自定义识别词集数偏移失败：{str(err)} - 标题：{title}，前定位词：{front}，后定位词：{back}，偏移量：{offset}")
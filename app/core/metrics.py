@@ -0,0 +1,195 @@
+import bisect
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+# 默认的耗时分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    """
+    格式化标签
+    """
+    items = list(labels)
+    if extra:
+        items.append(extra)
+    if not items:
+        return ""
+    pairs = []
+    for key, value in items:
+        value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Counter:
+    """
+    计数器
+    """
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, labels: tuple, value: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for labels, value in self.values.items():
+            lines.append(f"{self.name}_total{_format_labels(labels)} {value}")
+        return lines
+
+
+class _Histogram:
+    """
+    直方图
+    """
+
+    def __init__(self, name: str, description: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        # 标签 -> [各分桶计数, 总和, 总数]
+        self.values: Dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        data = self.values.get(labels)
+        if data is None:
+            data = [[0] * len(self.buckets), 0.0, 0]
+            self.values[labels] = data
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            data[0][index] += 1
+        data[1] += value
+        data[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bucket, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', bucket))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class MetricsManager:
+    """
+    运行指标统计，以 OpenMetrics 格式输出
+    未开启时各埋点只判断 enabled 标志，不做任何统计
+    """
+
+    def __init__(self):
+        self.enabled = settings.METRICS_ENABLE
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Any] = {}
+        # 采集时才计算的指标 名称 -> (说明, 类型, 取值函数)
+        self._gauges: Dict[str, Tuple[str, str, Callable[[], Dict[tuple, float]]]] = {}
+        # 缓存命中统计 名称 -> 返回(命中数, 未命中数)的函数
+        self._caches: Dict[str, Callable[[], Tuple[int, int]]] = {}
+        # 埋点统计的缓存命中 名称 -> [命中数, 未命中数]
+        self._cache_counts: Dict[str, List[int]] = {}
+
+    def __get(self, name: str, description: str, metric_type: type):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = metric_type(name, description)
+            self._metrics[name] = metric
+        return metric
+
+    def inc(self, name: str, description: str, value: float = 1, **labels):
+        """
+        计数器累加
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.__get(name, description, _Counter).inc(tuple(labels.items()), value)
+
+    def observe(self, name: str, description: str, value: float, **labels):
+        """
+        记录一次耗时等观测值
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.__get(name, description, _Histogram).observe(tuple(labels.items()), value)
+
+    def register_gauge(self, name: str, description: str, func: Callable[[], Any], metric_type: str = "gauge"):
+        """
+        注册采集时计算的指标
+        :param name: 指标名称
+        :param description: 指标说明
+        :param func: 取值函数，返回数值或 {标签元组: 数值}
+        :param metric_type: 指标类型 gauge/counter
+        """
+        self._gauges[name] = (description, metric_type, func)
+
+    def register_cache(self, name: str, func: Callable[[], Tuple[int, int]]):
+        """
+        注册缓存命中统计
+        :param name: 缓存名称
+        :param func: 返回(命中数, 未命中数)的函数
+        """
+        self._caches[name] = func
+
+    def cache_hit(self, name: str, hit: bool):
+        """
+        记录一次缓存访问
+        :param name: 缓存名称
+        :param hit: 是否命中
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            counts = self._cache_counts.setdefault(name, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def render(self) -> str:
+        """
+        输出 OpenMetrics 格式的指标
+        """
+        lines = []
+        with self._lock:
+            for metric in self._metrics.values():
+                lines.extend(metric.render())
+        for name, (description, metric_type, func) in self._gauges.items():
+            try:
+                value = func()
+            except Exception:
+                continue
+            values = value if isinstance(value, dict) else {(): value}
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            suffix = "_total" if metric_type == "counter" else ""
+            for labels, val in values.items():
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {val or 0}")
+        with self._lock:
+            caches = {name: (lambda c=tuple(counts): c) for name, counts in self._cache_counts.items()}
+        caches.update(self._caches)
+        if caches:
+            hits_lines = ["# HELP mp_cache_hits 缓存命中次数", "# TYPE mp_cache_hits counter"]
+            misses_lines = ["# HELP mp_cache_misses 缓存未命中次数", "# TYPE mp_cache_misses counter"]
+            ratio_lines = ["# HELP mp_cache_hit_ratio 缓存命中率", "# TYPE mp_cache_hit_ratio gauge"]
+            for name, func in caches.items():
+                try:
+                    hits, misses = func()
+                except Exception:
+                    continue
+                labels = _format_labels((("cache", name),))
+                hits_lines.append(f"mp_cache_hits_total{labels} {hits}")
+                misses_lines.append(f"mp_cache_misses_total{labels} {misses}")
+                ratio_lines.append(f"mp_cache_hit_ratio{labels} {round(hits / (hits + misses), 4) if hits + misses else 0}")
+            lines.extend(hits_lines + misses_lines + ratio_lines)
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsManager()
@@ -1,11 +1,14 @@
+import time
 import traceback
-from typing import Generator, Optional, Tuple, Any
+from typing import Generator, Optional, Tuple, Any, Set
 
 from app.core.config import settings
 from app.core.event import eventmanager
+from app.core.profiler import startup_profiler
+from app.db.systemconfig_oper import SystemConfigOper
 from app.helper.module import ModuleHelper
 from app.log import logger
-from app.schemas.types import EventType, ModuleType
+from app.schemas.types import EventType, ModuleType, SystemConfigKey
 from app.utils.object import ObjectUtils
 from app.utils.singleton import Singleton
 
@@ -19,6 +22,15 @@ class ModuleManager(metaclass=Singleton):
     _modules: dict = {}
     # 运行态模块列表
     _running_modules: dict = {}
+    # 未配置服务而延迟加载的模块包
+    _deferred_packages: Set[str] = set()
+
+    # 服务类模块包，未启用对应类型的服务配置时不导入，重新加载模块时再按配置加载
+    _service_packages = {
+        SystemConfigKey.Downloaders: ["qbittorrent", "transmission"],
+        SystemConfigKey.MediaServers: ["emby", "jellyfin", "plex"],
+        SystemConfigKey.Notifications: ["telegram", "wechat", "slack", "synologychat", "vocechat"],
+    }
 
     def __init__(self):
         self.load_modules()
@@ -27,16 +39,23 @@ class ModuleManager(metaclass=Singleton):
         """
         加载所有模块
         """
+        self._deferred_packages = self.__get_deferred_packages()
         # 扫描模块目录
         modules = ModuleHelper.load(
             "app.modules",
-            filter_func=lambda _, obj: hasattr(obj, 'init_module') and hasattr(obj, 'init_setting')
+            filter_func=lambda _, obj: hasattr(obj, 'init_module') and hasattr(obj, 'init_setting'),
+            package_filter=lambda name: name not in self._deferred_packages,
+            on_imported=startup_profiler.record_import
         )
+        for package in self._deferred_packages:
+            startup_profiler.record_deferred(package)
         self._running_modules = {}
         self._modules = {}
         for module in modules:
             module_id = module.__name__
+            package = module.__module__.split(".")[2]
             self._modules[module_id] = module
+            start = time.perf_counter()
             try:
                 # 生成实例
                 _module = module()
@@ -45,9 +64,28 @@ class ModuleManager(metaclass=Singleton):
                     # 通过模板开关控制加载
                     _module.init_module()
                     self._running_modules[module_id] = _module
+                    startup_profiler.record_module(package, module_id, time.perf_counter() - start, "running")
                     logger.info(f"Moudle Loaded：{module_id}")
+                else:
+                    startup_profiler.record_module(package, module_id, time.perf_counter() - start, "disabled")
             except Exception as err:
+                startup_profiler.record_module(package, module_id, time.perf_counter() - start, "error")
                 logger.error(f"Load Moudle Error：{module_id}，{str(err)} - {traceback.format_exc()}", exc_info=True)
+        if self._deferred_packages:
+            logger.info(f"未配置服务，延迟加载模块：{', '.join(sorted(self._deferred_packages))}")
+
+    def __get_deferred_packages(self) -> Set[str]:
+        """
+        获取未启用服务配置的模块包
+        """
+        deferred = set()
+        systemconfig = SystemConfigOper()
+        for config_key, packages in self._service_packages.items():
+            configs = systemconfig.get(config_key) or []
+            enabled_types = {conf.get("type") for conf in configs
+                             if isinstance(conf, dict) and conf.get("enabled")}
+            deferred.update(package for package in packages if package not in enabled_types)
+        return deferred
 
     def stop(self):
         """
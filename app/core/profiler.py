@@ -0,0 +1,110 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from app.log import logger
+
+
+class StartupProfiler:
+    """
+    启动耗时统计，按阶段和模块记录耗时并输出报告
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        # 阶段名称 -> 耗时（秒）
+        self._phases: Dict[str, float] = {}
+        # 模块ID -> {导入/初始化耗时、状态}
+        self._modules: Dict[str, dict] = {}
+        # 启动完成时的总耗时
+        self._total: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        统计一个启动阶段的耗时
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._phases[name] = time.perf_counter() - start
+
+    def record_import(self, package: str, elapsed: float):
+        """
+        记录模块包的导入耗时
+        """
+        with self._lock:
+            self._modules.setdefault(package, {})["import"] = elapsed
+
+    def record_module(self, package: str, module_id: str, elapsed: float, state: str):
+        """
+        记录模块的实例化和初始化耗时
+        :param package: 模块所在包名
+        :param module_id: 模块ID
+        :param elapsed: 耗时（秒）
+        :param state: 状态 running/disabled/deferred/error
+        """
+        with self._lock:
+            data = self._modules.setdefault(package, {})
+            data["module"] = module_id
+            data["init"] = elapsed
+            data["state"] = state
+
+    def record_deferred(self, package: str):
+        """
+        记录未配置而延迟加载的模块包
+        """
+        with self._lock:
+            self._modules[package] = {"state": "deferred"}
+
+    def finish(self):
+        """
+        启动完成，输出耗时报告
+        """
+        with self._lock:
+            self._total = time.perf_counter() - self._started
+        logger.info(self.format_report())
+
+    def report(self) -> dict:
+        """
+        启动耗时报告
+        """
+        with self._lock:
+            modules = []
+            for package, data in self._modules.items():
+                modules.append({
+                    "package": package,
+                    "module": data.get("module"),
+                    "state": data.get("state"),
+                    "import": round(data.get("import", 0), 4),
+                    "init": round(data.get("init", 0), 4)
+                })
+            modules.sort(key=lambda x: x["import"] + x["init"], reverse=True)
+            return {
+                "total": round(self._total, 4) if self._total is not None else None,
+                "phases": [{"name": name, "elapsed": round(elapsed, 4)} for name, elapsed in self._phases.items()],
+                "modules": modules
+            }
+
+    def format_report(self) -> str:
+        """
+        格式化启动耗时报告
+        """
+        report = self.report()
+        lines: List[str] = [f"启动耗时报告，总耗时：{report['total'] or 0:.2f}s"]
+        for item in report["phases"]:
+            lines.append(f"  阶段 {item['name']}：{item['elapsed']:.3f}s")
+        for item in report["modules"]:
+            if item["state"] == "deferred":
+                lines.append(f"  模块 {item['package']}：未配置，延迟加载")
+                continue
+            lines.append(f"  模块 {item['package']}：导入 {item['import']:.3f}s，"
+                         f"初始化 {item['init']:.3f}s，状态 {item['state']}")
+        return "\n".join(lines)
+
+
+startup_profiler = StartupProfiler()
@@ -1,9 +1,13 @@
+import time
+from contextlib import contextmanager
 from typing import Any, Generator, List, Optional, Self, Tuple
 
-from sqlalchemy import NullPool, QueuePool, and_, create_engine, inspect
+from sqlalchemy import NullPool, QueuePool, and_, create_engine, event, inspect
 from sqlalchemy.orm import Session, as_declarative, declared_attr, scoped_session, sessionmaker
 
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.log import logger
 
 # 根据池类型设置 poolclass 和相关参数
 pool_class = NullPool if settings.DB_POOL_TYPE == "NullPool" else QueuePool
@@ -28,6 +32,58 @@ if pool_class == QueuePool:
 # 创建数据库引擎
 Engine = create_engine(**kwargs)
 
+
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragma(dbapi_connection, _):
+    """
+    新建连接时设置SQLite参数
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        if settings.DB_WAL_ENABLE:
+            # WAL模式下读写互不阻塞，减少database is locked
+            cursor.execute("PRAGMA journal_mode=WAL")
+        if settings.DB_SYNCHRONOUS:
+            synchronous = str(settings.DB_SYNCHRONOUS).upper()
+            # 只允许SQLite支持的取值，避免拼接任意语句
+            if synchronous in ("OFF", "NORMAL", "FULL", "EXTRA"):
+                cursor.execute(f"PRAGMA synchronous={synchronous}")
+            else:
+                logger.warn(f"DB_SYNCHRONOUS 配置无效：{settings.DB_SYNCHRONOUS}，应为 OFF/NORMAL/FULL/EXTRA")
+        if settings.DB_CACHE_SIZE:
+            # 负数表示以KB为单位
+            cursor.execute(f"PRAGMA cache_size=-{int(settings.DB_CACHE_SIZE)}")
+        if settings.DB_MMAP_SIZE:
+            cursor.execute(f"PRAGMA mmap_size={int(settings.DB_MMAP_SIZE) * 1024 * 1024}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    except Exception as err:
+        logger.error(f"设置数据库参数失败：{str(err)}")
+    finally:
+        cursor.close()
+
+
+if settings.DB_SLOW_QUERY_MS or metrics.enabled:
+    @event.listens_for(Engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        """
+        记录SQL开始执行时间
+        """
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        """
+        记录SQL执行耗时，超过阈值时记录慢查询日志
+        """
+        start_times = conn.info.get("query_start_time")
+        if not start_times:
+            return
+        elapsed = time.perf_counter() - start_times.pop()
+        metrics.observe("mp_db_statement_duration_seconds", "数据库语句执行耗时", elapsed,
+                        operation=statement.split(None, 1)[0].upper() if statement else "")
+        if settings.DB_SLOW_QUERY_MS and elapsed * 1000 >= settings.DB_SLOW_QUERY_MS:
+            logger.warn(f"慢查询 {elapsed * 1000:.1f}ms：{statement} {parameters}")
+
 # 会话工厂
 SessionFactory = sessionmaker(bind=Engine)
 
@@ -49,6 +105,25 @@ def get_db() -> Generator:
             db.close()
 
 
+@contextmanager
+def db_transaction() -> Generator[Session, None, None]:
+    """
+    工作单元，将多次更新操作合并到一个事务中提交，用于批量写入
+    在上下文中将返回的会话作为db参数传入各更新操作，退出时统一提交，异常时整体回滚
+    :return: Session
+    """
+    db = SessionFactory()
+    db.info["unit_of_work"] = True
+    try:
+        yield db
+        db.commit()
+    except Exception as err:
+        db.rollback()
+        raise err
+    finally:
+        db.close()
+
+
 def close_database():
     """
     关闭所有数据库连接
@@ -108,11 +183,16 @@ def db_update(func):
         try:
             # 执行函数
             result = func(*args, **kwargs)
-            # 提交事务
-            db.commit()
+            if db.info.get("unit_of_work"):
+                # 工作单元中只刷新到数据库，由工作单元统一提交
+                db.flush()
+            else:
+                # 提交事务
+                db.commit()
         except Exception as err:
-            # 回滚事务
-            db.rollback()
+            # 回滚事务，工作单元中由工作单元统一回滚
+            if not db.info.get("unit_of_work"):
+                db.rollback()
             raise err
         finally:
             # 关闭数据库会话
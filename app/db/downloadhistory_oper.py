@@ -1,6 +1,6 @@
-from typing import List
+from typing import List, Dict
 
-from app.db import DbOper
+from app.db import DbOper, db_transaction
 from app.db.models.downloadhistory import DownloadHistory, DownloadFiles
 
 
@@ -23,6 +23,20 @@ class DownloadHistoryOper(DbOper):
         """
         return DownloadHistory.get_by_hash(self._db, download_hash)
 
+    def get_by_hashes(self, download_hashes: List[str]) -> Dict[str, DownloadHistory]:
+        """
+        按Hash批量查询下载记录，每个Hash只返回第一条记录
+        :param download_hashes: Hash列表
+        :return: Hash -> 下载记录
+        """
+        result: Dict[str, DownloadHistory] = {}
+        download_hashes = list(dict.fromkeys(h for h in download_hashes if h))
+        # 分批查询，避免超出SQLite参数数量限制
+        for i in range(0, len(download_hashes), 500):
+            for history in DownloadHistory.get_by_hashes(self._db, download_hashes[i:i + 500]) or []:
+                result.setdefault(history.download_hash, history)
+        return result
+
     def get_by_mediaid(self, tmdbid: int, doubanid: str) -> List[DownloadHistory]:
         """
         按媒体ID查询下载记录
@@ -41,9 +55,12 @@ class DownloadHistoryOper(DbOper):
         """
         新增下载历史文件
         """
-        for file_item in file_items:
-            downloadfile = DownloadFiles(**file_item)
-            downloadfile.create(self._db)
+        if not file_items:
+            return
+        # 所有文件记录在同一事务中提交
+        with db_transaction() as db:
+            for file_item in file_items:
+                DownloadFiles(**file_item).create(db)
 
     def truncate_files(self):
         """
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from sqlalchemy.orm import Session
 
@@ -26,6 +26,30 @@ class MediaServerOper(DbOper):
             return True
         return False
 
+    def add_many(self, items: List[dict]) -> int:
+        """
+        批量新增媒体服务器数据，已存在的条目跳过
+        :param items: 媒体服务器数据列表
+        :return: 新增数量
+        """
+        new_items = {}
+        for item in items:
+            if not item.get("item_id"):
+                continue
+            # MediaServerItem中没有的属性剔除
+            new_items.setdefault(item.get("item_id"),
+                                 {k: v for k, v in item.items() if hasattr(MediaServerItem, k)})
+        if not new_items:
+            return 0
+        # 分批查询已存在的条目，避免超出SQLite参数数量限制
+        item_ids = list(new_items.keys())
+        for i in range(0, len(item_ids), 500):
+            for item_id in MediaServerItem.list_itemids(self._db, item_ids[i:i + 500]) or []:
+                new_items.pop(item_id, None)
+        if new_items:
+            MediaServerItem.add_many(self._db, list(new_items.values()))
+        return len(new_items)
+
     def empty(self, server: Optional[str] = None):
         """
         清空媒体服务器数据
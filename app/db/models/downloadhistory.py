@@ -1,6 +1,7 @@
 import time
+from typing import List
 
-from sqlalchemy import Column, Integer, String, Sequence, JSON
+from sqlalchemy import Column, Integer, String, Sequence, JSON, Index
 from sqlalchemy.orm import Session
 
 from app.db import db_query, db_update, Base
@@ -50,11 +51,25 @@ class DownloadHistory(Base):
     # 自定义媒体类别
     media_category = Column(String)
 
+    __table_args__ = (
+        # 按TMDBID、季、集查询
+        Index('ix_downloadhistory_tmdbid_seasons_episodes', 'tmdbid', 'seasons', 'episodes'),
+        # 按类型、标题、年份、季查询
+        Index('ix_downloadhistory_type_title_year_seasons', 'type', 'title', 'year', 'seasons'),
+    )
+
     @staticmethod
     @db_query
     def get_by_hash(db: Session, download_hash: str):
         return db.query(DownloadHistory).filter(DownloadHistory.download_hash == download_hash).first()
 
+    @staticmethod
+    @db_query
+    def get_by_hashes(db: Session, download_hashes: List[str]):
+        result = db.query(DownloadHistory).filter(DownloadHistory.download_hash.in_(download_hashes)).order_by(
+            DownloadHistory.id).all()
+        return list(result)
+
     @staticmethod
     @db_query
     def get_by_mediaid(db: Session, tmdbid: int, doubanid: str):
@@ -63,8 +78,22 @@ class DownloadHistory(Base):
 
     @staticmethod
     @db_query
-    def list_by_page(db: Session, page: int = 1, count: int = 30):
-        result = db.query(DownloadHistory).offset((page - 1) * count).limit(count).all()
+    def list_by_page(db: Session, page: int = 1, count: int = 30, cursor: int = None):
+        if cursor:
+            # 游标为上一页最后一条记录的ID
+            result = db.query(DownloadHistory).filter(
+                DownloadHistory.id > cursor
+            ).order_by(DownloadHistory.id).limit(count).all()
+        elif page <= 1:
+            result = db.query(DownloadHistory).order_by(DownloadHistory.id).limit(count).all()
+        else:
+            # 先在主键上定位当前页ID再取整行，避免OFFSET逐行读取完整记录
+            page_ids = db.query(DownloadHistory.id).order_by(
+                DownloadHistory.id
+            ).offset((page - 1) * count).limit(count).subquery()
+            result = db.query(DownloadHistory).filter(
+                DownloadHistory.id.in_(page_ids.select())
+            ).order_by(DownloadHistory.id).all()
         return list(result)
 
     @staticmethod
@@ -181,6 +210,11 @@ class DownloadFiles(Base):
     # 状态 0-已删除 1-正常
     state = Column(Integer, nullable=False, default=1)
 
+    __table_args__ = (
+        # 按Hash、状态查询
+        Index('ix_downloadfiles_hash_state', 'download_hash', 'state'),
+    )
+
     @staticmethod
     @db_query
     def get_by_hash(db: Session, download_hash: str, state: int = None):
@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
-from sqlalchemy import Column, Integer, String, Sequence, JSON
+from sqlalchemy import Column, Integer, String, Sequence, JSON, Index
 from sqlalchemy.orm import Session
 
 from app.db import db_query, db_update, Base
@@ -41,11 +41,27 @@ class MediaServerItem(Base):
     # 同步时间
     lst_mod_date = Column(String, default=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
 
+    __table_args__ = (
+        # 按标题、类型、年份查询
+        Index('ix_mediaserveritem_title_type_year', 'title', 'item_type', 'year'),
+    )
+
     @staticmethod
     @db_query
     def get_by_itemid(db: Session, item_id: str):
         return db.query(MediaServerItem).filter(MediaServerItem.item_id == item_id).first()
 
+    @staticmethod
+    @db_query
+    def list_itemids(db: Session, item_ids: List[str]):
+        result = db.query(MediaServerItem.item_id).filter(MediaServerItem.item_id.in_(item_ids)).all()
+        return [r[0] for r in result]
+
+    @staticmethod
+    @db_update
+    def add_many(db: Session, items: List[dict]):
+        db.add_all([MediaServerItem(**item) for item in items])
+
     @staticmethod
     @db_update
     def empty(db: Session, server: Optional[str] = None):
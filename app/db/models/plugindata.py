@@ -24,6 +24,13 @@ class PluginData(Base):
     def get_plugin_data_by_key(db: Session, plugin_id: str, key: str):
         return db.query(PluginData).filter(PluginData.plugin_id == plugin_id, PluginData.key == key).first()
 
+    @staticmethod
+    @db_update
+    def set_plugin_data_by_key(db: Session, plugin_id: str, key: str, value):
+        if not db.query(PluginData).filter(PluginData.plugin_id == plugin_id,
+                                           PluginData.key == key).update({"value": value}):
+            db.add(PluginData(plugin_id=plugin_id, key=key, value=value))
+
     @staticmethod
     @db_update
     def del_plugin_data_by_key(db: Session, plugin_id: str, key: str):
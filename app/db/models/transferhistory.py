@@ -1,10 +1,14 @@
 import time
+from typing import List, Optional, Dict
 
-from sqlalchemy import Column, Integer, String, Sequence, Boolean, func, or_, JSON
-from sqlalchemy.orm import Session
+from sqlalchemy import Column, Integer, String, Sequence, Boolean, func, or_, JSON, Index, text, tuple_
+from sqlalchemy.orm import Session, Query
 
 from app.db import db_query, db_update, Base
 
+# 辅助表是否存在，数据库升级后不会变化，只检查一次
+_table_exists: Dict[str, bool] = {}
+
 
 class TransferHistory(Base):
     """
@@ -54,39 +58,96 @@ class TransferHistory(Base):
     # 文件清单，以JSON存储
     files = Column(JSON, default=list)
 
+    __table_args__ = (
+        # 按状态、时间游标分页
+        Index('ix_transferhistory_status_date', 'status', 'date'),
+    )
+
+    @staticmethod
+    def __has_table(db: Session, name: str) -> bool:
+        """
+        检查全文索引、计数等辅助表是否存在
+        """
+        if name not in _table_exists:
+            _table_exists[name] = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": name}
+            ).first() is not None
+        return _table_exists[name]
+
+    @staticmethod
+    def __filter_title(db: Session, query: Query, title: str) -> Query:
+        """
+        按标题、源路径、目标路径搜索，3个字符以上使用全文索引，否则使用LIKE
+        """
+        if len(title) >= 3 and TransferHistory.__has_table(db, "transferhistory_fts"):
+            match = '"' + title.replace('"', '""') + '"'
+            return query.filter(
+                text("transferhistory.id IN (SELECT rowid FROM transferhistory_fts WHERE transferhistory_fts MATCH :match)")
+            ).params(match=match)
+        return query.filter(or_(
+            TransferHistory.title.like(f'%{title}%'),
+            TransferHistory.src.like(f'%{title}%'),
+            TransferHistory.dest.like(f'%{title}%'),
+        ))
+
+    @staticmethod
+    def __paginate(db: Session, query: Query, page: int, count: int, cursor: Optional[str]) -> List["TransferHistory"]:
+        """
+        按时间倒序分页，有游标时从游标（上一页最后一条的 时间|ID）之后开始，否则先在索引上定位当前页ID再取整行
+        """
+        if cursor:
+            date, _, rid = cursor.rpartition("|")
+            rid = int(rid)
+            if date:
+                # 行值比较可直接走(date, id)索引范围扫描，整理记录均有时间，不再包含时间为空的记录
+                query = query.filter(tuple_(TransferHistory.date, TransferHistory.id) < (date, rid))
+            else:
+                query = query.filter(TransferHistory.date.is_(None), TransferHistory.id < rid)
+            return query.order_by(
+                TransferHistory.date.desc(), TransferHistory.id.desc()
+            ).limit(count).all()
+        if page <= 1:
+            return query.order_by(
+                TransferHistory.date.desc(), TransferHistory.id.desc()
+            ).limit(count).all()
+        page_ids = query.with_entities(TransferHistory.id).order_by(
+            TransferHistory.date.desc(), TransferHistory.id.desc()
+        ).offset((page - 1) * count).limit(count).subquery()
+        return db.query(TransferHistory).filter(
+            TransferHistory.id.in_(page_ids.select())
+        ).order_by(
+            TransferHistory.date.desc(), TransferHistory.id.desc()
+        ).all()
+
+    @staticmethod
+    def get_cursor(history: "TransferHistory") -> str:
+        """
+        生成以该记录为结尾的分页游标
+        """
+        return f"{history.date or ''}|{history.id}"
+
     @staticmethod
     @db_query
-    def list_by_title(db: Session, title: str, page: int = 1, count: int = 30, status: bool = None):
+    def list_by_title(db: Session, title: str, page: int = 1, count: int = 30, status: bool = None,
+                      cursor: str = None):
         if status is not None:
-            result = db.query(TransferHistory).filter(
+            query = db.query(TransferHistory).filter(
                 TransferHistory.status == status
-            ).order_by(
-                TransferHistory.date.desc()
-            ).offset((page - 1) * count).limit(count).all()
+            )
         else:
-            result = db.query(TransferHistory).filter(or_(
-                TransferHistory.title.like(f'%{title}%'),
-                TransferHistory.src.like(f'%{title}%'),
-                TransferHistory.dest.like(f'%{title}%'),
-            )).order_by(
-                TransferHistory.date.desc()
-            ).offset((page - 1) * count).limit(count).all()
-        return list(result)
+            query = TransferHistory.__filter_title(db, db.query(TransferHistory), title)
+        return list(TransferHistory.__paginate(db, query, page, count, cursor))
 
     @staticmethod
     @db_query
-    def list_by_page(db: Session, page: int = 1, count: int = 30, status: bool = None):
+    def list_by_page(db: Session, page: int = 1, count: int = 30, status: bool = None, cursor: str = None):
         if status is not None:
-            result = db.query(TransferHistory).filter(
+            query = db.query(TransferHistory).filter(
                 TransferHistory.status == status
-            ).order_by(
-                TransferHistory.date.desc()
-            ).offset((page - 1) * count).limit(count).all()
+            )
         else:
-            result = db.query(TransferHistory).order_by(
-                TransferHistory.date.desc()
-            ).offset((page - 1) * count).limit(count).all()
-        return list(result)
+            query = db.query(TransferHistory)
+        return list(TransferHistory.__paginate(db, query, page, count, cursor))
 
     @staticmethod
     @db_query
@@ -102,6 +163,14 @@ class TransferHistory(Base):
         else:
             return db.query(TransferHistory).filter(TransferHistory.src == src).first()
 
+    @staticmethod
+    @db_query
+    def list_by_srcs(db: Session, srcs: List[str], storage: str = None):
+        query = db.query(TransferHistory.src, TransferHistory.status).filter(TransferHistory.src.in_(srcs))
+        if storage:
+            query = query.filter(TransferHistory.src_storage == storage)
+        return list(query.all())
+
     @staticmethod
     @db_query
     def get_by_dest(db: Session, dest: str):
@@ -129,6 +198,14 @@ class TransferHistory(Base):
     @staticmethod
     @db_query
     def count(db: Session, status: bool = None):
+        if TransferHistory.__has_table(db, "transferhistory_count"):
+            # 使用触发器维护的计数
+            if status is not None:
+                total = db.execute(text("SELECT total FROM transferhistory_count WHERE status = :status"),
+                                   {"status": int(status)}).scalar()
+            else:
+                total = db.execute(text("SELECT SUM(total) FROM transferhistory_count")).scalar()
+            return total or 0
         if status is not None:
             return db.query(func.count(TransferHistory.id)).filter(TransferHistory.status == status).first()[0]
         else:
@@ -138,13 +215,10 @@ class TransferHistory(Base):
     @db_query
     def count_by_title(db: Session, title: str, status: bool = None):
         if status is not None:
-            return db.query(func.count(TransferHistory.id)).filter(TransferHistory.status == status).first()[0]
+            return TransferHistory.count(db, status=status)
         else:
-            return db.query(func.count(TransferHistory.id)).filter(or_(
-                TransferHistory.title.like(f'%{title}%'),
-                TransferHistory.src.like(f'%{title}%'),
-                TransferHistory.dest.like(f'%{title}%')
-            )).first()[0]
+            query = TransferHistory.__filter_title(db, db.query(func.count(TransferHistory.id)), title)
+            return query.first()[0]
 
     @staticmethod
     @db_query
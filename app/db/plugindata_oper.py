@@ -1,7 +1,190 @@
-from typing import Any
+import json
+import threading
+from typing import Any, Dict, Optional, Tuple
 
-from app.db import DbOper
+from cachetools import LRUCache
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import DbOper, db_transaction
 from app.db.models.plugindata import PluginData
+from app.log import logger
+from app.utils.singleton import Singleton
+
+
+class PluginDataCache(metaclass=Singleton):
+    """
+    插件数据缓存，读取时缓存数据库中的值，保存和删除先写入内存，由后台线程按间隔合并为一个事务写入数据库，
+    避免插件频繁保存数据时与整理等流程争抢数据库写锁；值以JSON文本缓存，每次读取返回新的对象
+    """
+
+    # 缓存中不存在
+    _MISSING = object()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 同一时间只有一个线程写入数据库
+        self._flush_lock = threading.Lock()
+        # 待写入的数据：(插件ID, key) -> JSON文本，None表示删除
+        self._pending: Dict[Tuple[str, str], Optional[str]] = {}
+        # 正在写入的数据
+        self._flushing: Dict[Tuple[str, str], Optional[str]] = {}
+        # 与数据库一致的数据，None表示不存在
+        self._cache: LRUCache = LRUCache(maxsize=max(settings.PLUGIN_DATA_CACHE_SIZE, 1))
+        # 数据变化版本，避免读取数据库期间数据变化后缓存旧值
+        self._version = 0
+        self._event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def get(self, db: Optional[Session], plugin_id: str, key: str) -> Any:
+        """
+        读取数据，未缓存时从数据库读取
+        """
+        data_key = (plugin_id, key)
+        with self._lock:
+            if data_key in self._pending:
+                text = self._pending[data_key]
+            elif data_key in self._flushing:
+                text = self._flushing[data_key]
+            else:
+                text = self._cache.get(data_key, self._MISSING)
+            version = self._version
+        if text is not self._MISSING:
+            return json.loads(text) if text is not None else None
+        data = PluginData.get_plugin_data_by_key(db, plugin_id, key)
+        value = data.value if data else None
+        with self._lock:
+            if version == self._version:
+                self._cache[data_key] = json.dumps(value, ensure_ascii=False) if data else None
+        return value
+
+    def set(self, plugin_id: str, key: str, value: Any):
+        """
+        保存数据，按间隔合并写入数据库
+        """
+        text = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._pending[(plugin_id, key)] = text
+            self._version += 1
+        self.__schedule()
+
+    def delete(self, plugin_id: str, key: str):
+        """
+        删除数据，按间隔合并写入数据库
+        """
+        with self._lock:
+            self._pending[(plugin_id, key)] = None
+            self._version += 1
+        self.__schedule()
+
+    def clear(self, db: Optional[Session], plugin_id: str = None):
+        """
+        立即删除插件的所有数据，未指定插件时清空所有插件数据
+        """
+        with self._flush_lock:
+            with self._lock:
+                for data_key in [k for k in self._pending if not plugin_id or k[0] == plugin_id]:
+                    self._pending.pop(data_key, None)
+                for data_key in [k for k in self._cache if not plugin_id or k[0] == plugin_id]:
+                    self._cache.pop(data_key, None)
+                self._version += 1
+            if plugin_id:
+                PluginData.del_plugin_data(db, plugin_id)
+            else:
+                PluginData.truncate(db)
+            with self._lock:
+                self._version += 1
+
+    def flush(self):
+        """
+        将待写入的数据在一个事务中写入数据库
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                self._flushing, self._pending = self._pending, {}
+            try:
+                with db_transaction() as db:
+                    for data_key, text in self._flushing.items():
+                        self.__write(db, data_key, text)
+                failed = {}
+            except Exception as err:
+                logger.warn(f"批量写入插件数据失败，改为逐条写入：{str(err)}")
+                failed = self.__write_each(self._flushing)
+            with self._lock:
+                for data_key, text in self._flushing.items():
+                    if data_key in failed:
+                        # 数据库忙时保留，下次重试，期间的新数据优先
+                        self._pending.setdefault(data_key, text)
+                    elif data_key not in self._pending:
+                        self._cache[data_key] = text
+                self._flushing = {}
+                self._version += 1
+
+    def stop(self):
+        """
+        停止后台写入并写入剩余数据，之后的保存操作立即写入
+        """
+        self._stopped = True
+        self._event.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.flush()
+
+    @staticmethod
+    def __write(db: Session, data_key: Tuple[str, str], text: Optional[str]):
+        """
+        写入一条数据
+        """
+        plugin_id, key = data_key
+        if text is None:
+            PluginData.del_plugin_data_by_key(db, plugin_id, key)
+        else:
+            PluginData.set_plugin_data_by_key(db, plugin_id, key, json.loads(text))
+
+    def __write_each(self, pending: Dict[Tuple[str, str], Optional[str]]) -> Dict[Tuple[str, str], Optional[str]]:
+        """
+        逐条写入，无法写入的数据记录错误后丢弃
+        :return: 因数据库忙需要重试的数据
+        """
+        failed = {}
+        for data_key, text in pending.items():
+            try:
+                with db_transaction() as db:
+                    self.__write(db, data_key, text)
+            except OperationalError as err:
+                logger.warn(f"插件 {data_key[0]} 数据 {data_key[1]} 写入失败，稍后重试：{str(err)}")
+                failed[data_key] = text
+            except Exception as err:
+                logger.error(f"插件 {data_key[0]} 数据 {data_key[1]} 写入失败：{str(err)}")
+        return failed
+
+    def __schedule(self):
+        """
+        启动后台写入线程，未设置写入间隔或已停止时立即写入
+        """
+        if self._stopped or settings.PLUGIN_DATA_FLUSH_INTERVAL <= 0:
+            self.flush()
+            return
+        if not self._thread:
+            with self._lock:
+                if not self._thread:
+                    self._thread = threading.Thread(target=self.__run, name="plugindata-flush", daemon=True)
+                    self._thread.start()
+
+    def __run(self):
+        """
+        按间隔写入数据库
+        """
+        while not self._event.wait(settings.PLUGIN_DATA_FLUSH_INTERVAL / 1000):
+            try:
+                self.flush()
+            except Exception as err:
+                logger.error(f"插件数据写入数据库失败：{str(err)}")
 
 
 class PluginDataOper(DbOper):
@@ -16,13 +199,7 @@ class PluginDataOper(DbOper):
         :param key: 数据key
         :param value: 数据值
         """
-        plugin = PluginData.get_plugin_data_by_key(self._db, plugin_id, key)
-        if plugin:
-            plugin.update(self._db, {
-                "value": value
-            })
-        else:
-            PluginData(plugin_id=plugin_id, key=key, value=value).create(self._db)
+        PluginDataCache().set(plugin_id, key, value)
 
     def get_data(self, plugin_id: str, key: str = None) -> Any:
         """
@@ -31,11 +208,9 @@ class PluginDataOper(DbOper):
         :param key: 数据key
         """
         if key:
-            data = PluginData.get_plugin_data_by_key(self._db, plugin_id, key)
-            if not data:
-                return None
-            return data.value
+            return PluginDataCache().get(self._db, plugin_id, key)
         else:
+            PluginDataCache().flush()
             return PluginData.get_plugin_data(self._db, plugin_id)
 
     def del_data(self, plugin_id: str, key: str = None) -> Any:
@@ -45,19 +220,20 @@ class PluginDataOper(DbOper):
         :param key: 数据key
         """
         if key:
-            PluginData.del_plugin_data_by_key(self._db, plugin_id, key)
+            PluginDataCache().delete(plugin_id, key)
         else:
-            PluginData.del_plugin_data(self._db, plugin_id)
+            PluginDataCache().clear(self._db, plugin_id)
 
     def truncate(self):
         """
         清空插件数据
         """
-        PluginData.truncate(self._db)
+        PluginDataCache().clear(self._db)
 
     def get_data_all(self, plugin_id: str) -> Any:
         """
         获取插件所有数据
         :param plugin_id: 插件id
         """
+        PluginDataCache().flush()
         return PluginData.get_plugin_data_by_plugin_id(self._db, plugin_id)
@@ -1,5 +1,5 @@
 import time
-from typing import Any, List
+from typing import Any, List, Set
 
 from app.core.context import MediaInfo
 from app.core.meta import MetaBase
@@ -35,6 +35,24 @@ class TransferHistoryOper(DbOper):
         """
         return TransferHistory.get_by_src(self._db, src, storage)
 
+    def exists_src_many(self, srcs: List[str], storage: str = None, success: bool = False) -> Set[str]:
+        """
+        按源批量查询已存在转移记录的路径
+        :param srcs: 源路径列表
+        :param storage: 存储类型
+        :param success: 是否只返回整理成功的路径
+        :return: 存在转移记录的源路径集合
+        """
+        result = set()
+        srcs = list(dict.fromkeys(src for src in srcs if src))
+        # 分批查询，避免超出SQLite参数数量限制
+        for i in range(0, len(srcs), 500):
+            for src, status in TransferHistory.list_by_srcs(self._db, srcs[i:i + 500], storage) or []:
+                if success and not status:
+                    continue
+                result.add(src)
+        return result
+
     def get_by_dest(self, dest: str) -> TransferHistory:
         """
         按转移路径查询转移记录
@@ -1,8 +1,264 @@
-from typing import Callable, Any
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+from urllib.parse import urlparse
 
-from playwright.sync_api import sync_playwright, Page
-from cf_clearance import sync_cf_retry, sync_stealth
+from app.core.config import settings
 from app.log import logger
+from app.utils.singleton import Singleton
+
+if TYPE_CHECKING:
+    from playwright.sync_api import Page, BrowserContext
+
+
+class _BrowserWorker(threading.Thread):
+    """
+    浏览器工作线程，Playwright同步接口只能在创建它的线程中使用，
+    每个实例独占一个线程和一个浏览器进程，按站点保留浏览器上下文（Cookie及本地存储），
+    站点键为None的任务使用用完即关闭的全新上下文
+    """
+
+    # 空闲检查间隔（秒）
+    _reap_interval = 60
+
+    def __init__(self, browser_type: str, headless: bool):
+        super().__init__(name=f"browser-{browser_type}", daemon=True)
+        self.browser_type = browser_type
+        self.headless = headless
+        self._tasks: queue.Queue = queue.Queue()
+        self._playwright = None
+        self._browser = None
+        # 站点 -> (上下文, 最近使用时间)
+        self._contexts: Dict[tuple, Tuple["BrowserContext", float]] = {}
+        self._last_active = time.time()
+        self._last_reap = time.time()
+        # 排队及执行中的任务数
+        self.pending = 0
+        self.stopped = False
+        self._lock = threading.Lock()
+
+    def submit(self, key: Optional[tuple], func: Callable[["Page"], Any],
+               ua: str = None, proxies: dict = None) -> Optional[Future]:
+        """
+        提交任务，在工作线程中打开页面并执行
+        :return: 任务Future，工作线程已退出时返回None
+        """
+        with self._lock:
+            if self.stopped:
+                return None
+            future = Future()
+            self.pending += 1
+            self._tasks.put((key, func, ua, proxies, future))
+            return future
+
+    def has_context(self, key: tuple) -> bool:
+        return key in self._contexts
+
+    def stop(self):
+        self._tasks.put(None)
+
+    def run(self):
+        try:
+            while True:
+                try:
+                    task = self._tasks.get(timeout=self._reap_interval)
+                except queue.Empty:
+                    if self.__reap():
+                        break
+                    continue
+                if task is None:
+                    break
+                self.__execute(*task)
+                with self._lock:
+                    self.pending -= 1
+                self._last_active = time.time()
+                # 持续有任务时也定期清理不再使用的站点上下文
+                if self._last_active - self._last_reap > self._reap_interval:
+                    self.__reap()
+        finally:
+            with self._lock:
+                self.stopped = True
+            self.__close()
+            # 退出时仍在排队的任务直接失败，避免调用方一直等待
+            while not self._tasks.empty():
+                task = self._tasks.get_nowait()
+                if task and task[-1].set_running_or_notify_cancel():
+                    task[-1].set_exception(RuntimeError("浏览器已关闭"))
+
+    def __launch(self):
+        """
+        启动浏览器
+        """
+        # 浏览器相关库较重，使用时才导入
+        from playwright.sync_api import sync_playwright
+        if not self._playwright:
+            self._playwright = sync_playwright().start()
+        self._browser = self._playwright[self.browser_type].launch(headless=self.headless)
+        logger.info(f"浏览器 {self.browser_type} 已启动")
+
+    def __close(self):
+        """
+        关闭所有上下文和浏览器
+        """
+        for context, _ in self._contexts.values():
+            try:
+                context.close()
+            except Exception as e:
+                logger.debug(f"关闭浏览器上下文失败：{str(e)}")
+        self._contexts.clear()
+        for obj in (self._browser, self._playwright):
+            if not obj:
+                continue
+            try:
+                obj.close() if obj is self._browser else obj.stop()
+            except Exception as e:
+                logger.debug(f"关闭浏览器失败：{str(e)}")
+        self._browser = None
+        self._playwright = None
+
+    def __get_context(self, key: Optional[tuple], ua: str = None, proxies: dict = None) -> "BrowserContext":
+        """
+        获取站点的浏览器上下文，浏览器未启动或已崩溃时重新启动
+        :param key: 站点键，为None时创建不保留的新上下文
+        """
+        if not self._browser or not self._browser.is_connected():
+            if self._browser:
+                logger.warn(f"浏览器 {self.browser_type} 已断开，正在重新启动")
+                self._contexts.clear()
+            self.__launch()
+        if key is None:
+            return self._browser.new_context(user_agent=ua, proxy=proxies)
+        if key in self._contexts:
+            context = self._contexts[key][0]
+        else:
+            context = self._browser.new_context(user_agent=ua, proxy=proxies)
+        self._contexts[key] = (context, time.time())
+        return context
+
+    def __execute(self, key: Optional[tuple], func: Callable[["Page"], Any], ua: str, proxies: dict,
+                  future: Future):
+        """
+        执行任务，调用方已放弃（超时取消）的任务直接跳过，浏览器崩溃时重启后重试一次
+        """
+        if not future.set_running_or_notify_cancel():
+            return
+        for retry in range(2):
+            context, page = None, None
+            try:
+                context = self.__get_context(key, ua=ua, proxies=proxies)
+                page = context.new_page()
+                future.set_result(func(page))
+                return
+            except Exception as e:
+                if retry == 0 and self._browser and not self._browser.is_connected():
+                    continue
+                future.set_exception(e)
+                return
+            finally:
+                # 临时上下文关闭时一并关闭页面
+                closing = context if context and key is None else page
+                if closing:
+                    try:
+                        closing.close()
+                    except Exception as e:
+                        logger.debug(f"关闭页面失败：{str(e)}")
+
+    def __reap(self) -> bool:
+        """
+        关闭长时间未使用的站点上下文，全部空闲超时后关闭浏览器
+        :return: 是否退出工作线程
+        """
+        now = time.time()
+        self._last_reap = now
+        for key, (context, used) in list(self._contexts.items()):
+            if now - used > settings.BROWSER_CONTEXT_TIMEOUT:
+                self._contexts.pop(key, None)
+                try:
+                    context.close()
+                except Exception as e:
+                    logger.debug(f"关闭浏览器上下文失败：{str(e)}")
+        if self._contexts or now - self._last_active <= settings.BROWSER_IDLE_TIMEOUT:
+            return False
+        with self._lock:
+            if self.pending:
+                return False
+            # 在锁内标记退出，之后提交的任务会分配给新的工作线程
+            self.stopped = True
+        logger.info(f"浏览器 {self.browser_type} 空闲超时，已关闭")
+        return True
+
+
+class BrowserPool(metaclass=Singleton):
+    """
+    常驻浏览器池，复用已启动的浏览器和站点上下文，限制同时运行的浏览器数量
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._workers: List[_BrowserWorker] = []
+
+    def submit(self, url: str, func: Callable[["Page"], Any], browser_type: str = "chromium",
+               headless: bool = False, ua: str = None, proxies: dict = None, fresh: bool = False) -> Future:
+        """
+        提交网页任务，同一站点优先分配给已保留其上下文的浏览器
+        :param url: 网页地址，按域名区分站点上下文
+        :param func: 在页面上执行的函数，接收page对象
+        :param browser_type: 浏览器类型
+        :param headless: 是否无头模式
+        :param ua: user-agent
+        :param proxies: 代理
+        :param fresh: 使用全新的上下文且用后关闭，不带入也不保留站点的Cookie，如模拟登录
+        """
+        key = None if fresh else (urlparse(url).netloc, ua, (proxies or {}).get("server"))
+        with self._lock:
+            future = self.__dispatch(key, func, browser_type=browser_type, headless=headless,
+                                     ua=ua, proxies=proxies)
+            if not future:
+                # 选中的工作线程恰好空闲退出，重新分配
+                future = self.__dispatch(key, func, browser_type=browser_type, headless=headless,
+                                         ua=ua, proxies=proxies)
+            return future
+
+    def __dispatch(self, key: Optional[tuple], func: Callable[["Page"], Any], browser_type: str, headless: bool,
+                   ua: str = None, proxies: dict = None) -> Optional[Future]:
+        """
+        选择工作线程并提交任务
+        """
+        self._workers = [w for w in self._workers if not w.stopped]
+        workers = [w for w in self._workers if w.browser_type == browser_type and w.headless == headless]
+        worker = next((w for w in workers if key and w.has_context(key)), None)
+        if not worker:
+            idle = [w for w in workers if not w.pending]
+            if idle:
+                worker = idle[0]
+            elif len(self._workers) < max(settings.BROWSER_POOL_SIZE, 1):
+                worker = _BrowserWorker(browser_type=browser_type, headless=headless)
+                worker.start()
+                self._workers.append(worker)
+            elif workers:
+                worker = min(workers, key=lambda w: w.pending)
+            else:
+                # 浏览器数量已达上限且都不是所需类型，关闭最空闲的一个
+                oldest = min(self._workers, key=lambda w: w.pending)
+                oldest.stop()
+                self._workers.remove(oldest)
+                worker = _BrowserWorker(browser_type=browser_type, headless=headless)
+                worker.start()
+                self._workers.append(worker)
+        return worker.submit(key, func, ua=ua, proxies=proxies)
+
+    def stop(self):
+        """
+        关闭所有浏览器
+        """
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.stop()
+        for worker in workers:
+            worker.join(timeout=10)
 
 
 class PlaywrightHelper:
@@ -10,21 +266,48 @@ class PlaywrightHelper:
         self.browser_type = browser_type
 
     @staticmethod
-    def __pass_cloudflare(url: str, page: Page) -> bool:
+    def __pass_cloudflare(url: str, page: "Page") -> bool:
         """
         尝试跳过cloudfare验证
         """
+        from cf_clearance import sync_cf_retry, sync_stealth
         sync_stealth(page, pure=True)
         page.goto(url)
         return sync_cf_retry(page)
 
+    def __open(self, url: str, func: Callable[["Page"], Any], cookies: str = None, ua: str = None,
+               proxies: dict = None, headless: bool = False, timeout: int = 30, fresh: bool = False) -> Any:
+        """
+        在浏览器池中打开网页并执行操作
+        """
+
+        def __run(page: "Page"):
+            if cookies:
+                page.set_extra_http_headers({"cookie": cookies})
+            if not self.__pass_cloudflare(url, page):
+                logger.warn("cloudflare challenge fail！")
+            page.wait_for_load_state("networkidle", timeout=timeout * 1000)
+            return func(page)
+
+        future = BrowserPool().submit(url, __run, browser_type=self.browser_type,
+                                      headless=headless, ua=ua, proxies=proxies, fresh=fresh)
+        try:
+            # 含排队及浏览器启动时间
+            return future.result(timeout=timeout * 3)
+        except FutureTimeoutError:
+            # 取消仍在排队的任务，工作线程将跳过；已在执行的任务由页面自身的超时结束
+            if not future.cancel():
+                logger.warn(f"网页任务超时，等待浏览器执行结束：{url}")
+            raise
+
     def action(self, url: str,
                callback: Callable,
                cookies: str = None,
                ua: str = None,
                proxies: dict = None,
                headless: bool = False,
-               timeout: int = 30) -> Any:
+               timeout: int = 30,
+               fresh: bool = False) -> Any:
         """
         访问网页，接收Page对象并执行操作
         :param url: 网页地址
@@ -34,24 +317,11 @@ class PlaywrightHelper:
         :param proxies: 代理
         :param headless: 是否无头模式
         :param timeout: 超时时间
+        :param fresh: 使用全新的浏览器上下文，不复用站点已保留的Cookie
         """
         try:
-            with sync_playwright() as playwright:
-                browser = playwright[self.browser_type].launch(headless=headless)
-                context = browser.new_context(user_agent=ua, proxy=proxies)
-                page = context.new_page()
-                if cookies:
-                    page.set_extra_http_headers({"cookie": cookies})
-                try:
-                    if not self.__pass_cloudflare(url, page):
-                        logger.warn("cloudflare challenge fail！")
-                    page.wait_for_load_state("networkidle", timeout=timeout * 1000)
-                    # 回调函数
-                    return callback(page)
-                except Exception as e:
-                    logger.error(f"网页操作失败: {str(e)}")
-                finally:
-                    browser.close()
+            return self.__open(url, callback, cookies=cookies, ua=ua, proxies=proxies,
+                               headless=headless, timeout=timeout, fresh=fresh)
         except Exception as e:
             logger.error(f"网页操作失败: {str(e)}")
         return None
@@ -71,27 +341,12 @@ class PlaywrightHelper:
         :param headless: 是否无头模式
         :param timeout: 超时时间
         """
-        source = ""
         try:
-            with sync_playwright() as playwright:
-                browser = playwright[self.browser_type].launch(headless=headless)
-                context = browser.new_context(user_agent=ua, proxy=proxies)
-                page = context.new_page()
-                if cookies:
-                    page.set_extra_http_headers({"cookie": cookies})
-                try:
-                    if not self.__pass_cloudflare(url, page):
-                        logger.warn("cloudflare challenge fail！")
-                    page.wait_for_load_state("networkidle", timeout=timeout * 1000)
-                    source = page.content()
-                except Exception as e:
-                    logger.error(f"获取网页源码失败: {str(e)}")
-                    source = None
-                finally:
-                    browser.close()
+            return self.__open(url, lambda page: page.content(), cookies=cookies, ua=ua, proxies=proxies,
+                               headless=headless, timeout=timeout)
         except Exception as e:
             logger.error(f"获取网页源码失败: {str(e)}")
-        return source
+        return None
 
 
 # 示例用法
@@ -1,8 +1,7 @@
 import base64
-from typing import Tuple, Optional
+from typing import Tuple, Optional, TYPE_CHECKING
 
 from lxml import etree
-from playwright.sync_api import Page
 
 from app.helper.browser import PlaywrightHelper
 from app.helper.ocr import OcrHelper
@@ -12,6 +11,9 @@ from app.utils.http import RequestUtils
 from app.utils.site import SiteUtils
 from app.utils.string import StringUtils
 
+if TYPE_CHECKING:
+    from playwright.sync_api import Page
+
 
 class CookieHelper:
     # 站点登录界面元素XPATH
@@ -85,7 +87,7 @@ class CookieHelper:
         :return: cookie、ua、message
         """
 
-        def __page_handler(page: Page) -> Tuple[Optional[str], Optional[str], str]:
+        def __page_handler(page: "Page") -> Tuple[Optional[str], Optional[str], str]:
             """
             页面处理
             :return: Cookie和UA
@@ -221,9 +223,11 @@ class CookieHelper:
         if not url or not username or not password:
             return None, None, "参数错误"
 
+        # 模拟登录使用全新的上下文，避免带入上次登录的会话Cookie
         return PlaywrightHelper().action(url=url,
                                          callback=__page_handler,
-                                         proxies=proxies)
+                                         proxies=proxies,
+                                         fresh=True)
 
     @staticmethod
     def __get_captcha_text(cookie: str, ua: str, code_url: str) -> str:
@@ -5,62 +5,252 @@ author: https://github.com/C5H12O5/syno-videoinfo-plugin
 import base64
 import concurrent
 import concurrent.futures
+import ipaddress
 import json
 import socket
 import struct
+import threading
+import time
 import urllib
 import urllib.request
-from typing import Dict, Optional
+from typing import Any, Dict, Optional, Tuple
+
+from cachetools import LRUCache
 
 from app.core.config import settings
+from app.core.metrics import metrics
 from app.log import logger
 
 # 定义一个全局线程池执行器
 _executor = concurrent.futures.ThreadPoolExecutor()
+# 后台刷新缓存使用单独的线程池，刷新中会等待全局线程池中的DoH查询，共用时线程池占满后会死锁
+_refresh_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="dns-refresh")
 
 # 定义默认的DoH配置
 _doh_timeout = 5
-_doh_cache: Dict[str, str] = {}
+# 最后一次解析成功的DoH解析器，优先使用
+_doh_preferred: Optional[str] = None
+# DoH记录TTL的上下限（秒）
+_min_ttl = 30
+_max_ttl = 3600
+# 剩余有效期低于该比例时，后台刷新热点记录
+_refresh_ratio = 0.2
+
+
+class _DnsCacheEntry:
+    """
+    DNS缓存条目，value为None时表示解析失败
+    """
+    __slots__ = ("value", "ttl", "expire", "hits", "refreshing")
+
+    def __init__(self, value: Any, ttl: float):
+        self.value = value
+        self.ttl = ttl
+        self.expire = time.monotonic() + ttl
+        self.hits = 0
+        self.refreshing = False
+
+
+# DNS缓存，DoH域名的键为域名，其它域名的键为getaddrinfo的参数
+_dns_cache: LRUCache = LRUCache(maxsize=settings.DNS_CACHE_SIZE)
+_dns_lock = threading.Lock()
+# 缓存统计
+_dns_stats: Dict[str, float] = {
+    "hits": 0,
+    "misses": 0,
+    "negative_hits": 0,
+    "refreshes": 0,
+    "lookup_time": 0.0,
+}
+
+
+def get_dns_stats() -> Dict[str, Any]:
+    """
+    获取DNS缓存统计信息
+    """
+    with _dns_lock:
+        stats = dict(_dns_stats)
+        stats["size"] = len(_dns_cache)
+    lookup_time = stats.pop("lookup_time")
+    stats["avg_lookup_ms"] = round(lookup_time * 1000 / stats["misses"], 2) if stats["misses"] else 0
+    return stats
+
+
+def clear_dns_cache():
+    """
+    清空DNS缓存
+    """
+    with _dns_lock:
+        _dns_cache.clear()
+
+
+def _is_ip(host: str) -> bool:
+    """
+    判断是否为IP地址
+    """
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+def _cache_get(key: Any) -> Optional[_DnsCacheEntry]:
+    """
+    获取未过期的缓存条目，热点条目即将过期时提交后台刷新
+    """
+    with _dns_lock:
+        entry: _DnsCacheEntry = _dns_cache.get(key)
+        if not entry:
+            return None
+        remaining = entry.expire - time.monotonic()
+        if remaining <= 0:
+            _dns_cache.pop(key, None)
+            return None
+        entry.hits += 1
+        if entry.value is None:
+            _dns_stats["negative_hits"] += 1
+        else:
+            _dns_stats["hits"] += 1
+            if entry.hits > 1 and not entry.refreshing and remaining < entry.ttl * _refresh_ratio:
+                entry.refreshing = True
+                _dns_stats["refreshes"] += 1
+                _refresh_executor.submit(_refresh, key)
+    return entry
+
+
+def _cache_set(key: Any, value: Any, ttl: float):
+    """
+    写入缓存条目
+    """
+    with _dns_lock:
+        _dns_cache[key] = _DnsCacheEntry(value, ttl)
+
+
+def _resolve(key: Any) -> Tuple[Any, float]:
+    """
+    按缓存键解析，返回解析结果及缓存时间，解析失败时结果为None
+    """
+    start = time.perf_counter()
+    try:
+        if isinstance(key, str):
+            # DoH解析
+            result = _doh_resolve(key)
+            if result:
+                return result
+            return None, settings.DNS_NEGATIVE_TTL
+        try:
+            return _orig_getaddrinfo(*key), settings.DNS_CACHE_TTL
+        except socket.gaierror:
+            return None, settings.DNS_NEGATIVE_TTL
+    finally:
+        with _dns_lock:
+            _dns_stats["misses"] += 1
+            _dns_stats["lookup_time"] += time.perf_counter() - start
+
+
+def _refresh(key: Any):
+    """
+    后台刷新缓存条目，刷新失败时保留原记录直到过期
+    """
+    try:
+        value, ttl = _resolve(key)
+        if value is not None:
+            _cache_set(key, value, ttl)
+    except Exception as e:
+        logger.debug("刷新DNS缓存 [%s] 失败: %s", key, e)
+    finally:
+        with _dns_lock:
+            entry = _dns_cache.get(key)
+            if entry:
+                entry.refreshing = False
+
+
+def _doh_resolve(host: str) -> Optional[Tuple[str, float]]:
+    """
+    使用DoH解析主机，优先使用上次成功的解析器，失败后并发查询其余解析器
+    """
+    global _doh_preferred
+    resolvers = [r for r in settings.DOH_RESOLVERS.split(",") if r]
+    if _doh_preferred in resolvers:
+        result = _doh_query(_doh_preferred, host)
+        if result:
+            return result
+        resolvers.remove(_doh_preferred)
+
+    futures = {_executor.submit(_doh_query, resolver, host): resolver for resolver in resolvers}
+    for future in concurrent.futures.as_completed(futures):
+        result = future.result()
+        if result:
+            _doh_preferred = futures[future]
+            return result
+    return None
 
 
 def _patched_getaddrinfo(host, *args, **kwargs):
     """
     socket.getaddrinfo的补丁版本。
     """
-    if host not in settings.DOH_DOMAINS.split(","):
+    if isinstance(host, bytes):
+        host = host.decode("idna")
+    if not host or _is_ip(host) or host == "localhost":
         return _orig_getaddrinfo(host, *args, **kwargs)
 
-    # 检查主机是否已解析
-    if host in _doh_cache:
-        ip = _doh_cache[host]
-        logger.info("已解析 [%s] 为 [%s] (缓存)", host, ip)
-        return _orig_getaddrinfo(ip, *args, **kwargs)
-
-    # 使用DoH解析主机
-    futures = []
-    for resolver in settings.DOH_RESOLVERS.split(","):
-        futures.append(_executor.submit(_doh_query, resolver, host))
+    if settings.DOH_ENABLE and host in settings.DOH_DOMAINS.split(","):
+        # 使用DoH解析主机
+        entry = _cache_get(host)
+        if entry:
+            ip = entry.value
+        else:
+            ip, ttl = _resolve(host)
+            _cache_set(host, ip, ttl)
+            if ip:
+                logger.info("已解析 [%s] 为 [%s]", host, ip)
+        if ip:
+            return _orig_getaddrinfo(ip, *args, **kwargs)
+        # DoH解析失败，使用系统解析
+        return _orig_getaddrinfo(host, *args, **kwargs)
 
-    for future in concurrent.futures.as_completed(futures):
-        ip = future.result()
-        if ip is not None:
-            logger.info("已解析 [%s] 为 [%s]", host, ip)
-            _doh_cache[host] = ip
-            host = ip
-            break
+    if not settings.DNS_CACHE_ENABLE or kwargs:
+        return _orig_getaddrinfo(host, *args, **kwargs)
 
-    return _orig_getaddrinfo(host, *args, **kwargs)
+    # 缓存系统解析结果
+    key = (host, *args)
+    entry = _cache_get(key)
+    if entry:
+        result = entry.value
+    else:
+        result, ttl = _resolve(key)
+        _cache_set(key, result, ttl)
+    if result is None:
+        raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+    return result
 
 
 # 对 socket.getaddrinfo 进行补丁
-if settings.DOH_ENABLE:
+if settings.DOH_ENABLE or settings.DNS_CACHE_ENABLE:
     _orig_getaddrinfo = socket.getaddrinfo
     socket.getaddrinfo = _patched_getaddrinfo
+    metrics.register_cache("dns", lambda: (_dns_stats["hits"] + _dns_stats["negative_hits"], _dns_stats["misses"]))
 
 
-def _doh_query(resolver: str, host: str) -> Optional[str]:
+def _skip_name(data: bytes, offset: int) -> int:
     """
-    使用给定的DoH解析器查询给定主机的IP地址。
+    跳过DNS消息中的域名，返回域名之后的偏移
+    """
+    while True:
+        length = data[offset]
+        if length == 0:
+            return offset + 1
+        if length & 0xC0 == 0xC0:
+            # 压缩指针占2字节
+            return offset + 2
+        offset += length + 1
+
+
+def _doh_query(resolver: str, host: str) -> Optional[Tuple[str, float]]:
+    """
+    使用给定的DoH解析器查询给定主机的IP地址，返回IP地址及记录TTL。
     """
 
     # 构造DNS查询消息（RFC 1035）
@@ -103,13 +293,20 @@ def _doh_query(resolver: str, host: str) -> Optional[str]:
                 return None
             resp_body = response.read()
 
-        # 解析DNS响应消息（RFC 1035）
-        # name（压缩）:2 + type:2 + class:2 + ttl:4 + rdlength:2 = 12字节
-        first_rdata_start = len(header) + len(question) + 12
-        # rdata（A记录）= 4字节
-        first_rdata_end = first_rdata_start + 4
-        # 将rdata转换为IP地址
-        return socket.inet_ntoa(resp_body[first_rdata_start:first_rdata_end])
+        # 解析DNS响应消息（RFC 1035），跳过CNAME等记录，取第一条A记录
+        ancount = struct.unpack("!H", resp_body[6:8])[0]
+        offset = len(header) + len(question)
+        for _ in range(ancount):
+            offset = _skip_name(resp_body, offset)
+            # type:2 + class:2 + ttl:4 + rdlength:2 = 10字节
+            rtype, _, ttl, rdlength = struct.unpack("!HHIH", resp_body[offset:offset + 10])
+            offset += 10
+            if rtype == 1 and rdlength == 4:
+                # 将rdata转换为IP地址
+                ip = socket.inet_ntoa(resp_body[offset:offset + 4])
+                return ip, min(max(ttl, _min_ttl), _max_ttl)
+            offset += rdlength
+        return None
     except Exception as e:
         logger.error("解析器(%s)请求错误: %s", resolver, e)
         return None
@@ -0,0 +1,286 @@
+import json
+import pickle
+import queue
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional, Any, Dict, List, Deque
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.module import ModuleManager
+from app.log import logger
+from app.schemas import Notification
+from app.utils.limit import TokenBucketRateLimiter
+from app.utils.singleton import Singleton
+
+
+class MessageQueueManager(metaclass=Singleton):
+    """
+    消息发送队列，按消息渠道模块分别排队异步发送，避免阻塞业务线程
+    各渠道独立限速，短时间内同类型的通知合并发送，发送失败时退避重试，未发送的消息在入队和出队时持久化
+    """
+    # 未发送消息的持久化文件
+    _queue_file = "__message_queue__"
+    # 合并同类通知的时间窗口（秒）
+    _merge_window = 3
+    # 最大重试次数
+    _max_retries = 3
+    # 渠道模块不可用（如重新加载中）时等待的最长时间（秒）
+    _module_wait = 60
+    # 各渠道的发送速率（条/秒）及突发数量
+    _rate_limits = {
+        "TelegramModule": (1, 20),
+        "WechatModule": (1, 10),
+        "SlackModule": (1, 10),
+    }
+    _default_rate_limit = (2, 10)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = True
+        self._queues: Dict[str, queue.Queue] = {}
+        self._pending: Dict[str, Deque[dict]] = {}
+        # 各渠道正在发送的消息
+        self._inflight: Dict[str, dict] = {}
+        self._save_lock = threading.Lock()
+        self._limiters: Dict[str, TokenBucketRateLimiter] = {}
+        self._threads: Dict[str, threading.Thread] = {}
+        self._stats = {
+            "sent": 0,
+            "failed": 0,
+            "merged": 0,
+            "latency": 0.0
+        }
+        metrics.register_gauge("mp_message_queue_depth", "消息发送队列长度",
+                                lambda: {(("module", k),): v for k, v in self.get_stats()["queues"].items()})
+        self.__load()
+
+    def send(self, method: str, **kwargs):
+        """
+        将消息加入所有实现了该方法的渠道模块的发送队列
+        :param method: 模块方法 post_message/post_medias_message/post_torrents_message
+        :param kwargs: 方法参数
+        """
+        for module in ModuleManager().get_running_modules(method):
+            self.__put({
+                "module_id": module.__class__.__name__,
+                "method": method,
+                "kwargs": kwargs,
+                "time": time.time()
+            })
+
+    def __put(self, job: dict):
+        """
+        加入渠道队列，首次使用时启动该渠道的发送线程
+        """
+        module_id = job.get("module_id")
+        with self._lock:
+            if module_id not in self._queues:
+                self._queues[module_id] = queue.Queue()
+                self._pending[module_id] = deque()
+                rate, capacity = self._rate_limits.get(module_id, self._default_rate_limit)
+                self._limiters[module_id] = TokenBucketRateLimiter(rate=rate, capacity=capacity,
+                                                                   source=module_id, enable_logging=False)
+            self._queues[module_id].put(job)
+            if self._active and module_id not in self._threads:
+                thread = threading.Thread(target=self.__worker, args=(module_id,), daemon=True)
+                self._threads[module_id] = thread
+                thread.start()
+        self.__save()
+
+    @staticmethod
+    def __merge_key(job: dict) -> Optional[tuple]:
+        """
+        可合并的通知键，只合并有消息类型的普通通知，交互消息不合并
+        """
+        if job.get("method") != "post_message":
+            return None
+        message: Notification = job.get("kwargs", {}).get("message")
+        if not message or not message.mtype:
+            return None
+        return (job.get("module_id"), message.mtype, message.channel, message.source,
+                message.userid, json.dumps(message.targets, sort_keys=True, default=str),
+                tuple(job.get("configs") or ()))
+
+    def __merge(self, job: dict, q: queue.Queue, pending: Deque[dict]) -> dict:
+        """
+        等待合并窗口，将窗口内同类通知合并为一条
+        """
+        key = self.__merge_key(job)
+        if not key:
+            return job
+        wait = job.get("time", 0) + self._merge_window - time.time()
+        if wait > 0:
+            time.sleep(wait)
+        candidates = list(pending)
+        pending.clear()
+        while True:
+            try:
+                candidates.append(q.get_nowait())
+            except queue.Empty:
+                break
+        jobs = [job]
+        for candidate in candidates:
+            if self.__merge_key(candidate) == key:
+                jobs.append(candidate)
+            else:
+                pending.append(candidate)
+        if len(jobs) == 1:
+            return job
+        messages: List[Notification] = [j["kwargs"]["message"] for j in jobs]
+        first = messages[0]
+        merged = first.copy(update={
+            "title": f"【{first.mtype.value}】共 {len(messages)} 条消息",
+            "text": "\n\n".join("\n".join(filter(None, [m.title, m.text])) for m in messages),
+        })
+        with self._lock:
+            self._stats["merged"] += len(jobs) - 1
+        return {
+            **job,
+            "kwargs": {**job["kwargs"], "message": merged},
+            "count": len(jobs)
+        }
+
+    def __worker(self, module_id: str):
+        """
+        渠道发送线程
+        """
+        q = self._queues[module_id]
+        pending = self._pending[module_id]
+        limiter = self._limiters[module_id]
+        while self._active:
+            if pending:
+                job = pending.popleft()
+            else:
+                try:
+                    job = q.get(timeout=1)
+                except queue.Empty:
+                    continue
+            self._inflight[module_id] = job
+            job = self.__merge(job, q, pending)
+            self._inflight[module_id] = job
+            module = self.__wait_module(module_id)
+            if not module:
+                if self._active:
+                    logger.error(f"{module_id} 渠道不可用，丢弃 {job.get('count', 1)} 条消息")
+                    with self._lock:
+                        self._stats["failed"] += job.get("count", 1)
+                else:
+                    # 停止中，放回队列等待保存
+                    pending.appendleft(job)
+                self._inflight.pop(module_id, None)
+                continue
+            delivered = False
+            for retry in range(self._max_retries + 1):
+                limiter.acquire()
+                try:
+                    # 重试时只发送到上次失败的配置，已送达的配置不重复发送
+                    results = getattr(module, job["method"])(configs=job.get("configs"), **job["kwargs"]) or {}
+                    delivered = delivered or any(results.values())
+                    for name in [name for name, ret in results.items() if ret is None]:
+                        logger.warn(f"{module_id} 配置 {name} 无法发送消息，不再重试")
+                    failed = [name for name, ret in results.items() if ret is False]
+                    if failed:
+                        # 记录待重试的配置，异常退出后重新加载时也只发送这些配置
+                        job["configs"] = failed
+                        raise Exception(f"配置 {'、'.join(failed)} 未发送成功")
+                    limiter.reset()
+                    break
+                except Exception as err:
+                    if retry >= self._max_retries:
+                        logger.error(f"{module_id} 发送消息失败：{str(err)}\n{traceback.format_exc()}")
+                        break
+                    logger.warn(f"{module_id} 发送消息失败：{str(err)}，{2 ** retry} 秒后重试 ...")
+                    limiter.trigger_limit()
+                    self.__save()
+                    time.sleep(2 ** retry)
+            with self._lock:
+                if delivered:
+                    self._stats["sent"] += job.get("count", 1)
+                    self._stats["latency"] += (time.time() - job["time"]) * job.get("count", 1)
+                else:
+                    self._stats["failed"] += job.get("count", 1)
+            self._inflight.pop(module_id, None)
+            self.__save()
+
+    def __wait_module(self, module_id: str) -> Optional[Any]:
+        """
+        获取渠道模块，模块重新加载期间等待其恢复
+        :return: 渠道模块，超时或停止时返回None
+        """
+        deadline = time.time() + self._module_wait
+        while self._active:
+            module = ModuleManager().get_running_module(module_id)
+            if module:
+                return module
+            if time.time() >= deadline:
+                break
+            time.sleep(1)
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取队列统计信息
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            depths = {module_id: q.qsize() + len(self._pending.get(module_id) or [])
+                      for module_id, q in self._queues.items()}
+        latency = stats.pop("latency")
+        stats["queues"] = depths
+        stats["avg_latency_ms"] = round(latency * 1000 / stats["sent"], 2) if stats["sent"] else 0
+        return stats
+
+    def __load(self):
+        """
+        加载上次未发送的消息
+        """
+        path = settings.TEMP_PATH / self._queue_file
+        if not path.exists():
+            return
+        try:
+            with open(path, 'rb') as f:
+                jobs: List[dict] = pickle.load(f)
+            for job in jobs:
+                self.__put(job)
+            if jobs:
+                logger.info(f"已加载 {len(jobs)} 条未发送的消息")
+        except Exception as err:
+            logger.error(f"加载未发送的消息出错：{str(err)}")
+
+    def __save(self):
+        """
+        将未发送完成的消息（含正在发送的）保存到本地，异常退出后下次启动时重新发送
+        """
+        with self._save_lock:
+            with self._lock:
+                jobs = list(self._inflight.values())
+                for module_id, q in self._queues.items():
+                    jobs.extend(self._pending.get(module_id) or [])
+                    with q.mutex:
+                        jobs.extend(q.queue)
+            path = settings.TEMP_PATH / self._queue_file
+            try:
+                if not jobs:
+                    path.unlink(missing_ok=True)
+                    return
+                tmp_path = path.with_suffix(".tmp")
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(jobs, f)
+                tmp_path.replace(path)
+            except Exception as err:
+                logger.error(f"保存未发送的消息出错：{str(err)}")
+
+    def stop(self):
+        """
+        停止发送线程，未发送的消息保存到本地
+        """
+        self._active = False
+        for thread in self._threads.values():
+            thread.join(timeout=5)
+        self.__save()
+        depth = sum(self.get_stats()["queues"].values())
+        if depth:
+            logger.info(f"已保存 {depth} 条未发送的消息")
@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 import importlib
 import pkgutil
+import sys
+import time
 import traceback
 from pathlib import Path
-from typing import List, Any
+from typing import List, Any, Callable, Optional
 
 from app.log import logger
 
@@ -14,11 +16,15 @@ class ModuleHelper:
     """
 
     @classmethod
-    def load(cls, package_path: str, filter_func=lambda name, obj: True) -> List[Any]:
+    def load(cls, package_path: str, filter_func=lambda name, obj: True,
+             package_filter: Optional[Callable[[str], bool]] = None,
+             on_imported: Optional[Callable[[str, float], None]] = None) -> List[Any]:
         """
         导入模块
         :param package_path: 父包名
         :param filter_func: 子模块过滤函数，入参为模块名和模块对象，返回True则导入，否则不导入
+        :param package_filter: 包过滤函数，入参为包名，返回False则不导入该包
+        :param on_imported: 包导入完成回调，入参为包名和导入耗时（秒）
         :return: 导入的模块对象列表
         """
 
@@ -28,9 +34,17 @@ class ModuleHelper:
             try:
                 if package_name.startswith('_'):
                     continue
+                if package_filter and not package_filter(package_name):
+                    continue
                 full_package_name = f'{package_path}.{package_name}'
+                start = time.perf_counter()
+                # 首次导入时无需重复执行reload
+                loaded = full_package_name in sys.modules
                 module = importlib.import_module(full_package_name)
-                importlib.reload(module)
+                if loaded:
+                    importlib.reload(module)
+                if on_imported:
+                    on_imported(package_name, time.perf_counter() - start)
                 for name, obj in module.__dict__.items():
                     if name.startswith('_'):
                         continue
@@ -0,0 +1,180 @@
+import os
+import secrets
+import socket
+import subprocess
+import threading
+import time
+from typing import Optional
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from app.log import logger
+from app.utils.http import RequestUtils
+from app.utils.singleton import Singleton
+from app.utils.system import SystemUtils
+
+
+class RcloneHelper(metaclass=Singleton):
+    """
+    rclone远程控制服务，维护一个常驻的rclone rcd进程并通过本地HTTP接口调用，
+    避免每次操作都启动新进程、重新读取配置和认证远程存储
+    """
+
+    # 启动等待时间（秒）
+    _start_timeout = 10
+    # 异步任务轮询间隔（秒）
+    _poll_interval = 0.2
+    # 同步调用超时时间（秒）
+    _timeout = 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+        self._url: Optional[str] = None
+        self._session: Optional[Session] = None
+
+    @staticmethod
+    def __get_hidden_shell():
+        if SystemUtils.is_windows():
+            st = subprocess.STARTUPINFO()
+            st.dwFlags = subprocess.STARTF_USESHOWWINDOW
+            st.wShowWindow = subprocess.SW_HIDE
+            return st
+        else:
+            return None
+
+    @staticmethod
+    def __free_port() -> int:
+        """
+        获取本地空闲端口
+        """
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+    def __is_running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def __start(self) -> bool:
+        """
+        启动rclone rcd进程，使用随机端口和随机口令，仅监听本地地址，口令通过环境变量传递以免出现在进程列表中
+        """
+        with self._lock:
+            if self.__is_running():
+                return True
+            port = self.__free_port()
+            user, password = "mp", secrets.token_urlsafe(16)
+            try:
+                self._process = subprocess.Popen(
+                    [
+                        'rclone', 'rcd',
+                        f'--rc-addr=127.0.0.1:{port}'
+                    ],
+                    env={**os.environ, "RCLONE_RC_USER": user, "RCLONE_RC_PASS": password},
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    startupinfo=self.__get_hidden_shell()
+                )
+            except Exception as err:
+                logger.error(f"rclone rcd启动失败：{err}")
+                self._process = None
+                return False
+            session = Session()
+            session.auth = (user, password)
+            session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=16))
+            self._session = session
+            self._url = f"http://127.0.0.1:{port}"
+            # 等待接口可用
+            deadline = time.time() + self._start_timeout
+            while time.time() < deadline:
+                if self._process.poll() is not None:
+                    break
+                res = RequestUtils(session=self._session, content_type="application/json",
+                                   timeout=1).post_res(f"{self._url}/rc/noop", json={})
+                if res is not None and res.status_code == 200:
+                    logger.info(f"rclone rcd已启动，端口：{port}")
+                    return True
+                time.sleep(0.1)
+            logger.error("rclone rcd启动超时")
+            self.__terminate()
+            return False
+
+    def __terminate(self):
+        """
+        结束rclone rcd进程
+        """
+        if self._process:
+            try:
+                self._process.terminate()
+                self._process.wait(timeout=5)
+            except Exception as err:
+                logger.debug(f"结束rclone rcd进程失败：{err}")
+                self._process.kill()
+        self._process = None
+        if self._session:
+            self._session.close()
+        self._session = None
+        self._url = None
+
+    def stop(self):
+        """
+        停止服务，配置变更后下次调用时会重新启动并读取新配置
+        """
+        with self._lock:
+            if self.__is_running():
+                RequestUtils(session=self._session, content_type="application/json",
+                             timeout=2).post_res(f"{self._url}/core/quit", json={})
+            self.__terminate()
+
+    def call(self, command: str, timeout: int = None, **params) -> Optional[dict]:
+        """
+        调用rc接口
+        :param command: 接口名称，如 operations/list
+        :param timeout: 超时时间（秒）
+        :param params: 接口参数
+        :return: 接口返回的数据，失败时返回None
+        """
+        if not self.__is_running() and not self.__start():
+            return None
+        res = RequestUtils(session=self._session, content_type="application/json",
+                           timeout=timeout or self._timeout).post_res(f"{self._url}/{command}", json=params)
+        if res is None:
+            logger.error(f"rclone {command} 调用失败：无法连接rcd")
+            return None
+        try:
+            data = res.json()
+        except ValueError:
+            data = {}
+        if res.status_code != 200:
+            logger.error(f"rclone {command} 调用失败：{data.get('error') or res.status_code}")
+            return None
+        return data
+
+    def call_async(self, command: str, timeout: int = None, **params) -> Optional[dict]:
+        """
+        以异步任务方式调用rc接口并轮询任务状态，用于耗时较长的复制、移动等操作
+        :param command: 接口名称，如 operations/movefile
+        :param timeout: 最长等待时间（秒），为空时一直等待至任务结束
+        :param params: 接口参数
+        :return: 任务结果，失败时返回None
+        """
+        job = self.call(command, _async=True, **params)
+        if not job or job.get("jobid") is None:
+            return None
+        jobid = job.get("jobid")
+        deadline = time.time() + timeout if timeout else None
+        while True:
+            status = self.call("job/status", jobid=jobid)
+            if not status:
+                return None
+            if status.get("finished"):
+                if not status.get("success"):
+                    logger.error(f"rclone {command} 任务失败：{status.get('error')}")
+                    return None
+                return status.get("output") or {}
+            if deadline and time.time() > deadline:
+                logger.error(f"rclone {command} 任务超时")
+                self.call("job/stop", jobid=jobid)
+                return None
+            time.sleep(self._poll_interval)
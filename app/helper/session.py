@@ -0,0 +1,165 @@
+import hashlib
+import pickle
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Union
+
+from app.core.config import settings
+from app.core.context import MediaInfo
+from app.core.meta import MetaBase
+from app.log import logger
+from app.utils.singleton import Singleton
+
+
+@dataclass
+class UserSession:
+    """
+    用户交互会话，保存消息交互中的候选列表及翻页状态
+    """
+    # 会话类型 Search/ReSearch/Subscribe/ReSubscribe/Torrent
+    type: str = None
+    # 候选列表，媒体信息或上下文
+    items: List[Any] = field(default_factory=list)
+    # 当前页码
+    page: int = 0
+    # 当前元数据
+    meta: Optional[MetaBase] = None
+    # 当前媒体信息
+    media: Optional[MediaInfo] = None
+    # 过期时间
+    expire: float = 0
+
+
+class SessionHelper(metaclass=Singleton):
+    """
+    用户会话管理，会话按用户保存在内存中，变更后延迟写入各自的文件
+    """
+    # 会话有效期（秒）
+    _ttl = 24 * 3600
+    # 延迟写入时间（秒）
+    _flush_delay = 10
+
+    def __init__(self):
+        self._sessions: Dict[str, UserSession] = {}
+        self._dirty: Set[str] = set()
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+
+    @property
+    def session_path(self) -> Path:
+        """
+        会话文件目录
+        """
+        path = settings.TEMP_PATH / "__user_sessions__"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def __get_file(self, key: str) -> Path:
+        """
+        获取用户会话文件
+        """
+        return self.session_path / hashlib.md5(key.encode()).hexdigest()
+
+    def get(self, userid: Union[str, int]) -> Optional[UserSession]:
+        """
+        获取用户会话，内存中不存在时从文件加载
+        """
+        key = str(userid)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self.__load(key)
+                if session:
+                    self._sessions[key] = session
+            if session and session.expire < time.time():
+                self.delete(userid)
+                return None
+            return session
+
+    def set(self, userid: Union[str, int], session: UserSession):
+        """
+        设置用户会话
+        """
+        key = str(userid)
+        with self._lock:
+            session.expire = time.time() + self._ttl
+            self._sessions[key] = session
+            self.__mark_dirty(key)
+
+    def touch(self, userid: Union[str, int]):
+        """
+        用户会话状态变更，如翻页、选择媒体
+        """
+        key = str(userid)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session:
+                session.expire = time.time() + self._ttl
+                self.__mark_dirty(key)
+
+    def delete(self, userid: Union[str, int]):
+        """
+        删除用户会话
+        """
+        key = str(userid)
+        with self._lock:
+            self._sessions.pop(key, None)
+            self.__mark_dirty(key)
+
+    def __mark_dirty(self, key: str):
+        """
+        标记会话待写入，并延迟写入文件
+        """
+        self._dirty.add(key)
+        if not self._timer:
+            self._timer = threading.Timer(self._flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def __load(self, key: str) -> Optional[UserSession]:
+        """
+        从文件加载用户会话
+        """
+        file = self.__get_file(key)
+        if not file.exists():
+            return None
+        try:
+            with open(file, 'rb') as f:
+                return pickle.load(f)
+        except Exception as err:
+            logger.error(f"加载用户 {key} 会话出错：{str(err)}")
+            return None
+
+    def flush(self):
+        """
+        将变更的会话写入文件，过期的会话从内存和文件中删除
+        """
+        with self._lock:
+            self._timer = None
+            now = time.time()
+            for key in [k for k, s in self._sessions.items() if s.expire < now]:
+                self._sessions.pop(key, None)
+                self._dirty.add(key)
+            dirty = {key: self._sessions.get(key) for key in self._dirty}
+            self._dirty.clear()
+        for key, session in dirty.items():
+            file = self.__get_file(key)
+            try:
+                if session is None:
+                    file.unlink(missing_ok=True)
+                    continue
+                with open(file, 'wb') as f:
+                    pickle.dump(session, f, pickle.HIGHEST_PROTOCOL)
+            except Exception as err:
+                logger.error(f"保存用户 {key} 会话出错：{str(err)}")
+
+    def stop(self):
+        """
+        停止延迟写入并立即保存
+        """
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+        self.flush()
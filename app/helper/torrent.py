@@ -1,10 +1,17 @@
 import datetime
+import hashlib
+import json
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import DefaultCookiePolicy
 from pathlib import Path
-from typing import Tuple, Optional, List, Union, Dict
-from urllib.parse import unquote
+from typing import Tuple, Optional, List, Union, Dict, Callable
+from urllib.parse import unquote, urlparse
 
-from requests import Response
+from cachetools import LRUCache
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
 from torrentool.api import Torrent
 
 from app.core.config import settings
@@ -26,47 +33,219 @@ class TorrentHelper(metaclass=Singleton):
 
     # 失败的种子：站点链接
     _invalid_torrents = []
+    # 站点会话：站点域名 -> Session，复用连接池
+    _sessions: Dict[str, Session] = {}
+    # 站点并发控制：站点域名 -> 信号量
+    _semaphores: Dict[str, threading.BoundedSemaphore] = {}
+    # 种子解析缓存：(路径, 修改时间, 大小) -> (目录名, 文件清单)
+    _torrent_info_cache: LRUCache = LRUCache(maxsize=512)
+    # 文件名识别的集数缓存：文件名 -> 集数，识别结果受自定义识别词影响，识别词变化时清空
+    _episodes_cache: LRUCache = LRUCache(maxsize=4096)
+    _episodes_words: Optional[tuple] = None
+    # 会话及缓存锁
+    _lock = threading.Lock()
 
     def __init__(self):
         self.system_config = SystemConfigOper()
         self.site_oper = SiteOper()
 
+    @property
+    def cache_path(self) -> Path:
+        """
+        种子文件缓存目录
+        """
+        return settings.CACHE_PATH / "torrents"
+
+    def __get_session(self, url: str) -> Session:
+        """
+        获取站点的共享会话，会话不保存响应中的Cookie，Cookie仍按每次请求传入
+        """
+        domain = urlparse(url).netloc
+        with self._lock:
+            session = self._sessions.get(domain)
+            if not session:
+                session = Session()
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                adapter = HTTPAdapter(pool_connections=1,
+                                      pool_maxsize=max(settings.TORRENT_DOWNLOAD_THREADS, 1))
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[domain] = session
+            return session
+
+    def __get_semaphore(self, url: str) -> threading.BoundedSemaphore:
+        """
+        获取站点的并发控制信号量
+        """
+        domain = urlparse(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.get(domain)
+            if not semaphore:
+                semaphore = threading.BoundedSemaphore(max(settings.TORRENT_DOWNLOAD_THREADS, 1))
+                self._semaphores[domain] = semaphore
+            return semaphore
+
+    def __get_cache_file(self, key: str) -> Tuple[Path, Path]:
+        """
+        获取下载链接对应的缓存文件：种子内容文件、元数据文件
+        """
+        name = hashlib.md5(key.encode("utf-8")).hexdigest()
+        return self.cache_path / f"{name}.torrent", self.cache_path / f"{name}.json"
+
+    def get_torrent_meta(self, key: str) -> Optional[dict]:
+        """
+        获取缓存的种子元数据
+        :param key: 缓存键，一般为种子的下载链接（enclosure）
+        :return: {file_name, folder_name, files, name, size, infohash} 或 {magnet}
+        """
+        if not key:
+            return None
+        _, meta_file = self.__get_cache_file(key)
+        if not meta_file.exists():
+            return None
+        try:
+            return json.loads(meta_file.read_text(encoding="utf-8"))
+        except Exception as err:
+            logger.debug(f"读取种子缓存失败：{str(err)}")
+            return None
+
+    def get_cache(self, key: str) \
+            -> Optional[Tuple[Optional[Path], Optional[Union[str, bytes]], Optional[str], Optional[list], Optional[str]]]:
+        """
+        从缓存中获取已下载的种子，避免重复下载和解析
+        :param key: 缓存键，一般为种子的下载链接（enclosure）
+        :return: 种子保存路径、种子内容、种子主目录、种子文件清单、错误信息，未命中时返回None
+        """
+        meta = self.get_torrent_meta(key)
+        if not meta:
+            return None
+        if meta.get("magnet"):
+            return None, meta.get("magnet"), "", [], "磁力链接"
+        content_file, _ = self.__get_cache_file(key)
+        if not content_file.exists():
+            return None
+        try:
+            content = content_file.read_bytes()
+            # 种子文件不存在（被清理）或已被同名的其它种子覆盖时，重新写入临时目录
+            file_path = Path(settings.TEMP_PATH) / meta.get("file_name")
+            if not file_path.exists() or file_path.read_bytes() != content:
+                file_path.write_bytes(content)
+            folder_name, file_list = meta.get("folder_name") or "", meta.get("files") or []
+            self.__set_info_cache(file_path, folder_name, file_list)
+            logger.debug(f"命中种子缓存：{key} => {file_path.name}")
+            return file_path, content, folder_name, file_list, ""
+        except Exception as err:
+            logger.debug(f"读取种子缓存失败：{str(err)}")
+            return None
+
+    def __save_cache(self, key: str, file_path: Optional[Path], content: Union[str, bytes],
+                     folder_name: str, file_list: list, torrentinfo: Torrent = None):
+        """
+        保存种子到缓存
+        """
+        if not key or not content:
+            return
+        content_file, meta_file = self.__get_cache_file(key)
+        try:
+            self.cache_path.mkdir(parents=True, exist_ok=True)
+            if isinstance(content, str):
+                meta = {"magnet": content}
+            else:
+                content_file.write_bytes(content)
+                meta = {
+                    "file_name": file_path.name,
+                    "folder_name": folder_name,
+                    "files": file_list,
+                    "name": torrentinfo.name if torrentinfo else None,
+                    "size": torrentinfo.total_size if torrentinfo else None,
+                    "infohash": torrentinfo.info_hash if torrentinfo else None
+                }
+            meta_file.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        except Exception as err:
+            logger.debug(f"保存种子缓存失败：{str(err)}")
+
     def download_torrent(self, url: str,
                          cookie: str = None,
                          ua: str = None,
                          referer: str = None,
-                         proxy: bool = False) \
+                         proxy: bool = False,
+                         cache_key: str = None) \
             -> Tuple[Optional[Path], Optional[Union[str, bytes]], Optional[str], Optional[list], Optional[str]]:
         """
-        把种子下载到本地
+        把种子下载到本地，下载成功的种子按缓存键缓存，重复下载时直接使用缓存
+        :param url: 种子下载链接
+        :param cookie: 站点Cookie
+        :param ua: 站点UA
+        :param referer: Referer
+        :param proxy: 是否使用代理
+        :param cache_key: 缓存键，默认为下载链接
         :return: 种子保存路径、种子内容、种子主目录、种子文件清单、错误信息
         """
         if url.startswith("magnet:"):
             return None, url, "", [], f"磁力链接"
+        cache_key = cache_key or url
+        cache = self.get_cache(cache_key)
+        if cache:
+            return cache
+        with self.__get_semaphore(url):
+            file_path, content, folder_name, file_list, error_msg, torrentinfo = self.__download_torrent(
+                url=url, cookie=cookie, ua=ua, referer=referer, proxy=proxy
+            )
+        if content:
+            self.__save_cache(cache_key, file_path, content, folder_name, file_list, torrentinfo)
+        return file_path, content, folder_name, file_list, error_msg
+
+    def download_torrents(self, tasks: List[dict]) \
+            -> List[Tuple[Optional[Path], Optional[Union[str, bytes]], Optional[str], Optional[list], Optional[str]]]:
+        """
+        并发下载多个种子，每个站点的并发数受 TORRENT_DOWNLOAD_THREADS 限制
+        :param tasks: 下载参数列表，参数同 download_torrent
+        :return: 与 tasks 顺序一致的下载结果列表
+        """
+        if not tasks:
+            return []
+        with ThreadPoolExecutor(max_workers=min(len(tasks), 10)) as executor:
+            futures = [executor.submit(self.download_torrent, **task) for task in tasks]
+            return [future.result() for future in futures]
+
+    def __download_torrent(self, url: str,
+                           cookie: str = None,
+                           ua: str = None,
+                           referer: str = None,
+                           proxy: bool = False) \
+            -> Tuple[Optional[Path], Optional[Union[str, bytes]], Optional[str],
+                     Optional[list], Optional[str], Optional[Torrent]]:
+        """
+        请求站点下载种子
+        :return: 种子保存路径、种子内容、种子主目录、种子文件清单、错误信息、种子解析对象
+        """
+        session = self.__get_session(url)
         # 请求种子文件
         req = RequestUtils(
             ua=ua,
             cookies=cookie,
             referer=referer,
-            proxies=settings.PROXY if proxy else None
+            proxies=settings.PROXY if proxy else None,
+            session=session
         ).get_res(url=url, allow_redirects=False)
         while req and req.status_code in [301, 302]:
             url = req.headers['Location']
             if url and url.startswith("magnet:"):
-                return None, url, "", [], f"获取到磁力链接"
+                return None, url, "", [], f"获取到磁力链接", None
             req = RequestUtils(
                 ua=ua,
                 cookies=cookie,
                 referer=referer,
-                proxies=settings.PROXY if proxy else None
+                proxies=settings.PROXY if proxy else None,
+                session=session
             ).get_res(url=url, allow_redirects=False)
         if req and req.status_code == 200:
             if not req.content:
-                return None, None, "", [], "未下载到种子数据"
+                return None, None, "", [], "未下载到种子数据", None
             # 解析内容格式
             if req.text and str(req.text).startswith("magnet:"):
                 # 磁力链接
-                return None, req.text, "", [], f"获取到磁力链接"
+                return None, req.text, "", [], f"获取到磁力链接", None
             elif req.text and "下载种子文件" in req.text:
                 # 首次下载提示页面
                 skip_flag = False
@@ -87,7 +266,8 @@ class TorrentHelper(metaclass=Singleton):
                                 ua=ua,
                                 cookies=cookie,
                                 referer=referer,
-                                proxies=settings.PROXY if proxy else None
+                                proxies=settings.PROXY if proxy else None,
+                                session=session
                             ).post_res(url=action, data=data)
                             if req and req.status_code == 200:
                                 # 检查是不是种子文件，如果不是抛出异常
@@ -104,11 +284,13 @@ class TorrentHelper(metaclass=Singleton):
                 except Exception as err:
                     logger.warn(f"触发了站点首次种子下载，尝试自动跳过时出现错误：{str(err)}，链接：{url}")
                 if not skip_flag:
-                    return None, None, "", [], "种子数据有误，请确认链接是否正确，如为PT站点则需手工在站点下载一次种子"
+                    return None, None, "", [], "种子数据有误，请确认链接是否正确，如为PT站点则需手工在站点下载一次种子", None
             # 种子内容
             if req.content:
                 # 检查是不是种子文件，如果不是仍然抛出异常
                 try:
+                    # 直接从内存解析种子，避免保存后再从磁盘读取
+                    torrentinfo = Torrent.from_string(req.content)
                     # 读取种子文件名
                     file_name = self.get_url_filename(req, url)
                     # 种子文件路径
@@ -116,23 +298,74 @@ class TorrentHelper(metaclass=Singleton):
                     # 保存到文件
                     file_path.write_bytes(req.content)
                     # 获取种子目录和文件清单
-                    folder_name, file_list = self.get_torrent_info(file_path)
+                    folder_name, file_list = self.__get_torrent_files(torrentinfo)
+                    logger.debug(f"解析种子：{file_path.name} => 目录：{folder_name}，文件清单：{file_list}")
+                    self.__set_info_cache(file_path, folder_name, file_list)
                     # 成功拿到种子数据
-                    return file_path, req.content, folder_name, file_list, ""
+                    return file_path, req.content, folder_name, file_list, "", torrentinfo
                 except Exception as err:
                     logger.error(f"种子文件解析失败：{str(err)}")
                 # 种子数据仍然错误
-                return None, None, "", [], "种子数据有误，请确认链接是否正确"
+                return None, None, "", [], "种子数据有误，请确认链接是否正确", None
             # 返回失败
-            return None, None, "", [], ""
+            return None, None, "", [], "", None
         elif req is None:
-            return None, None, "", [], "无法打开链接"
+            return None, None, "", [], "无法打开链接", None
         elif req.status_code == 429:
-            return None, None, "", [], "触发站点流控，请稍后重试"
+            return None, None, "", [], "触发站点流控，请稍后重试", None
         else:
             # 把错误的种子记下来，避免重复使用
             self.add_invalid(url)
-            return None, None, "", [], f"下载种子出错，状态码：{req.status_code}"
+            return None, None, "", [], f"下载种子出错，状态码：{req.status_code}", None
+
+    @staticmethod
+    def __get_info_key(torrent_path: Path) -> Optional[tuple]:
+        """
+        种子解析缓存键，文件变化时自动失效
+        """
+        try:
+            stat = torrent_path.stat()
+            return str(torrent_path), stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    @staticmethod
+    def __set_info_cache(torrent_path: Path, folder_name: str, file_list: List[str]):
+        """
+        记录种子文件的解析结果
+        """
+        key = TorrentHelper.__get_info_key(torrent_path)
+        if key:
+            with TorrentHelper._lock:
+                TorrentHelper._torrent_info_cache[key] = (folder_name, list(file_list))
+
+    @staticmethod
+    def __get_torrent_files(torrentinfo: Torrent) -> Tuple[str, List[str]]:
+        """
+        从种子解析对象中获取文件夹名和文件清单
+        """
+        # 获取文件清单
+        if (not torrentinfo.files
+                or (len(torrentinfo.files) == 1
+                    and torrentinfo.files[0].name == torrentinfo.name)):
+            # 单文件种子目录名返回空
+            folder_name = ""
+            # 单文件种子
+            file_list = [torrentinfo.name]
+        else:
+            # 目录名
+            folder_name = torrentinfo.name
+            # 文件清单，如果一级目录与种子名相同则去掉
+            file_list = []
+            for fileinfo in torrentinfo.files:
+                file_path = Path(fileinfo.name)
+                # 根路径
+                root_path = file_path.parts[0]
+                if root_path == folder_name:
+                    file_list.append(str(file_path.relative_to(root_path)))
+                else:
+                    file_list.append(fileinfo.name)
+        return folder_name, file_list
 
     @staticmethod
     def get_torrent_info(torrent_path: Path) -> Tuple[str, List[str]]:
@@ -143,30 +376,16 @@ class TorrentHelper(metaclass=Singleton):
         """
         if not torrent_path or not torrent_path.exists():
             return "", []
+        # 已解析过的种子文件直接返回
+        key = TorrentHelper.__get_info_key(torrent_path)
+        cache = TorrentHelper._torrent_info_cache.get(key) if key else None
+        if cache:
+            return cache[0], list(cache[1])
         try:
             torrentinfo = Torrent.from_file(torrent_path)
-            # 获取文件清单
-            if (not torrentinfo.files
-                    or (len(torrentinfo.files) == 1
-                        and torrentinfo.files[0].name == torrentinfo.name)):
-                # 单文件种子目录名返回空
-                folder_name = ""
-                # 单文件种子
-                file_list = [torrentinfo.name]
-            else:
-                # 目录名
-                folder_name = torrentinfo.name
-                # 文件清单，如果一级目录与种子名相同则去掉
-                file_list = []
-                for fileinfo in torrentinfo.files:
-                    file_path = Path(fileinfo.name)
-                    # 根路径
-                    root_path = file_path.parts[0]
-                    if root_path == folder_name:
-                        file_list.append(str(file_path.relative_to(root_path)))
-                    else:
-                        file_list.append(fileinfo.name)
+            folder_name, file_list = TorrentHelper.__get_torrent_files(torrentinfo)
             logger.debug(f"解析种子：{torrent_path.name} => 目录：{folder_name}，文件清单：{file_list}")
+            TorrentHelper.__set_info_cache(torrent_path, folder_name, file_list)
             return folder_name, file_list
         except Exception as err:
             logger.error(f"种子文件解析失败：{str(err)}")
@@ -191,13 +410,33 @@ class TorrentHelper(metaclass=Singleton):
             file_name = str(datetime.datetime.now())
         return file_name
 
+    @staticmethod
+    def __get_sort_fields(context: Context) -> Tuple[str, int, int]:
+        """
+        与排序规则无关的排序字段：标题、季数、集数，只计算一次并缓存在上下文中
+        """
+        fields = context.__dict__.get("_sort_fields")
+        if fields is None:
+            meta = context.meta_info
+            # 无集数的排最前面，集数越多的排越前面
+            fields = (str(context.media_info.title), len(meta.season_list), len(meta.episode_list) or 9999)
+            context._sort_fields = fields
+        return fields
+
     def sort_torrents(self, torrent_list: List[Context]) -> List[Context]:
         """
         对种子对行排序：torrent、site、upload、seeder
+        :param torrent_list: 种子列表
         """
         if not torrent_list:
             return []
 
+        return sorted(torrent_list, key=self.get_sort_key(), reverse=True)
+
+    def get_sort_key(self) -> Callable[[Context], tuple]:
+        """
+        获取种子排序键函数，按当前的下载规则和站点上传量生成，键越大越靠前
+        """
         # 下载规则
         priority_rule: List[str] = self.system_config.get(
             SystemConfigKey.TorrentsPriority) or ["torrent", "upload", "seeder"]
@@ -205,48 +444,28 @@ class TorrentHelper(metaclass=Singleton):
         site_uploads = {
             site.name: site.upload for site in self.site_oper.get_userdata_latest()
         }
+        # 各规则对应的取值
+        rule_values = {
+            # 资源优先级
+            "torrent": lambda _torrent: _torrent.pri_order or 0,
+            # 站点优先级
+            "site": lambda _torrent: 999 - (_torrent.site_order or 0),
+            # 站点上传量
+            "upload": lambda _torrent: site_uploads.get(_torrent.site_name) or 0,
+            # 资源做种数
+            "seeder": lambda _torrent: _torrent.seeders or 0,
+        }
+        getters = [rule_values[rule] for rule in priority_rule if rule in rule_values]
 
-        def get_sort_str(_context):
+        def __sort_key(_context: Context) -> tuple:
             """
-            拼装排序字段
+            按标题、下载规则的顺序、季集拼装排序元组
             """
-            _meta = _context.meta_info
+            _title, _season_count, _episode_count = self.__get_sort_fields(_context)
             _torrent = _context.torrent_info
-            _media = _context.media_info
-            # 标题
-            _title = str(_media.title).ljust(200, ' ')
-            # 站点优先级
-            _site_order = str(999 - (_torrent.site_order or 0)).rjust(3, '0')
-            # 站点上传量
-            _site_upload = str(site_uploads.get(_torrent.site_name) or 0).rjust(30, '0')
-            # 资源优先级
-            _torrent_order = str(_torrent.pri_order or 0).rjust(3, '0')
-            # 资源做种数
-            _torrent_seeders = str(_torrent.seeders or 0).rjust(10, '0')
-            # 季集
-            if not _meta.episode_list:
-                # 无集数的排最前面
-                _season_episode = "%s%s" % (str(len(_meta.season_list)).rjust(3, '0'), "9999")
-            else:
-                # 集数越多的排越前面
-                _season_episode = "%s%s" % (str(len(_meta.season_list)).rjust(3, '0'),
-                                            str(len(_meta.episode_list)).rjust(4, '0'))
-            # 根据下载规则的顺序拼装排序字符串
-            _sort_str = _title
-            for rule in priority_rule:
-                if rule == "torrent":
-                    _sort_str += _torrent_order
-                elif rule == "site":
-                    _sort_str += _site_order
-                elif rule == "upload":
-                    _sort_str += _site_upload
-                elif rule == "seeder":
-                    _sort_str += _torrent_seeders
-            _sort_str += _season_episode
-            return _sort_str
+            return (_title, *[getter(_torrent) for getter in getters], _season_count, _episode_count)
 
-        # 排序
-        return sorted(torrent_list, key=lambda x: get_sort_str(x), reverse=True)
+        return __sort_key
 
     def sort_group_torrents(self, torrent_list: List[Context]) -> List[Context]:
         """
@@ -260,7 +479,7 @@ class TorrentHelper(metaclass=Singleton):
 
         # 控重
         result = []
-        _added = []
+        _added = set()
         # 排序后重新加入数组，按真实名称控重，即只取每个名称的第一个
         for context in torrent_list:
             # 控重的主链是名称、年份、季、集
@@ -272,7 +491,7 @@ class TorrentHelper(metaclass=Singleton):
             else:
                 media_name = media.title_year
             if media_name not in _added:
-                _added.append(media_name)
+                _added.add(media_name)
                 result.append(context)
 
         return result
@@ -282,19 +501,30 @@ class TorrentHelper(metaclass=Singleton):
         """
         从种子的文件清单中获取所有集数
         """
-        episodes = []
+        custom_words = tuple(SystemConfigOper().get(SystemConfigKey.CustomIdentifiers) or [])
+        episodes = set()
         for file in files:
             if not file:
                 continue
             file_path = Path(file)
             if file_path.suffix not in settings.RMT_MEDIAEXT:
                 continue
-            # 只使用文件名识别
-            meta = MetaInfo(file_path.stem)
-            if not meta.begin_episode:
-                continue
-            episodes = list(set(episodes).union(set(meta.episode_list)))
-        return episodes
+            # 同一文件名在多次检查中只识别一次
+            with TorrentHelper._lock:
+                if TorrentHelper._episodes_words != custom_words:
+                    TorrentHelper._episodes_cache.clear()
+                    TorrentHelper._episodes_words = custom_words
+                file_episodes = TorrentHelper._episodes_cache.get(file_path.stem)
+            if file_episodes is None:
+                # 只使用文件名识别
+                meta = MetaInfo(file_path.stem)
+                file_episodes = tuple(meta.episode_list) if meta.begin_episode else ()
+                with TorrentHelper._lock:
+                    # 识别期间识别词已变化的不缓存
+                    if TorrentHelper._episodes_words == custom_words:
+                        TorrentHelper._episodes_cache[file_path.stem] = file_episodes
+            episodes.update(file_episodes)
+        return sorted(episodes)
 
     def is_invalid(self, url: str) -> bool:
         """
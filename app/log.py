@@ -1,8 +1,14 @@
-import inspect
+import atexit
+import gzip
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import queue
+import shutil
+import sys
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from pathlib import Path
-from typing import Dict, Any, Optional
+from types import CodeType
+from typing import Dict, Any, Optional, List, Tuple
 
 import click
 from pydantic import BaseSettings
@@ -77,6 +83,113 @@ class CustomFormatter(logging.Formatter):
         return super().format(record)
 
 
+class BatchStreamHandler(logging.StreamHandler):
+    """
+    终端日志，写入后不立即刷新，由后台线程每批刷新一次
+    """
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+class BatchRotatingFileHandler(RotatingFileHandler):
+    """
+    文件日志，写入后不立即刷新，自行累计文件大小判断是否轮转，轮转后的备份文件使用gzip压缩
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._size = os.path.getsize(self.baseFilename) if os.path.exists(self.baseFilename) else 0
+
+    def emit(self, record):
+        try:
+            msg = self.format(record) + self.terminator
+            size = len(msg.encode(self.encoding or "utf-8", errors="replace"))
+            if self.stream is None:
+                self.stream = self._open()
+            if self.maxBytes > 0 and self._size and self._size + size >= self.maxBytes:
+                self.doRollover()
+                self._size = 0
+                if self.stream is None:
+                    self.stream = self._open()
+            self.stream.write(msg)
+            self._size += size
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def rotation_filename(self, default_name: str) -> str:
+        return f"{default_name}.gz"
+
+    def rotate(self, source: str, dest: str):
+        """
+        压缩当前日志文件为备份文件
+        """
+        if not os.path.exists(source):
+            return
+        with open(source, "rb") as fsrc, gzip.open(dest, "wb") as fdst:
+            shutil.copyfileobj(fsrc, fdst)
+        os.remove(source)
+
+
+class LogQueueListener(QueueListener):
+    """
+    日志后台写入线程，所有日志文件的记录经同一队列汇总，按日志名称分发到对应的终端及文件日志，
+    每批记录写完后统一刷新，调用方只需将记录放入队列
+    """
+
+    # 每批最多处理的记录数
+    _batch_size = 512
+
+    def __init__(self, log_queue: queue.SimpleQueue):
+        super().__init__(log_queue)
+        self._log_handlers: Dict[str, List[logging.Handler]] = {}
+
+    def set_handlers(self, name: str, handlers: List[logging.Handler]):
+        """
+        设置日志名称对应的输出，替换已有的输出
+        """
+        for handler in self._log_handlers.get(name, []):
+            handler.close()
+        self._log_handlers[name] = handlers
+
+    def _monitor(self):
+        while True:
+            # 阻塞等待第一条，之后取出队列中已有的记录作为一批
+            batch = [self.dequeue(True)]
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            flushes = set()
+            stop = False
+            for record in batch:
+                if record is self._sentinel:
+                    stop = True
+                    break
+                for handler in self._log_handlers.get(record.name, []):
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+                        flushes.add(handler)
+            for handler in flushes:
+                handler.flush()
+            if stop:
+                break
+
+    def stop(self):
+        super().stop()
+        for handlers in self._log_handlers.values():
+            for handler in handlers:
+                handler.close()
+
+
 class LoggerManager:
     """
     日志管理
@@ -85,6 +198,46 @@ class LoggerManager:
     _loggers: Dict[str, Any] = {}
     # 默认日志文件名称
     _default_log_file = "moviepilot.log"
+    # 代码对象 -> (文件名称, 插件名称, 是否停止向上查找)
+    _frames: Dict[CodeType, Tuple[str, Optional[str], bool]] = {}
+    # 日志队列及后台写入线程
+    _queue: queue.SimpleQueue = queue.SimpleQueue()
+    _listener: Optional[LogQueueListener] = None
+
+    @staticmethod
+    def __get_frame_info(code: CodeType) -> Tuple[str, Optional[str], bool]:
+        """
+        根据代码所在文件获取文件名称、插件名称及是否停止向上查找，按代码对象缓存
+        """
+        info = LoggerManager._frames.get(code)
+        if info:
+            return info
+        parts = Path(code.co_filename).parts
+        # 文件名称
+        if parts[-1] == "__init__.py":
+            caller_name = parts[-2]
+        else:
+            caller_name = parts[-1]
+        plugin_name = None
+        stop = False
+        if "app" in parts:
+            if "plugins" in parts:
+                # 插件名称
+                plugin_name = parts[parts.index("plugins") + 1]
+                if plugin_name == "__init__.py":
+                    plugin_name = "plugin"
+                stop = True
+            elif "main.py" in parts:
+                # 已经到达程序的入口
+                stop = True
+        elif len(parts) != 1:
+            # 已经超出程序范围
+            stop = True
+        info = (caller_name, plugin_name, stop)
+        if len(LoggerManager._frames) > 4096:
+            LoggerManager._frames.clear()
+        LoggerManager._frames[code] = info
+        return info
 
     @staticmethod
     def __get_caller():
@@ -94,31 +247,41 @@ class LoggerManager:
         """
         # 调用者文件名称
         caller_name = None
-        # 调用者插件名称
-        plugin_name = None
-        for i in inspect.stack()[3:]:
-            filepath = Path(i.filename)
-            parts = filepath.parts
+        try:
+            frame = sys._getframe(3)
+        except ValueError:
+            frame = None
+        while frame:
+            name, plugin_name, stop = LoggerManager.__get_frame_info(frame.f_code)
             if not caller_name:
                 # 设定调用者文件名称
-                if parts[-1] == "__init__.py":
-                    caller_name = parts[-2]
-                else:
-                    caller_name = parts[-1]
-            if "app" in parts:
-                if not plugin_name and "plugins" in parts:
-                    # 设定调用者插件名称
-                    plugin_name = parts[parts.index("plugins") + 1]
-                    if plugin_name == "__init__.py":
-                        plugin_name = "plugin"
-                    break
-                if "main.py" in parts:
-                    # 已经到达程序的入口
-                    break
-            elif len(parts) != 1:
-                # 已经超出程序范围
+                caller_name = name
+            if plugin_name:
+                return caller_name, plugin_name
+            if stop:
                 break
-        return caller_name or "log.py", plugin_name
+            frame = frame.f_back
+        return caller_name or "log.py", None
+
+    @staticmethod
+    def __get_level() -> int:
+        """
+        获取日志级别
+        """
+        if log_settings.DEBUG:
+            return logging.DEBUG
+        return getattr(logging, log_settings.LOG_LEVEL.upper(), logging.INFO)
+
+    @staticmethod
+    def __get_listener() -> LogQueueListener:
+        """
+        获取日志后台写入线程，首次使用时启动，程序退出时写完剩余日志
+        """
+        if not LoggerManager._listener:
+            LoggerManager._listener = LogQueueListener(LoggerManager._queue)
+            LoggerManager._listener.start()
+            atexit.register(LoggerManager._listener.stop)
+        return LoggerManager._listener
 
     @staticmethod
     def __setup_logger(log_file: str):
@@ -131,25 +294,19 @@ class LoggerManager:
 
         # 创建新实例
         _logger = logging.getLogger(log_file_path.stem)
-
-        if log_settings.DEBUG:
-            _logger.setLevel(logging.DEBUG)
-        else:
-            loglevel = getattr(logging, log_settings.LOG_LEVEL.upper(), logging.INFO)
-            _logger.setLevel(loglevel)
+        _logger.setLevel(LoggerManager.__get_level())
 
         # 移除已有的 handler，避免重复添加
         for handler in _logger.handlers:
             _logger.removeHandler(handler)
 
         # 终端日志
-        console_handler = logging.StreamHandler()
+        console_handler = BatchStreamHandler()
         console_formatter = CustomFormatter(log_settings.LOG_CONSOLE_FORMAT)
         console_handler.setFormatter(console_formatter)
-        _logger.addHandler(console_handler)
 
         # 文件日志
-        file_handler = RotatingFileHandler(
+        file_handler = BatchRotatingFileHandler(
             filename=log_file_path,
             mode="a",
             maxBytes=log_settings.LOG_MAX_FILE_SIZE_BYTES,
@@ -158,7 +315,10 @@ class LoggerManager:
         )
         file_formatter = CustomFormatter(log_settings.LOG_FILE_FORMAT)
         file_handler.setFormatter(file_formatter)
-        _logger.addHandler(file_handler)
+
+        # 日志经队列由后台线程写入，不阻塞调用方
+        LoggerManager.__get_listener().set_handlers(_logger.name, [console_handler, file_handler])
+        _logger.addHandler(QueueHandler(LoggerManager._queue))
 
         return _logger
 
@@ -168,6 +328,9 @@ class LoggerManager:
         :param method: 日志方法
         :param msg: 日志信息
         """
+        # 低于日志级别时直接忽略，无需查找调用者
+        if getattr(logging, method.upper(), logging.CRITICAL) < self.__get_level():
+            return
         # 获取调用者文件名和插件名
         caller_name, plugin_name = self.__get_caller()
         # 区分插件日志
@@ -1,5 +1,5 @@
 from abc import abstractmethod, ABCMeta
-from typing import Generic, Tuple, Union, TypeVar, Type, Dict, Optional, Callable
+from typing import Generic, Tuple, Union, TypeVar, Type, Dict, Optional, Callable, List
 
 from app.helper.service import ServiceConfigHelper
 from app.schemas import Notification, MessageChannel, NotificationConf, MediaServerConf, DownloaderConf
@@ -220,6 +220,17 @@ class _MessageBase(ServiceBase[TService, NotificationConf]):
                     return False
         return True
 
+    def get_message_configs(self, message: Notification, configs: List[str] = None) -> List[NotificationConf]:
+        """
+        获取需要发送该消息的配置
+
+        :param message: 要发送的通知消息
+        :param configs: 只发送到指定名称的配置，如重试时只发送到上次失败的配置，为空时发送到所有配置
+        :return: 返回配置列表
+        """
+        return [conf for conf in self.get_configs().values()
+                if (not configs or conf.name in configs) and self.check_message(message, conf.name)]
+
 
 class _DownloaderBase(ServiceBase[TService, DownloaderConf]):
     """
@@ -2,15 +2,23 @@
 import base64
 import hashlib
 import hmac
+import pickle
+import threading
+import time
+from concurrent.futures import Future
 from datetime import datetime
-from functools import lru_cache
 from random import choice
+from typing import Dict, Optional, Tuple
 from urllib import parse
 
 import requests
+from cachetools import TLRUCache
 
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.log import logger
 from app.utils.http import RequestUtils
+from app.utils.limit import TokenBucketRateLimiter
 from app.utils.singleton import Singleton
 
 
@@ -155,9 +163,108 @@ class DoubanApi(metaclass=Singleton):
     _base_url = "https://frodo.douban.com/api/v2"
     _api_url = "https://api.douban.com/v2"
     _session = None
+    # 成功响应的缓存时间（秒）
+    _cache_ttl = 12 * 3600
+    # 成功响应缓存，值为 (过期时间, 响应数据)
+    _cache: TLRUCache = None
+    # 进行中的请求，相同请求合并等待
+    _inflight: Dict[tuple, Future] = {}
+    # 请求限流器，触发rate_limit时自适应降速
+    _limiter: TokenBucketRateLimiter = None
 
     def __init__(self):
         self._session = requests.Session()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._limiter = TokenBucketRateLimiter(rate=1, capacity=5, source="douban_api")
+        self._cache_path = settings.TEMP_PATH / "__douban_api_cache__"
+        self._cache = TLRUCache(maxsize=settings.CACHE_CONF.get('douban'),
+                                ttu=lambda _key, value, _now: value[0],
+                                timer=time.time)
+        self.__load_cache()
+
+    def __load_cache(self):
+        """
+        从文件中加载未过期的缓存
+        """
+        try:
+            if not self._cache_path.exists():
+                return
+            with open(self._cache_path, 'rb') as f:
+                data: dict = pickle.load(f)
+            now = time.time()
+            for key, value in data.items():
+                if value[0] > now:
+                    self._cache[key] = value
+        except Exception as e:
+            logger.error(f"加载豆瓣接口缓存失败: {str(e)}")
+
+    def save_cache(self):
+        """
+        保存缓存到文件
+        """
+        try:
+            with self._lock:
+                data = dict(self._cache.items())
+            with open(self._cache_path, 'wb') as f:
+                pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.error(f"保存豆瓣接口缓存失败: {str(e)}")
+
+    @staticmethod
+    def __is_rate_limited(resp: Optional[requests.Response]) -> bool:
+        """
+        判断是否触发了豆瓣限流
+        """
+        if resp is None:
+            return False
+        return resp.status_code == 429 or (resp.status_code == 400 and "rate_limit" in resp.text)
+
+    def __request(self, method: str, url: str, params: dict) -> dict:
+        """
+        带缓存、限流及相同请求合并的请求，只缓存成功的响应
+        """
+        # 缓存键不包含日期时间戳，避免跨天失效
+        key: Tuple = (method, url, tuple(sorted((k, str(v)) for k, v in params.items() if k != '_ts')))
+        with self._lock:
+            cached = self._cache.get(key)
+            metrics.cache_hit("douban_api", cached is not None)
+            if cached is not None:
+                return cached[1]
+            future = self._inflight.get(key)
+            if future is None:
+                future = Future()
+                self._inflight[key] = future
+                leader = True
+            else:
+                leader = False
+        if not leader:
+            # 等待相同的请求完成
+            return future.result()
+        result = {}
+        try:
+            self._limiter.acquire()
+            if method == "GET":
+                resp = self.__get_res(url, **params)
+            else:
+                resp = self.__post_res(url, **params)
+            if self.__is_rate_limited(resp):
+                self._limiter.trigger_limit()
+                result = resp.json()
+            elif resp is not None and resp.ok:
+                self._limiter.reset()
+                result = resp.json()
+                with self._lock:
+                    self._cache[key] = (time.time() + self._cache_ttl, result)
+            else:
+                result = resp.json() if resp else {}
+        except Exception as e:
+            logger.error(f"豆瓣接口请求失败：{str(e)}")
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_result(result)
+        return result
 
     @classmethod
     def __sign(cls, url: str, ts: int, method='GET') -> str:
@@ -174,8 +281,19 @@ class DoubanApi(metaclass=Singleton):
             ).digest()
         ).decode()
 
-    @lru_cache(maxsize=settings.CACHE_CONF.get('douban'))
     def __invoke(self, url: str, **kwargs) -> dict:
+        """
+        GET请求
+        """
+        return self.__request("GET", url, kwargs)
+
+    def __post(self, url: str, **kwargs) -> dict:
+        """
+        POST请求
+        """
+        return self.__request("POST", url, kwargs)
+
+    def __get_res(self, url: str, **kwargs) -> Optional[requests.Response]:
         """
         GET请求
         """
@@ -195,16 +313,12 @@ class DoubanApi(metaclass=Singleton):
             '_ts': ts,
             '_sig': self.__sign(url=req_url, ts=ts)
         })
-        resp = RequestUtils(
+        return RequestUtils(
             ua=choice(self._user_agents),
             session=self._session
         ).get_res(url=req_url, params=params)
-        if resp is not None and resp.status_code == 400 and "rate_limit" in resp.text:
-            return resp.json()
-        return resp.json() if resp else {}
 
-    @lru_cache(maxsize=settings.CACHE_CONF.get('douban'))
-    def __post(self, url: str, **kwargs) -> dict:
+    def __post_res(self, url: str, **kwargs) -> Optional[requests.Response]:
         """
         POST请求
         esponse = requests.post(
@@ -224,13 +338,10 @@ class DoubanApi(metaclass=Singleton):
             params.update(kwargs)
         if '_ts' in params:
             params.pop('_ts')
-        resp = RequestUtils(
+        return RequestUtils(
             ua=settings.USER_AGENT,
             session=self._session,
         ).post_res(url=req_url, data=params)
-        if resp is not None and resp.status_code == 400 and "rate_limit" in resp.text:
-            return resp.json()
-        return resp.json() if resp else {}
 
     def imdbid(self, imdbid: str,
                ts=datetime.strftime(datetime.now(), '%Y%m%d')):
@@ -514,10 +625,13 @@ class DoubanApi(metaclass=Singleton):
 
     def clear_cache(self):
         """
-        清空LRU缓存
+        清空缓存
         """
-        self.__invoke.cache_clear()
+        with self._lock:
+            self._cache.clear()
+        self._cache_path.unlink(missing_ok=True)
 
     def close(self):
+        self.save_cache()
         if self._session:
             self._session.close()
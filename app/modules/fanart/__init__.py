@@ -3,6 +3,7 @@ from functools import lru_cache
 from typing import Optional, Tuple, Union
 
 from app.core.context import MediaInfo, settings
+from app.core.metrics import metrics
 from app.log import logger
 from app.modules import _ModuleBase
 from app.utils.http import RequestUtils
@@ -312,7 +313,7 @@ class FanartModule(_ModuleBase):
     _tv_url: str = f'https://webservice.fanart.tv/v3/tv/%s?api_key={settings.FANART_API_KEY}'
 
     def init_module(self) -> None:
-        pass
+        metrics.register_cache("fanart", lambda: self.__request_fanart.cache_info()[:2])
 
     def stop(self):
         pass
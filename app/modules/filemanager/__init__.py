@@ -13,6 +13,7 @@ from app.core.metainfo import MetaInfo, MetaInfoPath
 from app.helper.directory import DirectoryHelper
 from app.helper.message import MessageHelper
 from app.helper.module import ModuleHelper
+from app.helper.rclone import RcloneHelper
 from app.log import logger
 from app.modules import _ModuleBase
 from app.modules.filemanager.storages import StorageBase
@@ -59,7 +60,7 @@ class FileManagerModule(_ModuleBase):
         return 4
 
     def stop(self):
-        pass
+        RcloneHelper().stop()
 
     def test(self) -> Tuple[bool, str]:
         """
@@ -191,6 +192,12 @@ class FileManagerModule(_ModuleBase):
                 else:
                     result.extend(_items)
 
+        # 本地存储等支持一次遍历所有文件的存储，无需逐级浏览
+        if recursion and hasattr(storage_oper, "walk"):
+            result = storage_oper.walk(fileitem)
+            if result is not None:
+                return result
+
         # 返回结果
         result = []
         __get_files(fileitem, recursion)
@@ -1,12 +1,18 @@
+import os
 import shutil
+import time
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Callable
 
 from app import schemas
+from app.core.config import settings
 from app.helper.directory import DirectoryHelper
+from app.helper.progress import ProgressHelper
 from app.log import logger
 from app.modules.filemanager.storages import StorageBase
-from app.schemas.types import StorageSchema
+from app.schemas.types import StorageSchema, ProgressKey
+from app.utils.copy import CopyUtils
+from app.utils.string import StringUtils
 from app.utils.system import SystemUtils
 
 
@@ -31,10 +37,13 @@ class LocalStorage(StorageBase):
         """
         return True
 
-    def __get_fileitem(self, path: Path):
+    def __get_fileitem(self, path: Path, stat: os.stat_result = None):
         """
         获取文件项
+        :param path: 文件路径
+        :param stat: 已获取的文件状态，为空时重新获取
         """
+        stat = stat or path.stat()
         return schemas.FileItem(
             storage=self.schema.value,
             type="file",
@@ -42,23 +51,37 @@ class LocalStorage(StorageBase):
             name=path.name,
             basename=path.stem,
             extension=path.suffix[1:],
-            size=path.stat().st_size,
-            modify_time=path.stat().st_mtime,
+            size=stat.st_size,
+            modify_time=stat.st_mtime,
         )
 
-    def __get_diritem(self, path: Path):
+    def __get_diritem(self, path: Path, stat: os.stat_result = None):
         """
         获取目录项
+        :param path: 目录路径
+        :param stat: 已获取的目录状态，为空时重新获取
         """
+        stat = stat or path.stat()
         return schemas.FileItem(
             storage=self.schema.value,
             type="dir",
             path=str(path).replace("\\", "/") + "/",
             name=path.name,
             basename=path.stem,
-            modify_time=path.stat().st_mtime,
+            modify_time=stat.st_mtime,
         )
 
+    @staticmethod
+    def __get_path(path: str) -> str:
+        """
+        转换为本地路径
+        """
+        if SystemUtils.is_windows():
+            return path.lstrip("/")
+        elif not path.startswith("/"):
+            return "/" + path
+        return path
+
     def list(self, fileitem: schemas.FileItem) -> Optional[List[schemas.FileItem]]:
         """
         浏览文件
@@ -81,10 +104,7 @@ class LocalStorage(StorageBase):
             else:
                 path = "/"
         else:
-            if SystemUtils.is_windows():
-                path = path.lstrip("/")
-            elif not path.startswith("/"):
-                path = "/" + path
+            path = self.__get_path(path)
 
         # 遍历目录
         path_obj = Path(path)
@@ -97,13 +117,42 @@ class LocalStorage(StorageBase):
             ret_items.append(self.__get_fileitem(path_obj))
             return ret_items
 
-        # 扁历所有目录
-        for item in SystemUtils.list_sub_directory(path_obj):
-            ret_items.append(self.__get_diritem(item))
+        # 一次扫描得到所有目录和文件，复用扫描时获取的状态信息
+        dirs, files = SystemUtils.list_sub_entries(path_obj)
+        for entry in dirs:
+            try:
+                ret_items.append(self.__get_diritem(Path(entry.path), entry.stat()))
+            except OSError as err:
+                # 扫描后被删除或无权限访问的跳过
+                logger.debug(f"获取目录信息失败：{entry.path} - {str(err)}")
+        for entry in files:
+            try:
+                ret_items.append(self.__get_fileitem(Path(entry.path), entry.stat()))
+            except OSError as err:
+                logger.debug(f"获取文件信息失败：{entry.path} - {str(err)}")
+        return ret_items
 
-        # 遍历所有文件，不含子目录
-        for item in SystemUtils.list_sub_file(path_obj):
-            ret_items.append(self.__get_fileitem(item))
+    def walk(self, fileitem: schemas.FileItem) -> Optional[List[schemas.FileItem]]:
+        """
+        递归浏览目录下的所有文件，代替逐级调用list
+        :return: 文件项列表，根目录等不支持的路径返回None
+        """
+        if not fileitem.path or fileitem.path == "/":
+            return None
+        path_obj = Path(self.__get_path(fileitem.path))
+        if not path_obj.exists():
+            logger.warn(f"目录不存在：{fileitem.path}")
+            return []
+        if path_obj.is_file():
+            return [self.__get_fileitem(path_obj)]
+        ret_items = []
+        for entry in SystemUtils.scan_files(path_obj, exclude_dirs=set(settings.SCAN_EXCLUDE_DIRS),
+                                            workers=settings.LOCAL_SCAN_WORKERS):
+            try:
+                ret_items.append(self.__get_fileitem(Path(entry.path), entry.stat()))
+            except OSError as err:
+                # 扫描后被删除或无权限访问的跳过
+                logger.debug(f"获取文件信息失败：{entry.path} - {str(err)}")
         return ret_items
 
     def create_folder(self, fileitem: schemas.FileItem, name: str) -> Optional[schemas.FileItem]:
@@ -200,12 +249,37 @@ class LocalStorage(StorageBase):
         复制文件
         """
         file_path = Path(fileitem.path)
-        code, message = SystemUtils.copy(file_path, target_file)
+        if settings.TRANSFER_COPY_ENGINE == "kernel":
+            code, message = CopyUtils.copy(file_path, target_file,
+                                           progress_callback=self.__copy_progress(file_path.name))
+        else:
+            code, message = SystemUtils.copy(file_path, target_file)
         if code != 0:
             logger.error(f"复制文件失败：{message}")
             return False
         return True
 
+    @staticmethod
+    def __copy_progress(name: str) -> Callable[[int, int], None]:
+        """
+        复制进度回调，在整理进度中显示当前文件的复制进度，每秒最多更新一次
+        """
+        progress = ProgressHelper()
+        start = time.time()
+        last = [0.0]
+
+        def __callback(copied: int, total: int):
+            now = time.time()
+            if now - last[0] < 1 and copied < total:
+                return
+            last[0] = now
+            speed = copied / max(now - start, 0.001)
+            progress.update(text=f"正在复制 {name}：{StringUtils.str_filesize(copied)} / "
+                                 f"{StringUtils.str_filesize(total)}（{StringUtils.str_filesize(speed)}/s）",
+                            key=ProgressKey.FileTransfer)
+
+        return __callback
+
     def link(self, fileitem: schemas.FileItem, target_file: Path) -> bool:
         """
         硬链接文件
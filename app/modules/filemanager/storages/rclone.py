@@ -1,16 +1,17 @@
 import copy
-import json
-import subprocess
+import threading
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Union
+
+from cachetools import TTLCache
 
 from app import schemas
 from app.core.config import settings
+from app.helper.rclone import RcloneHelper
 from app.log import logger
 from app.modules.filemanager.storages import StorageBase
 from app.schemas.types import StorageSchema
 from app.utils.string import StringUtils
-from app.utils.system import SystemUtils
 
 
 class Rclone(StorageBase):
@@ -27,6 +28,14 @@ class Rclone(StorageBase):
         "copy": "复制"
     }
 
+    # 目录列表缓存，键为目录路径，增删改时清除所在目录
+    _list_cache = TTLCache(maxsize=256, ttl=60)
+    _cache_lock = threading.Lock()
+
+    def __init__(self):
+        super().__init__()
+        self.rclonehelper = RcloneHelper()
+
     def set_config(self, conf: dict):
         """
         设置配置
@@ -40,33 +49,26 @@ class Rclone(StorageBase):
         if not path.parent.exists():
             path.parent.mkdir(parents=True)
         path.write_text(conf.get('content'))
+        # 重启rcd以读取新配置
+        self.rclonehelper.stop()
+        self.__clear_cache()
 
     @staticmethod
-    def __get_hidden_shell():
-        if SystemUtils.is_windows():
-            st = subprocess.STARTUPINFO()
-            st.dwFlags = subprocess.STARTF_USESHOWWINDOW
-            st.wShowWindow = subprocess.SW_HIDE
-            return st
-        else:
-            return None
+    def __get_remote(path: Union[Path, str]) -> str:
+        """
+        转换为rc接口使用的相对路径
+        """
+        return str(path).replace("\\", "/").strip("/")
 
-    def __get_fileitem(self, path: Path):
-        """
-        获取文件项
-        """
-        return schemas.FileItem(
-            storage=self.schema.value,
-            type="file",
-            path=str(path).replace("\\", "/"),
-            name=path.name,
-            basename=path.stem,
-            extension=path.suffix[1:],
-            size=path.stat().st_size,
-            modify_time=path.stat().st_mtime,
-        )
+    @staticmethod
+    def __get_parent(path: Union[Path, str]) -> str:
+        """
+        上级目录路径
+        """
+        parent = Path(str(path).rstrip("/")).parent.as_posix()
+        return parent if parent.endswith("/") else f"{parent}/"
 
-    def __get_rcloneitem(self, item: dict, parent: str = "/") -> schemas.FileItem:
+    def __get_rcloneitem(self, item: dict) -> schemas.FileItem:
         """
         获取rclone文件项
         """
@@ -76,7 +78,7 @@ class Rclone(StorageBase):
             return schemas.FileItem(
                 storage=self.schema.value,
                 type="dir",
-                path=f"{parent}{item.get('Name')}",
+                path=f"/{item.get('Path')}/",
                 name=item.get("Name"),
                 basename=item.get("Name"),
                 modify_time=StringUtils.str_to_timestamp(item.get("ModTime"))
@@ -85,7 +87,7 @@ class Rclone(StorageBase):
             return schemas.FileItem(
                 storage=self.schema.value,
                 type="file",
-                path=f"{parent}{item.get('Name')}",
+                path=f"/{item.get('Path')}",
                 name=item.get("Name"),
                 basename=Path(item.get("Name")).stem,
                 extension=Path(item.get("Name")).suffix[1:],
@@ -93,20 +95,24 @@ class Rclone(StorageBase):
                 modify_time=StringUtils.str_to_timestamp(item.get("ModTime"))
             )
 
+    def __invalidate(self, *paths: Union[Path, str]):
+        """
+        清除路径所在目录及自身的列表缓存
+        """
+        with self._cache_lock:
+            for path in paths:
+                self._list_cache.pop(self.__get_remote(path), None)
+                self._list_cache.pop(self.__get_remote(self.__get_parent(path)), None)
+
+    def __clear_cache(self):
+        with self._cache_lock:
+            self._list_cache.clear()
+
     def check(self) -> bool:
         """
         检查存储是否可用
         """
-        try:
-            retcode = subprocess.run(
-                ['rclone', 'lsf', 'MP:'],
-                startupinfo=self.__get_hidden_shell()
-            ).returncode
-            if retcode == 0:
-                return True
-        except Exception as err:
-            logger.error(f"rclone存储检查失败：{err}")
-        return False
+        return self.rclonehelper.call("operations/list", fs="MP:", remote="") is not None
 
     def list(self, fileitem: schemas.FileItem) -> Optional[List[schemas.FileItem]]:
         """
@@ -114,209 +120,130 @@ class Rclone(StorageBase):
         """
         if fileitem.type == "file":
             return [fileitem]
-        try:
-            ret = subprocess.run(
-                [
-                    'rclone', 'lsjson',
-                    f'MP:{fileitem.path}'
-                ],
-                capture_output=True,
-                startupinfo=self.__get_hidden_shell()
-            )
-            if ret.returncode == 0:
-                items = json.loads(ret.stdout)
-                return [self.__get_rcloneitem(item, parent=fileitem.path) for item in items]
-        except Exception as err:
-            logger.error(f"rclone浏览文件失败：{err}")
-        return []
+        remote = self.__get_remote(fileitem.path)
+        with self._cache_lock:
+            items = self._list_cache.get(remote)
+        if items is None:
+            ret = self.rclonehelper.call("operations/list", fs="MP:", remote=remote)
+            if ret is None:
+                logger.error(f"rclone浏览文件失败：{fileitem.path}")
+                return []
+            items = ret.get("list") or []
+            with self._cache_lock:
+                self._list_cache[remote] = items
+        return [self.__get_rcloneitem(item) for item in items]
 
     def create_folder(self, fileitem: schemas.FileItem, name: str) -> Optional[schemas.FileItem]:
         """
         创建目录
         """
-        try:
-            retcode = subprocess.run(
-                [
-                    'rclone', 'mkdir',
-                    f'MP:{fileitem.path}/{name}'
-                ],
-                startupinfo=self.__get_hidden_shell()
-            ).returncode
-            if retcode == 0:
-                ret_fileitem = copy.deepcopy(fileitem)
-                ret_fileitem.path = f"{fileitem.path}/{name}/"
-                ret_fileitem.name = name
-                return ret_fileitem
-        except Exception as err:
-            logger.error(f"rclone创建目录失败：{err}")
-        return None
+        path = f"{fileitem.path.rstrip('/')}/{name}"
+        if self.rclonehelper.call("operations/mkdir", fs="MP:", remote=self.__get_remote(path)) is None:
+            logger.error(f"rclone创建目录失败：{path}")
+            return None
+        self.__invalidate(path)
+        ret_fileitem = copy.deepcopy(fileitem)
+        ret_fileitem.path = f"{path}/"
+        ret_fileitem.name = name
+        return ret_fileitem
 
     def get_folder(self, path: Path) -> Optional[schemas.FileItem]:
         """
         根据文件路程获取目录，不存在则创建
         """
-
-        def __find_dir(_fileitem: schemas.FileItem, _name: str) -> Optional[schemas.FileItem]:
-            """
-            查找下级目录中匹配名称的目录
-            """
-            for sub_file in self.list(_fileitem):
-                if sub_file.type != "dir":
-                    continue
-                if sub_file.name == _name:
-                    return sub_file
+        fileitem = self.get_item(path)
+        if fileitem:
+            return fileitem if fileitem.type == "dir" else None
+        # mkdir会同时创建各级上级目录
+        if self.rclonehelper.call("operations/mkdir", fs="MP:", remote=self.__get_remote(path)) is None:
+            logger.warn(f"rclone创建目录 {path} 失败！")
             return None
-
-        # 逐级查找和创建目录
-        fileitem = schemas.FileItem(path="/")
-        for part in path.parts:
-            if part == "/":
-                continue
-            dir_file = __find_dir(fileitem, part)
-            if dir_file:
-                fileitem = dir_file
-            else:
-                dir_file = self.create_folder(fileitem, part)
-                if not dir_file:
-                    logger.warn(f"rclone创建目录 {fileitem.path}{part} 失败！")
-                    return None
-                fileitem = dir_file
-        return fileitem
+        self.__invalidate(*[parent for parent in path.parents], path)
+        return self.get_item(path)
 
     def get_item(self, path: Path) -> Optional[schemas.FileItem]:
         """
         获取文件或目录，不存在返回None
         """
-        try:
-            ret = subprocess.run(
-                [
-                    'rclone', 'lsjson',
-                    f'MP:{path}'
-                ],
-                capture_output=True,
-                startupinfo=self.__get_hidden_shell()
-            )
-            if ret.returncode == 0:
-                items = json.loads(ret.stdout)
-                return self.__get_rcloneitem(items[0])
-        except Exception as err:
-            logger.error(f"rclone获取文件失败：{err}")
-        return None
+        remote = self.__get_remote(path)
+        if not remote:
+            return schemas.FileItem(storage=self.schema.value, type="dir", path="/", name="", basename="")
+        ret = self.rclonehelper.call("operations/stat", fs="MP:", remote=remote)
+        if not ret or not ret.get("item"):
+            return None
+        return self.__get_rcloneitem(ret.get("item"))
 
     def delete(self, fileitem: schemas.FileItem) -> bool:
         """
         删除文件
         """
-        try:
-            retcode = subprocess.run(
-                [
-                    'rclone', 'deletefile',
-                    f'MP:{fileitem.path}'
-                ],
-                startupinfo=self.__get_hidden_shell()
-            ).returncode
-            if retcode == 0:
-                return True
-        except Exception as err:
-            logger.error(f"rclone删除文件失败：{err}")
-        return False
+        if self.rclonehelper.call("operations/deletefile", fs="MP:",
+                                  remote=self.__get_remote(fileitem.path)) is None:
+            logger.error(f"rclone删除文件失败：{fileitem.path}")
+            return False
+        self.__invalidate(fileitem.path)
+        return True
 
     def rename(self, fileitem: schemas.FileItem, name: str) -> bool:
         """
-        重命名文件
-        """
-        try:
-            retcode = subprocess.run(
-                [
-                    'rclone', 'moveto',
-                    f'MP:{fileitem.path}',
-                    f'MP:{Path(fileitem.path).parent}/{name}'
-                ],
-                startupinfo=self.__get_hidden_shell()
-            ).returncode
-            if retcode == 0:
-                return True
-        except Exception as err:
-            logger.error(f"rclone重命名文件失败：{err}")
-        return False
+        重命名文件或目录
+        """
+        return self.move(fileitem, Path(self.__get_parent(fileitem.path)) / name)
 
     def download(self, fileitem: schemas.FileItem, path: Path = None) -> Optional[Path]:
         """
         下载文件
         """
         path = (path or settings.TEMP_PATH) / fileitem.name
-        try:
-            retcode = subprocess.run(
-                [
-                    'rclone', 'copyto',
-                    f'MP:{fileitem.path}',
-                    f'{path}'
-                ],
-                startupinfo=self.__get_hidden_shell()
-            ).returncode
-            if retcode == 0:
-                return path
-        except Exception as err:
-            logger.error(f"rclone复制文件失败：{err}")
-        return None
+        if self.rclonehelper.call_async("operations/copyfile",
+                                        srcFs="MP:", srcRemote=self.__get_remote(fileitem.path),
+                                        dstFs=str(path.parent), dstRemote=path.name) is None:
+            logger.error(f"rclone复制文件失败：{fileitem.path}")
+            return None
+        return path
 
     def upload(self, fileitem: schemas.FileItem, path: Path) -> Optional[schemas.FileItem]:
         """
         上传文件
         """
-        try:
-            retcode = subprocess.run(
-                [
-                    'rclone', 'copyto',
-                    str(path),
-                    f'MP:{Path(fileitem.path) / path.name}'
-                ],
-                startupinfo=self.__get_hidden_shell()
-            ).returncode
-            if retcode == 0:
-                return self.__get_fileitem(path)
-        except Exception as err:
-            logger.error(f"rclone上传文件失败：{err}")
-        return None
+        target = f"{fileitem.path.rstrip('/')}/{path.name}"
+        if self.rclonehelper.call_async("operations/copyfile",
+                                        srcFs=str(path.parent), srcRemote=path.name,
+                                        dstFs="MP:", dstRemote=self.__get_remote(target)) is None:
+            logger.error(f"rclone上传文件失败：{path}")
+            return None
+        self.__invalidate(target)
+        return self.get_item(Path(target))
 
     def detail(self, fileitem: schemas.FileItem) -> Optional[schemas.FileItem]:
         """
         获取文件详情
         """
-        try:
-            ret = subprocess.run(
-                [
-                    'rclone', 'lsjson',
-                    f'MP:{fileitem.path}'
-                ],
-                capture_output=True,
-                startupinfo=self.__get_hidden_shell()
-            )
-            if ret.returncode == 0:
-                items = json.loads(ret.stdout)
-                return self.__get_rcloneitem(items[0])
-        except Exception as err:
-            logger.error(f"rclone获取文件详情失败：{err}")
-        return None
+        return self.get_item(Path(fileitem.path))
 
     def move(self, fileitem: schemas.FileItem, target: Path) -> bool:
         """
-        移动文件，target_file格式：rclone:path
-        """
-        try:
-            retcode = subprocess.run(
-                [
-                    'rclone', 'moveto',
-                    f'MP:{fileitem.path}',
-                    f'MP:{target}'
-                ],
-                startupinfo=self.__get_hidden_shell()
-            ).returncode
-            if retcode == 0:
-                return True
-        except Exception as err:
-            logger.error(f"rclone移动文件失败：{err}")
-        return False
+        移动文件或目录，target_file格式：rclone:path
+        """
+        src, dst = self.__get_remote(fileitem.path), self.__get_remote(target)
+        if fileitem.type == "dir":
+            # movefile只能移动文件，目录使用sync/move移动其中的全部内容后删除源目录
+            if self.rclonehelper.call_async("sync/move", srcFs=f"MP:{src}", dstFs=f"MP:{dst}",
+                                            createEmptySrcDirs=True, deleteEmptySrcDirs=True) is None:
+                logger.error(f"rclone移动目录失败：{fileitem.path} -> {target}")
+                return False
+            if self.get_item(Path(fileitem.path)):
+                self.rclonehelper.call("operations/rmdir", fs="MP:", remote=src)
+            # 目录下各级子目录的缓存均已失效
+            self.__clear_cache()
+            return True
+        if self.rclonehelper.call_async("operations/movefile",
+                                        srcFs="MP:", srcRemote=src,
+                                        dstFs="MP:", dstRemote=dst) is None:
+            logger.error(f"rclone移动文件失败：{fileitem.path} -> {target}")
+            return False
+        self.__invalidate(fileitem.path, target)
+        return True
 
     def copy(self, fileitem: schemas.FileItem, target_file: Path) -> bool:
         pass
@@ -331,21 +258,11 @@ class Rclone(StorageBase):
         """
         存储使用情况
         """
-        try:
-            ret = subprocess.run(
-                [
-                    'rclone', 'about',
-                    '/', '--json'
-                ],
-                capture_output=True,
-                startupinfo=self.__get_hidden_shell()
-            )
-            if ret.returncode == 0:
-                items = json.loads(ret.stdout)
-                return schemas.StorageUsage(
-                    total=items.get("total"),
-                    available=items.get("free")
-                )
-        except Exception as err:
-            logger.error(f"rclone获取存储使用情况失败：{err}")
-        return None
+        ret = self.rclonehelper.call("operations/about", fs="MP:")
+        if not ret:
+            logger.error("rclone获取存储使用情况失败")
+            return None
+        return schemas.StorageUsage(
+            total=ret.get("total"),
+            available=ret.get("free")
+        )
@@ -1,8 +1,9 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Union, Optional, Dict, Generator, Tuple
 
-from requests import Response
+from requests import Response, Session
 
 from app import schemas
 from app.core.config import settings
@@ -18,6 +19,10 @@ class Jellyfin:
     _playhost: str = None
     _sync_libraries: List[str] = []
     user: Optional[Union[str, int]] = None
+    # 同步时复用连接的会话
+    _session: Session = None
+    # 同步时每页获取的项目数
+    _page_size: int = 200
 
     def __init__(self, host: str = None, apikey: str = None, play_host: str = None,
                  sync_libraries: list = None, **kwargs):
@@ -31,6 +36,7 @@ class Jellyfin:
         if self._playhost:
             self._playhost = UrlUtils.standardize_base_url(self._playhost)
         self._apikey = apikey
+        self._session = Session()
         self.user = self.get_user(settings.SUPERUSER)
         self.serverid = self.get_server_id()
         self._sync_libraries = sync_libraries or []
@@ -767,6 +773,106 @@ class Jellyfin:
         except Exception as e:
             logger.error(f"连接Users/Items出错：" + str(e))
 
+    def get_library_items(self, parent: Union[str, int]) -> Optional[Generator]:
+        """
+        同步用，并发分页获取媒体库下的所有电影和电视剧，仅返回同步所需字段
+
+        :param parent: 媒体库ID
+        :return: 返回一个生成器对象，按顺序逐页返回媒体服务器中的项目
+        """
+        if not parent or not self._host or not self._apikey:
+            return None
+        url = f"{self._host}Users/{self.user}/Items"
+        params = {
+            "ParentId": parent,
+            "Recursive": "true",
+            "IncludeItemTypes": "Movie,Series",
+            "Fields": "ProviderIds,OriginalTitle,ProductionYear,Path,ParentId",
+            "EnableImages": "false",
+            "EnableUserData": "false",
+            "api_key": self._apikey
+        }
+        return (self.__format_item_info(item) for item in self.__iter_pages(url, params))
+
+    def get_library_episodes(self, parent: Union[str, int]) -> Optional[Dict[str, Dict[int, List[int]]]]:
+        """
+        同步用，一次性分页获取媒体库下所有剧集的季集信息，替代逐个剧集查询
+
+        :param parent: 媒体库ID
+        :return: {剧集ID: {季: [集]}}，获取失败时返回None
+        """
+        if not parent or not self._host or not self._apikey:
+            return None
+        url = f"{self._host}Users/{self.user}/Items"
+        params = {
+            "ParentId": parent,
+            "Recursive": "true",
+            "IncludeItemTypes": "Episode",
+            "IsMissing": "false",
+            "EnableImages": "false",
+            "EnableUserData": "false",
+            "api_key": self._apikey
+        }
+        series_episodes: Dict[str, Dict[int, List[int]]] = {}
+        try:
+            for item in self.__iter_pages(url, params, raise_exception=True):
+                series_id = item.get("SeriesId")
+                season_index = item.get("ParentIndexNumber")
+                episode_index = item.get("IndexNumber")
+                if not series_id or not season_index or not episode_index:
+                    continue
+                series_episodes.setdefault(series_id, {}).setdefault(season_index, []).append(episode_index)
+        except Exception as e:
+            logger.error(f"批量获取剧集信息出错：" + str(e))
+            return None
+        return series_episodes
+
+    def __iter_pages(self, url: str, params: dict, raise_exception: bool = False) -> Generator:
+        """
+        并发分页请求Items接口，按分页顺序逐条返回，同时进行中的分页数不超过并发数
+        """
+        workers = max(settings.MEDIASERVER_SYNC_WORKERS, 1)
+        request = RequestUtils(session=self._session)
+
+        def __get_page(start_index: int) -> List[dict]:
+            res = request.get_res(url, {**params, "StartIndex": start_index, "Limit": self._page_size},
+                                  raise_exception=raise_exception)
+            if not res or res.status_code != 200:
+                if raise_exception:
+                    raise Exception(f"Users/Items 返回异常：{res.status_code if res is not None else '无响应'}")
+                logger.error(f"Users/Items 第 {start_index} 条起的分页获取失败")
+                return []
+            return res.json().get("Items") or []
+
+        # 首页同时获取总数
+        try:
+            res = request.get_res(url, {**params, "StartIndex": 0, "Limit": self._page_size,
+                                        "EnableTotalRecordCount": "true"}, raise_exception=raise_exception)
+            if not res or res.status_code != 200:
+                if raise_exception:
+                    raise Exception(f"Users/Items 返回异常：{res.status_code if res is not None else '无响应'}")
+                return
+            first_page = res.json()
+        except Exception as e:
+            if raise_exception:
+                raise
+            logger.error(f"连接Users/Items出错：" + str(e))
+            return
+        yield from first_page.get("Items") or []
+        total = first_page.get("TotalRecordCount") or 0
+        starts = list(range(self._page_size, total, self._page_size))
+        if not starts:
+            return
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Jellyfin-Items") as executor:
+            futures = [executor.submit(__get_page, start) for start in starts[:workers]]
+            next_index = len(futures)
+            while futures:
+                items = futures.pop(0).result()
+                if next_index < len(starts):
+                    futures.append(executor.submit(__get_page, starts[next_index]))
+                    next_index += 1
+                yield from items
+
     def get_data(self, url: str) -> Optional[Response]:
         """
         自定义URL从媒体服务器获取数据，其中[HOST]、[APIKEY]、[USER]会被替换成实际的值
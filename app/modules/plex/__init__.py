@@ -1,4 +1,4 @@
-from typing import Optional, Tuple, Union, Any, List, Generator
+from typing import Optional, Tuple, Union, Any, List, Generator, Dict
 
 from app import schemas
 from app.core.context import MediaInfo
@@ -198,6 +198,33 @@ class PlexModule(_ModuleBase, _MediaServerBase[Plex]):
             return server.get_items(library_id, start_index, limit)
         return None
 
+    def mediaserver_sync_items(self, server: str, library_id: Union[str, int]) -> Optional[Generator]:
+        """
+        同步用，并发分页获取媒体库的所有项目，仅包含同步所需字段
+
+        :param server: 媒体服务器名称
+        :param library_id: 媒体库ID
+        :return: 返回一个生成器对象，用于逐步获取媒体服务器中的项目
+        """
+        server: Plex = self.get_instance(server)
+        if server:
+            return server.get_library_items(library_id)
+        return None
+
+    def mediaserver_library_episodes(self, server: str,
+                                     library_id: Union[str, int]) -> Optional[Dict[str, Dict[int, List[int]]]]:
+        """
+        批量获取媒体库下所有剧集的季集信息
+
+        :param server: 媒体服务器名称
+        :param library_id: 媒体库ID
+        :return: {剧集ID: {季: [集]}}
+        """
+        server: Plex = self.get_instance(server)
+        if server:
+            return server.get_library_episodes(library_id)
+        return None
+
     def mediaserver_iteminfo(self, server: str, item_id: str) -> Optional[schemas.MediaServerItem]:
         """
         媒体库项目详情
@@ -1,4 +1,5 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Optional, Dict, Tuple, Generator, Any, Union
 from urllib.parse import quote_plus
@@ -9,6 +10,7 @@ from plexapi.server import PlexServer
 from requests import Response, Session
 
 from app import schemas
+from app.core.config import settings
 from app.log import logger
 from app.schemas import MediaType
 from app.utils.http import RequestUtils
@@ -19,6 +21,8 @@ class Plex:
     _plex = None
     _session = None
     _sync_libraries: List[str] = []
+    # 同步时每页获取的项目数
+    _page_size: int = 200
 
     def __init__(self, host: str = None, token: str = None, play_host: str = None,
                  sync_libraries: list = None, **kwargs):
@@ -510,6 +514,75 @@ class Plex:
         except Exception as err:
             logger.error(f"获取媒体库列表出错：{str(err)}")
 
+    def get_library_items(self, parent: Union[str, int]) -> Optional[Generator]:
+        """
+        同步用，并发分页获取媒体库下的所有项目
+
+        :param parent: 媒体库ID
+        :return: 返回一个生成器对象，按顺序逐页返回媒体服务器中的项目
+        """
+        if not parent or not self._plex:
+            return None
+        try:
+            section = self._plex.library.sectionByID(int(parent))
+            for item in self.__iter_pages(section, libtype=section.TYPE):
+                try:
+                    if not item:
+                        continue
+                    yield self.__build_media_server_item(item)
+                except Exception as e:
+                    logger.error(f"处理媒体项目时出错：{str(e)}, 跳过此项目")
+        except Exception as err:
+            logger.error(f"获取媒体库列表出错：{str(err)}")
+
+    def get_library_episodes(self, parent: Union[str, int]) -> Optional[Dict[str, Dict[int, List[int]]]]:
+        """
+        同步用，一次性分页获取媒体库下所有剧集的季集信息，替代逐个剧集查询
+
+        :param parent: 媒体库ID
+        :return: {剧集ID: {季: [集]}}，获取失败时返回None
+        """
+        if not parent or not self._plex:
+            return None
+        series_episodes: Dict[str, Dict[int, List[int]]] = {}
+        try:
+            section = self._plex.library.sectionByID(int(parent))
+            if section.TYPE != "show":
+                return series_episodes
+            for episode in self.__iter_pages(section, libtype="episode"):
+                if not episode.grandparentKey or not episode.parentIndex or not episode.index:
+                    continue
+                series_episodes.setdefault(episode.grandparentKey, {}) \
+                    .setdefault(episode.parentIndex, []).append(episode.index)
+        except Exception as err:
+            logger.error(f"批量获取剧集信息出错：{str(err)}")
+            return None
+        return series_episodes
+
+    def __iter_pages(self, section: Any, libtype: str) -> Generator:
+        """
+        并发分页查询媒体库，按分页顺序逐条返回，同时进行中的分页数不超过并发数
+        """
+        workers = max(settings.MEDIASERVER_SYNC_WORKERS, 1)
+        total = section.totalViewSize(libtype=libtype, includeCollections=False)
+        starts = list(range(0, total, self._page_size))
+        if not starts:
+            return
+
+        def __get_page(start_index: int) -> list:
+            return section.search(libtype=libtype, container_start=start_index,
+                                  container_size=self._page_size, maxresults=self._page_size)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Plex-Items") as executor:
+            futures = [executor.submit(__get_page, start) for start in starts[:workers]]
+            next_index = len(futures)
+            while futures:
+                items = futures.pop(0).result()
+                if next_index < len(starts):
+                    futures.append(executor.submit(__get_page, starts[next_index]))
+                    next_index += 1
+                yield from items
+
     def get_webhook_message(self, form: any) -> Optional[schemas.WebhookEventInfo]:
         """
         解析Plex报文
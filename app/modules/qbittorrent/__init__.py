@@ -2,11 +2,13 @@ import shutil
 from pathlib import Path
 from typing import Set, Tuple, Optional, Union, List
 
+from cachetools import LRUCache
 from qbittorrentapi import TorrentFilesList
 from torrentool.torrent import Torrent
 
 from app import schemas
 from app.core.config import settings
+from app.core.meta import MetaBase
 from app.core.metainfo import MetaInfo
 from app.log import logger
 from app.modules import _ModuleBase, _DownloaderBase
@@ -25,6 +27,19 @@ class QbittorrentModule(_ModuleBase, _DownloaderBase[Qbittorrent]):
         """
         super().init_service(service_name=Qbittorrent.__name__.lower(),
                              service_type=Qbittorrent)
+        # 种子名称识别结果缓存：(hash, 名称) -> MetaInfo
+        self._meta_cache = LRUCache(maxsize=2048)
+
+    def __get_meta(self, torrent_hash: str, torrent_name: str) -> MetaBase:
+        """
+        识别种子名称，同一种子只识别一次
+        """
+        key = (torrent_hash, torrent_name)
+        meta = self._meta_cache.get(key)
+        if not meta:
+            meta = MetaInfo(torrent_name)
+            self._meta_cache[key] = meta
+        return meta
 
     @staticmethod
     def get_name() -> str:
@@ -249,7 +264,7 @@ class QbittorrentModule(_ModuleBase, _DownloaderBase[Qbittorrent]):
             # 获取正在下载的任务
             torrents = server.get_downloading_torrents(tags=settings.TORRENT_TAG)
             for torrent in torrents or []:
-                meta = MetaInfo(torrent.get('name'))
+                meta = self.__get_meta(torrent.get('hash'), torrent.get('name'))
                 ret_torrents.append(DownloadingTorrent(
                     hash=torrent.get('hash'),
                     title=torrent.get('name'),
@@ -269,6 +284,36 @@ class QbittorrentModule(_ModuleBase, _DownloaderBase[Qbittorrent]):
             return None
         return ret_torrents
 
+    def completed_torrents(self, downloader: str = None) -> Optional[List[TransferTorrent]]:
+        """
+        获取自上次检查以来新完成下载且未整理的种子，完成状态来自状态镜像的增量同步，只返回已进入做种状态的种子
+        :param downloader:  下载器
+        :return: 新完成的种子列表
+        """
+        server: Qbittorrent = self.get_instance(downloader)
+        if not server:
+            return None
+        torrents = server.pop_completed_torrents(tags=settings.TORRENT_TAG)
+        if not torrents:
+            return torrents
+        ret_torrents = []
+        for torrent in torrents:
+            if "已整理" in (torrent.get("tags") or ""):
+                continue
+            content_path = torrent.get("content_path")
+            if content_path:
+                torrent_path = Path(content_path)
+            else:
+                torrent_path = Path(torrent.get('save_path')) / torrent.get('name')
+            ret_torrents.append(TransferTorrent(
+                title=torrent.get('name'),
+                path=torrent_path,
+                hash=torrent.get('hash'),
+                size=torrent.get('total_size'),
+                tags=torrent.get('tags')
+            ))
+        return ret_torrents
+
     def transfer_completed(self, hashs: str, path: Path = None,
                            downloader: str = None, transfer_type: str = None) -> None:
         """
@@ -288,7 +333,8 @@ class QbittorrentModule(_ModuleBase, _DownloaderBase[Qbittorrent]):
                 logger.info(f"移动模式删除种子成功：{hashs} ")
             # 删除本地残留文件
             if path and path.exists():
-                files = SystemUtils.list_files(path, settings.RMT_MEDIAEXT)
+                files = SystemUtils.list_files(path, settings.RMT_MEDIAEXT,
+                                               exclude_dirs=set(settings.SCAN_EXCLUDE_DIRS))
                 if not files:
                     logger.warn(f"删除残留文件夹：{path}")
                     shutil.rmtree(path, ignore_errors=True)
@@ -1,5 +1,6 @@
+import threading
 import time
-from typing import Optional, Union, Tuple, List
+from typing import Optional, Union, Tuple, List, Dict, Set
 
 import qbittorrentapi
 from qbittorrentapi import TorrentDictionary, TorrentFilesList
@@ -21,6 +22,14 @@ class Qbittorrent:
 
     qbc: Client = None
 
+    # 下载中状态，对应 qbittorrent 的 downloading 过滤器
+    _downloading_states = {"downloading", "metaDL", "forcedMetaDL", "stalledDL", "checkingDL",
+                           "pausedDL", "stoppedDL", "queuedDL", "forcedDL"}
+    # 做种状态，对应 qbittorrent 的 seeding 过滤器
+    _seeding_states = {"uploading", "stalledUP", "checkingUP", "queuedUP", "forcedUP"}
+    # 状态镜像的最短同步间隔（秒），间隔内的多次读取共享同一次同步结果
+    _sync_interval = 1
+
     def __init__(self, host: str = None, port: int = None,
                  username: str = None, password: str = None,
                  category: bool = False, sequentail: bool = False,
@@ -42,6 +51,17 @@ class Qbittorrent:
         self._sequentail = sequentail
         self._force_resume = force_resume
         self._first_last_piece = first_last_piece
+        # 种子状态镜像：hash -> 种子属性
+        self._torrents: Dict[str, dict] = {}
+        # 增量同步序号
+        self._rid = 0
+        # 上次同步时间
+        self._last_sync = 0
+        # 镜像是否已过期
+        self._expired = False
+        # 同步中发现的新完成种子，等待整理
+        self._completed_hashes: Set[str] = set()
+        self._sync_lock = threading.Lock()
         if self._host and self._port:
             self.qbc = self.__login_qbittorrent()
 
@@ -58,6 +78,112 @@ class Qbittorrent:
         重连
         """
         self.qbc = self.__login_qbittorrent()
+        self.__reset_sync()
+
+    def __reset_sync(self):
+        """
+        重置状态镜像，下次读取时全量同步
+        """
+        with self._sync_lock:
+            self._rid = 0
+            self._last_sync = 0
+            self._torrents = {}
+
+    def __expire_sync(self):
+        """
+        本地修改了种子后使镜像过期，下次读取时立即增量同步
+        """
+        self._expired = True
+
+    def sync_torrents(self) -> Tuple[Optional[Dict[str, dict]], List[str]]:
+        """
+        通过 sync/maindata 增量同步种子状态到本地镜像，只传输上次同步后变化的字段
+        :return: 种子状态镜像（同步失败时为None）、本次同步中新完成下载的种子Hash列表
+        """
+        if not self.qbc:
+            return None, []
+        with self._sync_lock:
+            if self._rid and not self._expired and time.time() - self._last_sync < self._sync_interval:
+                return self._torrents, []
+            try:
+                maindata = self.qbc.sync_maindata(rid=self._rid)
+            except Exception as err:
+                logger.error(f"同步种子状态出错：{str(err)}")
+                self._rid = 0
+                return None, []
+            completed = []
+            # 全量更新（如出错后rid重置）时同样与原镜像比较进度，避免漏掉期间完成的种子
+            previous = self._torrents
+            if maindata.get("full_update"):
+                torrents = {}
+            else:
+                torrents = previous
+            for torrent_hash, changes in (maindata.get("torrents") or {}).items():
+                old_torrent = previous.get(torrent_hash)
+                old_progress = old_torrent.get("progress") if old_torrent is not None else None
+                torrent = torrents.get(torrent_hash)
+                if torrent is None:
+                    torrent = torrents[torrent_hash] = {"hash": torrent_hash}
+                torrent.update(changes)
+                # 进度由未完成变为完成
+                if old_progress is not None and old_progress < 1 <= (torrent.get("progress") or 0):
+                    completed.append(torrent_hash)
+            for torrent_hash in maindata.get("torrents_removed") or []:
+                torrents.pop(torrent_hash, None)
+            self._torrents = torrents
+            self._rid = maindata.get("rid") or 0
+            self._last_sync = time.time()
+            self._expired = False
+            self._completed_hashes.update(completed)
+            return self._torrents, completed
+
+    def pop_completed_torrents(self, tags: Optional[Union[str, list]] = None) -> Optional[List[TorrentDictionary]]:
+        """
+        同步种子状态，取出新完成下载且已进入做种状态的种子，移动、校验中的种子留到下次再取
+        :return: 种子列表，同步失败时返回None
+        """
+        torrents, _ = self.sync_torrents()
+        if torrents is None:
+            return None
+        with self._sync_lock:
+            hashs = []
+            for torrent_hash in list(self._completed_hashes):
+                torrent = torrents.get(torrent_hash)
+                if torrent is None:
+                    # 已删除
+                    self._completed_hashes.discard(torrent_hash)
+                elif torrent.get("state") in self._seeding_states:
+                    self._completed_hashes.discard(torrent_hash)
+                    hashs.append(torrent_hash)
+        if not hashs:
+            return []
+        return self.__get_mirror_torrents(states=self._seeding_states, tags=tags, hashs=hashs)
+
+    def __get_mirror_torrents(self, states: set,
+                              tags: Optional[Union[str, list]] = None,
+                              hashs: Optional[List[str]] = None) -> Optional[List[TorrentDictionary]]:
+        """
+        从状态镜像中按状态和标签筛选种子
+        :param hashs: 只筛选指定Hash的种子
+        :return: 种子列表，同步失败时返回None
+        """
+        torrents, _ = self.sync_torrents()
+        if torrents is None:
+            return None
+        if tags and not isinstance(tags, list):
+            tags = [tags]
+        if hashs is not None:
+            torrents = {torrent_hash: torrents[torrent_hash] for torrent_hash in hashs if torrent_hash in torrents}
+        results = []
+        for torrent in list(torrents.values()):
+            if torrent.get("state") not in states:
+                continue
+            if tags:
+                torrent_tags = [str(tag).strip() for tag in (torrent.get("tags") or "").split(',')]
+                if not set(tags).issubset(set(torrent_tags)):
+                    continue
+            results.append(TorrentDictionary(data=dict(torrent), client=self.qbc))
+        return results
 
     def __login_qbittorrent(self) -> Optional[Client]:
         """
@@ -117,6 +243,11 @@ class Qbittorrent:
         if not self.qbc:
             return None
         # completed会包含移动状态 改为获取seeding状态 包含活动上传, 正在做种, 及强制做种
+        if not ids:
+            # 从增量同步的状态镜像中读取
+            torrents = self.__get_mirror_torrents(states=self._seeding_states, tags=tags)
+            if torrents is not None:
+                return torrents
         torrents, error = self.get_torrents(status="seeding", ids=ids, tags=tags)
         return None if error else torrents or []
 
@@ -128,6 +259,11 @@ class Qbittorrent:
         """
         if not self.qbc:
             return None
+        if not ids:
+            # 从增量同步的状态镜像中读取
+            torrents = self.__get_mirror_torrents(states=self._downloading_states, tags=tags)
+            if torrents is not None:
+                return torrents
         torrents, error = self.get_torrents(ids=ids,
                                             status="downloading",
                                             tags=tags)
@@ -143,6 +279,7 @@ class Qbittorrent:
             return False
         try:
             self.qbc.torrents_delete_tags(torrent_hashes=ids, tags=tag)
+            self.__expire_sync()
             return True
         except Exception as err:
             logger.error(f"删除种子Tag出错：{str(err)}")
@@ -158,6 +295,7 @@ class Qbittorrent:
             return False
         try:
             self.qbc.torrents_remove_tags(torrent_hashes=ids, tags=tag)
+            self.__expire_sync()
             return True
         except Exception as err:
             logger.error(f"移除种子Tag出错：{str(err)}")
@@ -172,6 +310,7 @@ class Qbittorrent:
         try:
             # 打标签
             self.qbc.torrents_add_tags(tags=tags, torrent_hashes=ids)
+            self.__expire_sync()
         except Exception as err:
             logger.error(f"设置种子Tag出错：{str(err)}")
 
@@ -290,6 +429,7 @@ class Qbittorrent:
                                             cookie=cookie,
                                             category=category,
                                             **kwargs)
+            self.__expire_sync()
             return True if qbc_ret and str(qbc_ret).find("Ok") != -1 else False
         except Exception as err:
             logger.error(f"添加种子出错：{str(err)}")
@@ -303,6 +443,7 @@ class Qbittorrent:
             return False
         try:
             self.qbc.torrents_resume(torrent_hashes=ids)
+            self.__expire_sync()
             return True
         except Exception as err:
             logger.error(f"启动种子出错：{str(err)}")
@@ -316,6 +457,7 @@ class Qbittorrent:
             return False
         try:
             self.qbc.torrents_pause(torrent_hashes=ids)
+            self.__expire_sync()
             return True
         except Exception as err:
             logger.error(f"暂停种子出错：{str(err)}")
@@ -331,6 +473,7 @@ class Qbittorrent:
             return False
         try:
             self.qbc.torrents_delete(delete_files=delete_file, torrent_hashes=ids)
+            self.__expire_sync()
             return True
         except Exception as err:
             logger.error(f"删除种子出错：{str(err)}")
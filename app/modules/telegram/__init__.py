@@ -133,56 +133,69 @@ class TelegramModule(_ModuleBase, _MessageBase[Telegram]):
                                       userid=user_id, username=user_name, text=text)
         return None
 
-    def post_message(self, message: Notification) -> None:
+    def post_message(self, message: Notification,
+                     configs: List[str] = None) -> Dict[str, Optional[bool]]:
         """
         发送消息
         :param message: 消息体
-        :return: 成功或失败
+        :param configs: 只发送到指定名称的配置
+        :return: 各配置的发送结果：True 成功，False 失败可重试，None 无法发送（无目标用户、客户端未就绪）
         """
-        for conf in self.get_configs().values():
-            if not self.check_message(message, conf.name):
-                continue
+        results: Dict[str, Optional[bool]] = {}
+        for conf in self.get_message_configs(message, configs):
             targets = message.targets
             userid = message.userid
             if not userid and targets is not None:
                 userid = targets.get('telegram_userid')
                 if not userid:
                     logger.warn(f"用户没有指定 Telegram用户ID，消息无法发送")
-                    return
+                    results[conf.name] = None
+                    continue
             client: Telegram = self.get_instance(conf.name)
-            if client:
-                client.send_msg(title=message.title, text=message.text,
-                                image=message.image, userid=userid, link=message.link)
+            if not client:
+                results[conf.name] = None
+                continue
+            results[conf.name] = client.send_msg(title=message.title, text=message.text,
+                                                 image=message.image, userid=userid, link=message.link)
+        return results
 
-    def post_medias_message(self, message: Notification, medias: List[MediaInfo]) -> None:
+    def post_medias_message(self, message: Notification, medias: List[MediaInfo],
+                            configs: List[str] = None) -> Dict[str, Optional[bool]]:
         """
         发送媒体信息选择列表
         :param message: 消息体
         :param medias: 媒体列表
-        :return: 成功或失败
+        :param configs: 只发送到指定名称的配置
+        :return: 各配置的发送结果：True 成功，False 失败可重试，None 无法发送（无目标用户、客户端未就绪）
         """
-        for conf in self.get_configs().values():
-            if not self.check_message(message, conf.name):
-                continue
+        results: Dict[str, Optional[bool]] = {}
+        for conf in self.get_message_configs(message, configs):
             client: Telegram = self.get_instance(conf.name)
-            if client:
-                client.send_medias_msg(title=message.title, medias=medias,
-                                       userid=message.userid, link=message.link)
+            if not client:
+                results[conf.name] = None
+                continue
+            results[conf.name] = client.send_medias_msg(title=message.title, medias=medias,
+                                                        userid=message.userid, link=message.link)
+        return results
 
-    def post_torrents_message(self, message: Notification, torrents: List[Context]) -> None:
+    def post_torrents_message(self, message: Notification, torrents: List[Context],
+                              configs: List[str] = None) -> Dict[str, Optional[bool]]:
         """
         发送种子信息选择列表
         :param message: 消息体
         :param torrents: 种子列表
-        :return: 成功或失败
+        :param configs: 只发送到指定名称的配置
+        :return: 各配置的发送结果：True 成功，False 失败可重试，None 无法发送（无目标用户、客户端未就绪）
         """
-        for conf in self.get_configs().values():
-            if not self.check_message(message, conf.name):
-                continue
+        results: Dict[str, Optional[bool]] = {}
+        for conf in self.get_message_configs(message, configs):
             client: Telegram = self.get_instance(conf.name)
-            if client:
-                client.send_torrents_msg(title=message.title, torrents=torrents,
-                                         userid=message.userid, link=message.link)
+            if not client:
+                results[conf.name] = None
+                continue
+            results[conf.name] = client.send_torrents_msg(title=message.title, torrents=torrents,
+                                                          userid=message.userid, link=message.link)
+        return results
 
     def register_commands(self, commands: Dict[str, dict]):
         """
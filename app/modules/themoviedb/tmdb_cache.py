@@ -8,6 +8,7 @@ from typing import Optional
 
 from app.core.config import settings
 from app.core.meta import MetaBase
+from app.core.metrics import metrics
 from app.log import logger
 from app.utils.singleton import Singleton
 from app.schemas.types import MediaType
@@ -66,6 +67,7 @@ class TmdbCache(metaclass=Singleton):
                     self._meta_data[key] = info
                 elif expire and self._tmdb_cache_expire:
                     self.delete(key)
+            metrics.cache_hit("tmdb_meta", bool(info))
             return info or {}
 
     def delete(self, key: str) -> dict:
@@ -9,6 +9,7 @@ from functools import lru_cache
 import requests
 import requests.exceptions
 
+from app.core.metrics import metrics
 from app.utils.http import RequestUtils
 from .exceptions import TMDbException
 
@@ -225,3 +226,6 @@ class TMDb(object):
     def close(self):
         if self._session:
             self._session.close()
+
+
+metrics.register_cache("tmdb_api", lambda: TMDb.cached_request.cache_info()[:2])
@@ -2,11 +2,13 @@ import shutil
 from pathlib import Path
 from typing import Set, Tuple, Optional, Union, List
 
+from cachetools import LRUCache
 from torrentool.torrent import Torrent
 from transmission_rpc import File
 
 from app import schemas
 from app.core.config import settings
+from app.core.meta import MetaBase
 from app.core.metainfo import MetaInfo
 from app.log import logger
 from app.modules import _ModuleBase, _DownloaderBase
@@ -25,6 +27,19 @@ class TransmissionModule(_ModuleBase, _DownloaderBase[Transmission]):
         """
         super().init_service(service_name=Transmission.__name__.lower(),
                              service_type=Transmission)
+        # 种子名称识别结果缓存：(hash, 名称) -> MetaInfo
+        self._meta_cache = LRUCache(maxsize=2048)
+
+    def __get_meta(self, torrent_hash: str, torrent_name: str) -> MetaBase:
+        """
+        识别种子名称，同一种子只识别一次
+        """
+        key = (torrent_hash, torrent_name)
+        meta = self._meta_cache.get(key)
+        if not meta:
+            meta = MetaInfo(torrent_name)
+            self._meta_cache[key] = meta
+        return meta
 
     @staticmethod
     def get_name() -> str:
@@ -236,7 +251,7 @@ class TransmissionModule(_ModuleBase, _DownloaderBase[Transmission]):
             # 获取正在下载的任务
             torrents = server.get_downloading_torrents(tags=settings.TORRENT_TAG)
             for torrent in torrents or []:
-                meta = MetaInfo(torrent.name)
+                meta = self.__get_meta(torrent.hashString, torrent.name)
                 dlspeed = torrent.rate_download if hasattr(torrent, "rate_download") else torrent.rateDownload
                 upspeed = torrent.rate_upload if hasattr(torrent, "rate_upload") else torrent.rateUpload
                 ret_torrents.append(DownloadingTorrent(
@@ -256,6 +271,31 @@ class TransmissionModule(_ModuleBase, _DownloaderBase[Transmission]):
             return None
         return ret_torrents
 
+    def completed_torrents(self, downloader: str = None) -> Optional[List[TransferTorrent]]:
+        """
+        获取自上次检查以来新完成下载且未整理的种子，完成状态来自状态镜像的增量同步，只返回已进入做种状态的种子
+        :param downloader:  下载器
+        :return: 新完成的种子列表
+        """
+        server: Transmission = self.get_instance(downloader)
+        if not server:
+            return None
+        torrents = server.pop_completed_torrents(tags=settings.TORRENT_TAG)
+        if not torrents:
+            return torrents
+        ret_torrents = []
+        for torrent in torrents:
+            if "已整理" in (torrent.labels or []) or not torrent.download_dir:
+                continue
+            ret_torrents.append(TransferTorrent(
+                title=torrent.name,
+                path=Path(torrent.download_dir) / torrent.name,
+                hash=torrent.hashString,
+                size=torrent.total_size,
+                tags=",".join(torrent.labels or [])
+            ))
+        return ret_torrents
+
     def transfer_completed(self, hashs: str, path: Path = None,
                            downloader: str = None, transfer_type: str = None) -> None:
         """
@@ -283,7 +323,8 @@ class TransmissionModule(_ModuleBase, _DownloaderBase[Transmission]):
                 logger.info(f"移动模式删除种子成功：{hashs} ")
             # 删除本地残留文件
             if path and path.exists():
-                files = SystemUtils.list_files(path, settings.RMT_MEDIAEXT)
+                files = SystemUtils.list_files(path, settings.RMT_MEDIAEXT,
+                                               exclude_dirs=set(settings.SCAN_EXCLUDE_DIRS))
                 if not files:
                     logger.warn(f"删除残留文件夹：{path}")
                     shutil.rmtree(path, ignore_errors=True)
@@ -1,4 +1,6 @@
-from typing import Optional, Union, Tuple, List
+import threading
+import time
+from typing import Optional, Union, Tuple, List, Dict, Set
 
 import transmission_rpc
 from transmission_rpc import Client, Torrent, File
@@ -23,6 +25,11 @@ class Transmission:
               "peersGettingFromUs", "peersSendingToUs", "uploadRatio", "uploadedEver", "downloadedEver", "downloadDir",
               "error", "errorString", "doneDate", "queuePosition", "activityDate", "trackers"]
 
+    # 状态镜像的最短同步间隔（秒），间隔内的多次读取共享同一次同步结果
+    _sync_interval = 1
+    # recently-active 只返回最近60秒内活动的种子，超过该时间未同步时需全量同步
+    _full_sync_interval = 45
+
     def __init__(self, host: str = None, port: int = None, username: str = None, password: str = None, **kwargs):
         """
         若不设置参数，则创建配置文件设置的下载器
@@ -36,6 +43,16 @@ class Transmission:
             return
         self._username = username
         self._password = password
+        # 种子状态镜像：id -> 种子
+        self._torrents: Dict[int, Torrent] = {}
+        # 上次同步时间、上次全量同步时间
+        self._last_sync = 0
+        self._last_full_sync = 0
+        # 镜像是否已过期
+        self._expired = False
+        # 同步中发现的新完成种子，等待整理
+        self._completed_hashes: Set[str] = set()
+        self._sync_lock = threading.Lock()
         if self._host and self._port:
             self.trc = self.__login_transmission()
 
@@ -70,20 +87,105 @@ class Transmission:
         重连
         """
         self.trc = self.__login_transmission()
+        self.__reset_sync()
 
-    def get_torrents(self, ids: Union[str, list] = None, status: Union[str, list] = None,
-                     tags: Union[str, list] = None) -> Tuple[List[Torrent], bool]:
+    def __reset_sync(self):
         """
-        获取种子列表
-        返回结果 种子列表, 是否有错误
+        重置状态镜像，下次读取时全量同步
+        """
+        with self._sync_lock:
+            self._torrents = {}
+            self._last_sync = 0
+            self._last_full_sync = 0
+
+    def __expire_sync(self):
+        """
+        本地修改了种子后使镜像过期，下次读取时立即增量同步
+        """
+        self._expired = True
+
+    def sync_torrents(self) -> Tuple[Optional[Dict[int, Torrent]], List[str]]:
+        """
+        同步种子状态到本地镜像，首次及长时间未同步时全量获取，其余时间只获取 recently-active 的种子
+        :return: 种子状态镜像（同步失败时为None）、本次同步中新完成下载的种子Hash列表
         """
         if not self.trc:
-            return [], True
-        try:
-            torrents = self.trc.get_torrents(ids=ids, arguments=self._trarg)
-        except Exception as err:
-            logger.error(f"获取种子列表出错：{str(err)}")
-            return [], True
+            return None, []
+        with self._sync_lock:
+            now = time.time()
+            if self._last_full_sync and not self._expired and now - self._last_sync < self._sync_interval:
+                return self._torrents, []
+            completed = []
+            # 全量同步（首次、出错后、长时间未同步）时同样与原镜像比较进度，避免漏掉期间完成的种子
+            previous = self._torrents
+            try:
+                if not self._last_full_sync or now - self._last_sync > self._full_sync_interval:
+                    active = self.trc.get_torrents(arguments=self._trarg)
+                    torrents = {}
+                    removed = []
+                    self._last_full_sync = now
+                else:
+                    active, removed = self.trc.get_recently_active_torrents(arguments=self._trarg)
+                    torrents = previous
+                for torrent in active:
+                    old_torrent = previous.get(torrent.id)
+                    # 进度由未完成变为完成
+                    if old_torrent is not None \
+                            and old_torrent.fields.get("percentDone", 0) < 1 <= torrent.fields.get("percentDone", 0):
+                        completed.append(torrent.hashString)
+                    torrents[torrent.id] = torrent
+            except Exception as err:
+                logger.error(f"同步种子状态出错：{str(err)}")
+                self._last_full_sync = 0
+                return None, []
+            for tid in removed or []:
+                torrents.pop(tid, None)
+            self._torrents = torrents
+            self._last_sync = now
+            self._expired = False
+            self._completed_hashes.update(completed)
+            return self._torrents, completed
+
+    def pop_completed_torrents(self, tags: Union[str, list] = None) -> Optional[List[Torrent]]:
+        """
+        同步种子状态，取出新完成下载且已进入做种状态的种子，校验中的种子留到下次再取
+        :return: 种子列表，同步失败时返回None
+        """
+        torrents, _ = self.sync_torrents()
+        if torrents is None:
+            return None
+        with self._sync_lock:
+            if not self._completed_hashes:
+                return []
+            mirror = {torrent.hashString: torrent for torrent in torrents.values()}
+            completed = []
+            for torrent_hash in list(self._completed_hashes):
+                torrent = mirror.get(torrent_hash)
+                if torrent is None:
+                    # 已删除
+                    self._completed_hashes.discard(torrent_hash)
+                elif torrent.status in ("seeding", "seed_pending"):
+                    self._completed_hashes.discard(torrent_hash)
+                    completed.append(torrent)
+        return self.__filter_torrents(completed, tags=tags)
+
+    def __get_mirror_torrents(self, status: list,
+                              tags: Union[str, list] = None) -> Optional[List[Torrent]]:
+        """
+        从状态镜像中按状态和标签筛选种子
+        :return: 种子列表，同步失败时返回None
+        """
+        torrents, _ = self.sync_torrents()
+        if torrents is None:
+            return None
+        return self.__filter_torrents(list(torrents.values()), status=status, tags=tags)
+
+    @staticmethod
+    def __filter_torrents(torrents: List[Torrent], status: Union[str, list] = None,
+                          tags: Union[str, list] = None) -> List[Torrent]:
+        """
+        按状态和标签过滤种子
+        """
         if status and not isinstance(status, list):
             status = [status]
         if tags and not isinstance(tags, list):
@@ -99,7 +201,22 @@ class Transmission:
             if tags and not set(tags).issubset(set(labels)):
                 continue
             ret_torrents.append(torrent)
-        return ret_torrents, False
+        return ret_torrents
+
+    def get_torrents(self, ids: Union[str, list] = None, status: Union[str, list] = None,
+                     tags: Union[str, list] = None) -> Tuple[List[Torrent], bool]:
+        """
+        获取种子列表
+        返回结果 种子列表, 是否有错误
+        """
+        if not self.trc:
+            return [], True
+        try:
+            torrents = self.trc.get_torrents(ids=ids, arguments=self._trarg)
+        except Exception as err:
+            logger.error(f"获取种子列表出错：{str(err)}")
+            return [], True
+        return self.__filter_torrents(torrents, status=status, tags=tags), False
 
     def get_completed_torrents(self, ids: Union[str, list] = None,
                                tags: Union[str, list] = None) -> Optional[List[Torrent]]:
@@ -110,6 +227,11 @@ class Transmission:
         if not self.trc:
             return None
         try:
+            if not ids:
+                # 从增量同步的状态镜像中读取
+                torrents = self.__get_mirror_torrents(status=["seeding", "seed_pending"], tags=tags)
+                if torrents is not None:
+                    return torrents
             torrents, error = self.get_torrents(status=["seeding", "seed_pending"], ids=ids, tags=tags)
             return None if error else torrents or []
         except Exception as err:
@@ -125,6 +247,12 @@ class Transmission:
         if not self.trc:
             return None
         try:
+            if not ids:
+                # 从增量同步的状态镜像中读取
+                torrents = self.__get_mirror_torrents(status=["downloading", "download_pending", "stopped"],
+                                                      tags=tags)
+                if torrents is not None:
+                    return torrents
             torrents, error = self.get_torrents(ids=ids,
                                                 status=["downloading", "download_pending", "stopped"],
                                                 tags=tags)
@@ -143,6 +271,7 @@ class Transmission:
             return False
         try:
             self.trc.change_torrent(labels=list(set((org_tags or []) + tags)), ids=ids)
+            self.__expire_sync()
             return True
         except Exception as err:
             logger.error(f"设置种子标签出错：{str(err)}")
@@ -182,11 +311,13 @@ class Transmission:
         if not self.trc:
             return None
         try:
-            return self.trc.add_torrent(torrent=content,
-                                        download_dir=download_dir,
-                                        paused=is_paused,
-                                        labels=labels,
-                                        cookies=cookie)
+            torrent = self.trc.add_torrent(torrent=content,
+                                           download_dir=download_dir,
+                                           paused=is_paused,
+                                           labels=labels,
+                                           cookies=cookie)
+            self.__expire_sync()
+            return torrent
         except Exception as err:
             logger.error(f"添加种子出错：{str(err)}")
             return None
@@ -199,6 +330,7 @@ class Transmission:
             return False
         try:
             self.trc.start_torrent(ids=ids)
+            self.__expire_sync()
             return True
         except Exception as err:
             logger.error(f"启动种子出错：{str(err)}")
@@ -212,6 +344,7 @@ class Transmission:
             return False
         try:
             self.trc.stop_torrent(ids=ids)
+            self.__expire_sync()
             return True
         except Exception as err:
             logger.error(f"停止种子出错：{str(err)}")
@@ -227,6 +360,7 @@ class Transmission:
             return False
         try:
             self.trc.remove_torrent(delete_data=delete_file, ids=ids)
+            self.__expire_sync()
             return True
         except Exception as err:
             logger.error(f"删除种子出错：{str(err)}")
@@ -117,61 +117,77 @@ class VoceChatModule(_ModuleBase, _MessageBase[VoceChat]):
             logger.error(f"VoceChat消息处理发生错误：{str(err)}")
         return None
 
-    def post_message(self, message: Notification) -> None:
+    def post_message(self, message: Notification,
+                     configs: List[str] = None) -> Dict[str, Optional[bool]]:
         """
         发送消息
         :param message: 消息内容
-        :return: 成功或失败
+        :param configs: 只发送到指定名称的配置
+        :return: 各配置的发送结果：True 成功，False 失败可重试，None 无法发送（无目标用户、客户端未就绪）
         """
-        for conf in self.get_configs().values():
-            if not self.check_message(message, conf.name):
-                continue
+        results: Dict[str, Optional[bool]] = {}
+        for conf in self.get_message_configs(message, configs):
             targets = message.targets
             userid = message.userid
             if not message.userid and targets:
                 userid = targets.get('telegram_userid')
             client: VoceChat = self.get_instance(conf.name)
-            if client:
-                client.send_msg(title=message.title, text=message.text,
-                                userid=userid, link=message.link)
+            if not client:
+                results[conf.name] = None
+                continue
+            results[conf.name] = client.send_msg(title=message.title, text=message.text,
+                                                 userid=userid, link=message.link)
+        return results
 
-    def post_medias_message(self, message: Notification, medias: List[MediaInfo]) -> None:
+    def post_medias_message(self, message: Notification, medias: List[MediaInfo],
+                            configs: List[str] = None) -> Dict[str, Optional[bool]]:
         """
         发送媒体信息选择列表
         :param message: 消息内容
         :param medias: 媒体列表
-        :return: 成功或失败
+        :param configs: 只发送到指定名称的配置
+        :return: 各配置的发送结果：True 成功，False 失败可重试，None 无法发送（无目标用户、客户端未就绪）
         """
-        for conf in self.get_configs().values():
-            if not self.check_message(message, conf.name):
-                continue
+        results: Dict[str, Optional[bool]] = {}
+        for conf in self.get_message_configs(message, configs):
             client: VoceChat = self.get_instance(conf.name)
-            if client:
-                client.send_msg(title=message.title, userid=message.userid)
-                client.send_medias_msg(title=message.title, medias=medias,
-                                       userid=message.userid, link=message.link)
+            if not client:
+                results[conf.name] = None
+                continue
+            # 先发送标题，标题发送失败时不发送内容，重试时一并重发
+            ret = client.send_msg(title=message.title, userid=message.userid)
+            if ret:
+                ret = client.send_medias_msg(title=message.title, medias=medias,
+                                             userid=message.userid, link=message.link)
+            results[conf.name] = ret
+        return results
 
-    def post_torrents_message(self, message: Notification, torrents: List[Context]) -> None:
+    def post_torrents_message(self, message: Notification, torrents: List[Context],
+                              configs: List[str] = None) -> Dict[str, Optional[bool]]:
         """
         发送种子信息选择列表
         :param message: 消息内容
         :param torrents: 种子列表
-        :return: 成功或失败
+        :param configs: 只发送到指定名称的配置
+        :return: 各配置的发送结果：True 成功，False 失败可重试，None 无法发送（无目标用户、客户端未就绪）
         """
-        for conf in self.get_configs().values():
-            if not self.check_message(message, conf.name):
-                continue
+        results: Dict[str, Optional[bool]] = {}
+        for conf in self.get_message_configs(message, configs):
             targets = message.targets
             userid = message.userid
             if not userid and targets is not None:
                 userid = targets.get('vocechat_userid')
                 if not userid:
                     logger.warn(f"用户没有指定 VoceChat用户ID，消息无法发送")
-                    return
+                    results[conf.name] = None
+                    continue
             client: VoceChat = self.get_instance(conf.name)
-            if client:
-                client.send_torrents_msg(title=message.title, torrents=torrents,
-                                         userid=userid, link=message.link)
+            if not client:
+                results[conf.name] = None
+                continue
+            results[conf.name] = client.send_torrents_msg(title=message.title, torrents=torrents,
+                                                          userid=userid, link=message.link)
+        return results
 
     def register_commands(self, commands: Dict[str, dict]):
         pass
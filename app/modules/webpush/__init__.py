@@ -1,5 +1,5 @@
 import json
-from typing import Union, Tuple
+from typing import Union, Tuple, List, Dict, Optional
 
 from pywebpush import webpush, WebPushException
 
@@ -49,15 +49,16 @@ class WebPushModule(_ModuleBase, _MessageBase):
     def init_setting(self) -> Tuple[str, Union[str, bool]]:
         pass
 
-    def post_message(self, message: Notification) -> None:
+    def post_message(self, message: Notification,
+                     configs: List[str] = None) -> Dict[str, Optional[bool]]:
         """
         发送消息
         :param message: 消息内容
-        :return: 成功或失败
+        :param configs: 只发送到指定名称的配置
+        :return: 各配置的发送结果：True 成功，False 失败可重试，None 无法发送（无接收用户、消息为空）
         """
-        for conf in self.get_configs().values():
-            if not self.check_message(message, conf.name):
-                continue
+        results: Dict[str, Optional[bool]] = {}
+        for conf in self.get_message_configs(message, configs):
             webpush_users = conf.config.get("WEBPUSH_USERNAME") or ""
             if webpush_users:
                 # 设定了接收用户时，非该用户的消息不接收
@@ -65,7 +66,8 @@ class WebPushModule(_ModuleBase, _MessageBase):
                     continue
             if not message.title and not message.text:
                 logger.warn("标题和内容不能同时为空")
-                return
+                results[conf.name] = None
+                continue
             try:
                 if message.title:
                     caption = message.title
@@ -89,7 +91,10 @@ class WebPushModule(_ModuleBase, _MessageBase):
                             },
                         )
                     except WebPushException as err:
+                        # 单个订阅失效不影响其它订阅，不作为发送失败重试
                         logger.error(f"WebPush发送失败: {str(err)}")
-
+                results[conf.name] = True
             except Exception as msg_e:
                 logger.error(f"发送消息失败：{msg_e}")
+                results[conf.name] = False
+        return results
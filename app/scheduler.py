@@ -1,5 +1,6 @@
 import logging
 import threading
+import time
 import traceback
 from datetime import datetime, timedelta
 from typing import List
@@ -19,6 +20,7 @@ from app.chain.torrents import TorrentsChain
 from app.chain.transfer import TransferChain
 from app.core.config import settings
 from app.core.event import EventManager
+from app.core.metrics import metrics
 from app.core.plugin import PluginManager
 from app.helper.sites import SitesHelper
 from app.log import logger
@@ -146,6 +148,11 @@ class Scheduler(metaclass=Singleton):
                 "func": TransferChain().process,
                 "running": False,
             },
+            "transfer_completed": {
+                "name": "下载完成整理",
+                "func": TransferChain().process_completed,
+                "running": False,
+            },
             "clear_cache": {
                 "name": "缓存清理",
                 "func": clear_cache,
@@ -297,6 +304,18 @@ class Scheduler(metaclass=Singleton):
             }
         )
 
+        # 检查下载器中新完成的任务并立即整理（每30秒，基于下载器状态增量同步）
+        self._scheduler.add_job(
+            self.start,
+            "interval",
+            id="transfer_completed",
+            name="下载完成整理",
+            seconds=30,
+            kwargs={
+                'job_id': 'transfer_completed'
+            }
+        )
+
         # 后台刷新TMDB壁纸
         self._scheduler.add_job(
             self.start,
@@ -378,9 +397,11 @@ class Scheduler(metaclass=Singleton):
             job_name = job.get("name")
             if job.get("running"):
                 logger.warning(f"定时任务 {job_id} - {job_name} 正在运行 ...")
+                metrics.inc("mp_scheduler_job_overlaps", "定时任务重叠触发次数", job=job_id)
                 return
             self._jobs[job_id]["running"] = True
         # 开始运行
+        start_time = time.perf_counter()
         try:
             if not kwargs:
                 kwargs = job.get("kwargs") or {}
@@ -401,6 +422,8 @@ class Scheduler(metaclass=Singleton):
                 }
             )
         # 运行结束
+        metrics.observe("mp_scheduler_job_duration_seconds", "定时任务执行耗时",
+                        time.perf_counter() - start_time, job=job_id)
         with self._lock:
             try:
                 self._jobs[job_id]["running"] = False
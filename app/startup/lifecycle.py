@@ -3,8 +3,9 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
+from app.core.profiler import startup_profiler
 from app.startup.modules_initializer import shutdown_modules, start_modules
-from app.startup.plugins_initializer import init_plugins_async
+from app.startup.plugins_initializer import warmup_async
 from app.startup.routers_initializer import init_routers
 
 
@@ -17,9 +18,10 @@ async def lifespan(app: FastAPI):
     # 启动模块
     start_modules(app)
     # 初始化路由
-    init_routers(app)
-    # 初始化插件
-    plugin_init_task = asyncio.create_task(init_plugins_async())
+    with startup_profiler.phase("初始化路由"):
+        init_routers(app)
+    # 后台预热插件、定时服务并初始化插件，路由已可响应请求
+    plugin_init_task = asyncio.create_task(warmup_async())
     try:
         # 在此处 yield，表示应用已经启动，控制权交回 FastAPI 主事件循环
         yield
@@ -4,6 +4,7 @@ from fastapi import FastAPI
 
 from app.core.config import global_vars, settings
 from app.core.module import ModuleManager
+from app.core.profiler import startup_profiler
 from app.utils.system import SystemUtils
 
 # SitesHelper涉及资源包拉取，提前引入并容错提示
@@ -17,13 +18,17 @@ except ImportError as e:
 from app.core.event import EventManager
 from app.core.plugin import PluginManager
 from app.helper.thread import ThreadHelper
+from app.helper.browser import BrowserPool
 from app.helper.display import DisplayHelper
 from app.helper.resource import ResourceHelper
 from app.helper.message import MessageHelper
+from app.helper.messagequeue import MessageQueueManager
+from app.helper.session import SessionHelper
 from app.scheduler import Scheduler
 from app.monitor import Monitor
 from app.schemas import Notification, NotificationType
 from app.db import close_database
+from app.db.plugindata_oper import PluginDataCache
 from app.chain.command import CommandChain
 
 
@@ -64,12 +69,14 @@ def stop_frontend():
 
 def clear_temp():
     """
-    清理临时文件和图片缓存
+    清理临时文件、图片缓存和种子缓存
     """
     # 清理临时目录中3天前的文件
     SystemUtils.clear(settings.TEMP_PATH, days=3)
     # 清理图片缓存目录中7天前的文件
     SystemUtils.clear(settings.CACHE_PATH / "images", days=7)
+    # 清理种子缓存目录中7天前的文件
+    SystemUtils.clear(settings.CACHE_PATH / "torrents", days=7)
 
 
 def check_auth():
@@ -95,6 +102,8 @@ def shutdown_modules(_: FastAPI):
     """
     # 停止信号
     global_vars.stop_system()
+    # 停止消息发送队列
+    MessageQueueManager().stop()
     # 停止模块
     ModuleManager().stop()
     # 停止插件
@@ -102,14 +111,20 @@ def shutdown_modules(_: FastAPI):
     PluginManager().stop_monitor()
     # 停止事件消费
     EventManager().stop()
+    # 关闭常驻浏览器
+    BrowserPool().stop()
     # 停止虚拟显示
     DisplayHelper().stop()
     # 停止定时服务
     Scheduler().stop()
     # 停止监控
     Monitor().stop()
+    # 保存用户会话
+    SessionHelper().stop()
     # 停止线程池
     ThreadHelper().shutdown()
+    # 写入缓存的插件数据
+    PluginDataCache().stop()
     # 停止数据库连接
     close_database()
     # 停止前端服务
@@ -120,27 +135,43 @@ def shutdown_modules(_: FastAPI):
 
 def start_modules(_: FastAPI):
     """
-    启动模块
+    启动模块，仅启动API可用所必需的部分，插件、定时服务等在路由就绪后于后台预热
     """
     # 虚拟显示
-    DisplayHelper()
+    with startup_profiler.phase("虚拟显示"):
+        DisplayHelper()
     # 站点管理
-    SitesHelper()
+    with startup_profiler.phase("站点管理"):
+        SitesHelper()
     # 资源包检测
-    ResourceHelper()
+    with startup_profiler.phase("资源包检测"):
+        ResourceHelper()
     # 加载模块
-    ModuleManager()
+    with startup_profiler.phase("加载模块"):
+        ModuleManager()
     # 启动事件消费
-    EventManager().start()
+    with startup_profiler.phase("启动事件消费"):
+        EventManager().start()
+
+
+def warmup_modules():
+    """
+    后台预热插件、监控、定时服务及命令
+    """
     # 加载插件
-    PluginManager().start()
+    with startup_profiler.phase("加载插件"):
+        PluginManager().start()
     # 启动监控任务
-    Monitor()
+    with startup_profiler.phase("启动监控任务"):
+        Monitor()
     # 启动定时服务
-    Scheduler()
+    with startup_profiler.phase("启动定时服务"):
+        Scheduler()
     # 加载命令
-    CommandChain()
+    with startup_profiler.phase("加载命令"):
+        CommandChain()
     # 启动前端服务
     start_frontend()
     # 检查认证状态
-    check_auth()
+    with startup_profiler.phase("检查认证状态"):
+        check_auth()
@@ -1,8 +1,25 @@
 import asyncio
 
 from app.core.plugin import PluginManager
+from app.core.profiler import startup_profiler
 from app.log import logger
 from app.scheduler import Scheduler
+from app.startup.modules_initializer import warmup_modules
+
+
+async def warmup_async():
+    """
+    路由就绪后在后台预热插件、定时服务等，完成后同步在线插件并输出启动耗时报告
+    """
+    try:
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, warmup_modules)
+        # 插件加载后注册插件API
+        register_plugin_api()
+    except Exception as e:
+        logger.error(f"后台预热过程中出现异常: {e}")
+    startup_profiler.finish()
+    await init_plugins_async()
 
 
 async def init_plugins_async():
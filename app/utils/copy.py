@@ -0,0 +1,164 @@
+import ctypes
+import errno
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    # 使用libc的fallocate，文件系统不支持时返回EOPNOTSUPP，不会像posix_fallocate一样退化为逐块写零
+    _libc = ctypes.CDLL(None, use_errno=True)
+    _fallocate = getattr(_libc, "fallocate64", None) or getattr(_libc, "fallocate", None)
+    if _fallocate:
+        _fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64]
+        _fallocate.restype = ctypes.c_int
+except (OSError, TypeError, AttributeError):
+    _fallocate = None
+
+
+class CopyUtils:
+    """
+    内核加速的文件复制：优先reflink克隆，其次copy_file_range/sendfile在内核中复制，
+    数据不经过用户态；进程中断后再次复制时通过.part文件和偏移检查点断点续传，复制出错时清理临时文件
+    """
+
+    # ioctl FICLONE，btrfs/XFS等支持reflink的文件系统上仅复制元数据
+    _FICLONE = 0x40049409
+    # 每次内核复制的块大小
+    _chunk_size = 64 * 1024 * 1024
+    # 每复制多少字节保存一次检查点
+    _checkpoint_size = 2 * 1024 * 1024 * 1024
+
+    @staticmethod
+    def copy(src: Path, dest: Path,
+             progress_callback: Callable[[int, int], None] = None) -> Tuple[int, str]:
+        """
+        复制文件，保留文件属性，中断后再次复制同一文件时从检查点继续
+        :param src: 源文件
+        :param dest: 目标文件
+        :param progress_callback: 进度回调，参数为已复制字节数和总字节数
+        :return: 0 成功 -1 失败, 错误信息
+        """
+        part = dest.with_name(f"{dest.name}.part")
+        checkpoint = dest.with_name(f"{dest.name}.part.offset")
+        try:
+            stat = src.stat()
+            total = stat.st_size
+            # 源文件未变化时从检查点继续，否则清理上次遗留的检查点从头复制
+            offset = CopyUtils.__load_checkpoint(checkpoint, stat) if part.exists() else 0
+            if not offset:
+                checkpoint.unlink(missing_ok=True)
+            with open(src, "rb") as fsrc, open(part, "r+b" if offset else "wb") as fdst:
+                src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+                if not offset and CopyUtils.__reflink(src_fd, dst_fd):
+                    offset = total
+                else:
+                    CopyUtils.__preallocate(dst_fd, total)
+                    offset = CopyUtils.__copy_range(src_fd, dst_fd, offset, total, stat,
+                                                    checkpoint, progress_callback)
+                if progress_callback:
+                    progress_callback(offset, total)
+            shutil.copystat(src, part)
+            os.replace(part, dest)
+            checkpoint.unlink(missing_ok=True)
+            return 0, ""
+        except Exception as err:
+            part.unlink(missing_ok=True)
+            checkpoint.unlink(missing_ok=True)
+            return -1, str(err)
+
+    @staticmethod
+    def __reflink(src_fd: int, dst_fd: int) -> bool:
+        """
+        尝试reflink克隆，不支持时返回False
+        """
+        if not fcntl:
+            return False
+        try:
+            fcntl.ioctl(dst_fd, CopyUtils._FICLONE, src_fd)
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def __preallocate(dst_fd: int, total: int):
+        """
+        预分配目标文件空间，减少碎片并提前发现空间不足，只在文件系统原生支持时预分配，
+        NFS/SMB等不支持的文件系统上跳过，避免写零模拟导致数据写两遍
+        """
+        if not total or not _fallocate:
+            return
+        if _fallocate(dst_fd, 0, 0, total) == 0:
+            return
+        err = ctypes.get_errno()
+        # 空间不足直接失败，文件系统不支持时忽略
+        if err == errno.ENOSPC:
+            raise OSError(err, os.strerror(err))
+
+    @staticmethod
+    def __copy_range(src_fd: int, dst_fd: int, offset: int, total: int, stat: os.stat_result,
+                     checkpoint: Path, progress_callback: Optional[Callable[[int, int], None]]) -> int:
+        """
+        从offset开始按块复制，依次尝试copy_file_range、sendfile和普通读写
+        :return: 复制完成后的偏移
+        """
+        use_range = hasattr(os, "copy_file_range")
+        use_sendfile = hasattr(os, "sendfile")
+        last_checkpoint = offset
+        while offset < total:
+            count = min(CopyUtils._chunk_size, total - offset)
+            copied = 0
+            if use_range:
+                try:
+                    copied = os.copy_file_range(src_fd, dst_fd, count, offset, offset)
+                except OSError:
+                    # 跨文件系统或内核不支持
+                    use_range = False
+            if not copied and not use_range and use_sendfile:
+                try:
+                    os.lseek(dst_fd, offset, os.SEEK_SET)
+                    copied = os.sendfile(dst_fd, src_fd, offset, count)
+                except OSError:
+                    use_sendfile = False
+            if not copied and not use_range and not use_sendfile:
+                os.lseek(src_fd, offset, os.SEEK_SET)
+                os.lseek(dst_fd, offset, os.SEEK_SET)
+                data = os.read(src_fd, min(count, 8 * 1024 * 1024))
+                copied = os.write(dst_fd, data) if data else 0
+            if not copied:
+                raise IOError(f"复制中断，已复制 {offset} / {total} 字节")
+            offset += copied
+            if offset - last_checkpoint >= CopyUtils._checkpoint_size:
+                os.fsync(dst_fd)
+                CopyUtils.__save_checkpoint(checkpoint, stat, offset)
+                last_checkpoint = offset
+            if progress_callback:
+                progress_callback(offset, total)
+        # 预分配后文件大小可能与源文件不同，截断到实际大小
+        os.ftruncate(dst_fd, total)
+        return offset
+
+    @staticmethod
+    def __load_checkpoint(checkpoint: Path, stat: os.stat_result) -> int:
+        """
+        读取检查点，源文件大小或修改时间变化时从头复制
+        """
+        try:
+            size, mtime, offset = checkpoint.read_text().split(":")
+            if int(size) == stat.st_size and int(mtime) == stat.st_mtime_ns:
+                return int(offset)
+        except (OSError, ValueError):
+            pass
+        return 0
+
+    @staticmethod
+    def __save_checkpoint(checkpoint: Path, stat: os.stat_result, offset: int):
+        """
+        保存检查点：源文件大小、修改时间、已复制偏移
+        """
+        checkpoint.write_text(f"{stat.st_size}:{stat.st_mtime_ns}:{offset}")
@@ -1,10 +1,13 @@
+import time
 from typing import Any, Optional, Union
+from urllib.parse import urlparse
 
 import requests
 import urllib3
 from requests import Response, Session
 from urllib3.exceptions import InsecureRequestWarning
 
+from app.core.metrics import metrics
 from app.log import logger
 
 urllib3.disable_warnings(InsecureRequestWarning)
@@ -70,14 +73,31 @@ class RequestUtils:
         kwargs.setdefault("timeout", self._timeout)
         kwargs.setdefault("verify", False)
         kwargs.setdefault("stream", False)
+        start_time = time.perf_counter() if metrics.enabled else None
         try:
-            return req_method(method, url, **kwargs)
+            response = req_method(method, url, **kwargs)
+            if start_time is not None:
+                self.__record_metrics(url, start_time, error=response.status_code >= 500)
+            return response
         except requests.exceptions.RequestException as e:
             logger.debug(f"请求失败: {e}")
+            if start_time is not None:
+                self.__record_metrics(url, start_time, error=True)
             if raise_exception:
                 raise
             return None
 
+    @staticmethod
+    def __record_metrics(url: str, start_time: float, error: bool):
+        """
+        记录请求耗时及错误数
+        """
+        host = urlparse(url).hostname or ""
+        metrics.observe("mp_http_request_duration_seconds", "外部HTTP请求耗时",
+                        time.perf_counter() - start_time, host=host)
+        if error:
+            metrics.inc("mp_http_request_errors", "外部HTTP请求错误数", host=host)
+
     def get(self, url: str, params: dict = None, **kwargs) -> Optional[str]:
         """
         发送GET请求
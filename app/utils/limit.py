@@ -216,6 +216,113 @@ class WindowRateLimiter(BaseRateLimiter):
             self.call_times.append(current_time)
 
 
+# 令牌桶限流器
+class TokenBucketRateLimiter(BaseRateLimiter):
+    """
+    基于令牌桶的限流器，按固定速率生成令牌，允许一定的突发调用
+    触发限流时令牌生成速率减半，调用成功后逐步恢复，实现自适应降速
+    """
+
+    def __init__(self, rate: float, capacity: int, min_rate: float = None, recover_factor: float = 1.1,
+                 source: str = "", enable_logging: bool = True):
+        """
+        初始化 TokenBucketRateLimiter 实例
+        :param rate: 每秒生成的令牌数
+        :param capacity: 令牌桶容量，即允许的最大突发调用次数
+        :param min_rate: 自适应降速后的最小速率，默认为 rate 的 1/10
+        :param recover_factor: 调用成功后速率的恢复倍数，默认值为 1.1
+        :param source: 业务来源或上下文信息，默认值为 ""
+        :param enable_logging: 是否启用日志记录，默认为 True
+        """
+        super().__init__(source, enable_logging)
+        self.base_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate or rate / 10
+        self.recover_factor = recover_factor
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last_time = time.monotonic()
+
+    @property
+    def reset_on_success(self) -> bool:
+        """
+        调用成功后逐步恢复令牌生成速率
+        """
+        return True
+
+    def __refill(self):
+        """
+        按流逝时间补充令牌，调用方需持有锁
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_time) * self.rate)
+        self.last_time = now
+
+    def can_call(self) -> Tuple[bool, str]:
+        """
+        检查令牌桶中是否有可用令牌
+        :return: 如果允许调用，返回 True 和空消息，否则返回 False 和限流消息
+        """
+        with self.lock:
+            self.__refill()
+            if self.tokens >= 1:
+                return True, ""
+            wait_time = (1 - self.tokens) / self.rate
+            message = f"限流期间，跳过调用，将在 {wait_time:.2f} 秒后允许继续调用"
+            self.log_info(message)
+            return False, self.format_log(message)
+
+    def acquire(self, timeout: float = None) -> bool:
+        """
+        阻塞获取一个令牌
+        :param timeout: 最长等待时间（秒），为 None 时一直等待
+        :return: 是否获取到令牌
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self.lock:
+                self.__refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait_time = (1 - self.tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait_time = min(wait_time, remaining)
+            time.sleep(wait_time)
+
+    def record_call(self):
+        """
+        消耗一个令牌
+        """
+        with self.lock:
+            self.__refill()
+            self.tokens = max(self.tokens - 1, 0.0)
+
+    def reset(self):
+        """
+        逐步恢复令牌生成速率，直到基础速率
+        """
+        with self.lock:
+            if self.rate < self.base_rate:
+                self.rate = min(self.rate * self.recover_factor, self.base_rate)
+                if self.rate == self.base_rate:
+                    self.log_info(f"调用成功，恢复令牌生成速率为 {self.base_rate} 次/秒")
+
+    def trigger_limit(self):
+        """
+        触发限流
+        清空令牌并将令牌生成速率减半，直到最小速率
+        """
+        with self.lock:
+            self.__refill()
+            self.tokens = 0.0
+            self.rate = max(self.rate / 2, self.min_rate)
+            self.log_warning(f"触发限流，令牌生成速率降低为 {self.rate:.2f} 次/秒")
+
+
 # 组合限流器
 class CompositeRateLimiter(BaseRateLimiter):
     """
@@ -1,4 +1,5 @@
 import abc
+import threading
 
 
 class Singleton(abc.ABCMeta, type):
@@ -7,12 +8,21 @@ class Singleton(abc.ABCMeta, type):
     """
 
     _instances: dict = {}
+    # 各类的实例化锁，启动预热在后台线程中进行，避免并发时重复创建实例
+    _locks: dict = {}
+    _locks_lock = threading.Lock()
 
     def __call__(cls, *args, **kwargs):
         key = (cls, args, frozenset(kwargs.items()))
-        if key not in cls._instances:
-            cls._instances[key] = super().__call__(*args, **kwargs)
-        return cls._instances[key]
+        instance = cls._instances.get(key)
+        if instance is not None:
+            return instance
+        with cls._locks_lock:
+            lock = cls._locks.setdefault(cls, threading.RLock())
+        with lock:
+            if key not in cls._instances:
+                cls._instances[key] = super().__call__(*args, **kwargs)
+            return cls._instances[key]
 
 
 class AbstractSingleton(abc.ABC, metaclass=Singleton):
@@ -1,13 +1,12 @@
 import datetime
 import os
 import platform
-import re
 import shutil
 import subprocess
 import sys
-from glob import glob
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
-from typing import List, Optional, Tuple, Union
+from typing import List, Optional, Tuple, Union, Set, Generator
 
 import docker
 import psutil
@@ -162,45 +161,114 @@ class SystemUtils:
         except Exception as err:
             return -1, str(err)
 
+    @staticmethod
+    def __get_suffixes(extensions: Optional[list]) -> Optional[Tuple[str, ...]]:
+        """
+        转换为小写的扩展名元组，用于endswith匹配
+        """
+        if not extensions:
+            return None
+        return tuple(ext.lower() for ext in extensions)
+
+    @staticmethod
+    def __scan_dir(directory: Union[Path, str], suffixes: Optional[Tuple[str, ...]],
+                   exclude_dirs: Optional[Set[str]]) -> Tuple[List[os.DirEntry], List[str]]:
+        """
+        扫描单个目录，返回匹配的文件项和需要继续扫描的子目录
+        """
+        files, dirs = [], []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            if not exclude_dirs or entry.name not in exclude_dirs:
+                                dirs.append(entry.path)
+                        elif entry.is_file():
+                            if not suffixes or entry.name.lower().endswith(suffixes):
+                                files.append(entry)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return files, dirs
+
+    @staticmethod
+    def scan_files(directory: Path, extensions: list = None, min_filesize: int = 0,
+                   recursive: bool = True, exclude_dirs: Set[str] = None,
+                   workers: int = 1) -> Generator[os.DirEntry, None, None]:
+        """
+        使用scandir遍历目录下所有指定扩展名的文件，复用DirEntry中的文件类型和状态信息
+        :param directory: 指定的父目录
+        :param extensions: 需要包含的扩展名列表，例如 ['.mkv', '.mp4']
+        :param min_filesize: 文件最低大小，单位 MB
+        :param recursive: 是否递归查找
+        :param exclude_dirs: 不需要遍历的目录名称，如 {'@eaDir', '@Recycle'}
+        :param workers: 并行扫描子目录的线程数，网络存储等高延迟文件系统上可加快遍历
+        :return: 文件 DirEntry 生成器
+        """
+        suffixes = SystemUtils.__get_suffixes(extensions)
+        min_size = (min_filesize or 0) * 1024 * 1024
+
+        def __matched(_entries: List[os.DirEntry]):
+            if not min_size:
+                yield from _entries
+                return
+            for _entry in _entries:
+                try:
+                    if _entry.stat().st_size >= min_size:
+                        yield _entry
+                except OSError:
+                    continue
+
+        if not recursive:
+            yield from __matched(SystemUtils.__scan_dir(directory, suffixes, exclude_dirs)[0])
+            return
+
+        if workers <= 1:
+            pending = [str(directory)]
+            while pending:
+                files, dirs = SystemUtils.__scan_dir(pending.pop(), suffixes, exclude_dirs)
+                yield from __matched(files)
+                # 保持与递归遍历相同的先后顺序
+                pending.extend(reversed(dirs))
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(SystemUtils.__scan_dir, str(directory), suffixes, exclude_dirs)}
+            while futures:
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, dirs = future.result()
+                    for sub_dir in dirs:
+                        futures.add(executor.submit(SystemUtils.__scan_dir, sub_dir, suffixes, exclude_dirs))
+                    yield from __matched(files)
+
     @staticmethod
     def list_files(directory: Path, extensions: list = None,
-                   min_filesize: int = 0, recursive: bool = True) -> List[Path]:
+                   min_filesize: int = 0, recursive: bool = True,
+                   exclude_dirs: Set[str] = None, workers: int = 1) -> List[Path]:
         """
         获取目录下所有指定扩展名的文件（包括子目录）
         :param directory: 指定的父目录
         :param extensions: 需要包含的扩展名列表，例如 ['mkv', 'mp4']
         :param min_filesize: 文件最低大小，单位 MB
         :param recursive: 是否递归查找，可选参数，默认 True
+        :param exclude_dirs: 不需要遍历的目录名称
+        :param workers: 并行扫描子目录的线程数
         :return: 文件 Path 列表
         """
-
-        if not min_filesize:
-            min_filesize = 0
-
         if not directory.exists():
             return []
 
         if directory.is_file():
             return [directory]
 
-        if not min_filesize:
-            min_filesize = 0
-
-        files = []
-        if extensions:
-            pattern = r".*(" + "|".join(extensions) + ")$"
-        else:
-            pattern = r".*"
-
-        # 遍历目录及子目录
-        for matched_glob in glob(str(directory / '**'), recursive=recursive, include_hidden=True):
-            path = Path(matched_glob)
-            if path.is_file() \
-                    and re.match(pattern, path.name, re.IGNORECASE) \
-                    and path.stat().st_size >= min_filesize * 1024 * 1024:
-                files.append(path)
-
-        return files
+        return [Path(entry.path) for entry in SystemUtils.scan_files(directory, extensions=extensions,
+                                                                     min_filesize=min_filesize,
+                                                                     recursive=recursive,
+                                                                     exclude_dirs=exclude_dirs,
+                                                                     workers=workers)]
 
     @staticmethod
     def exits_files(directory: Path, extensions: list, min_filesize: int = 0, recursive: bool = True) -> bool:
@@ -213,31 +281,39 @@ class SystemUtils:
         :param recursive: 是否递归查找，可选参数，默认 True
         :return: True存在 False不存在
         """
-
-        if not min_filesize:
-            min_filesize = 0
-
         if not directory.exists():
             return False
 
         if directory.is_file():
             return True
 
-        if not min_filesize:
-            min_filesize = 0
-
-        pattern = r".*(" + "|".join(extensions) + ")$"
-
-        # 遍历目录及子目录
-        for matched_glob in glob(str(directory / '**'), recursive=recursive, include_hidden=True):
-            path = Path(matched_glob)
-            if path.is_file() \
-                    and re.match(pattern, path.name, re.IGNORECASE) \
-                    and path.stat().st_size >= min_filesize * 1024 * 1024:
-                return True
+        for _ in SystemUtils.scan_files(directory, extensions=extensions,
+                                        min_filesize=min_filesize, recursive=recursive):
+            return True
 
         return False
 
+    @staticmethod
+    def list_sub_entries(directory: Path) -> Tuple[List[os.DirEntry], List[os.DirEntry]]:
+        """
+        列出当前目录下的所有子目录和文件（不递归），返回DirEntry以复用其中的状态信息
+        :return: 子目录列表, 文件列表
+        """
+        dirs, files = [], []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            dirs.append(entry)
+                        elif entry.is_file():
+                            files.append(entry)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return dirs, files
+
     @staticmethod
     def list_sub_files(directory: Path, extensions: list) -> List[Path]:
         """
@@ -249,15 +325,7 @@ class SystemUtils:
         if directory.is_file():
             return [directory]
 
-        files = []
-        pattern = r".*(" + "|".join(extensions) + ")$"
-
-        # 遍历目录
-        for path in directory.iterdir():
-            if path.is_file() and re.match(pattern, path.name, re.IGNORECASE):
-                files.append(path)
-
-        return files
+        return SystemUtils.list_files(directory, extensions=extensions, recursive=False)
 
     @staticmethod
     def list_sub_directory(directory: Path) -> List[Path]:
@@ -270,14 +338,7 @@ class SystemUtils:
         if directory.is_file():
             return []
 
-        dirs = []
-
-        # 遍历目录
-        for path in directory.iterdir():
-            if path.is_dir():
-                dirs.append(path)
-
-        return dirs
+        return [Path(entry.path) for entry in SystemUtils.list_sub_entries(directory)[0]]
 
     @staticmethod
     def list_sub_file(directory: Path) -> List[Path]:
@@ -290,14 +351,7 @@ class SystemUtils:
         if directory.is_file():
             return [directory]
 
-        items = []
-
-        # 遍历目录
-        for path in directory.iterdir():
-            if path.is_file():
-                items.append(path)
-
-        return items
+        return [Path(entry.path) for entry in SystemUtils.list_sub_entries(directory)[1]]
 
     @staticmethod
     def get_directory_size(path: Path) -> float:
@@ -315,9 +369,11 @@ class SystemUtils:
         if path.is_file():
             return path.stat().st_size
         total_size = 0
-        for path in path.glob('**/*'):
-            if path.is_file():
-                total_size += path.stat().st_size
+        for entry in SystemUtils.scan_files(path):
+            try:
+                total_size += entry.stat().st_size
+            except OSError:
+                continue
 
         return total_size
 
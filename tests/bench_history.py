@@ -0,0 +1,137 @@
+"""
+整理/下载历史分页及搜索基准测试：构造合成数据库，对比 OFFSET/LIKE/COUNT 与 游标分页/全文索引/维护计数 的耗时
+运行：python -m tests.bench_history [--rows 500000] [--page-size 30] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# 使用独立的配置目录，避免污染用户数据，需在导入app之前设置
+os.environ.setdefault("CONFIG_DIR", tempfile.mkdtemp(prefix="mp_bench_"))
+os.environ.setdefault("LOG_LEVEL", "warning")
+
+from sqlalchemy import func, or_, text
+
+from app.db import ScopedSession
+from app.db.init import init_db, update_db
+from app.db.models.downloadhistory import DownloadHistory
+from app.db.models.transferhistory import TransferHistory
+from tests.benchmark import compare
+
+TITLES = ["羊毛战记", "沙丘2", "繁花", "Silo", "The Last of Us", "Shogun", "庆余年", "Fallout", "三体", "Severance"]
+
+
+def build_database(rows: int):
+    """
+    批量写入合成的整理及下载记录，触发器同步维护全文索引和计数
+    """
+    init_db()
+    update_db()
+    db = ScopedSession()
+    start = datetime(2020, 1, 1)
+    batch_th, batch_dh = [], []
+    rnd = random.Random(42)
+    for i in range(rows):
+        title = f"{rnd.choice(TITLES)} {i % 997}"
+        season, episode = i % 5 + 1, i % 24 + 1
+        name = f"{title}.S{season:02d}E{episode:02d}.2160p.WEB-DL.H265-GROUP{i % 31}.mkv"
+        date = (start + timedelta(minutes=i * 3 + rnd.randint(0, 2))).strftime("%Y-%m-%d %H:%M:%S")
+        batch_th.append({"src": f"/downloads/tv/{name}", "dest": f"/media/tv/{title}/Season {season}/{name}",
+                         "title": title, "type": "电视剧", "mode": "link", "status": i % 50 != 0,
+                         "date": date, "seasons": f"S{season:02d}", "episodes": f"E{episode:02d}"})
+        batch_dh.append({"path": f"/downloads/tv/{name}", "title": title, "type": "电视剧",
+                         "download_hash": f"{i:040x}", "date": date})
+        if len(batch_th) >= 10000:
+            db.execute(TransferHistory.__table__.insert(), batch_th)
+            db.execute(DownloadHistory.__table__.insert(), batch_dh)
+            db.commit()
+            batch_th, batch_dh = [], []
+    if batch_th:
+        db.execute(TransferHistory.__table__.insert(), batch_th)
+        db.execute(DownloadHistory.__table__.insert(), batch_dh)
+        db.commit()
+    db.execute(text("ANALYZE"))
+    db.commit()
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="历史记录分页及搜索基准测试")
+    parser.add_argument("--rows", type=int, default=500000, help="合成记录数")
+    parser.add_argument("--page-size", type=int, default=30, help="每页记录数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例重复次数")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    build_database(args.rows)
+    print(f"构造 {args.rows} 条记录耗时 {time.perf_counter() - start:.1f}s，数据库：{os.environ['CONFIG_DIR']}")
+
+    db = ScopedSession()
+    size = args.page_size
+    deep_page = args.rows // size - 1
+    # 深翻页时的游标，取深页前一条记录
+    anchor = db.query(TransferHistory).order_by(
+        TransferHistory.date.desc(), TransferHistory.id.desc()
+    ).offset((deep_page - 1) * size + size - 1).first()
+    cursor = TransferHistory.get_cursor(anchor)
+    dh_cursor = (deep_page - 1) * size
+
+    # 原实现的查询方式
+    def old_page(page: int):
+        db.query(TransferHistory).order_by(
+            TransferHistory.date.desc()
+        ).offset((page - 1) * size).limit(size).all()
+
+    def old_search_query(title: str):
+        return db.query(TransferHistory).filter(or_(
+            TransferHistory.title.like(f'%{title}%'),
+            TransferHistory.src.like(f'%{title}%'),
+            TransferHistory.dest.like(f'%{title}%'),
+        ))
+
+    def old_search(title: str):
+        old_search_query(title).order_by(TransferHistory.date.desc()).limit(size).all()
+
+    def old_search_count(title: str):
+        old_search_query(title).with_entities(func.count(TransferHistory.id)).first()
+
+    def old_download_page(page: int):
+        db.query(DownloadHistory).offset((page - 1) * size).limit(size).all()
+
+    cases = [
+        ("整理记录 第1页", lambda: old_page(1),
+         lambda: TransferHistory.list_by_page(db, page=1, count=size)),
+        (f"整理记录 第{deep_page}页", lambda: old_page(deep_page),
+         lambda: TransferHistory.list_by_page(db, page=deep_page, count=size)),
+        (f"整理记录 第{deep_page}页（游标）", lambda: old_page(deep_page),
+         lambda: TransferHistory.list_by_page(db, count=size, cursor=cursor)),
+        ("整理记录 总数",
+         lambda: db.query(func.count(TransferHistory.id)).first(),
+         lambda: TransferHistory.count(db)),
+        ("整理记录 失败数",
+         lambda: db.query(func.count(TransferHistory.id)).filter(TransferHistory.status.is_(False)).first(),
+         lambda: TransferHistory.count(db, status=False)),
+        ("搜索 GROUP7 第1页", lambda: old_search("GROUP7"),
+         lambda: TransferHistory.list_by_title(db, title="GROUP7", count=size)),
+        ("搜索 GROUP7 总数", lambda: old_search_count("GROUP7"),
+         lambda: TransferHistory.count_by_title(db, title="GROUP7")),
+        ("搜索 羊毛战记 123 第1页", lambda: old_search("羊毛战记 123"),
+         lambda: TransferHistory.list_by_title(db, title="羊毛战记 123", count=size)),
+        ("搜索 羊毛战记 123 总数", lambda: old_search_count("羊毛战记 123"),
+         lambda: TransferHistory.count_by_title(db, title="羊毛战记 123")),
+        (f"下载记录 第{deep_page}页",
+         lambda: old_download_page(deep_page),
+         lambda: DownloadHistory.list_by_page(db, page=deep_page, count=size)),
+        (f"下载记录 第{deep_page}页（游标）",
+         lambda: old_download_page(deep_page),
+         lambda: DownloadHistory.list_by_page(db, count=size, cursor=dh_cursor)),
+    ]
+    compare(cases, args.repeat, precision=2)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+目录遍历基准测试：构造合成媒体库目录，对比 glob+正则+stat 与 scandir 遍历的耗时
+运行：python -m tests.bench_listfiles [--files 200000] [--workers 4] [--repeat 3] [--root DIR]
+"""
+import argparse
+import re
+import shutil
+import tempfile
+import time
+from glob import glob
+from pathlib import Path
+from typing import List
+
+from app.core.config import settings
+from app.utils.system import SystemUtils
+from tests.benchmark import compare
+
+EXTS = [".mkv", ".mp4", ".nfo", ".jpg", ".srt", ".ass"]
+
+
+def build_tree(root: Path, files: int):
+    """
+    构造 剧集/季/文件 三层结构的合成媒体库，每季附带一个@eaDir缩略图目录
+    """
+    per_season = 50
+    seasons = 5
+    shows = max(1, files // (per_season * seasons))
+    count = 0
+    for show in range(shows):
+        for season in range(1, seasons + 1):
+            season_dir = root / f"Show {show}" / f"Season {season}"
+            (season_dir / "@eaDir").mkdir(parents=True, exist_ok=True)
+            (season_dir / "@eaDir" / "SYNOPHOTO_THUMB_M.jpg").touch()
+            for episode in range(per_season):
+                name = f"Show {show} S{season:02d}E{episode + 1:02d}{EXTS[episode % len(EXTS)]}"
+                (season_dir / name).touch()
+                count += 1
+    return count
+
+
+def old_list_files(directory: Path, extensions: list = None, min_filesize: int = 0) -> List[Path]:
+    """
+    原 SystemUtils.list_files 的实现
+    """
+    files = []
+    pattern = r".*(" + "|".join(extensions) + ")$" if extensions else r".*"
+    for matched_glob in glob(str(directory / '**'), recursive=True, include_hidden=True):
+        path = Path(matched_glob)
+        if path.is_file() \
+                and re.match(pattern, path.name, re.IGNORECASE) \
+                and path.stat().st_size >= min_filesize * 1024 * 1024:
+            files.append(path)
+    return files
+
+
+def old_walk(directory: Path) -> list:
+    """
+    原本地存储逐级浏览的实现：每级目录分别列出子目录和文件，每个文件两次stat
+    """
+    result = []
+    for path in directory.iterdir():
+        if path.is_dir():
+            path.stat()
+            result.extend(old_walk(path))
+    for path in directory.iterdir():
+        if path.is_file():
+            result.append((str(path), path.stat().st_size, path.stat().st_mtime))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="目录遍历基准测试")
+    parser.add_argument("--files", type=int, default=200000, help="合成文件数")
+    parser.add_argument("--workers", type=int, default=4, help="并行扫描线程数")
+    parser.add_argument("--repeat", type=int, default=3, help="每个用例重复次数")
+    parser.add_argument("--root", type=str, default=None, help="构造目录的位置，可指定到网络挂载目录")
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="mp_bench_", dir=args.root))
+    try:
+        start = time.perf_counter()
+        count = build_tree(root, args.files)
+        print(f"构造 {count} 个文件耗时 {time.perf_counter() - start:.1f}s，目录：{root}")
+
+        exts = settings.RMT_MEDIAEXT
+        expected = sorted(map(str, old_list_files(root, exts)))
+        assert sorted(map(str, SystemUtils.list_files(root, exts))) == expected
+        assert sorted(map(str, SystemUtils.list_files(root, exts, workers=args.workers))) == expected
+
+        cases = [
+            ("list_files 媒体文件",
+             lambda: old_list_files(root, exts),
+             lambda: SystemUtils.list_files(root, exts)),
+            (f"list_files 媒体文件（{args.workers}线程）",
+             lambda: old_list_files(root, exts),
+             lambda: SystemUtils.list_files(root, exts, workers=args.workers)),
+            ("list_files 排除@eaDir",
+             lambda: old_list_files(root, exts),
+             lambda: SystemUtils.list_files(root, exts, exclude_dirs={"@eaDir"})),
+            ("list_files 最小1MB",
+             lambda: old_list_files(root, exts, min_filesize=1),
+             lambda: SystemUtils.list_files(root, exts, min_filesize=1)),
+            ("目录大小",
+             lambda: sum(p.stat().st_size for p in root.glob('**/*') if p.is_file()),
+             lambda: SystemUtils.get_directory_size(root)),
+            ("递归浏览文件项",
+             lambda: old_walk(root),
+             lambda: [(e.path, e.stat().st_size, e.stat().st_mtime) for e in SystemUtils.scan_files(root)]),
+            (f"递归浏览文件项（{args.workers}线程）",
+             lambda: old_walk(root),
+             lambda: [(e.path, e.stat().st_size, e.stat().st_mtime)
+                      for e in SystemUtils.scan_files(root, workers=args.workers)]),
+        ]
+        compare(cases, args.repeat, width=28)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
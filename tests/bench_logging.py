@@ -0,0 +1,132 @@
+"""
+日志输出基准测试：对比 inspect.stack 查找调用者+同步写文件 与 逐帧查找并缓存+队列后台批量写入 的每秒日志数
+运行：python -m tests.bench_logging [--calls 2000] [--depth 30] [--repeat 3]
+"""
+import argparse
+import inspect
+import logging
+import os
+import sys
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Callable
+
+# 使用独立的配置目录，避免污染用户数据，需在导入app之前设置
+os.environ.setdefault("CONFIG_DIR", tempfile.mkdtemp(prefix="mp_bench_"))
+os.environ.setdefault("LOG_LEVEL", "info")
+
+from app.log import logger, log_settings, LoggerManager, CustomFormatter
+from tests.benchmark import compare
+
+
+def old_get_caller():
+    """
+    原 LoggerManager.__get_caller 的实现
+    """
+    caller_name = None
+    plugin_name = None
+    for i in inspect.stack()[3:]:
+        filepath = Path(i.filename)
+        parts = filepath.parts
+        if not caller_name:
+            if parts[-1] == "__init__.py":
+                caller_name = parts[-2]
+            else:
+                caller_name = parts[-1]
+        if "app" in parts:
+            if not plugin_name and "plugins" in parts:
+                plugin_name = parts[parts.index("plugins") + 1]
+                if plugin_name == "__init__.py":
+                    plugin_name = "plugin"
+                break
+            if "main.py" in parts:
+                break
+        elif len(parts) != 1:
+            break
+    return caller_name or "log.py", plugin_name
+
+
+def build_old_logger() -> logging.Logger:
+    """
+    原实现的终端及文件日志，同步写入
+    """
+    _logger = logging.getLogger("bench_old")
+    _logger.setLevel(logging.INFO)
+    _logger.propagate = False
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(CustomFormatter(log_settings.LOG_CONSOLE_FORMAT))
+    _logger.addHandler(console_handler)
+    file_handler = RotatingFileHandler(filename=log_settings.LOG_PATH / "bench_old.log", mode="a",
+                                       maxBytes=log_settings.LOG_MAX_FILE_SIZE_BYTES,
+                                       backupCount=log_settings.LOG_BACKUP_COUNT, encoding="utf-8")
+    file_handler.setFormatter(CustomFormatter(log_settings.LOG_FILE_FORMAT))
+    _logger.addHandler(file_handler)
+    return _logger
+
+
+def nested(depth: int, func: Callable):
+    """
+    在指定调用深度下执行，模拟业务代码中的调用栈
+    """
+    if depth <= 0:
+        return func()
+    return nested(depth - 1, func)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志输出基准测试")
+    parser.add_argument("--calls", type=int, default=2000, help="每轮日志条数")
+    parser.add_argument("--depth", type=int, default=30, help="调用栈深度")
+    parser.add_argument("--repeat", type=int, default=3, help="每个用例重复次数")
+    args = parser.parse_args()
+
+    log_settings.LOG_PATH.mkdir(parents=True, exist_ok=True)
+    # 终端输出丢弃，只比较调用开销及文件写入
+    sys.stderr = open(os.devnull, "w")
+    old_logger = build_old_logger()
+
+    def old_logger_method(method: str, msg: str):
+        caller_name, _ = old_get_caller()
+        getattr(old_logger, method)(f"{caller_name} - {msg}")
+
+    def old_info(msg: str):
+        old_logger_method("info", msg)
+
+    def old_debug(msg: str):
+        old_logger_method("debug", msg)
+
+    def old_run():
+        for i in range(args.calls):
+            old_info(f"整理完成 {i}")
+
+    def old_debug_run():
+        for i in range(args.calls):
+            old_debug(f"调试信息 {i}")
+
+    def new_run():
+        for i in range(args.calls):
+            logger.info(f"整理完成 {i}")
+
+    def new_drain():
+        new_run()
+        # 等待后台线程写完
+        while not LoggerManager._queue.empty():
+            time.sleep(0.001)
+
+    def new_debug():
+        for i in range(args.calls):
+            logger.debug(f"调试信息 {i}")
+
+    cases = [
+        ("info（调用方）", lambda: nested(args.depth, old_run), lambda: nested(args.depth, new_run)),
+        ("info（含写入完成）", lambda: nested(args.depth, old_run), lambda: nested(args.depth, new_drain)),
+        ("debug（级别过滤）", lambda: nested(args.depth, old_debug_run), lambda: nested(args.depth, new_debug)),
+    ]
+    print(f"每轮 {args.calls} 条，调用栈深度 {args.depth}", file=sys.stdout)
+    compare(cases, args.repeat, width=20, calls=args.calls)
+
+
+if __name__ == "__main__":
+    main()
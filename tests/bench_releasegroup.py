@@ -0,0 +1,122 @@
+"""
+制作组及自定义识别词匹配基准测试：对比拼接正则/逐次编译与自动机/预编译的耗时
+运行：python -m tests.bench_releasegroup [--titles 5000] [--custom 200] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import tempfile
+from typing import List
+
+# 使用独立的配置目录，避免污染用户数据，需在导入app之前设置
+os.environ.setdefault("CONFIG_DIR", tempfile.mkdtemp(prefix="mp_bench_"))
+os.environ.setdefault("LOG_LEVEL", "warning")
+
+import regex as re
+
+from app.core.meta.releasegroup import ReleaseGroupsMatcher
+from app.core.meta.words import WordsMatcher
+from app.db.init import init_db
+from app.db.systemconfig_oper import SystemConfigOper
+from app.schemas.types import SystemConfigKey
+from tests.benchmark import compare, print_header
+from tests.cases.meta import meta_cases
+
+SAMPLE_GROUPS = ["CHDWEB", "HDSky", "FRDS", "MTeamTV", "PTerWEB", "iNT-TLF", "CMCTV", "ADWeb", "OurTV",
+                 "Nekomoe kissaten", "LoliHouse", "喵萌奶茶屋", "TrollHD ", "XXX", "GROUP", "HDCTV"]
+
+
+def old_match(title: str, custom_groups: List[str]) -> str:
+    """
+    原 ReleaseGroupsMatcher.match 的实现
+    """
+    release_groups = '|'.join(group for groups in ReleaseGroupsMatcher.RELEASE_GROUPS.values() for group in groups)
+    if custom_groups:
+        groups = f"{release_groups}|{'|'.join(custom_groups)}"
+    else:
+        groups = release_groups
+    title = f"{title} "
+    groups_re = re.compile(r"(?<=[-@\[￡【&])(?:%s)(?=[@.\s\]\[】&])" % groups, re.I)
+    unique_groups = []
+    for item in re.findall(groups_re, title):
+        if item not in unique_groups:
+            unique_groups.append(item)
+    return "@".join(unique_groups)
+
+
+def old_prepare(title: str, words: List[str]):
+    """
+    原 WordsMatcher.prepare 的实现（仅替换词和屏蔽词）
+    """
+    appley_words = []
+    for word in words:
+        if not word or word.startswith("#"):
+            continue
+        if word.count(" => "):
+            strings = word.split(" => ")
+            replaced, replace = strings[0], strings[1]
+        else:
+            replaced, replace = word, ""
+        if re.findall(r'%s' % replaced, title):
+            title = re.sub(r'%s' % replaced, r'%s' % replace, title)
+            appley_words.append(word)
+    return title, appley_words
+
+
+def build_titles(count: int, custom_groups: List[str]) -> List[str]:
+    """
+    构造合成标题，包含内置组、自定义组及不含制作组的标题
+    """
+    rnd = random.Random(42)
+    groups = SAMPLE_GROUPS + [g.replace("\\d+", "42") for g in custom_groups[::10]]
+    titles = [case["title"] for case in meta_cases if case.get("title")]
+    while len(titles) < count:
+        season, episode = rnd.randint(1, 9), rnd.randint(1, 30)
+        name = rnd.choice(["The.Long.Season", "Silo", "繁花", "Shogun", "三体"])
+        suffix = "@".join(rnd.sample(groups, rnd.randint(0, 2)))
+        sep = rnd.choice(["-", "@", "[", "&"])
+        titles.append(f"{name}.S{season:02d}E{episode:02d}.2160p.WEB-DL.H265.DDP5.1{sep}{suffix}.mkv"
+                      if suffix else f"{name}.S{season:02d}E{episode:02d}.1080p.BluRay.x264")
+    return titles
+
+
+def main():
+    parser = argparse.ArgumentParser(description="制作组及自定义识别词匹配基准测试")
+    parser.add_argument("--titles", type=int, default=5000, help="合成标题数")
+    parser.add_argument("--custom", type=int, default=200, help="自定义制作组及识别词数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例重复次数")
+    args = parser.parse_args()
+
+    init_db()
+    # 自定义组中约十分之一为正则
+    custom_groups = [f"Custom{i}\\d+" if i % 10 == 0 else f"Custom(?:Grp|Web){i}" if i % 10 == 1
+                     else f"CustomGroup{i}" for i in range(args.custom)]
+    custom_words = [f"Custom{i} => C{i}" if i % 2 else f"BLOCK{i}\\.?" for i in range(args.custom)]
+    titles = build_titles(args.titles, custom_groups)
+    systemconfig = SystemConfigOper()
+    matcher = ReleaseGroupsMatcher()
+    words_matcher = WordsMatcher()
+
+    cases = []
+    for name, groups in (("制作组（内置）", []), (f"制作组（{args.custom}个自定义）", custom_groups)):
+        systemconfig.set(SystemConfigKey.CustomReleaseGroups, groups)
+        for title in titles:
+            assert matcher.match(title) == old_match(title, groups), title
+        cases.append((name, lambda g=groups: [old_match(t, g) for t in titles],
+                      lambda: [matcher.match(t) for t in titles], groups))
+    for title in titles:
+        assert words_matcher.prepare(title, custom_words) == old_prepare(title, custom_words), title
+    cases.append((f"识别词（{args.custom}个）", lambda: [old_prepare(t, custom_words) for t in titles],
+                  lambda: [words_matcher.prepare(t, custom_words) for t in titles], None))
+
+    print(f"{len(titles)} 个标题")
+    print_header()
+    for name, old, new, groups in cases:
+        if groups is not None:
+            systemconfig.set(SystemConfigKey.CustomReleaseGroups, groups)
+        compare([(name, old, new)], args.repeat, header=False)
+    systemconfig.delete(SystemConfigKey.CustomReleaseGroups)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,501 @@
+"""
+搜索 → 过滤 → 匹配 → 排序 全流程离线基准测试
+回放录制的站点页面及TMDB数据，不访问网络，驱动真实的 SearchChain.process 及 SubscribeChain.match，
+输出各规模下的吞吐量、P95耗时及峰值内存，结果为JSON，便于不同版本间对比
+运行：python -m tests.bench_search --torrents 1000,10000,50000 --subscribes 10,100,500 --rules 1,4,16 \
+        --output bench.json [--baseline last.json]
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from unittest import mock
+from urllib.parse import urlparse
+
+# 使用独立的配置目录，避免污染用户数据，需在导入app之前设置
+os.environ.setdefault("CONFIG_DIR", tempfile.mkdtemp(prefix="mp_bench_"))
+os.environ.setdefault("LOG_LEVEL", "warning")
+
+import psutil
+import requests
+
+from app.chain.search import SearchChain
+from app.chain.subscribe import SubscribeChain
+from app.core.context import Context, MediaInfo, TorrentInfo
+from app.core.meta import MetaBase
+from app.core.metainfo import MetaInfo
+from app.core.module import ModuleManager
+from app.db.init import init_db
+from app.db.subscribe_oper import SubscribeOper
+from app.db.systemconfig_oper import SystemConfigOper
+from app.modules import _ModuleBase
+from app.modules.filter import FilterModule
+from app.modules.indexer import IndexerModule
+from app.schemas.types import MediaType, ModuleType, SystemConfigKey
+from app.utils.http import RequestUtils
+from app.utils.string import StringUtils
+
+FIXTURES = Path(__file__).parent / "cases" / "bench"
+
+# 优先级规则，规则组取前N-1级，最后一级为兜底规则
+RULE_LEVELS = [
+    "SPECSUB & 4K & !BLU & !REMUX & !DOLBY & HDR & !3D",
+    "CNSUB & 4K & !BLU & !REMUX & !DOLBY & HDR & !3D",
+    "SPECSUB & 4K & WEBDL & !DOLBY & !3D",
+    "CNSUB & 4K & WEBDL & !DOLBY & !3D",
+    "4K & !BLU & !REMUX & !DOLBY & HDR & !3D",
+    "4K & !BLURAY & !REMUX & !DOLBY & !3D",
+    "SPECSUB & 1080P & !BLU & !REMUX & !WEBDL & !DOLBY & !3D",
+    "CNSUB & 1080P & !BLU & !REMUX & !WEBDL & !DOLBY & !3D",
+    "SPECSUB & 1080P & WEBDL & !DOLBY & HDR & !3D",
+    "CNSUB & 1080P & WEBDL & !DOLBY & !3D",
+    "1080P & !BLU & !REMUX & !DOLBY & HDR & !3D",
+    "1080P & !BLU & !REMUX & !DOLBY & !3D",
+    "REMUX & (HDR | DOLBY)",
+    "BLURAY & (H265 | H264)",
+    "720P & (CNSUB | CNVOI)",
+    "720P",
+]
+FALLBACK_LEVEL = "4K | 1080P | 720P"
+
+# 复制种子时轮换的分辨率及制作组
+RESOLUTIONS = ["2160p", "1080p", "720p"]
+GROUPS = ["FLUX", "NTb", "CHDWEB", "HHWEB", "WiKi", "FRDS", "ADWeb"]
+
+
+class ReplaySites:
+    """
+    回放录制的站点页面，按每个站点需要的种子数复制种子行，其它请求一律拒绝
+    """
+
+    def __init__(self, sites: int, per_site: int):
+        self.indexer: dict = json.loads((FIXTURES / "indexer.json").read_text(encoding="utf-8"))
+        html = (FIXTURES / "torrents.html").read_text(encoding="utf-8")
+        rows = list(re.finditer(r'<tr>\n<td class="rowfollow nowrap".*?\n</tr>(?!</table>)', html, re.S))
+        self._head = html[:rows[0].start()]
+        self._tail = html[rows[-1].end():]
+        self._rows = [row.group(0) for row in rows]
+        self.indexers = [self.__make_indexer(i, per_site) for i in range(sites)]
+        self._pages: Dict[str, bytes] = {
+            urlparse(indexer["domain"]).netloc: self.__make_page(i, per_site)
+            for i, indexer in enumerate(self.indexers)
+        }
+
+    def __make_indexer(self, index: int, per_site: int) -> dict:
+        indexer = copy.deepcopy(self.indexer)
+        indexer.update({
+            "id": index + 1,
+            "name": f"{indexer['name']}{index + 1}",
+            "domain": f"https://pt.bench{index + 1}.test/",
+            "result_num": per_site,
+            "pri": index + 1,
+        })
+        return indexer
+
+    @staticmethod
+    def __vary_title(title: str, k: int) -> str:
+        """
+        按序号变换集数、分辨率及制作组，生成不同的种子名称
+        """
+        if not k:
+            return title
+        title = re.sub(r"S(\d{2})E(\d{2})",
+                       lambda m: f"S{m.group(1)}E{(int(m.group(2)) + k - 1) % 10 + 1:02d}", title)
+        title = re.sub(r"2160p|1080p|720p", RESOLUTIONS[k % len(RESOLUTIONS)], title)
+        return re.sub(r"-[A-Za-z0-9]+$", f"-{GROUPS[k % len(GROUPS)]}{k // len(GROUPS)}", title)
+
+    def __make_page(self, site: int, count: int) -> bytes:
+        rows = []
+        for n in range(count):
+            row = self._rows[n % len(self._rows)]
+            k = n // len(self._rows) + site
+            title = re.search(r'title="([^"]+)"', row).group(1)
+            varied = self.__vary_title(title, k)
+            row = row.replace(title, varied)
+            row = re.sub(r"id=\d+", f"id={site * 1000000 + n}", row)
+            rows.append(row)
+        return (self._head + "\n".join(rows) + self._tail).encode("utf-8")
+
+    def get_res(self, url: str) -> requests.Response:
+        """
+        返回录制的页面
+        """
+        page = self._pages.get(urlparse(url).netloc)
+        if page is None:
+            raise RuntimeError(f"基准测试不允许访问网络：{url}")
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.encoding = "utf-8"
+        response._content = page
+        return response
+
+    def patch(self):
+        """
+        替换 RequestUtils.get_res，所有请求均由回放页面响应
+        """
+        return mock.patch.object(RequestUtils, "get_res",
+                                 lambda _request, url, *args, **kwargs: self.get_res(url))
+
+    def get_indexers(self) -> List[dict]:
+        return self.indexers
+
+    @staticmethod
+    def check(_domain: str) -> Tuple[bool, str]:
+        return False, ""
+
+
+class ReplayMediaModule(_ModuleBase):
+    """
+    回放TMDB数据的媒体识别模块
+    """
+
+    def __init__(self, medias: List[dict]):
+        super().__init__()
+        self._by_id = {media["id"]: media for media in medias}
+        self._by_name = {}
+        for media in medias:
+            for name in [media.get("name"), media.get("title"), media.get("original_name"),
+                         media.get("original_title")] + (media.get("names") or []):
+                if name:
+                    self._by_name.setdefault(StringUtils.clear_upper(name), media)
+
+    def init_module(self) -> None:
+        pass
+
+    def init_setting(self) -> Tuple[str, bool]:
+        pass
+
+    @staticmethod
+    def get_name() -> str:
+        return "TMDB回放"
+
+    @staticmethod
+    def get_type() -> ModuleType:
+        return ModuleType.MediaRecognize
+
+    @staticmethod
+    def get_priority() -> int:
+        return 0
+
+    def stop(self):
+        pass
+
+    def test(self):
+        pass
+
+    def recognize_media(self, meta: MetaBase = None, mtype: MediaType = None, tmdbid: int = None,
+                        **kwargs) -> Optional[MediaInfo]:
+        if tmdbid:
+            info = self._by_id.get(tmdbid)
+        elif meta:
+            info = self._by_name.get(StringUtils.clear_upper(meta.cn_name)) \
+                   or self._by_name.get(StringUtils.clear_upper(meta.en_name))
+        else:
+            info = None
+        return MediaInfo(tmdb_info=copy.deepcopy(info)) if info else None
+
+
+class StageTimer:
+    """
+    统计各阶段的调用耗时
+    """
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.samples[name].append(time.perf_counter() - start)
+
+        return wrapper
+
+    def summary(self) -> Dict[str, dict]:
+        return {name: {"calls": len(values),
+                       "total_s": round(sum(values), 4),
+                       "p95_ms": round(p95(values) * 1000, 3)}
+                for name, values in self.samples.items()}
+
+
+class PeakRss:
+    """
+    后台采样进程常驻内存，记录峰值
+    """
+
+    def __init__(self, interval: float = 0.02):
+        self._process = psutil.Process()
+        self._interval = interval
+        self._event = threading.Event()
+        self._thread = threading.Thread(target=self.__sample, daemon=True)
+        self.peak = 0
+
+    def __sample(self):
+        while not self._event.is_set():
+            self.peak = max(self.peak, self._process.memory_info().rss)
+            self._event.wait(self._interval)
+
+    def __enter__(self):
+        self.peak = self._process.memory_info().rss
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._event.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._process.memory_info().rss)
+
+
+def p95(values: List[float]) -> float:
+    if not values:
+        return 0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=20, method="inclusive")[-1]
+
+
+def load_medias(count: int) -> List[dict]:
+    """
+    加载录制的TMDB数据，数量不足时以录制数据为模板生成不同ID的媒体
+    """
+    medias: List[dict] = json.loads((FIXTURES / "tmdb.json").read_text(encoding="utf-8"))
+    templates = list(medias)
+    for i in range(len(medias), count):
+        media = copy.deepcopy(templates[i % len(templates)])
+        media["id"] = 900000 + i
+        media["names"] = []
+        media["external_ids"] = {}
+        if media["media_type"] == "tv":
+            media["name"] = media["original_name"] = f"基准剧集{i}"
+        else:
+            media["title"] = media["original_title"] = f"基准电影{i}"
+        medias.append(media)
+    return medias
+
+
+def set_rule_group(levels: int) -> List[str]:
+    """
+    写入指定级数的过滤规则组，并设置为搜索及订阅规则组
+    """
+    name = f"基准规则{levels}"
+    rule_string = " > ".join([RULE_LEVELS[i % len(RULE_LEVELS)] for i in range(levels - 1)] + [FALLBACK_LEVEL])
+    systemconfig = SystemConfigOper()
+    systemconfig.set(SystemConfigKey.UserFilterRuleGroups, [{"name": name, "rule_string": rule_string}])
+    systemconfig.set(SystemConfigKey.SearchFilterRuleGroups, [name])
+    systemconfig.set(SystemConfigKey.SubscribeFilterRuleGroups, [name])
+    return [name]
+
+
+def setup_modules(medias: List[dict]):
+    """
+    只加载索引、过滤及TMDB回放模块
+    """
+    with mock.patch.object(ModuleManager, "load_modules"):
+        manager = ModuleManager()
+    modules = {}
+    for module in [IndexerModule(), FilterModule(), ReplayMediaModule(medias)]:
+        module.init_module()
+        modules[module.__class__.__name__] = module
+    manager._running_modules = modules
+
+
+def bench_search(replay: ReplaySites, torrents: int, levels: int, repeat: int) -> dict:
+    """
+    SearchChain.process：站点搜索、过滤规则、匹配、排序
+    """
+    medias = load_medias(0)
+    rule_groups = set_rule_group(levels)
+    chain = SearchChain()
+    chain.siteshelper = replay
+    timer = StageTimer()
+    helper = chain.torrenthelper
+    durations, results = [], 0
+    with replay.patch(), \
+            mock.patch.object(chain, "search_torrents", timer.wrap("search", chain.search_torrents)), \
+            mock.patch.object(chain, "filter_torrents", timer.wrap("filter", chain.filter_torrents)), \
+            mock.patch.object(helper, "match_torrent", timer.wrap("match", helper.match_torrent)), \
+            mock.patch.object(helper, "sort_torrents", timer.wrap("sort", helper.sort_torrents)), \
+            PeakRss() as rss:
+        for i in range(repeat):
+            mediainfo = MediaInfo(tmdb_info=copy.deepcopy(medias[i % len(medias)]))
+            start = time.perf_counter()
+            contexts = chain.process(mediainfo=mediainfo, rule_groups=rule_groups)
+            durations.append(time.perf_counter() - start)
+            results += len(contexts)
+    return {
+        "scenario": "search",
+        "torrents": torrents,
+        "sites": len(replay.indexers),
+        "rule_levels": levels,
+        "repeat": repeat,
+        "matched": results // repeat,
+        "throughput": round(torrents * repeat / sum(durations), 1),
+        "throughput_unit": "torrents/s",
+        "mean_ms": round(statistics.mean(durations) * 1000, 3),
+        "p95_ms": round(p95(durations) * 1000, 3),
+        "peak_rss_mb": round(rss.peak / 1024 / 1024, 1),
+        "stages": timer.summary(),
+    }
+
+
+def build_cache(replay: ReplaySites) -> Dict[str, List[Context]]:
+    """
+    按站点刷新回放页面并识别，生成订阅匹配使用的种子缓存
+    """
+    chain = SearchChain()
+    cache = {}
+    with replay.patch():
+        for indexer in replay.indexers:
+            torrents: List[TorrentInfo] = chain.search_torrents(site=indexer, keywords=None) or []
+            contexts = []
+            for torrent in torrents:
+                meta = MetaInfo(title=torrent.title, subtitle=torrent.description)
+                contexts.append(Context(meta_info=meta, media_info=chain.recognize_media(meta=meta),
+                                        torrent_info=torrent))
+            cache[StringUtils.get_url_domain(indexer.get("domain"))] = contexts
+    return cache
+
+
+def bench_subscribe(cache: Dict[str, List[Context]], subscribes: int, levels: int, repeat: int) -> dict:
+    """
+    SubscribeChain.match：订阅与种子缓存逐一匹配，不执行下载
+    """
+    medias = load_medias(subscribes)
+    set_rule_group(levels)
+    subscribeoper = SubscribeOper()
+    for subscribe in subscribeoper.list():
+        subscribeoper.delete(subscribe.id)
+    for media in medias[:subscribes]:
+        mediainfo = MediaInfo(tmdb_info=media)
+        subscribeoper.add(mediainfo=mediainfo, state="R", best_version=0,
+                          season=2 if mediainfo.type == MediaType.TV else None,
+                          total_episode=10 if mediainfo.type == MediaType.TV else 0,
+                          start_episode=1 if mediainfo.type == MediaType.TV else 0)
+    chain = SubscribeChain()
+    timer = StageTimer()
+    helper = chain.torrenthelper
+    matched = []
+
+    def batch_download(contexts: List[Context], no_exists: dict = None, **kwargs):
+        matched.append(len(contexts))
+        return [], no_exists
+
+    torrents = sum(len(contexts) for contexts in cache.values())
+    durations = []
+    with mock.patch.object(chain.downloadchain, "batch_download", batch_download), \
+            mock.patch.object(chain, "finish_subscribe_or_not"), \
+            mock.patch.object(chain, "filter_torrents", timer.wrap("filter", chain.filter_torrents)), \
+            mock.patch.object(helper, "match_torrent", timer.wrap("match", helper.match_torrent)), \
+            mock.patch.object(helper, "filter_torrent", timer.wrap("filter_params", helper.filter_torrent)), \
+            PeakRss() as rss:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            chain.match(cache)
+            durations.append(time.perf_counter() - start)
+    return {
+        "scenario": "subscribe",
+        "torrents": torrents,
+        "subscribes": subscribes,
+        "rule_levels": levels,
+        "repeat": repeat,
+        "matched": sum(matched) // repeat,
+        "throughput": round(subscribes * torrents * repeat / sum(durations), 1),
+        "throughput_unit": "pairs/s",
+        "mean_ms": round(statistics.mean(durations) * 1000, 3),
+        "p95_ms": round(p95(durations) * 1000, 3),
+        "peak_rss_mb": round(rss.peak / 1024 / 1024, 1),
+        "stages": timer.summary(),
+    }
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                  text=True, cwd=Path(__file__).parent, timeout=5).stdout.strip()
+    except Exception:
+        revision = None
+    return {
+        "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def case_key(case: dict) -> tuple:
+    return case["scenario"], case["torrents"], case.get("subscribes"), case["rule_levels"]
+
+
+def compare(cases: List[dict], baseline_file: str):
+    """
+    与基准结果对比吞吐量
+    """
+    baseline = {case_key(case): case for case in json.loads(Path(baseline_file).read_text())["cases"]}
+    for case in cases:
+        base = baseline.get(case_key(case))
+        if not base:
+            continue
+        ratio = case["throughput"] / base["throughput"] if base["throughput"] else 0
+        print(f"{case_key(case)}：吞吐量 {base['throughput']} → {case['throughput']} {case['throughput_unit']}"
+              f"（{ratio:.2f}x），P95 {base['p95_ms']} → {case['p95_ms']} ms", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="搜索/订阅匹配流程离线基准测试")
+    parser.add_argument("--torrents", default="1000,10000,50000", help="搜索返回的种子总数，逗号分隔")
+    parser.add_argument("--subscribes", default="10,100,500", help="订阅数，逗号分隔")
+    parser.add_argument("--rules", default="1,4,16", help="过滤规则组的优先级级数，逗号分隔")
+    parser.add_argument("--sites", type=int, default=10, help="站点数")
+    parser.add_argument("--cache-torrents", type=int, default=1000, help="订阅匹配使用的种子缓存数")
+    parser.add_argument("--repeat", type=int, default=3, help="每个用例重复次数")
+    parser.add_argument("--scenario", choices=["all", "search", "subscribe"], default="all")
+    parser.add_argument("--output", help="结果输出文件，默认输出到标准输出")
+    parser.add_argument("--baseline", help="对比的历史结果文件")
+    args = parser.parse_args()
+
+    init_db()
+    setup_modules(load_medias(max(int(n) for n in args.subscribes.split(","))))
+    levels_list = [int(n) for n in args.rules.split(",")]
+    cases = []
+    if args.scenario in ("all", "search"):
+        for torrents in [int(n) for n in args.torrents.split(",")]:
+            replay = ReplaySites(sites=args.sites, per_site=max(torrents // args.sites, 1))
+            for levels in levels_list:
+                cases.append(bench_search(replay, torrents, levels, args.repeat))
+                print(f"search torrents={torrents} rules={levels}：{cases[-1]['throughput']} torrents/s",
+                      file=sys.stderr)
+    if args.scenario in ("all", "subscribe"):
+        cache = build_cache(ReplaySites(sites=args.sites, per_site=max(args.cache_torrents // args.sites, 1)))
+        for subscribes in [int(n) for n in args.subscribes.split(",")]:
+            for levels in levels_list:
+                cases.append(bench_subscribe(cache, subscribes, levels, args.repeat))
+                print(f"subscribe subscribes={subscribes} rules={levels}：{cases[-1]['throughput']} pairs/s",
+                      file=sys.stderr)
+
+    result = json.dumps({"env": environment(), "cases": cases}, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(result, encoding="utf-8")
+    else:
+        print(result)
+    if args.baseline:
+        compare(cases, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
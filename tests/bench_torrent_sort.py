@@ -0,0 +1,143 @@
+"""
+种子排序及去重基准测试：构造合成搜索结果，对比字符串排序键/列表去重与元组排序键/集合去重/堆取前N的耗时
+运行：python -m tests.bench_torrent_sort [--contexts 20000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import tempfile
+from types import SimpleNamespace
+from typing import List
+
+# 使用独立的配置目录，避免污染用户数据，需在导入app之前设置
+os.environ.setdefault("CONFIG_DIR", tempfile.mkdtemp(prefix="mp_bench_"))
+os.environ.setdefault("LOG_LEVEL", "warning")
+
+from app.core.context import Context, MediaInfo, TorrentInfo
+from app.core.metainfo import MetaInfo
+from app.db.init import init_db
+from app.helper.torrent import TorrentHelper
+from app.schemas.types import MediaType
+from tests.benchmark import compare
+
+SITES = [f"site{i}" for i in range(40)]
+UPLOADS = {name: i * 7919 % 100000 for i, name in enumerate(SITES)}
+
+
+def build_contexts(count: int) -> List[Context]:
+    """
+    构造合成的搜索结果，包含多部剧集及电影
+    """
+    rnd = random.Random(42)
+    medias = [MediaInfo(type=MediaType.TV, title=f"剧集{i}", year=str(2000 + i % 24)) for i in range(20)] \
+        + [MediaInfo(type=MediaType.MOVIE, title=f"电影{i}", year=str(2000 + i % 24)) for i in range(20)]
+    contexts = []
+    for i in range(count):
+        media = rnd.choice(medias)
+        if media.type == MediaType.TV:
+            season = rnd.randint(1, 3)
+            if rnd.random() < 0.3:
+                title = f"Show.{i}.S{season:02d}.2160p.WEB-DL.H265-GRP"
+            else:
+                episode = rnd.randint(1, 24)
+                title = f"Show.{i}.S{season:02d}E{episode:02d}-E{episode + rnd.randint(0, 3):02d}.1080p.WEB-DL-GRP"
+        else:
+            title = f"Movie.{i}.{media.year}.1080p.BluRay.x264-GRP"
+        torrent = TorrentInfo(site_name=rnd.choice(SITES), site_order=rnd.randint(0, 50), title=title,
+                              seeders=rnd.randint(0, 5000), pri_order=rnd.randint(0, 99))
+        contexts.append(Context(meta_info=MetaInfo(title), media_info=media, torrent_info=torrent))
+    return contexts
+
+
+def old_sort_torrents(torrent_list: List[Context], priority_rule: List[str]) -> List[Context]:
+    """
+    原 sort_torrents 的实现
+    """
+
+    def get_sort_str(_context):
+        _meta = _context.meta_info
+        _torrent = _context.torrent_info
+        _media = _context.media_info
+        _title = str(_media.title).ljust(200, ' ')
+        _site_order = str(999 - (_torrent.site_order or 0)).rjust(3, '0')
+        _site_upload = str(UPLOADS.get(_torrent.site_name) or 0).rjust(30, '0')
+        _torrent_order = str(_torrent.pri_order or 0).rjust(3, '0')
+        _torrent_seeders = str(_torrent.seeders or 0).rjust(10, '0')
+        if not _meta.episode_list:
+            _season_episode = "%s%s" % (str(len(_meta.season_list)).rjust(3, '0'), "9999")
+        else:
+            _season_episode = "%s%s" % (str(len(_meta.season_list)).rjust(3, '0'),
+                                        str(len(_meta.episode_list)).rjust(4, '0'))
+        _sort_str = _title
+        for rule in priority_rule:
+            if rule == "torrent":
+                _sort_str += _torrent_order
+            elif rule == "site":
+                _sort_str += _site_order
+            elif rule == "upload":
+                _sort_str += _site_upload
+            elif rule == "seeder":
+                _sort_str += _torrent_seeders
+        _sort_str += _season_episode
+        return _sort_str
+
+    return sorted(torrent_list, key=lambda x: get_sort_str(x), reverse=True)
+
+
+def old_group(torrent_list: List[Context], priority_rule: List[str]) -> List[Context]:
+    """
+    原 sort_group_torrents 的实现
+    """
+    result = []
+    _added = []
+    for context in old_sort_torrents(torrent_list, priority_rule):
+        meta = context.meta_info
+        media = context.media_info
+        if media.type == MediaType.TV:
+            media_name = "%s%s" % (media.title_year, meta.season_episode)
+        else:
+            media_name = media.title_year
+        if media_name not in _added:
+            _added.append(media_name)
+            result.append(context)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="种子排序及去重基准测试")
+    parser.add_argument("--contexts", type=int, default=20000, help="合成上下文数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例重复次数")
+    args = parser.parse_args()
+
+    init_db()
+    helper = TorrentHelper()
+    helper.site_oper.get_userdata_latest = lambda: [SimpleNamespace(name=name, upload=upload)
+                                                    for name, upload in UPLOADS.items()]
+    priority_rule = ["torrent", "upload", "seeder"]
+    contexts = build_contexts(args.contexts)
+
+    def clear_cache():
+        for context in contexts:
+            context.__dict__.pop("_sort_fields", None)
+
+    assert helper.sort_torrents(contexts) == old_sort_torrents(contexts, priority_rule)
+    assert helper.sort_group_torrents(contexts) == old_group(contexts, priority_rule)
+
+    files = [f"Show/Season 1/Show.S01E{i % 99 + 1:02d}.1080p.mkv" for i in range(2000)]
+    cases = [
+        ("排序（首次）", lambda: old_sort_torrents(contexts, priority_rule),
+         lambda: helper.sort_torrents(contexts), clear_cache),
+        ("排序（已缓存排序字段）", lambda: old_sort_torrents(contexts, priority_rule),
+         lambda: helper.sort_torrents(contexts), None),
+        ("排序去重", lambda: old_group(contexts, priority_rule),
+         lambda: helper.sort_group_torrents(contexts), None),
+        ("种子集数识别（2000文件）",
+         lambda: [MetaInfo(f.rsplit("/", 1)[-1].rsplit(".", 1)[0]).episode_list for f in files],
+         lambda: TorrentHelper.get_torrent_episodes(files), None),
+    ]
+    print(f"{args.contexts} 个上下文")
+    compare(cases, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+种子缓存压缩格式对比：50个站点 x 100个种子，对比缓存文件大小、加载耗时及内存占用
+运行：python -m tests.bench_torrents_cache
+"""
+import pickle
+import time
+import tracemalloc
+
+from app.chain.torrents import TorrentsChain
+from app.core.context import Context, MediaInfo, TorrentInfo
+from app.core.metainfo import MetaInfo
+from app.schemas.types import MediaType
+
+SITES = 50
+TORRENTS = 100
+MEDIAS = 40
+
+
+def build_cache() -> dict:
+    """
+    构造旧格式的种子缓存，每个种子的媒体信息都是独立的对象
+    """
+    cache = {}
+    for s in range(SITES):
+        cookie = f"uid={s}; pass={'x' * 64}; cf_clearance={'y' * 120}"
+        ua = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/128.0 Safari/537.36"
+        contexts = []
+        for t in range(TORRENTS):
+            m = (s + t) % MEDIAS
+            title = f"Show.{m}.S01E{t % 12 + 1:02d}.1080p.WEB-DL.H264.AAC-GROUP{m % 7}"
+            mediainfo = MediaInfo(type=MediaType.TV, title=f"剧集{m}", year="2024", tmdb_id=1000 + m,
+                                  overview="简介" * 60, poster_path=f"https://image.tmdb.org/p/{m}.jpg",
+                                  category="国产剧")
+            mediainfo.clear()
+            # 模拟每次解析产生新的字符串对象
+            torrent = TorrentInfo(site=s, site_name=f"站点{s}", site_cookie="".join(cookie),
+                                  site_ua="".join(ua), site_order=s, title=title,
+                                  description=f"第{t % 12 + 1}集 | 中字", size=1.5e9, seeders=t,
+                                  enclosure=f"https://site{s}.org/download.php?id={t}&passkey={'k' * 32}",
+                                  page_url=f"https://site{s}.org/details.php?id={t}", pubdate="2024-10-01 00:00:00")
+            contexts.append(Context(meta_info=MetaInfo(title), media_info=mediainfo, torrent_info=torrent))
+        cache[f"site{s}.org"] = contexts
+    return cache
+
+
+def measure(data: bytes, loader) -> tuple:
+    """
+    测量加载耗时及内存占用
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = loader(pickle.loads(data))
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, current
+
+
+if __name__ == "__main__":
+    chain = TorrentsChain()
+    cache = build_cache()
+
+    old_data = pickle.dumps(cache)
+    new_data = pickle.dumps(chain._TorrentsChain__pack_torrents(cache))
+    old_time, old_mem = measure(old_data, lambda x: x)
+    new_time, new_mem = measure(new_data, chain._TorrentsChain__unpack_torrents)
+
+    print(f"{SITES} 个站点 x {TORRENTS} 个种子")
+    print(f"旧格式：文件 {len(old_data) / 1024:.0f} KB，加载 {old_time * 1000:.1f} ms，内存 {old_mem / 1024:.0f} KB")
+    print(f"新格式：文件 {len(new_data) / 1024:.0f} KB，加载 {new_time * 1000:.1f} ms，内存 {new_mem / 1024:.0f} KB")
@@ -0,0 +1,59 @@
+"""
+基准测试公共方法：计时并输出原方式与新方式的对比表格
+"""
+import statistics
+import time
+from typing import Callable, Iterable, Optional
+
+
+def measure(func: Callable, repeat: int, setup: Callable = None) -> float:
+    """
+    返回多次执行的中位耗时（毫秒）
+    :param func: 被测方法
+    :param repeat: 重复次数
+    :param setup: 每次执行前调用（不计入耗时），如清除缓存
+    """
+    elapsed = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        elapsed.append((time.perf_counter() - start) * 1000)
+    return statistics.median(elapsed)
+
+
+def print_header(width: int = 24, calls: Optional[int] = None):
+    """
+    输出对比表头
+    :param width: 用例名称列宽
+    :param calls: 每轮调用次数，指定时按吞吐量（条/秒）输出
+    """
+    if calls:
+        print(f"{'用例':<{width}}{'原方式(条/秒)':>14}{'新方式(条/秒)':>14}{'加速':>8}")
+    else:
+        print(f"{'用例':<{width}}{'原方式(ms)':>12}{'新方式(ms)':>12}{'加速':>8}")
+
+
+def compare(cases: Iterable[tuple], repeat: int, width: int = 24, calls: Optional[int] = None,
+            precision: int = 1, header: bool = True):
+    """
+    依次测量各用例的原方式和新方式并输出对比表格
+    :param cases: (名称, 原方式, 新方式) 或 (名称, 原方式, 新方式, 新方式每次执行前的准备) 列表
+    :param repeat: 每个用例重复次数
+    :param width: 用例名称列宽
+    :param calls: 每轮调用次数，指定时按吞吐量（条/秒）输出
+    :param precision: 耗时保留的小数位数
+    :param header: 是否输出表头
+    """
+    if header:
+        print_header(width=width, calls=calls)
+    for name, old, new, *setup in cases:
+        old_ms = measure(old, repeat)
+        new_ms = measure(new, repeat, setup[0] if setup else None)
+        speedup = old_ms / new_ms if new_ms else 0
+        if calls:
+            old_rate, new_rate = calls * 1000 / old_ms, calls * 1000 / new_ms
+            print(f"{name:<{width}}{old_rate:>14.0f}{new_rate:>14.0f}{speedup:>7.1f}x")
+        else:
+            print(f"{name:<{width}}{old_ms:>12.{precision}f}{new_ms:>12.{precision}f}{speedup:>7.1f}x")
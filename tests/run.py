@@ -1,6 +1,9 @@
 import unittest
 
+from tests.test_browser import BrowserPoolTest
+from tests.test_copy import CopyUtilsTest
 from tests.test_metainfo import MetaInfoTest
+from tests.test_rclone import RcloneTest
 
 if __name__ == '__main__':
     suite = unittest.TestSuite()
@@ -8,6 +11,24 @@ if __name__ == '__main__':
     # 测试名称识别
     suite.addTest(MetaInfoTest('test_metainfo'))
 
+    # 测试文件复制
+    suite.addTest(CopyUtilsTest('test_copy'))
+    suite.addTest(CopyUtilsTest('test_resume'))
+    suite.addTest(CopyUtilsTest('test_stale_checkpoint'))
+    suite.addTest(CopyUtilsTest('test_fallback'))
+    suite.addTest(CopyUtilsTest('test_failure_cleanup'))
+
+    # 测试浏览器池
+    suite.addTest(BrowserPoolTest('test_context_reuse'))
+    suite.addTest(BrowserPoolTest('test_fresh_context'))
+    suite.addTest(BrowserPoolTest('test_cancelled_task'))
+
+    # 测试rclone存储
+    suite.addTest(RcloneTest('test_list_stat_mkdir'))
+    suite.addTest(RcloneTest('test_async_move'))
+    suite.addTest(RcloneTest('test_rename_dir'))
+    suite.addTest(RcloneTest('test_list_cache'))
+
     # 运行测试
     runner = unittest.TextTestRunner()
     runner.run(suite)
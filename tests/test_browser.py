@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import TestCase, skipUnless
+
+from app.helper.browser import BrowserPool, _BrowserWorker
+
+
+def _chromium_available() -> bool:
+    """
+    是否已安装Playwright及Chromium
+    """
+    try:
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as p:
+            return Path(p.chromium.executable_path).exists()
+    except Exception:
+        return False
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    /login 设置会话Cookie，其它路径返回请求中的Cookie
+    """
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if self.path == "/login":
+            self.send_header("Set-Cookie", "session=abc; Path=/")
+        self.end_headers()
+        self.wfile.write(f"<html><body>{self.headers.get('Cookie') or ''}</body></html>".encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@skipUnless(_chromium_available(), "未安装Playwright Chromium")
+class BrowserPoolTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        BrowserPool().stop()
+        cls.server.shutdown()
+
+    def __fetch(self, path: str, fresh: bool = False) -> str:
+        url = f"{self.url}{path}"
+
+        def __run(page):
+            page.goto(url)
+            return page.inner_text("body")
+
+        return BrowserPool().submit(url, __run, headless=True, fresh=fresh).result(timeout=60)
+
+    def test_context_reuse(self):
+        self.__fetch("/login")
+        # 同一站点复用上下文，保留Cookie
+        self.assertIn("session=abc", self.__fetch("/"))
+
+    def test_fresh_context(self):
+        self.__fetch("/login")
+        # 全新上下文不带入站点Cookie，也不影响站点上下文
+        self.assertNotIn("session=abc", self.__fetch("/", fresh=True))
+        self.assertIn("session=abc", self.__fetch("/"))
+
+    def test_cancelled_task(self):
+        worker = _BrowserWorker(browser_type="chromium", headless=True)
+        worker.start()
+        try:
+            called = []
+            slow = worker.submit(("slow",), lambda page: page.wait_for_timeout(2000))
+            abandoned = worker.submit(("slow",), lambda page: called.append(page))
+            # 调用方超时放弃排队中的任务，工作线程跳过
+            self.assertTrue(abandoned.cancel())
+            slow.result(timeout=60)
+            self.assertEqual(worker.submit(("slow",), lambda page: "ok").result(timeout=60), "ok")
+            self.assertEqual(called, [])
+        finally:
+            worker.stop()
+            worker.join(timeout=10)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+from pathlib import Path
+from unittest import TestCase, mock
+
+from app.utils.copy import CopyUtils
+
+
+class CopyUtilsTest(TestCase):
+    def setUp(self) -> None:
+        self._tempdir = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tempdir.name)
+        self.src = self.dir / "src.mkv"
+        self.src.write_bytes(os.urandom(1024 * 1024 + 123))
+        self.dest = self.dir / "dest.mkv"
+        self.part = self.dir / "dest.mkv.part"
+        self.checkpoint = self.dir / "dest.mkv.part.offset"
+        # 不使用reflink，按块复制
+        self._patches = [
+            mock.patch.object(CopyUtils, "_CopyUtils__reflink", return_value=False),
+            mock.patch.object(CopyUtils, "_chunk_size", 64 * 1024),
+        ]
+        for patch in self._patches:
+            patch.start()
+
+    def tearDown(self) -> None:
+        for patch in self._patches:
+            patch.stop()
+        self._tempdir.cleanup()
+
+    def __write_part(self, offset: int, mtime_ns: int = None):
+        """
+        模拟中断后遗留的.part文件和检查点
+        """
+        stat = self.src.stat()
+        self.part.write_bytes(self.src.read_bytes()[:offset])
+        self.checkpoint.write_text(f"{stat.st_size}:{mtime_ns or stat.st_mtime_ns}:{offset}")
+
+    def test_copy(self):
+        code, message = CopyUtils.copy(self.src, self.dest)
+        self.assertEqual(code, 0, message)
+        self.assertEqual(self.dest.read_bytes(), self.src.read_bytes())
+        self.assertFalse(self.part.exists())
+        self.assertFalse(self.checkpoint.exists())
+
+    def test_resume(self):
+        self.__write_part(512 * 1024)
+        offsets = []
+        code, message = CopyUtils.copy(self.src, self.dest, progress_callback=lambda done, _: offsets.append(done))
+        self.assertEqual(code, 0, message)
+        # 从检查点继续复制
+        self.assertGreater(offsets[0], 512 * 1024)
+        self.assertEqual(self.dest.read_bytes(), self.src.read_bytes())
+        self.assertFalse(self.checkpoint.exists())
+
+    def test_stale_checkpoint(self):
+        # 源文件已变化，从头复制
+        self.__write_part(512 * 1024, mtime_ns=1)
+        offsets = []
+        code, message = CopyUtils.copy(self.src, self.dest, progress_callback=lambda done, _: offsets.append(done))
+        self.assertEqual(code, 0, message)
+        self.assertEqual(offsets[0], 64 * 1024)
+        self.assertEqual(self.dest.read_bytes(), self.src.read_bytes())
+        self.assertFalse(self.checkpoint.exists())
+
+    def test_fallback(self):
+        # copy_file_range和sendfile都不可用时使用普通读写
+        with mock.patch("os.copy_file_range", side_effect=OSError(18, "Invalid cross-device link"), create=True), \
+                mock.patch("os.sendfile", side_effect=OSError(22, "Invalid argument"), create=True):
+            code, message = CopyUtils.copy(self.src, self.dest)
+        self.assertEqual(code, 0, message)
+        self.assertEqual(self.dest.read_bytes(), self.src.read_bytes())
+
+    def test_failure_cleanup(self):
+        self.__write_part(512 * 1024)
+        with mock.patch("os.copy_file_range", return_value=0, create=True):
+            code, _ = CopyUtils.copy(self.src, self.dest)
+        self.assertEqual(code, -1)
+        self.assertFalse(self.dest.exists())
+        self.assertFalse(self.part.exists())
+        self.assertFalse(self.checkpoint.exists())
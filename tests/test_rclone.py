@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase, mock, skipUnless
+
+from app import schemas
+from app.helper.rclone import RcloneHelper
+from app.modules.filemanager.storages.rclone import Rclone
+
+
+@skipUnless(shutil.which("rclone"), "未安装rclone")
+class RcloneTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        # 使用指向临时目录的alias远程存储作为MP:
+        cls._tempdir = tempfile.TemporaryDirectory()
+        cls.root = Path(cls._tempdir.name)
+        cls._env = mock.patch.dict(os.environ, {
+            "RCLONE_CONFIG_MP_TYPE": "alias",
+            "RCLONE_CONFIG_MP_REMOTE": str(cls.root)
+        })
+        cls._env.start()
+        RcloneHelper().stop()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        RcloneHelper().stop()
+        cls._env.stop()
+        cls._tempdir.cleanup()
+
+    def setUp(self) -> None:
+        for path in self.root.iterdir():
+            shutil.rmtree(path) if path.is_dir() else path.unlink()
+        self.storage = Rclone()
+        self.storage._Rclone__clear_cache()
+
+    def __root(self) -> schemas.FileItem:
+        return self.storage.get_item(Path("/"))
+
+    def __names(self, fileitem: schemas.FileItem):
+        return sorted(item.name for item in self.storage.list(fileitem))
+
+    def test_list_stat_mkdir(self):
+        (self.root / "a.mkv").write_bytes(b"0" * 10)
+        folder = self.storage.create_folder(self.__root(), "Movies")
+        self.assertEqual(folder.path, "/Movies/")
+        self.assertTrue((self.root / "Movies").is_dir())
+        self.assertEqual(self.__names(self.__root()), ["Movies", "a.mkv"])
+        item = self.storage.get_item(Path("/a.mkv"))
+        self.assertEqual((item.type, item.size, item.extension), ("file", 10, "mkv"))
+        self.assertEqual(self.storage.get_item(Path("/Movies")).type, "dir")
+        self.assertIsNone(self.storage.get_item(Path("/missing.mkv")))
+        # 自动创建各级目录
+        self.assertEqual(self.storage.get_folder(Path("/TV/Show/Season 1")).path, "/TV/Show/Season 1/")
+
+    def test_async_move(self):
+        (self.root / "a.mkv").write_bytes(b"0")
+        calls = []
+        call = RcloneHelper.call
+
+        def __call(helper, command, *args, **kwargs):
+            calls.append(command)
+            return call(helper, command, *args, **kwargs)
+
+        with mock.patch.object(RcloneHelper, "call", __call):
+            self.assertTrue(self.storage.move(self.storage.get_item(Path("/a.mkv")), Path("/Movies/b.mkv")))
+        # 以异步任务提交并轮询任务状态
+        self.assertIn("job/status", calls)
+        self.assertFalse((self.root / "a.mkv").exists())
+        self.assertTrue((self.root / "Movies" / "b.mkv").exists())
+
+    def test_rename_dir(self):
+        (self.root / "Old" / "Sub").mkdir(parents=True)
+        (self.root / "Old" / "a.mkv").write_bytes(b"0")
+        (self.root / "Old" / "Sub" / "b.srt").write_bytes(b"1")
+        self.assertTrue(self.storage.rename(self.storage.get_item(Path("/Old")), "New"))
+        self.assertFalse((self.root / "Old").exists())
+        self.assertTrue((self.root / "New" / "a.mkv").exists())
+        self.assertTrue((self.root / "New" / "Sub" / "b.srt").exists())
+
+    def test_list_cache(self):
+        root = self.__root()
+        self.assertEqual(self.__names(root), [])
+        # 绕过存储直接写入，命中缓存
+        (self.root / "a.mkv").write_bytes(b"0")
+        self.assertEqual(self.__names(root), [])
+        # 通过存储修改后清除所在目录的缓存
+        self.storage.create_folder(root, "Movies")
+        self.assertEqual(self.__names(root), ["Movies", "a.mkv"])
+        movies = self.storage.get_item(Path("/Movies"))
+        self.assertEqual(self.__names(movies), [])
+        self.storage.move(self.storage.get_item(Path("/a.mkv")), Path("/Movies/a.mkv"))
+        self.assertEqual(self.__names(root), ["Movies"])
+        self.assertEqual(self.__names(movies), ["a.mkv"])
+        self.storage.delete(self.storage.get_item(Path("/Movies/a.mkv")))
+        self.assertEqual(self.__names(movies), [])